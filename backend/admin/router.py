@@ -3,8 +3,10 @@ Admin Panel Router — all HTML (server-side) routes.
 Mounted at: /admin
 """
 
+import base64
 import json
 import os
+import asyncio
 import re
 import time
 from datetime import datetime
@@ -13,7 +15,7 @@ from typing import Any, Dict, Optional
 
 import httpx
 from fastapi import APIRouter, Depends, Form, Query, Request, Response
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 
 from admin.auth import (
@@ -107,6 +109,17 @@ async def _start_full_sync() -> dict:
         return {"error": str(e)}
 
 
+def _sync_elapsed(sync: dict) -> int:
+    """Seconds a running job has been going (started_at is stored as naive UTC)."""
+    started_at = sync.get("started_at")
+    if started_at and sync.get("status") == "running":
+        try:
+            return int((datetime.utcnow() - datetime.fromisoformat(started_at)).total_seconds())
+        except Exception:
+            return 0
+    return 0
+
+
 def _ts_to_str(ts) -> str:
     if not ts:
         return "—"
@@ -174,11 +187,10 @@ async def dashboard(request: Request):
     if not user:
         return _redirect_login("/admin/dashboard")
 
-    # Gather quick stats from DB
+    # Quick stats: O(1) reads of the stat_counters table
     from app.infra.db.session import SessionLocal
-    from app.infra.db.models.student import Student
     from app.infra.db.models.event_log import EventLog
-    from sqlalchemy import func, text
+    from app.services.stat_counter_service import dashboard_stats
 
     stats = {
         "students": 0,
@@ -190,23 +202,7 @@ async def dashboard(request: Request):
 
     try:
         db = SessionLocal()
-        stats["students"] = db.query(func.count(Student.id)).scalar() or 0
-        stats["events_total"] = db.query(func.count(EventLog.id)).scalar() or 0
-        stats["events_completed"] = (
-            db.query(func.count(EventLog.id))
-            .filter(EventLog.status == "completed")
-            .scalar() or 0
-        )
-        stats["events_failed"] = (
-            db.query(func.count(EventLog.id))
-            .filter(EventLog.status == "failed")
-            .scalar() or 0
-        )
-        stats["events_pending"] = (
-            db.query(func.count(EventLog.id))
-            .filter(EventLog.status.in_(["pending", "processing"]))
-            .scalar() or 0
-        )
+        stats.update(dashboard_stats(db))
         # Recent events (last 10)
         recent_events = (
             db.query(EventLog)
@@ -248,13 +244,7 @@ async def sync_control(request: Request):
         return _redirect_login("/admin/sync")
 
     sync = await _get_sync_status()
-    elapsed = 0
-    started_at = sync.get("started_at")
-    if started_at and sync.get("status") == "running":
-        try:
-            elapsed = int((datetime.utcnow() - datetime.fromisoformat(started_at)).total_seconds())
-        except Exception:
-            elapsed = 0
+    elapsed = _sync_elapsed(sync)
     return templates.TemplateResponse(
         "sync_control.html",
         {"request": request, "user": user, "sync": sync, "elapsed": elapsed, "ts": _ts_to_str},
@@ -283,20 +273,43 @@ async def sync_status_partial(request: Request):
         return HTMLResponse("", status_code=401)
 
     sync = await _get_sync_status()
-    # Calculate elapsed seconds for running jobs (started_at is stored as naive UTC)
-    elapsed = 0
-    started_at = sync.get("started_at")
-    if started_at and sync.get("status") == "running":
-        try:
-            elapsed = int((datetime.utcnow() - datetime.fromisoformat(started_at)).total_seconds())
-        except Exception:
-            elapsed = 0
+    elapsed = _sync_elapsed(sync)
     return templates.TemplateResponse(
         "partials/sync_status.html",
         {"request": request, "sync": sync, "started": False, "elapsed": elapsed, "ts": _ts_to_str},
     )
 
 
+async def _sync_panel_events():
+    """Re-render the status panel whenever the latest full-sync job publishes progress."""
+    from app.api.v1.endpoints import full_sync
+    from app.core import progress
+    from app.core.config import settings
+
+    panel = templates.get_template("partials/sync_status.html")
+    pause = settings.FULL_SYNC_PROGRESS_INTERVAL_MS / 1000
+    with progress.bus.subscribe(full_sync.PROGRESS_TOPIC) as sub:
+        while True:
+            sync = full_sync.JOBS.get(full_sync.LATEST_JOB_ID) or {"status": "no_job"}
+            html = panel.render(sync=sync, started=False, elapsed=_sync_elapsed(sync), ts=_ts_to_str)
+            yield progress.sse_event("status", html)
+            # Updates that land meanwhile are conflated into the next render
+            await asyncio.sleep(pause)
+            while not await sub.get(timeout=progress.SSE_KEEPALIVE_SECONDS):
+                yield ": keepalive\n\n"
+
+
+@router.get("/sync/stream")
+async def sync_stream(request: Request):
+    """SSE target of the sync page — pushes the rendered status panel on progress."""
+    user = get_current_user(request)
+    if not user:
+        return HTMLResponse("", status_code=401)
+    from app.core.progress import SSE_HEADERS
+    return StreamingResponse(_sync_panel_events(), media_type="text/event-stream",
+                             headers=SSE_HEADERS)
+
+
 @router.post("/sync/single-student", response_class=HTMLResponse)
 async def sync_single_student(request: Request, zoho_student_id: str = Form(...)):
     """Sync a single student by Zoho ID."""
@@ -351,28 +364,30 @@ async def logs_page(
     category: str = Query(default=""),
     status:   str = Query(default=""),
     search:   str = Query(default=""),
-    page:     int = Query(default=1, ge=1),
+    before:   Optional[int] = Query(default=None),
+    after:    Optional[int] = Query(default=None),
 ):
     user = get_current_user(request)
     if not user:
         return _redirect_login("/admin/logs")
 
-    from app.core.access_log import get_entries
-    logs, total = get_entries(
+    from app.core import access_log
+    result = access_log.get_entries(
         method=method, category=category, status_class=status,
-        search=search, page=page, per_page=100,
+        search=search, before=before, after=after, per_page=100,
     )
-    total_pages = max(1, (total + 99) // 100)
 
     return templates.TemplateResponse(
         "logs.html",
         {
             "request": request,
             "user": user,
-            "logs": logs,
-            "total": total,
-            "page": page,
-            "total_pages": total_pages,
+            "logs": result.entries,
+            "total": result.total,
+            "newer_cursor": result.newer_cursor,
+            "older_cursor": result.older_cursor,
+            "cursor_qs": f"before={before}" if before is not None else (f"after={after}" if after is not None else ""),
+            "capacity": access_log.capacity(),
             "method": method,
             "category": category,
             "status": status,
@@ -388,28 +403,30 @@ async def logs_partial(
     category: str = Query(default=""),
     status:   str = Query(default=""),
     search:   str = Query(default=""),
-    page:     int = Query(default=1, ge=1),
+    before:   Optional[int] = Query(default=None),
+    after:    Optional[int] = Query(default=None),
 ):
     """HTMX partial — returns the logs table only."""
     user = get_current_user(request)
     if not user:
         return HTMLResponse("", status_code=401)
 
-    from app.core.access_log import get_entries
-    logs, total = get_entries(
+    from app.core import access_log
+    result = access_log.get_entries(
         method=method, category=category, status_class=status,
-        search=search, page=page, per_page=100,
+        search=search, before=before, after=after, per_page=100,
     )
-    total_pages = max(1, (total + 99) // 100)
 
     return templates.TemplateResponse(
         "partials/logs_table.html",
         {
             "request": request,
-            "logs": logs,
-            "total": total,
-            "page": page,
-            "total_pages": total_pages,
+            "logs": result.entries,
+            "total": result.total,
+            "newer_cursor": result.newer_cursor,
+            "older_cursor": result.older_cursor,
+            "cursor_qs": f"before={before}" if before is not None else (f"after={after}" if after is not None else ""),
+            "capacity": access_log.capacity(),
             "method": method,
             "category": category,
             "status": status,
@@ -418,15 +435,143 @@ async def logs_partial(
     )
 
 
+# ─── TRACES ───────────────────────────────────────────────────────────────────
+
+@router.get("/traces", response_class=HTMLResponse)
+async def traces_page(
+    request: Request,
+    min_ms: float = Query(default=0, ge=0),
+    search: str   = Query(default=""),
+):
+    """Recent slow / failed request traces (app.core.tracing ring buffer)."""
+    user = get_current_user(request)
+    if not user:
+        return _redirect_login("/admin/traces")
+    if user["role"] != "admin":
+        return RedirectResponse(url="/admin/dashboard", status_code=302)
+
+    from app.core import tracing
+    from app.core.config import settings
+    traces = tracing.recent_traces(min_ms=min_ms, search=search, limit=200)
+
+    return templates.TemplateResponse(
+        "traces.html",
+        {
+            "request": request,
+            "user": user,
+            "traces": traces,
+            "min_ms": min_ms,
+            "search": search,
+            "slow_ms": settings.TRACE_SLOW_MS,
+            "enabled": settings.TRACING_ENABLED,
+            "profiler_max_s": settings.PROFILER_MAX_SECONDS,
+            "ts": _ts_to_str,
+        },
+    )
+
+
+@router.get("/traces/{trace_id}", response_class=HTMLResponse)
+async def trace_detail(request: Request, trace_id: str):
+    """Waterfall of one trace's spans."""
+    user = get_current_user(request)
+    if not user:
+        return _redirect_login(f"/admin/traces/{trace_id}")
+    if user["role"] != "admin":
+        return RedirectResponse(url="/admin/dashboard", status_code=302)
+
+    from app.core import tracing
+    trace = tracing.get_trace(trace_id)
+    if trace is None:
+        return RedirectResponse(url="/admin/traces", status_code=302)
+
+    return templates.TemplateResponse(
+        "trace_detail.html",
+        {"request": request, "user": user, "trace": trace, "rows": trace.waterfall(), "ts": _ts_to_str},
+    )
+
+
+@router.get("/traces/{trace_id}/otlp.json")
+async def trace_export(request: Request, trace_id: str):
+    """One trace as OTLP/JSON (importable into Jaeger / Tempo)."""
+    user = get_current_user(request)
+    if not user or user["role"] != "admin":
+        return Response(status_code=401)
+
+    from app.core import tracing
+    trace = tracing.get_trace(trace_id)
+    if trace is None:
+        return Response(status_code=404)
+    return Response(
+        content=json.dumps(tracing.to_otlp(trace)),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="trace-{trace_id}.json"'},
+    )
+
+
+# ─── PROFILER ─────────────────────────────────────────────────────────────────
+
+@router.get("/profiler/collapsed.txt")
+async def profiler_collapsed(
+    request: Request,
+    seconds:     float = Query(default=10, gt=0),
+    mode:        str   = Query(default="cpu", pattern="^(cpu|tasks)$"),
+    interval_ms: float = Query(default=5, ge=1),
+    idle:        bool  = Query(default=False),
+):
+    """
+    Sample the whole process for `seconds` and download collapsed stacks
+    (flamegraph.pl / speedscope input).  Admin only; one run at a time.
+    """
+    if not require_admin(request):
+        return Response(status_code=401)
+
+    from app.core import profiler
+    try:
+        collapsed, summary = await profiler.profile(seconds, mode, interval_ms / 1000, idle)
+    except profiler.ProfilerBusy as exc:
+        return Response(content=str(exc), status_code=409, media_type="text/plain")
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    header = "# " + " ".join(f"{k}={v}" for k, v in summary.items()) + "\n"
+    return Response(
+        content=header + collapsed,
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="profile-{mode}-{stamp}.txt"'},
+    )
+
+
+@router.get("/profiler/slow-requests")
+async def profiler_slow_requests(request: Request):
+    """Estimated CPU time per endpoint for slow requests (continuous sampler)."""
+    if not require_admin(request):
+        return Response(status_code=401)
+
+    from app.core import profiler
+    from app.core.config import settings
+    return {
+        "enabled": settings.PROFILER_CONTINUOUS_HZ > 0,
+        "sample_hz": settings.PROFILER_CONTINUOUS_HZ,
+        "slow_ms": settings.PROFILER_SLOW_REQUEST_MS,
+        "routes": profiler.slow_request_cpu(),
+    }
+
+
 # ─── DATA BROWSER ─────────────────────────────────────────────────────────────
 
+_BROWSE_PER_PAGE = 30
+_COUNT_CAP = 1000          # filtered counts stop here ("1,000+")
+_COUNT_TTL = 60.0          # seconds a filtered count is reused
+_count_cache: Dict[tuple, tuple] = {}   # (entity, search, status) → (label, stored_at)
+
+
 @router.get("/data/{entity}", response_class=HTMLResponse)
 async def data_browser(
     request: Request,
     entity: str,
     search: str = Query(default=""),
-    page: int = Query(default=1, ge=1),
     status: str = Query(default=""),
+    before: str = Query(default=""),
+    after:  str = Query(default=""),
 ):
     user = get_current_user(request)
     if not user:
@@ -436,8 +581,9 @@ async def data_browser(
     if entity not in allowed:
         entity = "students"
 
-    rows, total, columns = _fetch_entity(entity, search=search, status=status, page=page, per_page=30)
-    total_pages = max(1, (total + 29) // 30)
+    rows, total, columns, newer, older = _fetch_entity(
+        entity, search=search, status=status, before=before, after=after, per_page=_BROWSE_PER_PAGE,
+    )
 
     return templates.TemplateResponse(
         "data_browser.html",
@@ -448,8 +594,8 @@ async def data_browser(
             "rows": rows,
             "columns": columns,
             "total": total,
-            "page": page,
-            "total_pages": total_pages,
+            "newer_cursor": newer,
+            "older_cursor": older,
             "search": search,
             "status": status,
             "ts": _ts_to_str,
@@ -457,99 +603,119 @@ async def data_browser(
     )
 
 
-def _fetch_entity(entity: str, search: str, status: str, page: int, per_page: int):
+def _browse_spec(entity: str):
+    """(model, status column or None, display columns) for a data browser entity."""
+    if entity == "students":
+        from app.infra.db.models.student import Student
+        return Student, Student.status, ["zoho_id", "display_name", "academic_email", "phone", "status", "sync_status", "created_at"]
+    if entity == "events":
+        from app.infra.db.models.event_log import EventLog
+        return EventLog, EventLog.status, ["source", "module", "event_type", "record_id", "status", "created_at", "error_message"]
+    if entity == "registrations":
+        from app.infra.db.models.registration import Registration
+        return Registration, Registration.enrollment_status, ["zoho_id", "student_zoho_id", "enrollment_status", "registration_date", "sync_status", "created_at"]
+    if entity == "enrollments":
+        from app.infra.db.models.enrollment import Enrollment
+        return Enrollment, Enrollment.status, ["zoho_id", "student_zoho_id", "class_zoho_id", "status", "start_date", "created_at"]
+    if entity == "payments":
+        from app.infra.db.models.payment import Payment
+        return Payment, None, ["zoho_id", "amount", "status", "payment_date", "created_at"]
+    from app.infra.db.models.grade import Grade
+    return Grade, None, ["zoho_id", "grade_value", "grade_type", "status", "created_at"]
+
+
+def _encode_cursor(row, id_only: bool) -> str:
+    raw = str(row.id) if id_only else f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _keyset_filter(model, cursor: str, id_only: bool, older: bool):
+    """Rows strictly older (or newer) than the cursor row in (created_at, id) order."""
+    from sqlalchemy import and_, or_
+
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    if id_only:
+        key = int(raw)
+        return model.id < key if older else model.id > key
+    created, key = raw.split("|", 1)
+    created = datetime.fromisoformat(created)
+    if older:
+        return or_(model.created_at < created, and_(model.created_at == created, model.id < key))
+    return or_(model.created_at > created, and_(model.created_at == created, model.id > key))
+
+
+def _browse_count(db, entity: str, model, q, search: str, status: str) -> str:
+    """Display total: exact O(1) counters, a planner estimate, or a capped, cached count."""
+    from sqlalchemy import func, text
+    from app.services import stat_counter_service as counters
+
+    if entity in ("students", "events") and not search and (not status or entity == "events"):
+        c = counters.read_counters(db)
+        if entity == "students" and not status:
+            return f"{c.get(counters.STUDENTS_TOTAL, 0):,}"
+        name = counters.STATUS_PREFIX + status if status else counters.EVENTS_TOTAL
+        return f"{c.get(name, 0):,}"
+    if not search and not status and db.get_bind().dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :t"),
+            {"t": model.__tablename__},
+        ).scalar()
+        if estimate and estimate > 0:
+            return f"~{estimate:,}"
+
+    key = (entity, search, status)
+    cached = _count_cache.get(key)
+    if cached and time.time() - cached[1] < _COUNT_TTL:
+        return cached[0]
+    capped = q.with_entities(model.id).limit(_COUNT_CAP + 1).subquery()
+    n = db.query(func.count()).select_from(capped).scalar() or 0
+    label = f"{_COUNT_CAP:,}+" if n > _COUNT_CAP else f"{n:,}"
+    if len(_count_cache) > 500:
+        _count_cache.clear()
+    _count_cache[key] = (label, time.time())
+    return label
+
+
+def _fetch_entity(entity: str, search: str, status: str, before: str, after: str, per_page: int):
+    """
+    One keyset page of an entity, newest first.  Returns
+    (rows, total label, columns, newer cursor, older cursor).
+    """
     from app.infra.db.session import SessionLocal
-    from sqlalchemy import or_, text
+    from app.infra.db.search import ID_ORDERED, search_clause
 
     try:
         db = SessionLocal()
+        model, status_col, columns = _browse_spec(entity)
+        id_only = model.__tablename__ in ID_ORDERED
 
-        if entity == "students":
-            from app.infra.db.models.student import Student
-            q = db.query(Student)
-            if search:
-                q = q.filter(
-                    or_(
-                        Student.display_name.ilike(f"%{search}%"),
-                        Student.academic_email.ilike(f"%{search}%"),
-                        Student.zoho_id.ilike(f"%{search}%"),
-                        Student.username.ilike(f"%{search}%"),
-                    )
-                )
-            if status:
-                q = q.filter(Student.status == status)
-            total = q.count()
-            rows = q.order_by(Student.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
-            columns = ["zoho_id", "display_name", "academic_email", "phone", "status", "sync_status", "created_at"]
-
-        elif entity == "events":
-            from app.infra.db.models.event_log import EventLog
-            q = db.query(EventLog)
-            if search:
-                q = q.filter(
-                    or_(
-                        EventLog.record_id.ilike(f"%{search}%"),
-                        EventLog.module.ilike(f"%{search}%"),
-                        EventLog.event_type.ilike(f"%{search}%"),
-                    )
-                )
-            if status:
-                q = q.filter(EventLog.status == status)
-            total = q.count()
-            rows = q.order_by(EventLog.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
-            columns = ["source", "module", "event_type", "record_id", "status", "created_at", "error_message"]
-
-        elif entity == "registrations":
-            from app.infra.db.models.registration import Registration
-            q = db.query(Registration)
-            if search:
-                q = q.filter(Registration.zoho_id.ilike(f"%{search}%"))
-            if status:
-                q = q.filter(Registration.enrollment_status == status)
-            total = q.count()
-            rows = q.order_by(Registration.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
-            columns = ["zoho_id", "student_zoho_id", "enrollment_status", "registration_date", "sync_status", "created_at"]
-
-        elif entity == "enrollments":
-            from app.infra.db.models.enrollment import Enrollment
-            q = db.query(Enrollment)
-            if search:
-                q = q.filter(
-                    or_(
-                        Enrollment.zoho_id.ilike(f"%{search}%"),
-                        Enrollment.student_zoho_id.ilike(f"%{search}%"),
-                        Enrollment.class_zoho_id.ilike(f"%{search}%"),
-                    )
-                )
-            if status:
-                q = q.filter(Enrollment.status == status)
-            total = q.count()
-            rows = q.order_by(Enrollment.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
-            columns = ["zoho_id", "student_zoho_id", "class_zoho_id", "status", "start_date", "created_at"]
-
-        elif entity == "payments":
-            from app.infra.db.models.payment import Payment
-            q = db.query(Payment)
-            if search:
-                q = q.filter(Payment.zoho_id.ilike(f"%{search}%"))
-            total = q.count()
-            rows = q.order_by(Payment.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
-            columns = ["zoho_id", "amount", "status", "payment_date", "created_at"]
-
-        elif entity == "grades":
-            from app.infra.db.models.grade import Grade
-            q = db.query(Grade)
-            if search:
-                q = q.filter(Grade.zoho_id.ilike(f"%{search}%"))
-            total = q.count()
-            rows = q.order_by(Grade.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
-            columns = ["zoho_id", "grade_value", "grade_type", "status", "created_at"]
-
-        else:
-            total = 0
-            rows = []
-            columns = []
+        q = db.query(model)
+        if search:
+            q = q.filter(search_clause(model, search, db.get_bind()))
+        if status and status_col is not None:
+            q = q.filter(status_col == status)
+        total = _browse_count(db, entity, model, q, search, status)
 
+        order = [model.id] if id_only else [model.created_at, model.id]
+        try:
+            if after:
+                page_q = q.filter(_keyset_filter(model, after, id_only, older=False)).order_by(*order)
+            else:
+                if before:
+                    q = q.filter(_keyset_filter(model, before, id_only, older=True))
+                page_q = q.order_by(*(c.desc() for c in order))
+        except ValueError:
+            page_q, before, after = q.order_by(*(c.desc() for c in order)), "", ""
+        rows = page_q.limit(per_page + 1).all()
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        if after:
+            rows.reverse()
+
+        has_newer = more if after else bool(before)
+        has_older = True if after else more
+        newer = _encode_cursor(rows[0], id_only) if rows and has_newer else None
+        older = _encode_cursor(rows[-1], id_only) if rows and has_older else None
         db.close()
 
         # Convert to dicts
@@ -565,10 +731,10 @@ def _fetch_entity(entity: str, search: str, status: str, page: int, per_page: in
                 d[col] = str(val)
             rows_dict.append(d)
 
-        return rows_dict, total, columns
+        return rows_dict, total, columns, newer, older
 
     except Exception as e:
-        return [{"error": str(e)}], 0, ["error"]
+        return [{"error": str(e)}], "0", ["error"], None, None
 
 
 # ─── SETTINGS ─────────────────────────────────────────────────────────────────
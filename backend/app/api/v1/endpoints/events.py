@@ -444,24 +444,15 @@ async def event_stats(db: Session = Depends(get_db)):
         Event processing stats
     """
     from app.infra.db.models.event_log import EventLog
-    from sqlalchemy import func
-    
+    from app.services import stat_counter_service as counters
+
     try:
-        # Total events
-        total = db.query(func.count(EventLog.id)).scalar()
-        
-        # Events by status
-        by_status = db.query(
-            EventLog.status,
-            func.count(EventLog.id)
-        ).group_by(EventLog.status).all()
-        
-        # Events by source
-        by_source = db.query(
-            EventLog.source,
-            func.count(EventLog.id)
-        ).group_by(EventLog.source).all()
-        
+        # Totals from stat_counters (O(1), no COUNT(*) over the event log)
+        c = counters.read_counters(db)
+        total = c.get(counters.EVENTS_TOTAL, 0)
+        by_status = counters.by_prefix(c, counters.STATUS_PREFIX)
+        by_source = counters.by_prefix(c, counters.SOURCE_PREFIX)
+
         # Recent events (last 10)
         recent = db.query(EventLog).order_by(
             EventLog.created_at.desc()
@@ -469,8 +460,8 @@ async def event_stats(db: Session = Depends(get_db)):
         
         return {
             "total_events": total,
-            "by_status": {status: count for status, count in by_status},
-            "by_source": {source: count for source, count in by_source},
+            "by_status": by_status,
+            "by_source": by_source,
             "recent_events": [
                 {
                     "event_id": e.event_id,
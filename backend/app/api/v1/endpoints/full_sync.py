@@ -2,36 +2,60 @@
 Full Sync Endpoint
 POST /api/v1/admin/full-sync        -> starts sync in background, returns job_id immediately
 GET  /api/v1/admin/full-sync/status -> poll progress (by job_id or latest)
+GET  /api/v1/admin/full-sync/stream -> live progress as server-sent events
 
-Sync order respects FK dependencies:
+Steps form a DAG over their FK dependencies (see SYNC_STEPS):
   1. Teachers       -> local_mzi_sync_teacher          (BTEC_Teachers; Classes reference teachers)
   2. Students       -> local_mzi_update_student
-  3. Classes        -> core_course_create_courses + local_mzi_create_class
-  4. Registrations  -> local_mzi_create_registration   (Student → Program)
-  5. Enrollments    -> local_mzi_update_enrollment     (Student ⇔ Class; triggers Moodle enrolment)
-  6. Payments       -> local_mzi_record_payment        (Registration → Payment)
-  7. Grades         -> local_mzi_submit_grade          (Student + Class)
-  8. Requests       -> local_mzi_update_request_status
+  3. Classes        -> core_course_create_courses + local_mzi_create_class   (after Teachers)
+  4. Registrations  -> local_mzi_create_registration   (Student → Program; after Students)
+  5. Enrollments    -> local_mzi_update_enrollment     (Student ⇔ Class; after Students + Classes)
+  6. Payments       -> local_mzi_record_payment        (Registration → Payment; after Registrations)
+  7. Grades         -> local_mzi_submit_grade          (Student + Class; after Students + Classes)
+  8. Requests       -> local_mzi_update_request_status (after Students)
+
+A step starts as soon as all of its dependencies have finished, so independent
+steps run concurrently (Teachers ‖ Students, then Classes ‖ Registrations ‖
+Requests, ...) bounded by settings.FULL_SYNC_MAX_PARALLEL_STEPS.
 """
 
 import asyncio
 import json
 import logging
+import time
 import uuid
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Set
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Set, Tuple
 
 import httpx
 from fastapi import APIRouter, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from fastapi import Body
+from app.core import progress
 from app.core.config import settings
+from app.core.metrics import (
+    FULL_SYNC_RATE,
+    FULL_SYNC_RECORDS,
+    FULL_SYNC_RUNNING,
+    FULL_SYNC_STEP_SECONDS,
+)
 from app.api.v1.endpoints.student_dashboard_webhooks import (
     ZOHO_MODULE_MAP,
     transform_zoho_to_moodle,
     call_moodle_ws,
 )
+from app.api.v1.endpoints.webhooks_shared import (
+    PARENT_REFERENCES,
+    find_missing_parent,
+    parent_ref_id,
+    parent_resolver,
+    program_category_cache,
+    teacher_cache,
+)
+from app.services.identity_index_service import identity_index
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -42,6 +66,22 @@ LATEST_JOB_ID: Optional[str] = None
 
 ZOHO_PER_PAGE = 200
 
+# Progress bus topic; messages carry "job_id" (+ "step" for per-step counts)
+PROGRESS_TOPIC = "full-sync"
+
+# Full-sync step DAG: key -> (label, keys that must finish first).
+# Order here is the display order used by the admin stepper.
+SYNC_STEPS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "teachers":      ("Teachers",      ()),
+    "students":      ("Students",      ()),
+    "classes":       ("Classes",       ("teachers",)),
+    "registrations": ("Registrations", ("students",)),
+    "enrollments":   ("Enrollments",   ("students", "classes")),
+    "payments":      ("Payments",      ("registrations",)),
+    "grades":        ("Grades",        ("students", "classes")),
+    "requests":      ("Requests",      ("students",)),
+}
+
 
 async def _get_zoho_token() -> str:
     from app.infra.zoho.auth import ZohoAuthClient
@@ -97,10 +137,62 @@ def _is_duplicate(e: Exception) -> bool:
     return "Duplicate entry" in str(e)
 
 
-def _is_parent_not_found(e: Exception, parent: str) -> bool:
-    """e.g. 'Registration with zoho_registration_id ... not found'"""
-    msg = str(e).lower()
-    return parent.lower() in msg and "not found" in msg
+_JOB_FIELDS = (
+    "job_id", "status", "current_step", "step_index", "step_total", "running_steps",
+    "completed_steps", "total_synced", "total_errors", "started_at", "finished_at",
+)
+
+
+def _publish_job(job: dict) -> None:
+    """Publish the job-level state (everything but per-step results)."""
+    if progress.bus.has_subscribers(PROGRESS_TOPIC):
+        progress.bus.publish(PROGRESS_TOPIC, f"{job['job_id']}:job",
+                             {k: job.get(k) for k in _JOB_FIELDS})
+
+
+def _publish_step(job: dict, key: str, result: dict) -> None:
+    if progress.bus.has_subscribers(PROGRESS_TOPIC):
+        message = {k: v for k, v in result.items() if k != "error_details"}
+        progress.bus.publish(PROGRESS_TOPIC, f"{job['job_id']}:{key}",
+                             {"job_id": job["job_id"], "step": key, **message})
+
+
+class _LiveProgress:
+    """
+    Live counters of one running step.
+
+    update() refreshes job["results"][key] (GET /full-sync/status) and
+    publishes it on the progress bus at most once per
+    FULL_SYNC_PROGRESS_INTERVAL_MS — the first call always goes through, so
+    the total shows up as soon as the records are fetched; finish() always
+    does.  Without a live job every call is a no-op.
+    """
+
+    __slots__ = ("job", "key", "module", "total", "_throttle")
+
+    def __init__(self, job: Optional[dict], key: Optional[str], module: str, total: int):
+        self.job = job if key else None
+        self.key = key
+        self.module = module
+        self.total = total
+        self._throttle = progress.Throttle(settings.FULL_SYNC_PROGRESS_INTERVAL_MS)
+
+    def update(self, r: StepResult, processed: int) -> None:
+        if self.job is not None and self._throttle.ready():
+            self._set(r, processed)
+
+    def finish(self, r: StepResult) -> None:
+        if self.job is not None:
+            self._set(r, self.total)
+
+    def _set(self, r: StepResult, processed: int) -> None:
+        snapshot = {
+            "module": self.module, "total": self.total, "synced": r.synced,
+            "skipped": r.skipped, "errors": r.errors,
+            "error_details": r.error_details, "processed": processed,
+        }
+        self.job["results"][self.key] = snapshot
+        _publish_step(self.job, self.key, snapshot)
 
 
 async def sync_generic(entity_type: str, ws_function: str, ws_param_key: str,
@@ -113,19 +205,17 @@ async def sync_generic(entity_type: str, ws_function: str, ws_param_key: str,
     except Exception as e:
         return StepResult(module=module, total=0, synced=0, skipped=0, errors=1,
                           error_details=[f"Zoho fetch failed: {e}"])
+    # Students / grades carry the Moodle keys the grade webhook resolves locally
+    await run_in_threadpool(identity_index.observe_records, entity_type, records)
 
-    # Pre-populate live job results so UI shows total immediately
-    if live_job is not None and live_key:
-        live_job["results"][live_key] = {
-            "module": module, "total": len(records),
-            "synced": 0, "skipped": 0, "errors": 0,
-            "error_details": [], "processed": 0,
-        }
-
-    # For payments: cache of registration IDs already attempted to avoid N calls
-    _auto_synced_regs: Set[str] = set()
+    # Parents that could not be auto-synced this run (don't retry them per child)
+    failed_parents: Set[Tuple[str, str]] = set()
+    # Parent types whose batch prefetch already ran this step
+    prefetched: Set[str] = set()
 
     r = StepResult(module=module, total=len(records), synced=0, skipped=0, errors=0)
+    live = _LiveProgress(live_job, live_key, module, len(records))
+    live.update(r, 0)
     for i, rec in enumerate(records):
         zoho_id = rec.get("id", "?")
         try:
@@ -136,31 +226,31 @@ async def sync_generic(entity_type: str, ws_function: str, ws_param_key: str,
             try:
                 await call_moodle_ws(ws_function, {ws_param_key: json.dumps(t)})
                 r.synced += 1
+                parent_resolver.mark_present(entity_type, rec.get("id"))
             except Exception as moodle_err:
+                missing = find_missing_parent(entity_type, moodle_err, t)
                 if _is_duplicate(moodle_err):
                     # Row already exists in Moodle — treat as already synced
                     r.skipped += 1
-                elif _is_parent_not_found(moodle_err, "registration"):
-                    # Payment/enrollment references a registration not yet in Moodle
-                    reg_id = t.get("zoho_registration_id")
-                    if reg_id and reg_id not in _auto_synced_regs:
-                        _auto_synced_regs.add(reg_id)
+                    parent_resolver.mark_present(entity_type, rec.get("id"))
+                elif missing is not None:
+                    # Child references a parent (registration/student/class) not yet in Moodle
+                    parent_type, parent_id = missing
+                    if parent_type not in prefetched:
+                        # First miss of this step: pull every not-known-present
+                        # parent of the batch in one Zoho call per 100 ids
+                        prefetched.add(parent_type)
+                        zoho_field = next(zf for pt, zf, _ in PARENT_REFERENCES[entity_type]
+                                          if pt == parent_type)
+                        await parent_resolver.prefetch(
+                            parent_type, (parent_ref_id(x, zoho_field) for x in records[i:]))
+                    if missing not in failed_parents:
                         try:
-
-                            from app.api.v1.endpoints.student_dashboard_webhooks import fetch_zoho_full_record
-                            reg_full = await fetch_zoho_full_record("BTEC_Registrations", reg_id)
-                            if reg_full:
-                                reg_t = transform_zoho_to_moodle(reg_full, "registrations")
-                                try:
-                                    await call_moodle_ws("local_mzi_create_registration",
-                                                        {"registrationdata": json.dumps(reg_t)})
-                                    logger.info(f"  Auto-synced missing registration {reg_id}")
-                                except Exception as re:
-                                    if not _is_duplicate(re):
-                                        raise re
+                            await parent_resolver.ensure_present(parent_type, parent_id, force=True)
                         except Exception as ae:
-                            logger.warning(f"  Could not auto-sync registration {reg_id}: {ae}")
-                    # Retry payment
+                            failed_parents.add(missing)
+                            logger.warning(f"  Could not auto-sync {parent_type} {parent_id}: {ae}")
+                    # Retry the child
                     try:
                         await call_moodle_ws(ws_function, {ws_param_key: json.dumps(t)})
                         r.synced += 1
@@ -168,6 +258,8 @@ async def sync_generic(entity_type: str, ws_function: str, ws_param_key: str,
                         if _is_duplicate(retry_err):
                             r.skipped += 1
                         else:
+                            # Parent push did not help — stop re-pushing it for siblings
+                            failed_parents.add(missing)
                             r.errors += 1
                             r.error_details.append(f"{module}/{zoho_id}: {retry_err}")
                 else:
@@ -178,14 +270,8 @@ async def sync_generic(entity_type: str, ws_function: str, ws_param_key: str,
             r.errors += 1
             r.error_details.append(f"{module}/{zoho_id}: {e}")
             logger.error(f"ERR {module}/{zoho_id}: {e}")
-        # Live update every 5 records so UI shows real-time progress
-        if live_job is not None and live_key and (i + 1) % 5 == 0:
-            live_job["results"][live_key] = {
-                **r.model_dump(), "total": len(records), "processed": i + 1,
-            }
-    # Final live update with exact totals
-    if live_job is not None and live_key:
-        live_job["results"][live_key] = {**r.model_dump(), "processed": len(records)}
+        live.update(r, i + 1)
+    live.finish(r)
     return r
 
 
@@ -197,6 +283,8 @@ async def sync_teachers(live_job: Optional[dict] = None,
       1. Look up or create a Moodle user account (by Academic_Email).
       2. Store the resulting mdl_user.id in local_mzi_teachers.moodle_user_id.
     Classes synced afterward can then assign the teacher by teacher_zoho_id.
+    The returned moodle_user_id also feeds teacher_cache, so class webhooks
+    enrol teachers without looking them up again.
     Moodle WS: local_mzi_sync_teacher  { teacherdata: JSON }
     """
     module = ZOHO_MODULE_MAP["teachers"]
@@ -207,12 +295,8 @@ async def sync_teachers(live_job: Optional[dict] = None,
                           error_details=[f"Zoho fetch failed: {e}"])
 
     r = StepResult(module=module, total=len(records), synced=0, skipped=0, errors=0)
-    if live_job is not None and live_key:
-        live_job["results"][live_key] = {
-            "module": module, "total": len(records),
-            "synced": 0, "skipped": 0, "errors": 0,
-            "error_details": [], "processed": 0,
-        }
+    live = _LiveProgress(live_job, live_key, module, len(records))
+    live.update(r, 0)
     for i, rec in enumerate(records):
         zoho_id = rec.get("id", "?")
         try:
@@ -221,8 +305,11 @@ async def sync_teachers(live_job: Optional[dict] = None,
                 r.skipped += 1
                 continue
             try:
-                await call_moodle_ws("local_mzi_sync_teacher", {"teacherdata": json.dumps(t)})
+                res = await call_moodle_ws("local_mzi_sync_teacher", {"teacherdata": json.dumps(t)})
                 r.synced += 1
+                if isinstance(res, dict):
+                    teacher_cache.store(t["zoho_teacher_id"], t.get("academic_email"),
+                                        res.get("moodle_user_id"))
             except Exception as me:
                 if _is_duplicate(me):
                     r.skipped += 1
@@ -232,12 +319,8 @@ async def sync_teachers(live_job: Optional[dict] = None,
         except Exception as e:
             r.errors += 1
             r.error_details.append(f"{module}/{zoho_id}: {e}")
-        if live_job is not None and live_key and (i + 1) % 5 == 0:
-            live_job["results"][live_key] = {
-                **r.model_dump(), "total": len(records), "processed": i + 1,
-            }
-    if live_job is not None and live_key:
-        live_job["results"][live_key] = {**r.model_dump(), "processed": len(records)}
+        live.update(r, i + 1)
+    live.finish(r)
     return r
 
 
@@ -256,25 +339,6 @@ def _date_to_epoch_gmt3(date_str: str) -> int:
         return 0
 
 
-async def _get_program_category(prog_zoho_id: str,
-                                cache: Dict[str, int],
-                                default: int) -> int:
-    """Fetch BTEC_Program (Products module) and return its MoodleID as category.
-    Results are cached per sync run to avoid repeated Zoho API calls."""
-    if prog_zoho_id in cache:
-        return cache[prog_zoho_id]
-    try:
-        from app.api.v1.endpoints.student_dashboard_webhooks import fetch_zoho_full_record
-        prog = await fetch_zoho_full_record("Products", prog_zoho_id)
-        mid = int(prog.get("MoodleID") or 0) if prog else 0
-        cat = mid if mid > 0 else default
-    except Exception as pe:
-        logger.warning(f"Could not fetch MoodleID for program {prog_zoho_id}: {pe}")
-        cat = default
-    cache[prog_zoho_id] = cat
-    return cat
-
-
 async def sync_classes(live_job: Optional[dict] = None,
                        live_key: Optional[str] = None) -> StepResult:
     module = ZOHO_MODULE_MAP["classes"]
@@ -284,15 +348,11 @@ async def sync_classes(live_job: Optional[dict] = None,
         return StepResult(module=module, total=0, synced=0, skipped=0, errors=1,
                           error_details=[f"Zoho fetch failed: {e}"])
 
+    await run_in_threadpool(identity_index.observe_records, "classes", records)
     r = StepResult(module=module, total=len(records), synced=0, skipped=0, errors=0)
-    if live_job is not None and live_key:
-        live_job["results"][live_key] = {
-            "module": module, "total": len(records),
-            "synced": 0, "skipped": 0, "errors": 0,
-            "error_details": [], "processed": 0,
-        }
+    live = _LiveProgress(live_job, live_key, module, len(records))
+    live.update(r, 0)
     default_cat = getattr(settings, "MOODLE_DEFAULT_CATEGORY_ID", 1)
-    _prog_cat_cache: Dict[str, int] = {}  # program_zoho_id → moodle_category_id
 
     for i, rec in enumerate(records):
         zoho_id = rec.get("id", "?")
@@ -305,10 +365,7 @@ async def sync_classes(live_job: Optional[dict] = None,
                 # ── Resolve category_id from BTEC_Program.MoodleID (like Zoho Deluge) ──
                 prog_ref = rec.get("BTEC_Program") or {}
                 prog_zoho_id = prog_ref.get("id") if isinstance(prog_ref, dict) else None
-                if prog_zoho_id:
-                    cat = await _get_program_category(prog_zoho_id, _prog_cat_cache, default_cat)
-                else:
-                    cat = default_cat
+                cat = await program_category_cache.get_category(prog_zoho_id, default_cat)
 
                 # ── Convert start_date to epoch in GMT+3 (same as Zoho Deluge) ──
                 start_epoch = _date_to_epoch_gmt3(t.get("start_date", ""))
@@ -331,9 +388,11 @@ async def sync_classes(live_job: Optional[dict] = None,
             try:
                 await call_moodle_ws("local_mzi_create_class", {"classdata": json.dumps(t)})
                 r.synced += 1
+                parent_resolver.mark_present("classes", rec.get("id"))
             except Exception as me:
                 if _is_duplicate(me):
                     r.skipped += 1
+                    parent_resolver.mark_present("classes", rec.get("id"))
                 else:
                     r.errors += 1
                     r.error_details.append(f"{module}/{zoho_id}: {me}")
@@ -342,33 +401,119 @@ async def sync_classes(live_job: Optional[dict] = None,
             r.errors += 1
             r.error_details.append(f"{module}/{zoho_id}: {e}")
             logger.error(f"ERR {module}/{zoho_id}: {e}")
-        if live_job is not None and live_key and (i + 1) % 5 == 0:
-            live_job["results"][live_key] = {
-                **r.model_dump(), "total": len(records), "processed": i + 1,
-            }
-    if live_job is not None and live_key:
-        live_job["results"][live_key] = {**r.model_dump(), "processed": len(records)}
+        live.update(r, i + 1)
+    live.finish(r)
     return r
 
 
+def _validate_step_dag(steps: Dict[str, Tuple[str, Tuple[str, ...]]]) -> None:
+    """Raise ValueError on unknown dependencies or cycles in the step DAG."""
+    for key, (_, deps) in steps.items():
+        for dep in deps:
+            if dep not in steps:
+                raise ValueError(f"Step '{key}' depends on unknown step '{dep}'")
+    visiting: Set[str] = set()
+    visited: Set[str] = set()
+
+    def _visit(key: str) -> None:
+        if key in visited:
+            return
+        if key in visiting:
+            raise ValueError(f"Cycle in sync step DAG at '{key}'")
+        visiting.add(key)
+        for dep in steps[key][1]:
+            _visit(dep)
+        visiting.discard(key)
+        visited.add(key)
+
+    for key in steps:
+        _visit(key)
+
+
+def _observe_step(key: str, r: StepResult, elapsed: float) -> None:
+    """Record a finished step's record counts, duration and throughput for /metrics."""
+    FULL_SYNC_RECORDS.inc(key, "synced", amount=r.synced)
+    FULL_SYNC_RECORDS.inc(key, "skipped", amount=r.skipped)
+    FULL_SYNC_RECORDS.inc(key, "errors", amount=r.errors)
+    FULL_SYNC_STEP_SECONDS.observe(elapsed, key)
+    FULL_SYNC_RATE.set(r.total / elapsed if elapsed > 0 else 0.0, key)
+
+
+async def _run_step_dag(
+    job: dict,
+    steps: Dict[str, Tuple[str, Tuple[str, ...]]],
+    runner: Callable[[str], Awaitable[StepResult]],
+    max_parallel: int,
+) -> None:
+    """
+    Run every step once all of its dependencies have finished.
+
+    At most `max_parallel` steps run at the same time.  A step that crashes is
+    recorded as a one-error StepResult and still releases its dependants, the
+    same as the old sequential loop which always moved on to the next step.
+
+    Live progress is kept in the job dict:
+      running_steps   – keys currently executing
+      completed_steps – keys finished, in completion order
+      step_index      – len(completed_steps)   (drives the overall progress bar)
+      current_step    – labels of running steps, e.g. "Classes ‖ Registrations"
+    """
+    _validate_step_dag(steps)
+    job_tag = job["job_id"][:8]
+    total = len(steps)
+    done: Dict[str, asyncio.Event] = {key: asyncio.Event() for key in steps}
+    budget = asyncio.Semaphore(max(1, max_parallel))
+    job["running_steps"] = []
+    job["completed_steps"] = []
+
+    def _publish_current() -> None:
+        running = job["running_steps"]
+        job["current_step"] = " ‖ ".join(steps[k][0] for k in running) if running else None
+        _publish_job(job)
+
+    async def _run_one(key: str) -> None:
+        label, deps = steps[key]
+        try:
+            for dep in deps:
+                await done[dep].wait()
+            async with budget:
+                job["running_steps"].append(key)
+                _publish_current()
+                logger.info(f"[{job_tag}] Step {label} started")
+                t0 = time.perf_counter()
+                try:
+                    r = await runner(key)
+                except Exception as exc:
+                    logger.error(f"[{job_tag}] {label} crashed: {exc}", exc_info=True)
+                    r = StepResult(module=label, total=0, synced=0, skipped=0, errors=1,
+                                   error_details=[str(exc)])
+                _observe_step(key, r, time.perf_counter() - t0)
+                job["running_steps"].remove(key)
+                job["results"][key] = r.model_dump()
+                _publish_step(job, key, {**job["results"][key], "processed": r.total})
+                job["total_synced"] = job.get("total_synced", 0) + r.synced
+                job["total_errors"] = job.get("total_errors", 0) + r.errors
+                job["completed_steps"].append(key)
+                job["step_index"] = len(job["completed_steps"])
+                _publish_current()
+                logger.info(
+                    f"[{job_tag}] {label} ({job['step_index']}/{total}): "
+                    f"{r.synced} synced, {r.errors} errors"
+                )
+        finally:
+            done[key].set()
+
+    await asyncio.gather(*(_run_one(key) for key in steps))
+
+
 async def _run_full_sync(job_id: str) -> None:
     global LATEST_JOB_ID
     job = JOBS[job_id]
     job["status"] = "running"
     job["started_at"] = datetime.utcnow().isoformat()
-    total_synced = 0
-    total_errors = 0
-
-    steps = [
-        ("Step 1/8: Teachers",      "teachers"),
-        ("Step 2/8: Students",      "students"),
-        ("Step 3/8: Classes",       "classes"),
-        ("Step 4/8: Registrations", "registrations"),
-        ("Step 5/8: Enrollments",   "enrollments"),
-        ("Step 6/8: Payments",      "payments"),
-        ("Step 7/8: Grades",        "grades"),
-        ("Step 8/8: Requests",      "requests"),
-    ]
+    job["total_synced"] = 0
+    job["total_errors"] = 0
+    _publish_job(job)
 
     coro_map = {
         "teachers":      lambda j, k: sync_teachers(live_job=j, live_key=k),
@@ -381,36 +526,28 @@ async def _run_full_sync(job_id: str) -> None:
         "requests":      lambda j, k: sync_generic("requests",      "local_mzi_update_request_status", "requestdata",      "zoho_request_id",      live_job=j, live_key=k),
     }
 
-    for idx, (label, key) in enumerate(steps):
-        job["current_step"] = label
-        job["step_index"] = idx
-        logger.info(f"[{job_id[:8]}] {label}")
-        try:
-            r = await coro_map[key](job, key)
-        except Exception as exc:
-            logger.error(f"[{job_id[:8]}] {label} crashed: {exc}", exc_info=True)
-            r = StepResult(module=label, total=0, synced=0, skipped=0, errors=1,
-                           error_details=[str(exc)])
-        total_synced += r.synced
-        total_errors += r.errors
-        job["results"][key] = r.model_dump()
-        job["total_synced"] = total_synced
-        job["total_errors"] = total_errors
-        logger.info(f"[{job_id[:8]}] {label}: {r.synced} synced, {r.errors} errors")
+    max_parallel = settings.FULL_SYNC_MAX_PARALLEL_STEPS
+    FULL_SYNC_RUNNING.inc()
+    try:
+        await _run_step_dag(job, SYNC_STEPS, lambda key: coro_map[key](job, key), max_parallel)
+    finally:
+        FULL_SYNC_RUNNING.dec()
 
     job["status"] = "completed"
     job["current_step"] = None
-    job["step_index"] = 8
+    job["step_index"] = len(SYNC_STEPS)
     job["finished_at"] = datetime.utcnow().isoformat()
     LATEST_JOB_ID = job_id
-    logger.info(f"[{job_id[:8]}] Full sync DONE: {total_synced} synced, {total_errors} errors")
+    _publish_job(job)
+    logger.info(f"[{job_id[:8]}] Full sync DONE: {job['total_synced']} synced, {job['total_errors']} errors")
 
 
 @router.post("/full-sync", summary="Start Full Zoho -> Moodle Sync (background)")
 async def start_full_sync():
     """
     Starts a full Zoho->Moodle sync in the background and returns immediately.
-    Poll GET /admin/full-sync/status to track progress.
+    Poll GET /admin/full-sync/status (or subscribe to GET /admin/full-sync/stream)
+    to track progress.
     """
     global LATEST_JOB_ID
     job_id = str(uuid.uuid4())
@@ -419,7 +556,9 @@ async def start_full_sync():
         "status": "pending",
         "current_step": None,
         "step_index": 0,
-        "step_total": 8,
+        "step_total": len(SYNC_STEPS),
+        "running_steps": [],
+        "completed_steps": [],
         "total_synced": 0,
         "total_errors": 0,
         "results": {},
@@ -433,6 +572,7 @@ async def start_full_sync():
         "job_id": job_id,
         "status": "started",
         "poll_url": f"/api/v1/admin/full-sync/status?job_id={job_id}",
+        "stream_url": f"/api/v1/admin/full-sync/stream?job_id={job_id}",
         "message": "Sync running in background. Poll the poll_url every few seconds.",
     }
 
@@ -446,60 +586,169 @@ async def get_sync_status(job_id: Optional[str] = Query(default=None)):
     return JOBS[jid]
 
 
+def _job_snapshot_events(job: dict) -> List[str]:
+    events = [progress.sse_event("job", {k: job.get(k) for k in _JOB_FIELDS})]
+    for key, result in job.get("results", {}).items():
+        message = {k: v for k, v in result.items() if k != "error_details"}
+        events.append(progress.sse_event("step", {"job_id": job["job_id"], "step": key, **message}))
+    return events
+
+
+async def _progress_events(job_id: Optional[str]):
+    """
+    SSE frames: current snapshot, then bus updates.  Ends when the requested
+    job finishes; without a job_id it keeps following later jobs.
+    """
+    with progress.bus.subscribe(PROGRESS_TOPIC) as sub:
+        jid = job_id or LATEST_JOB_ID
+        if jid in JOBS:
+            for frame in _job_snapshot_events(JOBS[jid]):
+                yield frame
+            if job_id and JOBS[jid]["status"] in ("completed", "failed"):
+                return
+        while True:
+            updates = await sub.get(timeout=progress.SSE_KEEPALIVE_SECONDS)
+            if not updates:
+                yield ": keepalive\n\n"
+                continue
+            for _, message in updates:
+                if job_id and message["job_id"] != job_id:
+                    continue
+                yield progress.sse_event("step" if "step" in message else "job", message)
+                if job_id and "step" not in message and message["status"] in ("completed", "failed"):
+                    return
+
+
+@router.get("/full-sync/stream", summary="Stream Full Sync Progress (SSE)")
+async def stream_sync_status(job_id: Optional[str] = Query(default=None)):
+    """
+    Server-sent events: a `job` event with the job state and a `step` event per
+    step's counters, first as a snapshot, then as they change (each step at most
+    every FULL_SYNC_PROGRESS_INTERVAL_MS).  With job_id the stream ends when
+    that job finishes; without it, it follows every job.
+    """
+    return StreamingResponse(_progress_events(job_id), media_type="text/event-stream",
+                             headers=progress.SSE_HEADERS)
+
+
 # ─── Helper: search Zoho module by a criteria field ──────────────────────────
 
-async def fetch_zoho_records_by_criteria(module: str, field: str, value: str) -> List[Dict]:
+async def fetch_zoho_records_by_criteria(module: str, field: str, value: str,
+                                         client: Optional[httpx.AsyncClient] = None,
+                                         token: Optional[str] = None) -> List[Dict]:
     """
     Search a Zoho module for records where `field` equals `value`.
     Uses the Zoho CRM search API: GET /crm/v2/{module}/search?criteria=((field:equals:value))
-    Returns all matching records (handles pagination).
+    Returns all matching records (follows pagination past 200 results).
+
+    Pass a shared `client` + `token` to run several searches concurrently
+    over one connection pool instead of one token/client per search.
     """
-    token = await _get_zoho_token()
+    if client is None:
+        async with httpx.AsyncClient(timeout=60.0) as own_client:
+            return await fetch_zoho_records_by_criteria(
+                module, field, value, client=own_client, token=token or await _get_zoho_token())
+    if token is None:
+        token = await _get_zoho_token()
+
     base_url = f"https://www.zohoapis.com/crm/v2/{module}/search"
     headers = {"Authorization": f"Zoho-oauthtoken {token}"}
     criteria = f"(({field}:equals:{value}))"
     records: List[Dict] = []
     page = 1
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        while True:
-            resp = await client.get(base_url, headers=headers,
-                                    params={"criteria": criteria, "page": page, "per_page": ZOHO_PER_PAGE})
-            if resp.status_code == 204:
-                break
-            if resp.status_code != 200:
-                logger.warning(f"Zoho search {module} ({field}={value}) page {page}: {resp.status_code}")
-                break
-            body = resp.json()
-            page_data: List[Dict] = body.get("data", [])
-            records.extend(page_data)
-            info = body.get("info", {})
-            if not info.get("more_records", False):
-                break
-            page += 1
+    while True:
+        resp = await client.get(base_url, headers=headers,
+                                params={"criteria": criteria, "page": page, "per_page": ZOHO_PER_PAGE})
+        if resp.status_code == 204:
+            break
+        if resp.status_code != 200:
+            logger.warning(f"Zoho search {module} ({field}={value}) page {page}: {resp.status_code}")
+            break
+        body = resp.json()
+        page_data: List[Dict] = body.get("data", [])
+        records.extend(page_data)
+        info = body.get("info", {})
+        if not info.get("more_records", False):
+            break
+        page += 1
 
     return records
 
 
+# Max concurrent Moodle WS pushes per related module in sync-student
+SINGLE_STUDENT_PUSH_CONCURRENCY = 5
+
+
 async def _push_single(entity_type: str, ws_function: str, ws_param_key: str,
-                        records: List[Dict]) -> Dict[str, Any]:
-    """Push a list of records to Moodle, return a summary dict."""
-    synced = skipped = errors = 0
+                        records: List[Dict],
+                        concurrency: int = 1) -> Dict[str, Any]:
+    """Push a list of records to Moodle (up to `concurrency` at once), return a summary dict."""
+    counts = {"synced": 0, "skipped": 0, "errors": 0}
     error_details: List[str] = []
-    for rec in records:
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def _push(rec: Dict) -> None:
         zoho_id = rec.get("id", "?")
-        try:
-            t = transform_zoho_to_moodle(rec, entity_type)
-            await call_moodle_ws(ws_function, {ws_param_key: json.dumps(t)})
-            synced += 1
-        except Exception as e:
-            if _is_duplicate(e):
-                skipped += 1
-            else:
-                errors += 1
-                error_details.append(f"{zoho_id}: {str(e)}")
-    return {"total": len(records), "synced": synced, "skipped": skipped,
-            "errors": errors, "error_details": error_details[:10]}
+        async with sem:
+            try:
+                t = transform_zoho_to_moodle(rec, entity_type)
+                await call_moodle_ws(ws_function, {ws_param_key: json.dumps(t)})
+                counts["synced"] += 1
+                parent_resolver.mark_present(entity_type, rec.get("id"))
+            except Exception as e:
+                if _is_duplicate(e):
+                    counts["skipped"] += 1
+                    parent_resolver.mark_present(entity_type, rec.get("id"))
+                else:
+                    counts["errors"] += 1
+                    error_details.append(f"{zoho_id}: {str(e)}")
+
+    await asyncio.gather(*(_push(rec) for rec in records))
+    return {"total": len(records), **counts, "error_details": error_details[:10]}
+
+
+# Related modules pushed by sync-student:
+#   result key -> (Zoho module, lookup field, entity_type, WS function, WS param key, must follow)
+SINGLE_STUDENT_RELATED: Dict[str, Tuple[str, str, str, str, str, Optional[str]]] = {
+    "registrations": ("BTEC_Registrations",    "Student_ID",        "registrations", "local_mzi_create_registration",   "registrationdata", None),
+    "payments":      ("BTEC_Payments",         "Student_ID",        "payments",      "local_mzi_record_payment",        "paymentdata",      "registrations"),
+    "enrollments":   ("BTEC_Enrollments",      "Enrolled_Students", "enrollments",   "local_mzi_update_enrollment",     "enrollmentdata",   None),
+    "grades":        ("BTEC_Grades",           "Student",           "grades",        "local_mzi_submit_grade",          "gradedata",        None),
+    "requests":      ("BTEC_Student_Requests", "Student",           "requests",      "local_mzi_update_request_status", "requestdata",      None),
+}
+
+
+async def _sync_student_related(zoho_student_id: str) -> Dict[str, Any]:
+    """
+    Search every related module concurrently on one shared client/token and
+    push each result set as soon as its search returns (pipelined).
+    Payments wait for the registrations push so their parent rows exist.
+    """
+    results: Dict[str, Any] = {}
+    pushed: Dict[str, asyncio.Event] = {key: asyncio.Event() for key in SINGLE_STUDENT_RELATED}
+    token = await _get_zoho_token()
+
+    async with httpx.AsyncClient(timeout=60.0) as client:
+
+        async def _one(key: str) -> None:
+            module, field, entity_type, ws_function, ws_param_key, after = SINGLE_STUDENT_RELATED[key]
+            try:
+                recs = await fetch_zoho_records_by_criteria(module, field, zoho_student_id,
+                                                            client=client, token=token)
+                if after:
+                    await pushed[after].wait()
+                results[key] = await _push_single(entity_type, ws_function, ws_param_key, recs,
+                                                  concurrency=SINGLE_STUDENT_PUSH_CONCURRENCY)
+            except Exception as e:
+                results[key] = {"status": "error", "detail": str(e)}
+            finally:
+                pushed[key].set()
+
+        await asyncio.gather(*(_one(key) for key in SINGLE_STUDENT_RELATED))
+
+    # Keep the historical key order in the response
+    return {key: results[key] for key in SINGLE_STUDENT_RELATED}
 
 
 @router.post("/sync-student", summary="Manually sync a single student + their data from Zoho")
@@ -535,9 +784,11 @@ async def sync_single_student(
     try:
         await call_moodle_ws("local_mzi_update_student", {"studentdata": json.dumps(student_data)})
         results["student"] = {"status": "synced"}
+        parent_resolver.mark_present("students", zoho_student_id)
     except Exception as e:
         if _is_duplicate(e):
             results["student"] = {"status": "already_exists"}
+            parent_resolver.mark_present("students", zoho_student_id)
         else:
             results["student"] = {"status": "error", "detail": str(e)}
             return {"success": False, "error": f"Student sync failed: {e}", "results": results}
@@ -545,48 +796,8 @@ async def sync_single_student(
     if not include_related:
         return {"success": True, "message": "Student synced.", "results": results}
 
-    # ── 2. Related records (search by Student_ID lookup) ────────────────────
-    # Use Zoho's criteria search for each related module
-
-    # Registrations
-    try:
-        regs = await fetch_zoho_records_by_criteria("BTEC_Registrations", "Student_ID", zoho_student_id)
-        results["registrations"] = await _push_single(
-            "registrations", "local_mzi_create_registration", "registrationdata", regs)
-    except Exception as e:
-        results["registrations"] = {"status": "error", "detail": str(e)}
-
-    # Payments
-    try:
-        pays = await fetch_zoho_records_by_criteria("BTEC_Payments", "Student_ID", zoho_student_id)
-        results["payments"] = await _push_single(
-            "payments", "local_mzi_record_payment", "paymentdata", pays)
-    except Exception as e:
-        results["payments"] = {"status": "error", "detail": str(e)}
-
-    # Enrollments
-    try:
-        enrs = await fetch_zoho_records_by_criteria("BTEC_Enrollments", "Enrolled_Students", zoho_student_id)
-        results["enrollments"] = await _push_single(
-            "enrollments", "local_mzi_update_enrollment", "enrollmentdata", enrs)
-    except Exception as e:
-        results["enrollments"] = {"status": "error", "detail": str(e)}
-
-    # Grades
-    try:
-        grds = await fetch_zoho_records_by_criteria("BTEC_Grades", "Student", zoho_student_id)
-        results["grades"] = await _push_single(
-            "grades", "local_mzi_submit_grade", "gradedata", grds)
-    except Exception as e:
-        results["grades"] = {"status": "error", "detail": str(e)}
-
-    # Requests
-    try:
-        reqs = await fetch_zoho_records_by_criteria("BTEC_Student_Requests", "Student", zoho_student_id)
-        results["requests"] = await _push_single(
-            "requests", "local_mzi_update_request_status", "requestdata", reqs)
-    except Exception as e:
-        results["requests"] = {"status": "error", "detail": str(e)}
+    # ── 2. Related records (criteria search by Student lookup, concurrent) ──
+    results.update(await _sync_student_related(zoho_student_id))
 
     logger.info(f"sync-student {zoho_student_id}: {results}")
     return {"success": True, "message": "Student and related data synced.", "results": results}
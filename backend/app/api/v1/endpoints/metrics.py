@@ -0,0 +1,72 @@
+"""
+Metrics Endpoint
+
+GET /metrics
+
+Prometheus text exposition of app.core.metrics (Zoho / Moodle WS calls,
+HTTP routes, event handling, full-sync throughput, token refreshes), merged
+across uvicorn workers, plus the webhook event backlog read from
+the stat_counters table at scrape time.
+
+Requires "Authorization: Bearer <METRICS_TOKEN>" unless METRICS_PUBLIC is set.
+"""
+
+import hmac
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+
+from app.core.config import settings
+from app.core.metrics import CONTENT_TYPE, register_collector, render
+from app.domain.events import EventStatus
+from app.infra.db.session import SessionLocal
+from app.services import stat_counter_service as counters
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["monitoring"])
+
+_QUEUED_STATUSES = (EventStatus.PENDING.value, EventStatus.PROCESSING.value)
+
+
+def _event_queue_depth():
+    """Pending / processing events — shared DB state, so not summed per worker."""
+    db = SessionLocal()
+    try:
+        by_status = counters.by_prefix(counters.read_counters(db), counters.STATUS_PREFIX)
+    finally:
+        db.close()
+    counts = {status: by_status.get(status, 0) for status in _QUEUED_STATUSES}
+    return [(
+        "event_queue_depth",
+        "Webhook events waiting in integration_events_log.",
+        "gauge",
+        [({"status": status}, n) for status, n in counts.items()],
+    )]
+
+
+register_collector(_event_queue_depth)
+
+
+def require_metrics_access(authorization: Optional[str] = Header(None)) -> None:
+    """Bearer METRICS_TOKEN check; METRICS_PUBLIC opts out, no token configured = closed."""
+    if settings.METRICS_PUBLIC:
+        return
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Metrics disabled: set METRICS_TOKEN (or METRICS_PUBLIC=true)",
+        )
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_access)])
+def metrics() -> Response:
+    """Prometheus scrape endpoint."""
+    return Response(content=render(), media_type=CONTENT_TYPE)
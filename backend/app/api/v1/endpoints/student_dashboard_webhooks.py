@@ -4,14 +4,15 @@ Student Dashboard Webhook Handlers  thin aggregator
 This module composes three focused sub-modules into a single FastAPI router:
 
   webhooks_dashboard_sync.py    local_mzi_* (student/registration/payment/grade/request)
-  webhooks_moodle_courses.py    core_course_* (class_updated / class_deleted)
+  webhooks_moodle_courses.py    core_course_* (class_updated / class_deleted / program_*)
   webhooks_moodle_enrol.py      enrol_manual_* (enrollment_updated / enrollment_deleted)
 
 Shared helpers live in webhooks_shared.py.
 
 Backward-compat re-exports (used by full_sync.py and tests):
   ZOHO_MODULE_MAP, transform_zoho_to_moodle, call_moodle_ws, fetch_zoho_full_record,
-  resolve_zoho_payload, FIELD_MAPPINGS, read_zoho_body, ensure_registration_synced
+  resolve_zoho_payload, FIELD_MAPPINGS, read_zoho_body, ensure_registration_synced,
+  parent_resolver, program_category_cache
 """
 from fastapi import APIRouter
 
@@ -28,6 +29,8 @@ from app.api.v1.endpoints.webhooks_shared import (           # noqa: F401
     read_zoho_body,
     ensure_registration_synced,
     extract_zoho_record,
+    parent_resolver,
+    program_category_cache,
 )
 
 # ---------------------------------------------------------------------------
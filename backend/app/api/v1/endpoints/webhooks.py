@@ -9,6 +9,7 @@ Handles incoming webhook events from Moodle and forwards them to appropriate pro
 """
 
 from fastapi import APIRouter, HTTPException, Header, Request, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any
 from datetime import datetime
@@ -266,18 +267,27 @@ async def handle_enrollment_deleted(data: Dict[str, Any], event_id: str) -> Dict
     }
 
 
-async def handle_grade_updated(data: Dict[str, Any], event_id: str) -> Dict[str, Any]:
+async def handle_grade_updated(data: Dict[str, Any], event_id: str,
+                               use_index: bool = True) -> Dict[str, Any]:
     """
     Handle grade_updated event
     
     Checks if grade exists in Zoho, then creates or updates accordingly.
     Returns action taken ('created' or 'updated') for accurate logging.
+    
+    Grade / student / class Zoho ids come from the local identity index and
+    Zoho is searched only on a miss, so a known grade costs a single update.
+    If Zoho rejects a write built from indexed ids, those mappings are
+    dropped and the event is retried once with searches (use_index=False).
     """
     logger.info(f"Processing grade_updated: User {data.get('student_id')} grade in course {data.get('course_id')}")
     logger.info(f"📦 Full data received from Plugin: {data}")
     
     try:
         from app.infra.zoho import create_zoho_client
+        from app.infra.zoho.exceptions import ZohoNotFoundError, ZohoValidationError
+        from app.services import identity_index_service as ids
+        from app.services.identity_index_service import identity_index
         
         # ✅ CRITICAL FIX: Use correct field names from new observer
         # Old observer sent: userid, courseid, assignmentid
@@ -325,17 +335,31 @@ async def handle_grade_updated(data: Dict[str, Any], event_id: str) -> Dict[str,
         # Initialize Zoho client
         zoho = create_zoho_client()
         
-        # Search for existing grade in Zoho
-        existing_grades = await zoho.search_records(
-            'BTEC_Grades',
-            f"(Moodle_Grade_Composite_Key:equals:{composite_key})"
-        )
-        
-        print(f"🔎 DEBUG: Search for key '{composite_key}' returned: {existing_grades}")
-        print(f"🔎 DEBUG: Number of results: {len(existing_grades) if existing_grades else 0}")
-        logger.info(f"🔎 Search results: found {len(existing_grades) if existing_grades else 0} grades with key {composite_key}")
-        if existing_grades:
-            logger.info(f"📋 Existing grades details: {existing_grades}")
+        # (kind, key) of identity index entries this write relies on
+        index_hits = []
+        
+        async def _retry_without_index(reason: Exception) -> Dict[str, Any]:
+            logger.warning(f"⚠️ Zoho rejected indexed ids {index_hits} ({reason}) → re-resolving by search")
+            for kind, key in index_hits:
+                await run_in_threadpool(identity_index.forget, kind, key)
+            _request_cache.pop(composite_key, None)
+            return await handle_grade_updated(data, event_id, use_index=False)
+        
+        # ✅ Existing grade: identity index first, Zoho search only on a miss
+        indexed_grade_id = (await run_in_threadpool(identity_index.get, ids.GRADE, composite_key)) if use_index else None
+        if indexed_grade_id:
+            index_hits.append((ids.GRADE, composite_key))
+            existing_grades = [{"id": indexed_grade_id}]
+            logger.info(f"📇 Grade {composite_key} → {indexed_grade_id} (identity index)")
+        else:
+            existing_grades = await zoho.search_records(
+                'BTEC_Grades',
+                f"(Moodle_Grade_Composite_Key:equals:{composite_key})"
+            )
+            logger.info(f"🔎 Search results: found {len(existing_grades) if existing_grades else 0} grades with key {composite_key}")
+            if existing_grades:
+                logger.info(f"📋 Existing grades details: {existing_grades}")
+                await run_in_threadpool(identity_index.store, ids.GRADE, composite_key, existing_grades[0].get('id'))
         
         # 🔍 Extract basic data from payload
         # ✅ Search for Student in Zoho by Moodle_ID
@@ -389,40 +413,58 @@ async def handle_grade_updated(data: Dict[str, Any], event_id: str) -> Dict[str,
                     "message": "Grade updated from R to RR (preserved existing data)",
                     "zoho_id": zoho_grade_id
                 }
+            except (ZohoNotFoundError, ZohoValidationError) as e:
+                if index_hits:
+                    return await _retry_without_index(e)
+                logger.error(f"❌ Failed to update RR: {e}")
+                raise HTTPException(status_code=500, detail=f"Failed to update RR: {e}")
             except Exception as e:
                 logger.error(f"❌ Failed to update RR: {e}")
                 raise HTTPException(status_code=500, detail=f"Failed to update RR: {e}")
         
         
-        # ✅ Search for Student in Zoho by Student_Moodle_ID (CORRECTED FIELD NAME)
-        student_zoho_id = None
-        try:
-            student_results = await zoho.search_records(
-                'BTEC_Students',
-                f"(Student_Moodle_ID:equals:{moodle_student_id})"
-            )
-            if student_results and len(student_results) > 0:
-                student_zoho_id = student_results[0].get('id')
-                logger.info(f"✅ Found Student in Zoho: ID={student_zoho_id}, Student_Moodle_ID={moodle_student_id}")
-            else:
-                logger.warning(f"⚠️ Student not found in Zoho: Student_Moodle_ID={moodle_student_id}")
-        except Exception as e:
-            logger.error(f"❌ Error searching for Student in Zoho: {e}")
-        
-        # ✅ Search for Class in Zoho by Class_Name (CORRECTED FIELD NAME)
+        # ✅ Student by Student_Moodle_ID: identity index, else Zoho search
+        student_zoho_id = (await run_in_threadpool(identity_index.get, ids.STUDENT, moodle_student_id)) if use_index else None
+        if student_zoho_id:
+            index_hits.append((ids.STUDENT, moodle_student_id))
+        else:
+            try:
+                student_results = await zoho.search_records(
+                    'BTEC_Students',
+                    f"(Student_Moodle_ID:equals:{moodle_student_id})"
+                )
+                if student_results and len(student_results) > 0:
+                    student_zoho_id = student_results[0].get('id')
+                    await run_in_threadpool(identity_index.store, ids.STUDENT, moodle_student_id, student_zoho_id)
+                    logger.info(f"✅ Found Student in Zoho: ID={student_zoho_id}, Student_Moodle_ID={moodle_student_id}")
+                else:
+                    logger.warning(f"⚠️ Student not found in Zoho: Student_Moodle_ID={moodle_student_id}")
+            except Exception as e:
+                logger.error(f"❌ Error searching for Student in Zoho: {e}")
+        
+        # ✅ Class by Moodle course id / Class_Name: identity index, else Zoho search by name
         class_zoho_id = None
-        try:
-            class_results = await zoho.search_records(
-                'BTEC_Classes',
-                f"(Class_Name:equals:{course_name})"
-            )
-            if class_results and len(class_results) > 0:
-                class_zoho_id = class_results[0].get('id')
-                logger.info(f"✅ Found Class in Zoho: ID={class_zoho_id}, Class_Name={course_name}")
-            else:
-                logger.warning(f"⚠️ Class not found in Zoho: Class_Name={course_name}")
-        except Exception as e:
-            logger.error(f"❌ Error searching for Class in Zoho: {e}")
+        if use_index:
+            for kind, key in ((ids.COURSE, course_id), (ids.CLASS_NAME, course_name)):
+                class_zoho_id = await run_in_threadpool(identity_index.get, kind, key)
+                if class_zoho_id:
+                    index_hits.append((kind, key))
+                    break
+        if not class_zoho_id:
+            try:
+                class_results = await zoho.search_records(
+                    'BTEC_Classes',
+                    f"(Class_Name:equals:{course_name})"
+                )
+                if class_results and len(class_results) > 0:
+                    class_zoho_id = class_results[0].get('id')
+                    await run_in_threadpool(identity_index.store, ids.CLASS_NAME, course_name, class_zoho_id)
+                    await run_in_threadpool(identity_index.store, ids.COURSE, course_id, class_zoho_id)
+                    logger.info(f"✅ Found Class in Zoho: ID={class_zoho_id}, Class_Name={course_name}")
+                else:
+                    logger.warning(f"⚠️ Class not found in Zoho: Class_Name={course_name}")
+            except Exception as e:
+                logger.error(f"❌ Error searching for Class in Zoho: {e}")
         
         # Prepare Zoho grade data
         learning_outcomes = data.get('learning_outcomes', [])
@@ -580,7 +622,12 @@ async def handle_grade_updated(data: Dict[str, Any], event_id: str) -> Dict[str,
             action = "updated"
             
             # Update the grade in Zoho
-            await zoho.update_record('BTEC_Grades', zoho_grade_id, zoho_grade_data)
+            try:
+                await zoho.update_record('BTEC_Grades', zoho_grade_id, zoho_grade_data)
+            except (ZohoNotFoundError, ZohoValidationError) as e:
+                if index_hits:
+                    return await _retry_without_index(e)
+                raise
             logger.info(f"✅ Updated grade in Zoho (ID: {zoho_grade_id})")
         else:
             # Grade doesn't exist → CREATE
@@ -591,6 +638,7 @@ async def handle_grade_updated(data: Dict[str, Any], event_id: str) -> Dict[str,
                 # Create the grade in Zoho
                 result = await zoho.create_record('BTEC_Grades', zoho_grade_data)
                 zoho_grade_id = result.get('details', {}).get('id')
+                await run_in_threadpool(identity_index.store, ids.GRADE, composite_key, zoho_grade_id)
                 logger.info(f"✅ Created new grade in Zoho (ID: {zoho_grade_id})")
             except Exception as create_error:
                 # Check if it's a duplicate error (race condition or search failed)
@@ -605,10 +653,14 @@ async def handle_grade_updated(data: Dict[str, Any], event_id: str) -> Dict[str,
                         logger.info(f"📌 Extracted existing grade ID from error: {zoho_grade_id}")
                         # Update instead of create
                         await zoho.update_record('BTEC_Grades', zoho_grade_id, zoho_grade_data)
+                        await run_in_threadpool(identity_index.store, ids.GRADE, composite_key, zoho_grade_id)
                         logger.info(f"✅ Updated grade in Zoho (ID: {zoho_grade_id}) via fallback")
                         action = "updated"
                     else:
                         raise  # Re-raise if we can't extract ID
+                elif index_hits and isinstance(create_error, ZohoValidationError):
+                    # e.g. INVALID_DATA on an indexed Student / Class lookup id
+                    return await _retry_without_index(create_error)
                 else:
                     raise  # Re-raise if it's not a duplicate error
         
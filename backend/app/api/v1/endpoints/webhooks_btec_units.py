@@ -8,6 +8,10 @@ Handles the full BTEC unit lifecycle:
   - btec_definition_deleted: Zoho BTEC record deleted →
         call local_mzi_delete_btec_definition to remove grading definition.
 
+Both also keep the shared grading template cache used by grade syncs
+(grade_sync_service.grading_template_cache) in step with Zoho; a delete also
+drops the unit's btec_template_sync hash so a re-created unit is pushed again.
+
 Zoho module api_name: "BTEC"  (NOT "BTEC_Units" — intentional per this org).
 
 Criteria field layout in the Zoho BTEC record:
@@ -26,6 +30,7 @@ import logging
 from typing import Dict, Any, List
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 
 from app.api.v1.endpoints.webhooks_shared import (
     call_moodle_ws,
@@ -33,6 +38,8 @@ from app.api.v1.endpoints.webhooks_shared import (
     read_zoho_body,
     resolve_zoho_payload,
 )
+from app.services.btec_template_service import forget_template_sync
+from app.services.grade_sync_service import grading_template_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -119,6 +126,13 @@ async def handle_btec_definition_updated(request: Request):
         if not zoho_unit_id:
             raise HTTPException(status_code=400, detail="Missing Zoho unit ID in payload")
 
+        # Refresh the grade-sync template cache from this record
+        # (or drop the entry when the full record could not be fetched)
+        if payload.get("Name"):
+            await run_in_threadpool(grading_template_cache.store, zoho_unit_id, payload)
+        else:
+            await run_in_threadpool(grading_template_cache.invalidate, zoho_unit_id)
+
         unit_name = payload.get("Name", "")
         if not unit_name:
             raise HTTPException(status_code=400, detail="Missing unit Name in Zoho BTEC record")
@@ -188,6 +202,8 @@ async def handle_btec_definition_deleted(request: Request):
             raise HTTPException(status_code=400, detail="Missing Zoho unit ID")
 
         logger.info(f"🗑️ Deleting BTEC definition for zoho_unit_id={zoho_unit_id}")
+        await run_in_threadpool(grading_template_cache.invalidate, zoho_unit_id)
+        await run_in_threadpool(forget_template_sync, zoho_unit_id)
 
         result = await call_moodle_ws("local_mzi_delete_btec_definition", {
             "zoho_unit_id": zoho_unit_id,
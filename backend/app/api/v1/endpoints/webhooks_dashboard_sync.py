@@ -23,16 +23,20 @@ import logging
 from datetime import datetime
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 
 from app.api.v1.endpoints.webhooks_shared import (
     call_moodle_ws,
     ensure_registration_synced,
+    parent_resolver,
     resync_registration_with_installments,
     read_zoho_body,
     resolve_zoho_payload,
     transform_zoho_to_moodle,
 )
 from app.core.config import settings
+from app.services.identity_index_service import identity_index
+from app.services.payment_sync_service import payment_summary_cache
 import httpx
 
 logger = logging.getLogger(__name__)
@@ -52,6 +56,7 @@ async def handle_student_updated(request: Request):
     try:
         raw = await read_zoho_body(request)
         payload = await resolve_zoho_payload(raw, "students")
+        await run_in_threadpool(identity_index.observe_records, "students", [payload])
         transformed = transform_zoho_to_moodle(payload, "students")
 
         if not transformed.get("zoho_student_id"):
@@ -62,6 +67,7 @@ async def handle_student_updated(request: Request):
             {"studentdata": json.dumps(transformed)},
         )
 
+        parent_resolver.mark_present("students", transformed["zoho_student_id"])
         logger.info(f"✅ Student synced to Moodle DB: {transformed['zoho_student_id']}")
         return {"status": "success", "zoho_student_id": transformed["zoho_student_id"], "moodle_response": result}
 
@@ -91,6 +97,7 @@ async def handle_registration_created(request: Request):
             "local_mzi_create_registration",
             {"registrationdata": json.dumps(transformed)},
         )
+        parent_resolver.mark_present("registrations", zoho_reg_id)
 
         # ── 2. Sync Payment_Schedule subform → local_mzi_installments ─────────
         # Zoho returns the subform as a list under the key "Payment_Schedule"
@@ -173,6 +180,9 @@ async def handle_payment_recorded(request: Request):
                        f"Registration_ID is missing. Check Zoho OAuth token."
             )
 
+        # True once the parent registration was pushed from a fresh Zoho fetch
+        # in this request — the post-payment resync would only repeat it.
+        reg_fresh = False
         try:
             result = await call_moodle_ws(
                 "local_mzi_record_payment",
@@ -185,7 +195,7 @@ async def handle_payment_recorded(request: Request):
                 reg_id = transformed.get("zoho_registration_id")
                 if not reg_id:
                     raise
-                await ensure_registration_synced(reg_id)
+                reg_fresh = await ensure_registration_synced(reg_id)
                 logger.info(f"🔁 Retrying payment after auto-syncing registration {reg_id}")
                 result = await call_moodle_ws(
                     "local_mzi_record_payment",
@@ -196,11 +206,16 @@ async def handle_payment_recorded(request: Request):
 
         logger.info(f"✅ Payment synced: {transformed.get('zoho_payment_id')}")
 
+        if transformed.get("zoho_student_id"):
+            payment_summary_cache.invalidate(str(transformed["zoho_student_id"]))
+        else:
+            payment_summary_cache.clear()   # owner unknown: a new payment changes some summary
+
         # ── Re-sync the parent registration from Zoho ──────────────────────
         # This refreshes: Paid_Amount, Remaining_Amount, and installment
         # statuses (e.g. Pending → Paid) that Zoho updates after a payment.
         reg_id = transformed.get("zoho_registration_id")
-        if reg_id:
+        if reg_id and not reg_fresh:
             try:
                 await resync_registration_with_installments(reg_id)
             except Exception as resync_err:
@@ -224,6 +239,7 @@ async def handle_grade_submitted(request: Request):
     try:
         raw = await read_zoho_body(request)
         payload = await resolve_zoho_payload(raw, "grades")
+        await run_in_threadpool(identity_index.observe_records, "grades", [payload])
         logger.info(f"📥 grade_submitted webhook: zoho_id={payload.get('id')}")
         logger.info(f"🔑 Zoho payload keys: {list(payload.keys())}")
 
@@ -403,6 +419,8 @@ async def handle_student_deleted(request: Request):
         if not zoho_student_id:
             raise HTTPException(status_code=400, detail="Missing zoho_student_id")
         result = await call_moodle_ws("local_mzi_delete_student", {"zoho_student_id": zoho_student_id})
+        parent_resolver.forget("students", zoho_student_id)
+        await run_in_threadpool(identity_index.forget_zoho_id, zoho_student_id)
         logger.info(f"✅ Student soft-deleted: {zoho_student_id}")
         return {"status": "success", "moodle_response": result}
     except Exception as e:
@@ -420,6 +438,7 @@ async def handle_registration_deleted(request: Request):
         if not zoho_id:
             raise HTTPException(status_code=400, detail="Missing zoho_registration_id")
         result = await call_moodle_ws("local_mzi_delete_registration", {"zoho_registration_id": zoho_id})
+        parent_resolver.forget("registrations", zoho_id)
         return {"status": "success", "moodle_response": result}
     except Exception as e:
         logger.error(f"❌ registration_deleted error: {e}", exc_info=True)
@@ -436,6 +455,7 @@ async def handle_payment_deleted(request: Request):
         if not zoho_id:
             raise HTTPException(status_code=400, detail="Missing zoho_payment_id")
         result = await call_moodle_ws("local_mzi_delete_payment", {"zoho_payment_id": zoho_id})
+        payment_summary_cache.invalidate_payment(zoho_id, transformed.get("zoho_student_id"))
         return {"status": "success", "moodle_response": result}
     except Exception as e:
         logger.error(f"❌ payment_deleted error: {e}", exc_info=True)
@@ -452,6 +472,7 @@ async def handle_grade_deleted(request: Request):
         if not zoho_id:
             raise HTTPException(status_code=400, detail="Missing zoho_grade_id")
         result = await call_moodle_ws("local_mzi_delete_grade", {"zoho_grade_id": zoho_id})
+        await run_in_threadpool(identity_index.forget_zoho_id, zoho_id)
         return {"status": "success", "moodle_response": result}
     except Exception as e:
         logger.error(f"❌ grade_deleted error: {e}", exc_info=True)
@@ -18,30 +18,129 @@ Handles the full class lifecycle (triggered by Edit/Delete only — no Create tr
   class_deleted — soft-deletes from local_mzi_classes.
                   (Moodle course archiving can be added when needed.)
 
+  program_updated / program_deleted — drop the cached BTEC_Program →
+                  Moodle category mapping used when creating courses.
+
 Routes (all under prefix /webhooks/student-dashboard):
   POST /class_updated
   POST /class_deleted
+  POST /program_updated
+  POST /program_deleted
 """
+import asyncio
 import json
 import logging
+import time
 from datetime import datetime, timezone, timedelta
+from typing import Dict, List
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 
 from app.api.v1.endpoints.webhooks_shared import (
     call_moodle_ws,
-    fetch_zoho_full_record,
+    extract_zoho_record,
+    parent_resolver,
+    program_category_cache,
     read_zoho_body,
     resolve_zoho_payload,
+    teacher_cache,
     transform_zoho_to_moodle,
 )
+from app.core import tracing
 from app.core.config import settings
+from app.services import identity_index_service as ids
+from app.services.identity_index_service import identity_index
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 _TZ3 = timezone(timedelta(hours=3))   # Zoho / school timezone (GMT+3)
 
+# Enrollments per local_mzi_update_enrollments call
+ENROLLMENT_BATCH_SIZE = 50
+# Per-enrollment pushes in flight when the plugin has no batch function
+ENROLLMENT_FALLBACK_CONCURRENCY = 5
+
+# After Moodle reports local_mzi_update_enrollments missing (plugin older
+# than 2026022700), later classes go straight to per-item pushes until this
+# many seconds have passed, so a plugin upgrade is picked up without a restart
+ENROLLMENT_BATCH_RECHECK_SECONDS = 3600.0
+
+# time.monotonic() before which the batch function is assumed missing
+_batch_unsupported_until = 0.0
+
+
+def _is_missing_ws_function(error: Exception) -> bool:
+    """True only for Moodle's unknown-WS-function error (invalidrecord on external_functions)."""
+    message = str(getattr(error, "detail", error))
+    return "Can't find data record in database table external_functions" in message
+
+
+async def push_class_enrollments(enrollments: List[Dict]) -> Dict[str, int]:
+    """
+    Push transformed enrollments to Moodle: ENROLLMENT_BATCH_SIZE per
+    local_mzi_update_enrollments call, or concurrent local_mzi_update_enrollment
+    calls when the plugin predates the batch function.  Returns counts.
+    """
+    global _batch_unsupported_until
+    counts = {"synced": 0, "failed": 0}
+
+    def _record(enr_t: Dict, res) -> None:
+        ok = isinstance(res, dict) and res.get("success", True)
+        counts["synced" if ok else "failed"] += 1
+        level = logging.INFO if ok else logging.WARNING
+        logger.log(
+            level,
+            f"  {'✅' if ok else '⚠️'} Enrollment {enr_t.get('zoho_enrollment_id')}: "
+            f"enrol={res.get('enrol_status', '?') if isinstance(res, dict) else '?'}, "
+            f"user={res.get('moodle_user_id', '?') if isinstance(res, dict) else '?'}"
+            + ("" if ok else f" — {res.get('message') if isinstance(res, dict) else res}")
+        )
+
+    start = 0
+    batch = time.monotonic() >= _batch_unsupported_until
+    while batch and start < len(enrollments):
+        chunk = enrollments[start:start + ENROLLMENT_BATCH_SIZE]
+        try:
+            res = await call_moodle_ws(
+                "local_mzi_update_enrollments",
+                {"enrollmentsdata": json.dumps(chunk)},
+            )
+        except Exception as e:
+            if _is_missing_ws_function(e):
+                logger.warning("  local_mzi_update_enrollments unavailable — pushing enrollments one by one")
+                _batch_unsupported_until = time.monotonic() + ENROLLMENT_BATCH_RECHECK_SECONDS
+                break
+            logger.warning(f"  ⚠️ Enrollment batch of {len(chunk)} failed: {e}")
+            counts["failed"] += len(chunk)
+        else:
+            results = res.get("results", []) if isinstance(res, dict) else []
+            for enr_t, item in zip(chunk, results):
+                _record(enr_t, item)
+            counts["failed"] += max(0, len(chunk) - len(results))
+        start += len(chunk)
+
+    rest = enrollments[start:]
+    if rest:
+        sem = asyncio.Semaphore(ENROLLMENT_FALLBACK_CONCURRENCY)
+
+        async def _push_one(enr_t: Dict) -> None:
+            async with sem:
+                try:
+                    res = await call_moodle_ws(
+                        "local_mzi_update_enrollment",
+                        {"enrollmentdata": json.dumps(enr_t)},
+                    )
+                except Exception as enr_e:
+                    counts["failed"] += 1
+                    logger.warning(f"  ⚠️ Could not sync enrollment {enr_t.get('zoho_enrollment_id')}: {enr_e}")
+                    return
+            _record(enr_t, res)
+
+        await asyncio.gather(*(_push_one(e) for e in rest))
+    return counts
+
 
 @router.post("/class_updated")
 async def handle_class_updated(request: Request):
@@ -73,6 +172,7 @@ async def handle_class_updated(request: Request):
             f"name={payload.get('Class_Name')}, status={class_status}"
         )
 
+        await run_in_threadpool(identity_index.observe_records, "classes", [payload])
         transformed = transform_zoho_to_moodle(payload, "classes")
         existing_moodle_class_id = str(transformed.get("moodle_class_id") or "").strip()
         is_active = str(transformed.get("class_status", "")).strip().lower() == "active"
@@ -82,21 +182,16 @@ async def handle_class_updated(request: Request):
         # ===========================================================
         # Helper: resolve category_id from BTEC_Program.MoodleID
         # ===========================================================
+        @tracing.traced()
         async def _get_category():
             default_cat = getattr(settings, "MOODLE_DEFAULT_CATEGORY_ID", 1)
             prog_zoho_id = transformed.get("program_zoho_id")
-            if not prog_zoho_id:
-                return default_cat
-            try:
-                prog = await fetch_zoho_full_record("Products", prog_zoho_id)
-                mid  = int(prog.get("MoodleID") or 0) if prog else 0
-                if mid > 0:
-                    logger.info(f"  Category from BTEC_Program ({prog_zoho_id}): {mid}")
-                    return mid
-            except Exception as pe:
-                logger.warning(f"  Could not fetch BTEC_Program {prog_zoho_id}: {pe}")
-            logger.warning(f"  BTEC_Program {prog_zoho_id} has no MoodleID → fallback cat {default_cat}")
-            return default_cat
+            cat = await program_category_cache.get_category(prog_zoho_id, default_cat)
+            if prog_zoho_id and cat == default_cat:
+                logger.warning(f"  BTEC_Program {prog_zoho_id} has no MoodleID → fallback cat {default_cat}")
+            else:
+                logger.info(f"  Category from BTEC_Program ({prog_zoho_id}): {cat}")
+            return cat
 
         # ===========================================================
         # Helper: convert start_date to epoch (GMT+3)
@@ -115,8 +210,9 @@ async def handle_class_updated(request: Request):
                 return 0
 
         # ===========================================================
-        # Helper: enrol default users + teacher into a course
+        # Helper: enrol default users + teacher into a course (one WS call)
         # ===========================================================
+        @tracing.traced()
         async def _enrol_defaults(moodle_course_id: str):
             try:
                 enrol_list = list(
@@ -129,18 +225,10 @@ async def handle_class_updated(request: Request):
                 teacher_id = transformed.get("teacher_zoho_id")
                 if teacher_id:
                     try:
-                        t_rec   = await fetch_zoho_full_record("BTEC_Teachers", teacher_id)
-                        t_email = (t_rec or {}).get("Academic_Email", "")
-                        if t_email:
-                            lu = await call_moodle_ws(
-                                "core_user_get_users_by_field",
-                                {"field": "username", "values[0]": t_email.lower()},
-                            )
-                            if isinstance(lu, list) and lu:
-                                tmid = lu[0].get("id")
-                                if tmid:
-                                    enrol_list.append({"userid": tmid, "roleid": 3})
-                                    logger.info(f"  Teacher {t_email} → Moodle id={tmid}")
+                        tmid = await teacher_cache.get_moodle_user_id(str(teacher_id))
+                        if tmid:
+                            enrol_list.append({"userid": tmid, "roleid": 3})
+                            logger.info(f"  Teacher {teacher_id} → Moodle id={tmid}")
                     except Exception as te:
                         logger.warning(f"  ⚠️ Teacher lookup failed (non-fatal): {te}")
                 if enrol_list:
@@ -158,6 +246,7 @@ async def handle_class_updated(request: Request):
         # ===========================================================
         # Helper: sync all BTEC_Enrollments for this class
         # ===========================================================
+        @tracing.traced()
         async def _sync_enrollments(moodle_course_id: str):
             try:
                 from app.infra.zoho.client import ZohoClient
@@ -173,21 +262,20 @@ async def handle_class_updated(request: Request):
                     "BTEC_Enrollments", f"(Classes:equals:{zoho_id})"
                 )
                 logger.info(f"  Found {len(enrollments)} enrollment(s) to sync for class {zoho_id}")
+                batch = []
                 for enr in enrollments:
                     try:
                         enr_t = transform_zoho_to_moodle(enr, "enrollments")
-                        enr_t["moodle_course_id"] = moodle_course_id
-                        enr_r = await call_moodle_ws(
-                            "local_mzi_update_enrollment",
-                            {"enrollmentdata": json.dumps(enr_t)},
-                        )
-                        logger.info(
-                            f"  ✅ Enrollment {enr.get('id')}: "
-                            f"enrol={enr_r.get('enrol_status','?') if isinstance(enr_r,dict) else '?'}, "
-                            f"user={enr_r.get('moodle_user_id','?') if isinstance(enr_r,dict) else '?'}"
-                        )
                     except Exception as enr_e:
-                        logger.warning(f"  ⚠️ Could not sync enrollment {enr.get('id')}: {enr_e}")
+                        logger.warning(f"  ⚠️ Could not transform enrollment {enr.get('id')}: {enr_e}")
+                        continue
+                    enr_t["moodle_course_id"] = moodle_course_id
+                    batch.append(enr_t)
+                counts = await push_class_enrollments(batch)
+                logger.info(
+                    f"  Enrollments for class {zoho_id}: "
+                    f"{counts['synced']} synced, {counts['failed']} failed"
+                )
             except Exception as se:
                 logger.warning(f"⚠️ Could not fetch/sync enrollments for class {zoho_id}: {se}")
 
@@ -256,6 +344,7 @@ async def handle_class_updated(request: Request):
                         "local_mzi_create_class",
                         {"classdata": json.dumps(transformed)},
                     )
+                    parent_resolver.mark_present("classes", zoho_id)
 
                     # Write Moodle_Class_ID back to Zoho
                     try:
@@ -272,6 +361,7 @@ async def handle_class_updated(request: Request):
                             record_id=zoho_id,
                             data={"Moodle_Class_ID": moodle_course_id},
                         )
+                        await run_in_threadpool(identity_index.store, ids.COURSE, moodle_course_id, zoho_id)
                         logger.info(f"✅ Zoho BTEC_Classes {zoho_id} ← Moodle_Class_ID={moodle_course_id}")
                     except Exception as ze:
                         logger.warning(f"⚠️ Could not write Moodle_Class_ID back to Zoho: {ze}")
@@ -299,6 +389,7 @@ async def handle_class_updated(request: Request):
                 "local_mzi_create_class",
                 {"classdata": json.dumps(transformed)},
             )
+            parent_resolver.mark_present("classes", zoho_id)
         else:
             class_result = {"action": "created"}
 
@@ -328,7 +419,34 @@ async def handle_class_deleted(request: Request):
         if not zoho_id:
             raise HTTPException(status_code=400, detail="Missing zoho_class_id")
         result = await call_moodle_ws("local_mzi_delete_class", {"zoho_class_id": zoho_id})
+        parent_resolver.forget("classes", zoho_id)
+        await run_in_threadpool(identity_index.forget_zoho_id, zoho_id)
         return {"status": "success", "moodle_response": result}
     except Exception as e:
         logger.error(f"❌ class_deleted error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/program_updated")
+@router.post("/program_deleted")
+async def handle_program_changed(request: Request):
+    """
+    Webhook: BTEC_Program (Products) edited or deleted in Zoho.
+    Drops the cached program → Moodle category mapping so the next class
+    created under it re-reads Products.MoodleID.
+    """
+    try:
+        raw = await read_zoho_body(request)
+        program_zoho_id = (
+            raw.get("zoho_id") or raw.get("_url_zoho_id") or extract_zoho_record(raw).get("id")
+        )
+        if not program_zoho_id:
+            raise HTTPException(status_code=400, detail="Missing Zoho program ID")
+        await run_in_threadpool(program_category_cache.invalidate, str(program_zoho_id))
+        logger.info(f"🗑️ Program category cache invalidated for {program_zoho_id}")
+        return {"status": "success", "program_zoho_id": program_zoho_id}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ program_changed error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
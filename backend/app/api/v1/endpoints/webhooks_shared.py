@@ -11,15 +11,24 @@ Exports (used by all three webhook modules + full_sync.py):
   call_moodle_ws()           – Call Moodle Web Service REST API (dual-token)
   read_zoho_body()           – Parse Zoho notification body (JSON or form-encoded)
   ensure_registration_synced() – Auto-sync missing parent registration
+  parent_resolver            – Shared parent auto-sync (TTL cache + single-flight + batch prefetch)
+  program_category_cache     – DB-backed BTEC_Program → Moodle category cache
 """
+import asyncio
 import json
 import logging
+import time
 import httpx
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.core import tracing
+from app.core.metrics import MOODLE_WS_LATENCY, MOODLE_WS_REQUESTS
+from app.infra.db.models import ProgramCategory
+from app.infra.db.session import SessionLocal
 
 logger = logging.getLogger(__name__)
 
@@ -61,23 +70,39 @@ ZOHO_MODULE_MAP = {
 }
 
 
-async def fetch_zoho_full_record(module: str, record_id: str) -> Dict:
+async def get_zoho_access_token() -> str:
+    """Fresh Zoho access token from the configured refresh token."""
+    from app.infra.zoho.auth import ZohoAuthClient
+    auth = ZohoAuthClient(
+        client_id=settings.ZOHO_CLIENT_ID,
+        client_secret=settings.ZOHO_CLIENT_SECRET,
+        refresh_token=settings.ZOHO_REFRESH_TOKEN,
+        region=settings.ZOHO_REGION,
+    )
+    return await auth.get_access_token()
+
+
+@tracing.traced()
+async def fetch_zoho_full_record(module: str, record_id: str,
+                                 client: Optional[httpx.AsyncClient] = None,
+                                 token: Optional[str] = None) -> Dict:
     """
     Fetch a full record from Zoho CRM API when the notification only contained
     the record ID.  Called when return_affected_field_values=false on the channel.
+
+    Pass a shared `client` + `token` to reuse one connection pool and access
+    token across fetches.
     """
     try:
-        from app.infra.zoho.auth import ZohoAuthClient
-        auth = ZohoAuthClient(
-            client_id=settings.ZOHO_CLIENT_ID,
-            client_secret=settings.ZOHO_CLIENT_SECRET,
-            refresh_token=settings.ZOHO_REFRESH_TOKEN,
-            region=settings.ZOHO_REGION,
-        )
-        token = await auth.get_access_token()
+        if token is None:
+            token = await get_zoho_access_token()
         url = f"https://www.zohoapis.com/crm/v2/{module}/{record_id}"
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.get(url, headers={"Authorization": f"Zoho-oauthtoken {token}"})
+        headers = {"Authorization": f"Zoho-oauthtoken {token}"}
+        if client is None:
+            async with httpx.AsyncClient(timeout=30.0) as own_client:
+                resp = await own_client.get(url, headers=headers)
+        else:
+            resp = await client.get(url, headers=headers)
         if resp.status_code == 200:
             data = resp.json().get("data", [])
             if data:
@@ -89,6 +114,7 @@ async def fetch_zoho_full_record(module: str, record_id: str) -> Dict:
     return {}
 
 
+@tracing.traced()
 async def resolve_zoho_payload(raw: Dict, entity_type: str) -> Dict:
     """
     Extract record ID from Zoho notification and fetch the full record.
@@ -416,6 +442,9 @@ async def call_moodle_ws(
         **params,
     }
 
+    status = "http_error"
+    t0 = time.perf_counter()
+    ws_span = tracing.open_span(f"moodle {wsfunction}", "client", **{"moodle.wsfunction": wsfunction})
     async with httpx.AsyncClient(timeout=30.0) as client:
         try:
             response = await client.post(url, data=data)
@@ -423,13 +452,19 @@ async def call_moodle_ws(
             result = response.json()
 
             if isinstance(result, dict) and "exception" in result:
+                status = "moodle_error"
                 logger.error(f"Moodle WS error [{wsfunction}]: {result}")
                 raise HTTPException(status_code=500, detail=result.get("message", "Moodle WS error"))
 
+            status = "ok"
             return result
         except httpx.HTTPError as e:
             logger.error(f"HTTP error calling Moodle WS [{wsfunction}]: {e}")
             raise HTTPException(status_code=502, detail=f"Moodle API communication error: {str(e)}")
+        finally:
+            MOODLE_WS_REQUESTS.inc(wsfunction, status)
+            MOODLE_WS_LATENCY.observe(time.perf_counter() - t0, wsfunction)
+            tracing.close_span(ws_span, None if status == "ok" else status)
 
 
 # ===========================================================================
@@ -479,15 +514,279 @@ async def read_zoho_body(request: Request) -> Dict:
 
 
 # ===========================================================================
-# REGISTRATION AUTO-SYNC
+# PARENT RESOLUTION  (auto-sync missing registration / student / class)
 # ===========================================================================
 
-async def ensure_registration_synced(zoho_registration_id: str) -> None:
+# Parent entity_type → (Zoho module, Moodle WS function, WS param key)
+PARENT_PUSH_SPECS: Dict[str, Tuple[str, str, str]] = {
+    "students":      ("BTEC_Students",      "local_mzi_update_student",      "studentdata"),
+    "registrations": ("BTEC_Registrations", "local_mzi_create_registration", "registrationdata"),
+    "classes":       ("BTEC_Classes",       "local_mzi_create_class",        "classdata"),
+}
+
+# Child entity_type → [(parent entity_type, Zoho lookup field, transformed FK field)]
+# Checked in order, so the most specific parent comes first.
+PARENT_REFERENCES: Dict[str, List[Tuple[str, str, str]]] = {
+    "registrations": [("students",      "Student_ID",        "zoho_student_id")],
+    "payments":      [("registrations", "Registration_ID",   "zoho_registration_id")],
+    "enrollments":   [("students",      "Enrolled_Students", "zoho_student_id"),
+                      ("classes",       "Classes",           "zoho_class_id")],
+    "grades":        [("students",      "Student",           "zoho_student_id"),
+                      ("classes",       "Class",             "zoho_class_id")],
+    "requests":      [("students",      "Student",           "zoho_student_id")],
+}
+
+# Word Moodle uses for the parent in "<Parent> ... not found" errors
+_PARENT_LABELS = {"students": "student", "registrations": "registration", "classes": "class"}
+
+ZOHO_IDS_PER_CALL = 100   # Zoho GET /{module}?ids= accepts at most 100 ids
+
+
+@tracing.traced()
+async def fetch_zoho_records_by_ids(module: str, record_ids: List[str],
+                                    client: Optional[httpx.AsyncClient] = None,
+                                    token: Optional[str] = None) -> List[Dict]:
     """
-    Auto-sync a BTEC_Registrations record from Zoho into Moodle if it is missing.
-    Called automatically when a payment arrives before its parent registration.
+    Fetch up to 100 records from a Zoho module in one call:
+        GET /crm/v2/{module}?ids=id1,id2,...
+    Returns the records Zoho found (missing ids are simply absent).
+
+    Pass a shared `client` + `token` when fetching several chunks.
+    """
+    if not record_ids:
+        return []
+    if client is None:
+        async with httpx.AsyncClient(timeout=60.0) as own_client:
+            return await fetch_zoho_records_by_ids(
+                module, record_ids, client=own_client, token=token or await get_zoho_access_token())
+    if token is None:
+        token = await get_zoho_access_token()
+    url = f"https://www.zohoapis.com/crm/v2/{module}"
+    resp = await client.get(
+        url,
+        headers={"Authorization": f"Zoho-oauthtoken {token}"},
+        params={"ids": ",".join(record_ids[:ZOHO_IDS_PER_CALL])},
+    )
+    if resp.status_code == 204:
+        return []
+    if resp.status_code != 200:
+        logger.warning(f"⚠️ Zoho batch fetch {module} ({len(record_ids)} ids): {resp.status_code}")
+        return []
+    return resp.json().get("data", [])
+
+
+def parent_ref_id(record: Dict, field: str) -> Optional[str]:
+    """Return the id of a Zoho lookup field (dict or bare id)."""
+    value = record.get(field)
+    if isinstance(value, dict):
+        value = value.get("id")
+    return str(value) if value else None
+
+
+def find_missing_parent(entity_type: str, error: Exception,
+                        transformed: Dict) -> Optional[Tuple[str, str]]:
     """
-    await resync_registration_with_installments(zoho_registration_id)
+    Map a Moodle '<Parent> ... not found' error for `entity_type` to the
+    (parent entity_type, parent zoho id) it refers to, or None.
+    """
+    msg = str(getattr(error, "detail", "") or error).lower()
+    if "not found" not in msg:
+        return None
+    for parent_type, _, fk_field in PARENT_REFERENCES.get(entity_type, []):
+        if _PARENT_LABELS[parent_type] in msg and transformed.get(fk_field):
+            return parent_type, str(transformed[fk_field])
+    return None
+
+
+class ParentResolver:
+    """
+    Shared resolver for parent records that must exist in Moodle before a
+    child (payment, enrollment, grade, request) can be written.
+
+    Used by full_sync.py and the dashboard webhooks so both paths share:
+      * a TTL cache of parents known to be present in Moodle, per entity_type
+        (fed by every successful student / registration / class push);
+      * a short-lived cache of fetched Zoho parent records, so a prefetch or
+        auto-sync is never followed by a second fetch of the same record;
+      * single-flight fetch and push – concurrent callers making the same
+        request (same parent and same refresh / force flags) await one
+        in-flight Zoho call / Moodle push;
+      * batch prefetch – the parents of a whole batch are pulled with one
+        GET ?ids= call per 100 ids, over one client and access token,
+        instead of one fetch per child.
+
+    The cache is per process; it only ever saves calls, Moodle stays the
+    source of truth ('not found' always triggers a forced re-push).
+    """
+
+    def __init__(self, ttl_seconds: float = 900.0, record_ttl_seconds: float = 60.0):
+        self.ttl_seconds = ttl_seconds
+        self.record_ttl_seconds = record_ttl_seconds
+        self._present: Dict[str, Dict[str, float]] = {}             # type → id → expires_at
+        # type → id → (expires_at, fetch started_at, record)
+        self._records: Dict[str, Dict[str, Tuple[float, float, Dict]]] = {}
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+
+    # ── Presence cache ───────────────────────────────────────────────────────
+
+    def is_present(self, entity_type: str, zoho_id: str) -> bool:
+        expires_at = self._present.get(entity_type, {}).get(zoho_id)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            self._present[entity_type].pop(zoho_id, None)
+            return False
+        return True
+
+    def mark_present(self, entity_type: str, zoho_id: Optional[str]) -> None:
+        if entity_type in PARENT_PUSH_SPECS and zoho_id:
+            self._present.setdefault(entity_type, {})[str(zoho_id)] = time.monotonic() + self.ttl_seconds
+
+    def forget(self, entity_type: str, zoho_id: Optional[str]) -> None:
+        if zoho_id:
+            self._present.get(entity_type, {}).pop(str(zoho_id), None)
+            self._records.get(entity_type, {}).pop(str(zoho_id), None)
+
+    def clear(self) -> None:
+        self._present.clear()
+        self._records.clear()
+
+    # ── Zoho record cache ────────────────────────────────────────────────────
+
+    def _cached_record(self, entity_type: str, zoho_id: str) -> Optional[Dict]:
+        entry = self._records.get(entity_type, {}).get(zoho_id)
+        if entry and entry[0] >= time.monotonic():
+            return entry[2]
+        return None
+
+    def _cache_record(self, entity_type: str, record: Dict, started_at: float) -> None:
+        """Cache a fetched record unless a fetch started later already did."""
+        if not record.get("id"):
+            return
+        records = self._records.setdefault(entity_type, {})
+        current = records.get(str(record["id"]))
+        if current and current[1] > started_at:
+            return
+        records[str(record["id"])] = (time.monotonic() + self.record_ttl_seconds, started_at, record)
+
+    async def _single_flight(self, key: Tuple, factory):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+        return await asyncio.shield(task)
+
+    async def get_record(self, entity_type: str, zoho_id: str, refresh: bool = False,
+                         client: Optional[httpx.AsyncClient] = None,
+                         token: Optional[str] = None) -> Dict:
+        """Return the full Zoho record (cached unless refresh=True); {} if unavailable."""
+        if not refresh:
+            cached = self._cached_record(entity_type, zoho_id)
+            if cached is not None:
+                return cached
+        module = PARENT_PUSH_SPECS[entity_type][0]
+
+        async def _fetch() -> Dict:
+            started_at = time.monotonic()
+            record = await fetch_zoho_full_record(module, zoho_id, client=client, token=token)
+            if record:
+                self._cache_record(entity_type, record, started_at)
+            return record
+
+        # A refresh never joins a plain fetch that may predate the change it wants
+        return await self._single_flight(("fetch", entity_type, zoho_id, refresh), _fetch)
+
+    async def prefetch(self, entity_type: str, zoho_ids,
+                       client: Optional[httpx.AsyncClient] = None,
+                       token: Optional[str] = None) -> int:
+        """
+        Pull every id that is neither known-present nor cached with one Zoho
+        call per 100 ids, all over one client and access token (the caller's
+        when given).  Returns the number of records fetched.
+        """
+        module = PARENT_PUSH_SPECS[entity_type][0]
+        wanted = sorted({
+            str(i) for i in zoho_ids
+            if i and not self.is_present(entity_type, str(i))
+            and self._cached_record(entity_type, str(i)) is None
+        })
+        if not wanted:
+            return 0
+        if client is None:
+            async with httpx.AsyncClient(timeout=60.0) as own_client:
+                return await self.prefetch(entity_type, wanted, client=own_client, token=token)
+        fetched = 0
+        for start in range(0, len(wanted), ZOHO_IDS_PER_CALL):
+            chunk = wanted[start:start + ZOHO_IDS_PER_CALL]
+            started_at = time.monotonic()
+            try:
+                if token is None:
+                    token = await get_zoho_access_token()
+                records = await fetch_zoho_records_by_ids(module, chunk, client=client, token=token)
+            except Exception as e:
+                logger.warning(f"⚠️ Parent prefetch {module} failed ({len(chunk)} ids): {e}")
+                continue
+            for record in records:
+                self._cache_record(entity_type, record, started_at)
+            fetched += len(records)
+        logger.info(f"📦 Prefetched {fetched}/{len(wanted)} {module} parent record(s)")
+        return fetched
+
+    # ── Push ────────────────────────────────────────────────────────────────
+
+    async def ensure_present(self, entity_type: str, zoho_id: str,
+                             force: bool = False, refresh: bool = False) -> bool:
+        """
+        Make sure a parent exists in Moodle, fetching it from Zoho and pushing
+        it when needed.  Returns True if it was pushed by this call.
+
+        force=True   – push even if the cache says present (Moodle said 'not found')
+        refresh=True – ignore the cached Zoho record and fetch a fresh one
+        """
+        if not force and self.is_present(entity_type, zoho_id):
+            return False
+        module = PARENT_PUSH_SPECS[entity_type][0]
+
+        async def _push() -> bool:
+            record = await self.get_record(entity_type, zoho_id, refresh=refresh)
+            if not record:
+                raise ValueError(f"Cannot fetch {module} {zoho_id} from Zoho CRM")
+            await push_parent_record(entity_type, record)
+            logger.info(f"🔗 Auto-synced missing {_PARENT_LABELS[entity_type]} {zoho_id}")
+            return True
+
+        return await self._single_flight(("push", entity_type, zoho_id, force, refresh), _push)
+
+
+async def push_parent_record(entity_type: str, record: Dict) -> None:
+    """Upsert a parent record into Moodle and mark it present ('Duplicate entry' counts)."""
+    if entity_type == "registrations":
+        await _push_registration_record(record)
+    else:
+        _, ws_function, ws_param_key = PARENT_PUSH_SPECS[entity_type]
+        try:
+            await call_moodle_ws(ws_function, {ws_param_key: json.dumps(transform_zoho_to_moodle(record, entity_type))})
+        except Exception as e:
+            if "Duplicate entry" not in str(e):
+                raise
+    parent_resolver.mark_present(entity_type, record.get("id"))
+
+
+# ✅ Process-wide instance shared by full_sync.py and the webhook handlers
+parent_resolver = ParentResolver(ttl_seconds=settings.PARENT_CACHE_TTL_SECONDS)
+
+
+async def ensure_registration_synced(zoho_registration_id: str) -> bool:
+    """
+    Auto-sync a BTEC_Registrations record from Zoho into Moodle because Moodle
+    reported it missing.  Called when a payment arrives before its parent
+    registration.  The record is fetched fresh (it carries the paid amounts
+    Zoho just recalculated), so callers need no follow-up resync.
+    """
+    return await parent_resolver.ensure_present(
+        "registrations", zoho_registration_id, force=True, refresh=True,
+    )
 
 
 async def resync_registration_with_installments(zoho_registration_id: str) -> None:
@@ -495,15 +794,21 @@ async def resync_registration_with_installments(zoho_registration_id: str) -> No
     Re-fetch a BTEC_Registrations record from Zoho and upsert it into Moodle,
     including refreshing the Payment_Schedule subform (installments).
 
-    Called:
-    - After a payment is recorded, to pull fresh Paid_Amount / Remaining_Amount
-      and updated installment statuses (Pending → Paid).
-    - When auto-syncing a missing parent registration.
+    Called after a payment is recorded, to pull fresh Paid_Amount /
+    Remaining_Amount and updated installment statuses (Pending → Paid).
+    Concurrent resyncs of the same registration share one Zoho fetch.
     """
     logger.info(f"🔄 Re-syncing registration {zoho_registration_id} from Zoho (incl. installments)...")
-    record = await fetch_zoho_full_record("BTEC_Registrations", zoho_registration_id)
+    record = await parent_resolver.get_record("registrations", zoho_registration_id, refresh=True)
     if not record:
         raise ValueError(f"Cannot fetch registration {zoho_registration_id} from Zoho CRM")
+    await _push_registration_record(record)
+    parent_resolver.mark_present("registrations", zoho_registration_id)
+
+
+async def _push_registration_record(record: Dict) -> None:
+    """Upsert a full BTEC_Registrations record plus its Payment_Schedule installments."""
+    zoho_registration_id = record.get("id", "")
 
     # ── 1. Upsert registration row ──────────────────────────────────────────
     transformed = transform_zoho_to_moodle(record, "registrations")
@@ -538,3 +843,191 @@ async def resync_registration_with_installments(zoho_registration_id: str) -> No
             logger.warning(f"⚠️  Installment refresh skipped for {zoho_registration_id}: {err}")
     else:
         logger.info(f"ℹ️  No Payment_Schedule subform for {zoho_registration_id} — installments unchanged")
+
+
+# ===========================================================================
+# PROGRAM CATEGORY CACHE
+# ===========================================================================
+
+class ProgramCategoryCache:
+    """
+    BTEC_Program (Zoho Products) → Moodle category (Products.MoodleID) lookup,
+    persisted in the program_category_cache table.
+
+    Shared by full_sync.sync_classes and the class_updated webhook so a
+    program is fetched from Zoho at most once per TTL across runs, workers
+    and restarts.  Concurrent lookups of the same program share one fetch.
+    Rows are dropped by the program_updated / program_deleted webhooks.
+
+    The cache only ever saves calls: DB errors fall back to a Zoho fetch,
+    and a failed Zoho fetch falls back to a stale row (or the default).
+    """
+
+    def __init__(self, ttl_seconds: float = 86400.0, session_factory=SessionLocal):
+        self.ttl_seconds = ttl_seconds
+        self._session_factory = session_factory
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _load(self, program_zoho_id: str) -> Optional[Tuple[Optional[int], datetime]]:
+        try:
+            with self._session_factory() as db:
+                row = db.get(ProgramCategory, program_zoho_id)
+                return (row.moodle_category_id, row.fetched_at) if row else None
+        except Exception as e:
+            logger.warning(f"⚠️ Program category cache read failed ({program_zoho_id}): {e}")
+            return None
+
+    def store(self, program_zoho_id: str, moodle_category_id: Optional[int]) -> None:
+        """Upsert the mapping (None = program has no MoodleID)."""
+        try:
+            with self._session_factory() as db:
+                db.merge(ProgramCategory(
+                    program_zoho_id=program_zoho_id,
+                    moodle_category_id=moodle_category_id,
+                    fetched_at=datetime.utcnow(),
+                ))
+                db.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Program category cache write failed ({program_zoho_id}): {e}")
+
+    def invalidate(self, program_zoho_id: str) -> None:
+        try:
+            with self._session_factory() as db:
+                db.query(ProgramCategory).filter(
+                    ProgramCategory.program_zoho_id == program_zoho_id
+                ).delete()
+                db.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Program category cache invalidate failed ({program_zoho_id}): {e}")
+
+    async def get_moodle_id(self, program_zoho_id: str) -> Optional[int]:
+        """Return the program's MoodleID (None if unset or unavailable)."""
+        cached = await run_in_threadpool(self._load, program_zoho_id)
+        if cached and (datetime.utcnow() - cached[1]).total_seconds() < self.ttl_seconds:
+            return cached[0]
+
+        task = self._inflight.get(program_zoho_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(program_zoho_id, cached))
+            self._inflight[program_zoho_id] = task
+            task.add_done_callback(lambda _t, k=program_zoho_id: self._inflight.pop(k, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, program_zoho_id: str,
+                     stale: Optional[Tuple[Optional[int], datetime]]) -> Optional[int]:
+        try:
+            prog = await fetch_zoho_full_record("Products", program_zoho_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not fetch BTEC_Program {program_zoho_id}: {e}")
+            return stale[0] if stale else None
+        if not prog:
+            return stale[0] if stale else None
+        try:
+            mid = int(prog.get("MoodleID") or 0)
+        except (TypeError, ValueError):
+            mid = 0
+        moodle_id = mid if mid > 0 else None
+        await run_in_threadpool(self.store, program_zoho_id, moodle_id)
+        return moodle_id
+
+    async def get_category(self, program_zoho_id: Optional[str], default: int) -> int:
+        """Moodle category for a program, or `default` when it has no MoodleID."""
+        if not program_zoho_id:
+            return default
+        moodle_id = await self.get_moodle_id(program_zoho_id)
+        return moodle_id if moodle_id else default
+
+
+# ✅ Process-wide instance shared by full_sync.py and the class webhooks
+program_category_cache = ProgramCategoryCache(ttl_seconds=settings.PROGRAM_CATEGORY_CACHE_TTL_SECONDS)
+
+
+# ===========================================================================
+# TEACHER CACHE
+# ===========================================================================
+
+class TeacherCache:
+    """
+    BTEC_Teachers id → Academic_Email → Moodle user id, per process.
+
+    Fed by full_sync.sync_teachers (local_mzi_sync_teacher returns the
+    resolved moodle_user_id) so the class_updated webhook can enrol a class's
+    teacher without a Zoho fetch and a core_user_get_users_by_field call per
+    course.  Misses fall back to exactly those two calls, single-flight per
+    teacher, and store the answer.  Unresolved teachers are not cached.
+    """
+
+    def __init__(self, ttl_seconds: float = 86400.0):
+        self.ttl_seconds = ttl_seconds
+        self._emails: Dict[str, Tuple[float, str]] = {}   # teacher zoho id → (expires_at, email)
+        self._users: Dict[str, Tuple[float, int]] = {}    # email → (expires_at, moodle user id)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _get(cache: Dict[str, Tuple[float, Any]], key: str) -> Any:
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            cache.pop(key, None)
+            return None
+        return entry[1]
+
+    def store(self, teacher_zoho_id: Optional[str], email: Optional[str], moodle_user_id: Any) -> None:
+        """Remember a teacher's email and/or Moodle user id (0 / blank values are ignored)."""
+        expires_at = time.monotonic() + self.ttl_seconds
+        email = (email or "").strip().lower()
+        if teacher_zoho_id and email:
+            self._emails[str(teacher_zoho_id)] = (expires_at, email)
+        try:
+            moodle_user_id = int(moodle_user_id or 0)
+        except (TypeError, ValueError):
+            moodle_user_id = 0
+        if email and moodle_user_id > 0:
+            self._users[email] = (expires_at, moodle_user_id)
+
+    def get_by_email(self, email: Optional[str]) -> Optional[int]:
+        return self._get(self._users, (email or "").strip().lower())
+
+    def forget(self, teacher_zoho_id: str) -> None:
+        email = self._get(self._emails, str(teacher_zoho_id))
+        self._emails.pop(str(teacher_zoho_id), None)
+        if email:
+            self._users.pop(email, None)
+
+    def clear(self) -> None:
+        self._emails.clear()
+        self._users.clear()
+
+    async def get_moodle_user_id(self, teacher_zoho_id: str) -> Optional[int]:
+        """Moodle user id of a teacher (None when Zoho or Moodle don't know them)."""
+        email = self._get(self._emails, str(teacher_zoho_id))
+        if email:
+            moodle_user_id = self.get_by_email(email)
+            if moodle_user_id:
+                return moodle_user_id
+
+        task = self._inflight.get(teacher_zoho_id)
+        if task is None:
+            task = asyncio.ensure_future(self._resolve(teacher_zoho_id, email))
+            self._inflight[teacher_zoho_id] = task
+            task.add_done_callback(lambda _t, k=teacher_zoho_id: self._inflight.pop(k, None))
+        return await asyncio.shield(task)
+
+    async def _resolve(self, teacher_zoho_id: str, email: Optional[str]) -> Optional[int]:
+        if not email:
+            record = await fetch_zoho_full_record("BTEC_Teachers", teacher_zoho_id)
+            email = (record or {}).get("Academic_Email", "")
+            if not email:
+                return None
+        users = await call_moodle_ws(
+            "core_user_get_users_by_field",
+            {"field": "username", "values[0]": email.lower()},
+        )
+        moodle_user_id = users[0].get("id") if isinstance(users, list) and users else None
+        self.store(teacher_zoho_id, email, moodle_user_id)
+        return moodle_user_id or None
+
+
+# ✅ Process-wide instance shared by full_sync.py and the class webhooks
+teacher_cache = TeacherCache(ttl_seconds=settings.TEACHER_CACHE_TTL_SECONDS)
@@ -5,7 +5,7 @@ Workflow Rules are permanent (never expire) and work with Custom Modules
 (BTEC_*). They replace the old Notification Channels approach.
 
 Routes:
-  POST   /api/v1/admin/setup-zoho-automations   Delete old + create 14 Workflow Rules
+  POST   /api/v1/admin/setup-zoho-automations   Reconcile the 18 Workflow Rules (diff-based)
   GET    /api/v1/admin/zoho-automations          List current rules (state + live Zoho)
   DELETE /api/v1/admin/zoho-automations          Delete all MZI-managed Workflow Rules
 """
@@ -62,8 +62,9 @@ class WorkflowSetupRequest(BaseModel):
 @router.post("/setup-zoho-automations")
 async def setup_zoho_automations(request: Optional[WorkflowSetupRequest] = None):
     """
-    Create 14 Workflow Rules in Zoho CRM (one pair per BTEC module: create/edit + delete).
-    Any existing MZI rules are deleted first — idempotent.
+    Provision the Workflow Rules in Zoho CRM (one pair per BTEC module: create/edit + delete).
+    Only what differs is written: unchanged rules are skipped, changed ones updated
+    in place, stale MZI rules deleted once their replacements exist — idempotent.
 
     Requires Zoho OAuth scope: ZohoCRM.settings.workflow_rules.ALL
     """
@@ -75,22 +76,27 @@ async def setup_zoho_automations(request: Optional[WorkflowSetupRequest] = None)
 
         if not result.get("success"):
             logger.warning(
-                f"Partial creation: {result['created']}/{result['total']} rules created, "
+                f"Partial setup: {result['provisioned']}/{result['total']} rules in place, "
                 f"errors: {result.get('errors', [])}"
             )
 
         return {
             "status": "ok" if result.get("success") else "partial",
             "message": (
-                f"Successfully created {result['created']}/{result['total']} Workflow Rules."
+                f"All {result['total']} Workflow Rules in place "
+                f"({result['created']} created, {result['updated']} updated, "
+                f"{result['unchanged']} unchanged)."
                 if result.get("success")
-                else f"Partial setup: {result['created']}/{result['total']} rules created. "
+                else f"Partial setup: {result['provisioned']}/{result['total']} rules in place. "
                      f"Check logs for details."
             ),
             "webhook_base_url":  result["webhook_base_url"],
             "rules_created":     result["created"],
+            "rules_updated":     result["updated"],
+            "rules_unchanged":   result["unchanged"],
             "rules_total":       result["total"],
             "rules_deleted_old": result.get("deleted_old", 0),
+            "stale_deleted":     result.get("deleted", {}),
             "errors":            result.get("errors", []),
             "rules":             result.get("rules", []),
         }
@@ -132,8 +138,8 @@ async def list_zoho_automations():
 @router.delete("/zoho-automations")
 async def delete_zoho_automations():
     """
-    Delete all MZI-managed Workflow Rules from Zoho CRM and clear the local state file.
-    Uses saved rule IDs; falls back to searching Zoho by the 'MZI - ' name prefix.
+    Delete all MZI-managed Workflow Rules from Zoho CRM and clear the saved state.
+    Uses saved rule IDs plus anything in Zoho with the 'MZI - ' name prefix.
     """
     try:
         svc = ZohoWorkflowService()
@@ -141,12 +147,13 @@ async def delete_zoho_automations():
         return {
             "status":  "ok",
             "message": (
-                f"Deleted {result['deleted']} Workflow Rule(s)."
-                if result["deleted"]
-                else result.get("message", "No rules found to delete.")
+                f"Deleted {result['deleted_rules']} Workflow Rule(s)."
+                if result["deleted_rules"]
+                else "No rules found to delete."
             ),
-            "deleted": result["deleted"],
-            "failed":  result.get("failed", 0),
+            "deleted": result["deleted_rules"],
+            "deleted_webhooks": result["deleted_webhooks"],
+            "failed":  result["failed_rules"],
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,19 +1,33 @@
 """
-In-memory HTTP access log  ·  ring buffer + ASGI middleware
-Stores the last MAX_ENTRIES requests; newest-first on read.
+HTTP access log  ·  columnar ring buffer + ASGI middleware
+Stores the last ACCESS_LOG_SIZE requests in parallel arrays with per-method,
+per-category and per-status-class indexes; reads are newest-first keyset
+(cursor) pages that touch only the rows they return.  With
+ACCESS_LOG_SQLITE_PATH set, rows are also spilled to SQLite in batches and
+the admin log reads from there (all workers, survives restarts).
 """
 from __future__ import annotations
 
+import atexit
+import logging
+import sqlite3
+import threading
 import time
+from bisect import bisect_left, bisect_right
 from collections import deque
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from app.core import profiler, tracing
+from app.core.config import settings
+from app.core.metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS
+
+logger = logging.getLogger(__name__)
 
 # ── Config ────────────────────────────────────────────────────────────────────
 
-MAX_ENTRIES = 2000
-PER_PAGE    = 100
+PER_PAGE = 100
 
 # ── Data model ────────────────────────────────────────────────────────────────
 
@@ -27,11 +41,15 @@ class AccessLogEntry:
     duration_ms: float
     client_ip:   str
     category:    str   # admin | api | webhook | sync | health | other
+    seq:         int = 0   # cursor: ring sequence number or SQLite row id
 
 
-# ── Ring buffer ───────────────────────────────────────────────────────────────
-
-_store: Deque[AccessLogEntry] = deque(maxlen=MAX_ENTRIES)
+@dataclass
+class LogPage:
+    entries:      List[AccessLogEntry] = field(default_factory=list)   # newest first
+    total:        Optional[int] = None   # None when counting would need a full scan
+    newer_cursor: Optional[int] = None   # pass as after=  for the previous page
+    older_cursor: Optional[int] = None   # pass as before= for the next page
 
 
 def _categorize(path: str) -> str:
@@ -59,7 +77,283 @@ def _status_class(code: int) -> str:
     return "5xx"
 
 
-# ── Query helper ──────────────────────────────────────────────────────────────
+# ── Columnar ring ─────────────────────────────────────────────────────────────
+
+Row = Tuple[float, str, str, str, int, float, str, str]   # ts, method, path, query, status, ms, ip, category
+
+
+class AccessLogRing:
+    """
+    Fixed-size ring of parallel column lists; row `seq` lives in slot
+    seq % size.  Each index is a deque of seqs (oldest first) trimmed lazily
+    once the ring has overwritten them.  Appends and queries both run on the
+    event loop thread and a row is published (next_seq bumped) only after
+    all of its columns are written, so there is no lock.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self.next_seq = 0
+        self._ts:       List[float] = [0.0] * self.size
+        self._method:   List[str]   = [""] * self.size
+        self._path:     List[str]   = [""] * self.size
+        self._query:    List[str]   = [""] * self.size
+        self._status:   List[int]   = [0] * self.size
+        self._duration: List[float] = [0.0] * self.size
+        self._ip:       List[str]   = [""] * self.size
+        self._category: List[str]   = [""] * self.size
+        self._index: Dict[Tuple[str, str], Deque[int]] = {}
+
+    @property
+    def oldest_seq(self) -> int:
+        return max(0, self.next_seq - self.size)
+
+    def __len__(self) -> int:
+        return self.next_seq - self.oldest_seq
+
+    def append(self, row: Row) -> int:
+        seq = self.next_seq
+        i = seq % self.size
+        (self._ts[i], self._method[i], self._path[i], self._query[i],
+         self._status[i], self._duration[i], self._ip[i], self._category[i]) = row
+        oldest_after = seq + 1 - self.size
+        for key in (("method", row[1]), ("category", row[7]), ("status", _status_class(row[4]))):
+            idx = self._index.get(key)
+            if idx is None:
+                idx = self._index[key] = deque()
+            idx.append(seq)
+            while idx[0] < oldest_after:
+                idx.popleft()
+        self.next_seq = seq + 1
+        return seq
+
+    def _live(self, key: Tuple[str, str]) -> Sequence[int]:
+        idx = self._index.get(key)
+        if idx is None:
+            return ()
+        oldest = self.oldest_seq
+        while idx and idx[0] < oldest:
+            idx.popleft()
+        return idx
+
+    def _entry(self, seq: int) -> AccessLogEntry:
+        i = seq % self.size
+        return AccessLogEntry(
+            timestamp=datetime.fromtimestamp(self._ts[i]), method=self._method[i],
+            path=self._path[i], query=self._query[i], status_code=self._status[i],
+            duration_ms=self._duration[i], client_ip=self._ip[i], category=self._category[i],
+            seq=seq,
+        )
+
+    def query(
+        self,
+        *,
+        method:       str = "",
+        category:     str = "",
+        status_class: str = "",
+        search:       str = "",
+        before:       Optional[int] = None,
+        after:        Optional[int] = None,
+        per_page:     int = PER_PAGE,
+    ) -> LogPage:
+        method = method.upper()
+        filters = [(k, v) for k, v in (("method", method), ("category", category),
+                                       ("status", status_class)) if v]
+        if filters:
+            # Drive the scan from the most selective index; check the rest per row
+            seqs = min((self._live(f) for f in filters), key=len)
+        else:
+            seqs = range(self.oldest_seq, self.next_seq)
+        needle = search.lower()
+
+        def matches(seq: int) -> bool:
+            i = seq % self.size
+            if method and self._method[i] != method:
+                return False
+            if category and self._category[i] != category:
+                return False
+            if status_class and _status_class(self._status[i]) != status_class:
+                return False
+            if needle and not (needle in self._path[i].lower() or needle in self._query[i].lower()
+                               or needle in self._ip[i].lower()):
+                return False
+            return True
+
+        found: List[int] = []
+        if after is not None:
+            pos = bisect_right(seqs, after)
+            while pos < len(seqs) and len(found) <= per_page:
+                if matches(seqs[pos]):
+                    found.append(seqs[pos])
+                pos += 1
+            more_newer, more_older = len(found) > per_page, True
+            found = found[:per_page][::-1]
+        else:
+            pos = bisect_left(seqs, before) if before is not None else len(seqs)
+            while pos > 0 and len(found) <= per_page:
+                pos -= 1
+                if matches(seqs[pos]):
+                    found.append(seqs[pos])
+            more_newer, more_older = before is not None, len(found) > per_page
+            found = found[:per_page]
+
+        total = len(seqs) if len(filters) <= 1 and not needle else None
+        return LogPage(
+            entries=[self._entry(s) for s in found],
+            total=total,
+            newer_cursor=found[0] if found and more_newer else None,
+            older_cursor=found[-1] if found and more_older else None,
+        )
+
+
+# ── SQLite spill ──────────────────────────────────────────────────────────────
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS access_log (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts           REAL NOT NULL,
+    method       TEXT NOT NULL,
+    path         TEXT NOT NULL,
+    query        TEXT NOT NULL,
+    status_code  INTEGER NOT NULL,
+    status_class TEXT NOT NULL,
+    duration_ms  REAL NOT NULL,
+    client_ip    TEXT NOT NULL,
+    category     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_access_log_method   ON access_log (method, id);
+CREATE INDEX IF NOT EXISTS ix_access_log_category ON access_log (category, id);
+CREATE INDEX IF NOT EXISTS ix_access_log_status   ON access_log (status_class, id);
+"""
+
+
+class SqliteSink:
+    """
+    Batched writer: rows queue in memory and a daemon thread inserts them
+    every ACCESS_LOG_FLUSH_SECONDS, then trims the table to the newest
+    `retain` rows.  SQLite in WAL mode lets every worker write the same file.
+    """
+
+    def __init__(self, path: str, retain: int, flush_interval: float):
+        self.path = path
+        self.retain = retain
+        self.flush_interval = flush_interval
+        self._pending: List[Row] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def submit(self, row: Row) -> None:
+        self._pending.append(row)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="access-log-sink", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT INTO access_log (ts, method, path, query, status_code, status_class,"
+                    " duration_ms, client_ip, category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(ts, m, p, q, st, _status_class(st), ms, ip, cat)
+                     for ts, m, p, q, st, ms, ip, cat in batch],
+                )
+                conn.execute(
+                    "DELETE FROM access_log WHERE id <= (SELECT MAX(id) FROM access_log) - ?",
+                    (self.retain,),
+                )
+        except sqlite3.Error as exc:
+            logger.warning("Access log spill to %s failed (%d rows dropped): %s",
+                           self.path, len(batch), exc)
+
+    def close(self) -> None:
+        self._stop_event.set()
+        self.flush()
+
+    def query(
+        self,
+        *,
+        method:       str = "",
+        category:     str = "",
+        status_class: str = "",
+        search:       str = "",
+        before:       Optional[int] = None,
+        after:        Optional[int] = None,
+        per_page:     int = PER_PAGE,
+    ) -> LogPage:
+        where, params = [], []
+        for column, value in (("method", method.upper()), ("category", category),
+                              ("status_class", status_class)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if search:
+            where.append("(path LIKE ? OR query LIKE ? OR client_ip LIKE ?)")
+            params += [f"%{search}%"] * 3
+        filter_sql = " AND ".join(where) or "1"
+
+        if after is not None:
+            sql = f"SELECT * FROM access_log WHERE {filter_sql} AND id > ? ORDER BY id ASC LIMIT ?"
+        else:
+            cursor_sql = "AND id < ?" if before is not None else ""
+            sql = f"SELECT * FROM access_log WHERE {filter_sql} {cursor_sql} ORDER BY id DESC LIMIT ?"
+        cursor = after if after is not None else before
+        args = params + ([cursor] if cursor is not None else []) + [per_page + 1]
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, args).fetchall()
+            total = None if search else conn.execute(
+                f"SELECT COUNT(*) FROM access_log WHERE {filter_sql}", params).fetchone()[0]
+
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        if after is not None:
+            rows.reverse()
+        more_newer, more_older = (more, True) if after is not None else (before is not None, more)
+        entries = [
+            AccessLogEntry(timestamp=datetime.fromtimestamp(ts), method=m, path=p, query=q,
+                           status_code=st, duration_ms=ms, client_ip=ip, category=cat, seq=rid)
+            for rid, ts, m, p, q, st, _, ms, ip, cat in rows
+        ]
+        return LogPage(
+            entries=entries,
+            total=total,
+            newer_cursor=entries[0].seq if entries and more_newer else None,
+            older_cursor=entries[-1].seq if entries and more_older else None,
+        )
+
+
+# ── Store + query helper ──────────────────────────────────────────────────────
+
+_ring = AccessLogRing(settings.ACCESS_LOG_SIZE)
+_sink: Optional[SqliteSink] = None
+if settings.ACCESS_LOG_SQLITE_PATH:
+    try:
+        _sink = SqliteSink(settings.ACCESS_LOG_SQLITE_PATH, settings.ACCESS_LOG_SQLITE_RETAIN,
+                           settings.ACCESS_LOG_FLUSH_SECONDS)
+    except sqlite3.Error as exc:
+        logger.warning("Access log SQLite sink disabled (%s): %s", settings.ACCESS_LOG_SQLITE_PATH, exc)
+
+
+def record(row: Row) -> None:
+    _ring.append(row)
+    if _sink is not None:
+        _sink.submit(row)
+
 
 def get_entries(
     *,
@@ -67,31 +361,45 @@ def get_entries(
     category:     str = "",
     status_class: str = "",   # "2xx" | "3xx" | "4xx" | "5xx"
     search:       str = "",
-    page:         int = 1,
+    before:       Optional[int] = None,
+    after:        Optional[int] = None,
     per_page:     int = PER_PAGE,
-) -> tuple[list[AccessLogEntry], int]:
-    """Return filtered, paginated entries (newest first)."""
-    entries: list[AccessLogEntry] = list(reversed(_store))
-
-    if method:
-        entries = [e for e in entries if e.method == method.upper()]
-    if category:
-        entries = [e for e in entries if e.category == category]
-    if status_class:
-        prefix = status_class[0]          # "2", "3", "4", "5"
-        entries = [e for e in entries if str(e.status_code).startswith(prefix)]
-    if search:
-        s = search.lower()
-        entries = [
-            e for e in entries
-            if s in e.path.lower()
-            or s in e.query.lower()
-            or s in e.client_ip.lower()
-        ]
+) -> LogPage:
+    """One newest-first page of filtered entries (SQLite when spilling, else this process)."""
+    store = _sink if _sink is not None else _ring
+    return store.query(method=method, category=category, status_class=status_class,
+                       search=search, before=before, after=after, per_page=per_page)
+
+
+def capacity() -> int:
+    return _sink.retain if _sink is not None else _ring.size
+
 
-    total = len(entries)
-    start = (page - 1) * per_page
-    return entries[start : start + per_page], total
+# ── Route template (metrics label) ────────────────────────────────────────────
+
+_route_cache: dict = {}   # endpoint → [routes]
+
+
+def _route_template(scope) -> str:
+    """
+    Matched route path template (e.g. /admin/students/{student_id}) so metric
+    labels stay low-cardinality; unmatched paths collapse to one label.
+    """
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return "<unmatched>"
+    routes = _route_cache.get(endpoint)
+    if routes is None:
+        routes = [r for r in getattr(app, "routes", []) if getattr(r, "endpoint", None) is endpoint]
+        _route_cache[endpoint] = routes
+    if len(routes) == 1:
+        return routes[0].path
+    path = scope.get("path", "")
+    for route in routes:
+        if route.path_regex.match(path):
+            return route.path
+    return "<unmatched>"
 
 
 # ── ASGI middleware ───────────────────────────────────────────────────────────
@@ -99,7 +407,10 @@ def get_entries(
 class AccessLogMiddleware:
     """
     Starlette-compatible middleware that appends every HTTP request
-    to the in-memory ring buffer as an AccessLogEntry.
+    to the access log ring (and SQLite spill, if configured), records
+    per-route request counts / latency for /metrics, opens the
+    request's trace (root span for app.core.tracing) and registers
+    the request with the sampling profiler.
     """
 
     def __init__(self, app):
@@ -112,6 +423,16 @@ class AccessLogMiddleware:
 
         t0 = time.perf_counter()
         status_holder: list[int] = [0]
+        path     = scope.get("path", "")
+        category = _categorize(path)
+        method   = scope.get("method", "")
+        HTTP_IN_FLIGHT.inc(category)
+        traceparent = next((v.decode("latin-1") for k, v in scope.get("headers", ())
+                            if k == b"traceparent"), None)
+        root = tracing.start_trace(f"{method} {path}", traceparent=traceparent,
+                                   **{"http.method": method, "http.target": path,
+                                      "http.category": category})
+        profile_id = profiler.request_started(f"{method} {path}")
 
         async def _send(message):
             if message["type"] == "http.response.start":
@@ -121,20 +442,24 @@ class AccessLogMiddleware:
         try:
             await self.app(scope, receive, _send)
         finally:
-            duration_ms = round((time.perf_counter() - t0) * 1000, 1)
-            path   = scope.get("path", "")
+            elapsed     = time.perf_counter() - t0
+            duration_ms = round(elapsed * 1000, 1)
             query  = scope.get("query_string", b"").decode(errors="replace")
-            method = scope.get("method", "")
             client = scope.get("client")
             ip     = client[0] if client else "—"
 
-            _store.append(AccessLogEntry(
-                timestamp   = datetime.now(),
-                method      = method,
-                path        = path,
-                query       = query,
-                status_code = status_holder[0],
-                duration_ms = duration_ms,
-                client_ip   = ip,
-                category    = _categorize(path),
-            ))
+            record((time.time(), method, path, query, status_holder[0], duration_ms, ip, category))
+
+            route = _route_template(scope)
+            HTTP_IN_FLIGHT.dec(category)
+            HTTP_REQUESTS.inc(category, route, method, status_holder[0])
+            HTTP_LATENCY.observe(elapsed, category, route, method)
+            profiler.request_finished(profile_id, f"{method} {route}", elapsed)
+
+            if root is not None:
+                root.name = f"{method} {route if route != '<unmatched>' else path}"
+                root.set_attribute("http.route", route)
+                root.set_attribute("http.status_code", status_holder[0])
+                if status_holder[0] >= 500 or status_holder[0] == 0:
+                    root.set_status("error", f"HTTP {status_holder[0]}")
+                tracing.end_trace(root)
@@ -38,6 +38,75 @@ class Settings(BaseSettings):
     # 8133 = IT Program Leader (role 3)
     MOODLE_COURSE_ENROLMENTS_IT: str = '[{"userid":8133,"roleid":3}]'
 
+    # Full sync: max number of independent steps (e.g. Teachers ‖ Students) run at once
+    FULL_SYNC_MAX_PARALLEL_STEPS: int = 3
+    # Full sync: per-step live progress (job status + SSE stream) refresh interval
+    FULL_SYNC_PROGRESS_INTERVAL_MS: int = 250
+    # How long a student/registration/class stays "known present in Moodle"
+    # for parent auto-sync (payments, enrollments, grades, requests)
+    PARENT_CACHE_TTL_SECONDS: int = 900
+    # Program → Moodle category cache (program_category_cache table) freshness
+    PROGRAM_CATEGORY_CACHE_TTL_SECONDS: int = 86400
+    # BTEC grading templates (btec_template_cache table): re-read from Zoho after
+    # this long even without a btec_definition_updated webhook
+    BTEC_TEMPLATE_CACHE_TTL_SECONDS: int = 86400
+    # BTEC template sync → Moodle: grading definitions created at once
+    BTEC_TEMPLATE_SYNC_CONCURRENCY: int = 4
+    # Moodle ↔ Zoho identity index (zoho_identity_index table) used by the grade
+    # webhook: entries older than this are re-checked with a Zoho search
+    IDENTITY_INDEX_TTL_SECONDS: int = 604800
+    # Per-student payment summaries (totals + registration fees), per process;
+    # dropped early by the payment_recorded / payment_deleted webhooks
+    PAYMENT_SUMMARY_CACHE_TTL_SECONDS: int = 300
+    # Teacher → Moodle user id lookups (per process) used when creating class
+    # courses; fed by the full-sync teachers step
+    TEACHER_CACHE_TTL_SECONDS: int = 86400
+    # Zoho workflow/webhook provisioning: settings API calls in flight at once
+    ZOHO_AUTOMATION_CONCURRENCY: int = 4
+    # Dashboard counters (stat_counters table): full COUNT(*) rebuild interval
+    # to absorb writes that bypass the ORM (0 = only at startup)
+    STATS_RECONCILE_INTERVAL_SECONDS: int = 3600
+    # How often each worker writes its buffered counter deltas (dashboard totals
+    # from other workers lag by at most this much)
+    STATS_FLUSH_INTERVAL_SECONDS: float = 2.0
+    # Event log retention (destructive, off by default: interval 0 = off): days
+    # kept per status (statuses not listed are kept forever); expired rows are
+    # archived as gzip NDJSON under EVENT_ARCHIVE_DIR (an absolute path; empty =
+    # delete without archiving) and deleted in batches
+    EVENT_RETENTION_DAYS: str = '{"completed":30,"duplicate":7,"failed":90}'
+    EVENT_ARCHIVE_DIR: str = ""
+    EVENT_RETENTION_BATCH_SIZE: int = 1000
+    EVENT_RETENTION_INTERVAL_SECONDS: int = 0
+    # /metrics: directory shared by uvicorn workers for metric snapshots
+    # (empty = single-process metrics) and how often each worker flushes
+    METRICS_MULTIPROC_DIR: str = ""
+    METRICS_FLUSH_INTERVAL_SECONDS: float = 5.0
+    # /metrics access: scrapers send "Authorization: Bearer <METRICS_TOKEN>";
+    # with no token set the endpoint answers 403 unless METRICS_PUBLIC=true
+    # (explicit opt-out, e.g. when only a private network can reach it)
+    METRICS_TOKEN: Optional[str] = None
+    METRICS_PUBLIC: bool = False
+    # Request tracing: requests slower than TRACE_SLOW_MS (or failed) are kept
+    # for the admin trace viewer and appended to TRACE_FILE (OTLP JSON lines)
+    TRACING_ENABLED: bool = True
+    TRACE_SLOW_MS: float = 500.0
+    TRACE_BUFFER_SIZE: int = 200
+    TRACE_MAX_SPANS: int = 2000
+    TRACE_FILE: str = ""
+    # Sampling profiler (/admin/profiler): cap on one on-demand run, and the
+    # always-on per-endpoint CPU sampler for requests slower than
+    # PROFILER_SLOW_REQUEST_MS (0 Hz = off)
+    PROFILER_MAX_SECONDS: float = 120.0
+    PROFILER_CONTINUOUS_HZ: float = 0.0
+    PROFILER_SLOW_REQUEST_MS: float = 1000.0
+    # HTTP access log (/admin/logs): in-memory ring size per worker; with
+    # ACCESS_LOG_SQLITE_PATH set, rows are also batched into that SQLite file
+    # (shared by all workers, newest ACCESS_LOG_SQLITE_RETAIN rows kept)
+    ACCESS_LOG_SIZE: int = 2000
+    ACCESS_LOG_SQLITE_PATH: str = ""
+    ACCESS_LOG_SQLITE_RETAIN: int = 100000
+    ACCESS_LOG_FLUSH_SECONDS: float = 1.0
+
     # Zoho CRM Configuration
     ZOHO_CLIENT_ID: Optional[str] = None
     ZOHO_ACCESS_TOKEN: Optional[str] = None  # Short-lived OAuth2 access token for Zoho API
@@ -0,0 +1,352 @@
+"""
+In-process metrics registry  ·  Prometheus text exposition (/metrics)
+Counters, gauges and latency histograms kept in plain dicts; hot-path cost
+is one lock + one dict update per observation.
+
+Multi-worker (uvicorn --workers N): set METRICS_MULTIPROC_DIR to a directory
+shared by the workers.  Each worker flushes a JSON snapshot of its own values
+there every METRICS_FLUSH_INTERVAL_SECONDS; the worker serving /metrics merges
+all snapshots (counters/histograms summed, gauges summed or max'ed over live
+workers only).  Without the setting, /metrics reports the serving process.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ── Config ────────────────────────────────────────────────────────────────────
+
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+STEP_BUCKETS: Tuple[float, ...] = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_lock = threading.Lock()
+_registry: Dict[str, "_Metric"] = {}
+
+# Scrape-time collectors: () -> [(name, help, type, [(labels dict, value)])]
+Sample = Tuple[Dict[str, str], float]
+Collector = Callable[[], List[Tuple[str, str, str, List[Sample]]]]
+_collectors: List[Collector] = []
+
+
+# ── Metric types ──────────────────────────────────────────────────────────────
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, object] = {}
+        _registry[name] = self
+
+    def _key(self, labelvalues: tuple) -> tuple:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labelvalues}")
+        return tuple(str(v) for v in labelvalues)
+
+    def clear(self) -> None:
+        with _lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonic counter; summed across workers."""
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount: float = 1.0) -> None:
+        key = self._key(labelvalues)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labelvalues) -> float:
+        return self._values.get(self._key(labelvalues), 0.0)
+
+
+class Gauge(_Metric):
+    """
+    Point-in-time value.  mode="sum" adds live workers (in-flight counts),
+    mode="max" keeps the largest (last-run rates).
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), mode: str = "sum"):
+        super().__init__(name, help, labelnames)
+        self.mode = mode
+
+    def set(self, value: float, *labelvalues) -> None:
+        key = self._key(labelvalues)
+        with _lock:
+            self._values[key] = float(value)
+
+    def inc(self, *labelvalues, amount: float = 1.0) -> None:
+        key = self._key(labelvalues)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labelvalues, amount: float = 1.0) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def value(self, *labelvalues) -> float:
+        return self._values.get(self._key(labelvalues), 0.0)
+
+
+class Histogram(_Metric):
+    """Bucketed observations (+ sum and count); summed across workers."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues) -> None:
+        key = self._key(labelvalues)
+        idx = bisect_left(self.buckets, value)   # len(buckets) → +Inf only
+        with _lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][idx] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *labelvalues) -> int:
+        entry = self._values.get(self._key(labelvalues))
+        return entry[2] if entry else 0
+
+
+def register_collector(collector: Collector) -> None:
+    """Add a scrape-time collector (for values read from shared state, e.g. the DB)."""
+    _collectors.append(collector)
+
+
+# ── Application metrics ───────────────────────────────────────────────────────
+
+ZOHO_REQUESTS = Counter(
+    "zoho_api_requests_total", "Zoho CRM API calls.", ("module", "operation", "status"))
+ZOHO_LATENCY = Histogram(
+    "zoho_api_request_duration_seconds", "Zoho CRM API call latency.", ("module", "operation"))
+ZOHO_TOKEN_REFRESHES = Counter(
+    "zoho_token_refreshes_total", "Zoho OAuth access-token refreshes.", ("outcome",))
+
+MOODLE_WS_REQUESTS = Counter(
+    "moodle_ws_requests_total", "Moodle Web Service calls.", ("wsfunction", "status"))
+MOODLE_WS_LATENCY = Histogram(
+    "moodle_ws_request_duration_seconds", "Moodle Web Service call latency.", ("wsfunction",))
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled.", ("category", "route", "method", "status"))
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency per route.", ("category", "route", "method"))
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.", ("category",))
+
+EVENTS_HANDLED = Counter(
+    "events_handled_total", "Webhook events processed by EventHandlerService.", ("source", "module", "status"))
+EVENT_LATENCY = Histogram(
+    "event_processing_duration_seconds", "EventHandlerService processing time.", ("source", "module"))
+
+FULL_SYNC_RECORDS = Counter(
+    "full_sync_records_total", "Records processed by full-sync steps.", ("step", "outcome"))
+FULL_SYNC_STEP_SECONDS = Histogram(
+    "full_sync_step_duration_seconds", "Full-sync step duration.", ("step",), buckets=STEP_BUCKETS)
+FULL_SYNC_RATE = Gauge(
+    "full_sync_step_records_per_second", "Throughput of the last run of each full-sync step.",
+    ("step",), mode="max")
+FULL_SYNC_RUNNING = Gauge(
+    "full_sync_jobs_running", "Full-sync jobs currently running.")
+
+
+# ── Multi-worker snapshots ────────────────────────────────────────────────────
+
+def _multiproc_dir() -> Optional[str]:
+    return settings.METRICS_MULTIPROC_DIR or None
+
+
+def _snapshot() -> Dict:
+    with _lock:
+        metrics = {}
+        for m in _registry.values():
+            values = [
+                [list(k), [list(v[0]), v[1], v[2]] if isinstance(v, list) else v]
+                for k, v in m._values.items()
+            ]
+            metrics[m.name] = {"kind": m.kind, "values": values}
+    return {"pid": os.getpid(), "metrics": metrics}
+
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics_{pid}.json")
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def flush() -> None:
+    """Write this worker's snapshot (atomic replace); no-op in single-process mode."""
+    directory = _multiproc_dir()
+    if not directory:
+        return
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = _snapshot_path(directory, os.getpid())
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(_snapshot(), fh)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"⚠️ Metrics flush failed: {e}")
+
+
+def prune_dead_snapshots() -> None:
+    """Drop snapshots of workers that no longer exist (called once at startup)."""
+    directory = _multiproc_dir()
+    if not directory or not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.startswith("metrics_") and name.endswith(".json"):
+            try:
+                pid = int(name[len("metrics_"):-len(".json")])
+            except ValueError:
+                continue
+            if not _pid_alive(pid):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+
+async def run_flusher(interval: float) -> None:
+    """Background task: flush this worker's snapshot every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        flush()
+
+
+def _load_snapshots() -> List[Dict]:
+    """This worker's live values plus every other worker's last snapshot."""
+    snapshots = [_snapshot()]
+    directory = _multiproc_dir()
+    if not directory or not os.path.isdir(directory):
+        return snapshots
+    own = os.getpid()
+    for name in os.listdir(directory):
+        if not (name.startswith("metrics_") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as fh:
+                snap = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        if snap.get("pid") != own:
+            snapshots.append(snap)
+    return snapshots
+
+
+def _merge(snapshots: Iterable[Dict]) -> Dict[str, Dict[tuple, object]]:
+    merged: Dict[str, Dict[tuple, object]] = {name: {} for name in _registry}
+    own = os.getpid()
+    for snap in snapshots:
+        alive = snap.get("pid") == own or _pid_alive(int(snap.get("pid", 0)))
+        for name, data in snap.get("metrics", {}).items():
+            metric = _registry.get(name)
+            if metric is None or data.get("kind") != metric.kind:
+                continue
+            if metric.kind == "gauge" and not alive:
+                continue
+            out = merged[name]
+            for labels, value in data["values"]:
+                key = tuple(labels)
+                if metric.kind == "histogram":
+                    cur = out.get(key)
+                    if cur is None or len(cur[0]) != len(value[0]):
+                        out[key] = [list(value[0]), value[1], value[2]]
+                    else:
+                        cur[0] = [a + b for a, b in zip(cur[0], value[0])]
+                        cur[1] += value[1]
+                        cur[2] += value[2]
+                elif metric.kind == "gauge" and getattr(metric, "mode", "sum") == "max":
+                    out[key] = max(out.get(key, value), value)
+                else:
+                    out[key] = out.get(key, 0.0) + value
+    return merged
+
+
+# ── Exposition ────────────────────────────────────────────────────────────────
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render() -> str:
+    """Prometheus text format for all metrics, merged across workers."""
+    merged = _merge(_load_snapshots())
+    lines: List[str] = []
+
+    for name in sorted(_registry):
+        metric = _registry[name]
+        values = merged.get(name, {})
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key in sorted(values):
+            value = values[key]
+            if metric.kind == "histogram":
+                cumulative = 0
+                for bound, n in zip(metric.buckets + (float("inf"),), value[0]):
+                    cumulative += n
+                    le = 'le="%s"' % _fmt(bound)
+                    lines.append(f"{name}_bucket{_labels(metric.labelnames, key, le)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(metric.labelnames, key)} {_fmt(value[1])}")
+                lines.append(f"{name}_count{_labels(metric.labelnames, key)} {value[2]}")
+            else:
+                lines.append(f"{name}{_labels(metric.labelnames, key)} {_fmt(value)}")
+
+    for collector in _collectors:
+        try:
+            families = collector()
+        except Exception as e:
+            logger.warning(f"⚠️ Metrics collector failed: {e}")
+            continue
+        for name, help, kind, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_fmt(value)}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,235 @@
+"""
+Sampling profiler  ·  collapsed stacks for flamegraphs, per-endpoint CPU
+A daemon thread wakes every `interval` seconds and records the Python stack
+of every other thread (sys._current_frames) — no tracing hooks, so the
+profiled code runs at full speed; cost is one stack walk per thread per
+sample.  Output is the collapsed-stack format ("frame;frame;frame count")
+read by flamegraph.pl, speedscope and inferno.
+
+Modes:
+  cpu   – thread stacks (where the interpreter is executing); idle threads
+          parked in select / Condition.wait are dropped unless idle=True
+  tasks – await chains of every asyncio task on the app loop (where requests
+          are *waiting*: Zoho / Moodle I/O, locks, sleeps)
+
+Samples taken while the event loop is inside a request are prefixed with
+"METHOD /path" (AccessLogMiddleware registers its frame per request).
+
+With PROFILER_CONTINUOUS_HZ > 0 a low-rate sampler runs for the life of the
+process and only counts which request each event-loop sample landed in;
+requests slower than PROFILER_SLOW_REQUEST_MS add samples × interval (their
+estimated CPU time) to per-endpoint totals.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+# ── Request attribution ───────────────────────────────────────────────────────
+
+_inflight: Dict[int, list] = {}         # id(middleware frame) → ["METHOD /path", samples]
+_slow_cpu: Dict[str, List[float]] = {}  # "METHOD /route" → [count, wall_s, cpu_s, max_cpu_s]
+_continuous: Optional["_ContinuousSampler"] = None
+
+
+def request_started(label: str) -> int:
+    """Called by the middleware: register the caller's frame as this request."""
+    frame_id = id(sys._getframe(1))
+    _inflight[frame_id] = [label, 0]
+    return frame_id
+
+
+def request_finished(frame_id: int, route_label: str, wall_s: float) -> None:
+    _, samples = _inflight.pop(frame_id, (None, 0))
+    if _continuous is None or wall_s * 1000 < settings.PROFILER_SLOW_REQUEST_MS:
+        return
+    cpu = samples * _continuous.interval
+    entry = _slow_cpu.setdefault(route_label, [0, 0.0, 0.0, 0.0])
+    entry[0] += 1
+    entry[1] += wall_s
+    entry[2] += cpu
+    entry[3] = max(entry[3], cpu)
+
+
+def slow_request_cpu() -> List[Dict[str, float]]:
+    """Per-endpoint totals for slow requests, most CPU first."""
+    rows = [
+        {"route": route, "requests": int(n), "wall_s": round(wall, 3), "cpu_s": round(cpu, 3),
+         "max_cpu_s": round(max_cpu, 3), "cpu_share": round(cpu / wall, 3) if wall else 0.0}
+        for route, (n, wall, cpu, max_cpu) in _slow_cpu.items()
+    ]
+    return sorted(rows, key=lambda r: r["cpu_s"], reverse=True)
+
+
+# ── Stack helpers ─────────────────────────────────────────────────────────────
+
+_IDLE_FILES = ("selectors.py", "threading.py", "queue.py")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _walk(frame) -> Tuple[List[str], Optional[str]]:
+    """Root-first frame labels plus the request label if a request frame is on the stack."""
+    labels: List[str] = []
+    request = None
+    while frame is not None:
+        if request is None:
+            entry = _inflight.get(id(frame))
+            request = entry[0] if entry else None
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels, request
+
+
+def _await_chain(coro) -> List[str]:
+    """Frames of a suspended task: the coroutine and everything it is awaiting."""
+    labels = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        labels.append(_frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return labels
+
+
+# ── Samplers ──────────────────────────────────────────────────────────────────
+
+class StackSampler(threading.Thread):
+    """On-demand sampler for one profile run; see module docstring for modes."""
+
+    def __init__(self, interval: float, mode: str = "cpu", idle: bool = False,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.mode = mode
+        self.idle = idle
+        self.loop = loop
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            if self.mode == "tasks":
+                self.loop.call_soon_threadsafe(self._sample_tasks)
+            else:
+                self._sample_threads()
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join(timeout=5)
+
+    def _sample_threads(self) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+            if not self.idle and frame.f_code.co_filename.endswith(_IDLE_FILES):
+                continue
+            labels, request = _walk(frame)
+            prefix = [names.get(ident, f"thread-{ident}")] + ([request] if request else [])
+            self.stacks[";".join(prefix + labels)] += 1
+
+    def _sample_tasks(self) -> None:
+        # Runs on the event loop thread (scheduled via call_soon_threadsafe)
+        current = asyncio.current_task()
+        for task in asyncio.all_tasks():
+            if task is current:
+                continue
+            chain = _await_chain(task.get_coro())
+            if chain:
+                self.stacks[";".join([f"task:{task.get_name()}"] + chain)] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class _ContinuousSampler(threading.Thread):
+    """Low-rate event-loop-thread sampler that only attributes samples to requests."""
+
+    def __init__(self, interval: float, loop_thread: int):
+        super().__init__(name="request-cpu-sampler", daemon=True)
+        self.interval = interval
+        self._loop_thread = loop_thread
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self._loop_thread)
+            while frame is not None:
+                entry = _inflight.get(id(frame))
+                if entry is not None:
+                    entry[1] += 1
+                    break
+                frame = frame.f_back
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+def start_continuous() -> None:
+    """Start the per-request CPU sampler; call from the event loop thread (lifespan)."""
+    global _continuous
+    if _continuous is None and settings.PROFILER_CONTINUOUS_HZ > 0:
+        _continuous = _ContinuousSampler(1.0 / settings.PROFILER_CONTINUOUS_HZ, threading.get_ident())
+        _continuous.start()
+
+
+def stop_continuous() -> None:
+    global _continuous
+    if _continuous is not None:
+        _continuous.stop()
+        _continuous = None
+
+
+# ── On-demand profile ─────────────────────────────────────────────────────────
+
+_profile_running = False
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profile is already running in this process."""
+
+
+async def profile(seconds: float, mode: str = "cpu", interval: float = 0.005,
+                  idle: bool = False) -> Tuple[str, Dict[str, float]]:
+    """
+    Sample the process for `seconds` (capped at PROFILER_MAX_SECONDS) and
+    return (collapsed stacks, summary).  One profile at a time.
+    """
+    global _profile_running
+    if _profile_running:
+        raise ProfilerBusy("a profile is already running")
+    seconds = max(0.1, min(seconds, settings.PROFILER_MAX_SECONDS))
+    interval = max(0.001, interval)
+    _profile_running = True
+    sampler = StackSampler(interval, mode, idle, loop=asyncio.get_running_loop())
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    sampler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop()
+        _profile_running = False
+    summary = {
+        "mode": mode,
+        "seconds": round(time.perf_counter() - t0, 3),
+        "samples": sampler.samples,
+        "interval_ms": interval * 1000,
+        "process_cpu_s": round(time.process_time() - cpu0, 3),
+    }
+    return sampler.collapsed(), summary
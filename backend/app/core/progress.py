@@ -0,0 +1,112 @@
+"""
+In-process pub/sub for live job progress  ·  feeds the SSE progress streams
+Producers (the full-sync step loops) publish small dicts on a topic under a
+key; every subscriber of that topic keeps only the newest message per key, so
+a slow or stalled reader never grows a queue or holds the producer back — it
+just sees the latest state of each step when it next reads.
+
+publish() is synchronous and must run on the event loop thread; with nobody
+subscribed it is a dict lookup.  Messages are shared between subscribers and
+must be treated as read-only.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class Subscription:
+    """One reader's conflated view of a topic: newest message per key."""
+
+    def __init__(self, bus: "ProgressBus", topic: str):
+        self._bus = bus
+        self.topic = topic
+        self._pending: Dict[str, Any] = {}
+        self._ready = asyncio.Event()
+
+    def _offer(self, key: str, message: Any) -> None:
+        self._pending.pop(key, None)   # re-insert: delivery follows last-update order
+        self._pending[key] = message
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> List[Tuple[str, Any]]:
+        """Wait for updates; returns [(key, message)] ([] when `timeout` passes first)."""
+        if not self._pending:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        items = list(self._pending.items())
+        self._pending.clear()
+        self._ready.clear()
+        return items
+
+    def close(self) -> None:
+        self._bus._unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ProgressBus:
+    """Topic → subscribers registry; see module docstring."""
+
+    def __init__(self) -> None:
+        self._subs: Dict[str, Set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, topic: str) -> Subscription:
+        sub = Subscription(self, topic)
+        self._subs[topic].add(sub)
+        return sub
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        subs = self._subs.get(sub.topic)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subs[sub.topic]
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self._subs.get(topic))
+
+    def publish(self, topic: str, key: str, message: Any) -> None:
+        for sub in tuple(self._subs.get(topic, ())):
+            sub._offer(key, message)
+
+
+class Throttle:
+    """True at most once per `interval_ms` (always on the first call)."""
+
+    __slots__ = ("_interval", "_last")
+
+    def __init__(self, interval_ms: float):
+        self._interval = max(0.0, interval_ms) / 1000.0
+        self._last = float("-inf")
+
+    def ready(self) -> bool:
+        now = time.monotonic()
+        if now - self._last < self._interval:
+            return False
+        self._last = now
+        return True
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one text/event-stream frame; non-str data is sent as JSON."""
+    if not isinstance(data, str):
+        data = json.dumps(data, default=str)
+    lines = "".join(f"data: {line}\n" for line in data.split("\n"))
+    return f"event: {event}\n{lines}\n"
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+SSE_KEEPALIVE_SECONDS = 15.0
+
+# Process-wide bus (full-sync publishes on topic "full-sync")
+bus = ProgressBus()
@@ -0,0 +1,409 @@
+"""
+Lightweight request tracing  ·  OpenTelemetry-compatible spans, no SDK needed
+Each inbound HTTP request opens a trace (AccessLogMiddleware); spans opened
+while it runs — outbound Zoho / Moodle HTTP calls, Moodle WS functions, Zoho
+client operations, SQL statements, and any function wrapped with @traced —
+attach to it through a context variable, so asyncio tasks spawned by the
+handler inherit the parent span.
+
+Finished traces slower than TRACE_SLOW_MS (or that failed) are kept in a ring
+buffer for the admin trace viewer and, when TRACE_FILE is set, appended to it
+as OTLP/JSON lines ({"resourceSpans": [...]}) that an OpenTelemetry
+collector's file receiver, Jaeger or Tempo can import.  Code running outside a
+request (no active trace) pays one context-variable lookup per span.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ── Data model ────────────────────────────────────────────────────────────────
+
+SERVICE_NAME = "moodle-zoho-integration"
+
+# OTLP SpanKind / StatusCode enum values
+_KIND = {"internal": 1, "server": 2, "client": 3}
+_STATUS = {"unset": 0, "ok": 1, "error": 2}
+
+
+@dataclass
+class Span:
+    trace: "Trace" = field(repr=False)
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    kind: str
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "unset"
+    status_message: str = ""
+    token: Any = field(default=None, repr=False)   # context-var reset token while current
+
+    @property
+    def duration_ms(self) -> float:
+        return round(((self.end_ns or time.time_ns()) - self.start_ns) / 1e6, 2)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_status(self, status: str, message: str = "") -> None:
+        self.status = status
+        self.status_message = message
+
+    def end(self) -> None:
+        if not self.end_ns:
+            self.end_ns = time.time_ns()
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    spans: List[Span] = field(default_factory=list)
+    dropped: int = 0
+    closed: bool = False
+
+    @property
+    def root(self) -> Span:
+        return self.spans[0]
+
+    @property
+    def duration_ms(self) -> float:
+        return self.root.duration_ms
+
+    def waterfall(self) -> List[Dict[str, Any]]:
+        """Spans depth-first in start order, with depth and offset for rendering."""
+        children: Dict[Optional[str], List[Span]] = {}
+        for s in self.spans:
+            children.setdefault(s.parent_id, []).append(s)
+        rows: List[Dict[str, Any]] = []
+        origin = self.root.start_ns
+
+        def _walk(span: Span, depth: int) -> None:
+            rows.append({
+                "span": span,
+                "depth": depth,
+                "offset_ms": round((span.start_ns - origin) / 1e6, 2),
+                "duration_ms": span.duration_ms,
+            })
+            for child in sorted(children.get(span.span_id, []), key=lambda c: c.start_ns):
+                _walk(child, depth + 1)
+
+        _walk(self.root, 0)
+        return rows
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+_recent: Deque[Trace] = deque(maxlen=settings.TRACE_BUFFER_SIZE)
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+# ── W3C traceparent ───────────────────────────────────────────────────────────
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple]:
+    """'00-<32 hex trace id>-<16 hex span id>-<flags>' → (trace_id, parent span id)."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32:
+        return None
+    return parts[1], parts[2]
+
+
+# ── Span API ──────────────────────────────────────────────────────────────────
+
+def start_trace(name: str, *, traceparent: Optional[str] = None, **attributes) -> Optional[Span]:
+    """Open the root (server) span of a new trace and make it current."""
+    if not settings.TRACING_ENABLED:
+        return None
+    remote = parse_traceparent(traceparent)
+    trace = Trace(trace_id=remote[0] if remote else _new_id(16))
+    root = Span(trace, _new_id(8), remote[1] if remote else None, name, "server",
+                time.time_ns(), attributes=dict(attributes))
+    trace.spans.append(root)
+    root.token = _current.set(root)
+    return root
+
+
+def end_trace(root: Optional[Span]) -> None:
+    """Close the trace; keep / export it if it was slow or failed."""
+    if root is None:
+        return
+    root.end()
+    trace = root.trace
+    trace.closed = True
+    try:
+        _current.reset(root.token)
+    except ValueError:          # ended from another context
+        _current.set(None)
+    if root.status == "error" or trace.duration_ms >= settings.TRACE_SLOW_MS:
+        _recent.append(trace)
+        if settings.TRACE_FILE:
+            _sink.submit(trace)
+
+
+def _open(name: str, kind: str, attributes: Dict[str, Any]) -> Optional[Span]:
+    parent = _current.get()
+    if parent is None or parent.trace.closed:
+        return None
+    trace = parent.trace
+    if len(trace.spans) >= settings.TRACE_MAX_SPANS:
+        trace.dropped += 1
+        return None
+    s = Span(trace, _new_id(8), parent.span_id, name, kind, time.time_ns(), attributes=attributes)
+    trace.spans.append(s)
+    return s
+
+
+def open_span(name: str, kind: str = "internal", **attributes) -> Optional[Span]:
+    """
+    Start a child span of the current span and make it current; None outside
+    a trace.  Pair with close_span() in a finally block.
+    """
+    s = _open(name, kind, attributes)
+    if s is not None:
+        s.token = _current.set(s)
+    return s
+
+
+def close_span(s: Optional[Span], error: Optional[str] = None) -> None:
+    if s is None:
+        return
+    if error:
+        s.set_status("error", error[:300])
+    s.end()
+    try:
+        _current.reset(s.token)
+    except ValueError:          # closed from another context
+        pass
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes) -> Iterator[Optional[Span]]:
+    """
+    Child span of the current span; a no-op (yields None) outside a trace.
+    Exceptions mark the span as error and propagate.
+    """
+    s = open_span(name, kind, **attributes)
+    error = None
+    try:
+        yield s
+    except BaseException as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        close_span(s, error)
+
+
+def traced(name: Optional[str] = None, kind: str = "internal"):
+    """Decorator: run the (sync or async) function inside a span."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__.replace(".<locals>", "")
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ── Query helpers (admin viewer) ──────────────────────────────────────────────
+
+def recent_traces(*, min_ms: float = 0.0, search: str = "", limit: int = 100) -> List[Trace]:
+    """Kept traces, newest first."""
+    s = search.lower()
+    out = []
+    for trace in reversed(_recent):
+        if trace.duration_ms < min_ms:
+            continue
+        if s and s not in trace.root.name.lower() and s not in trace.trace_id:
+            continue
+        out.append(trace)
+        if len(out) >= limit:
+            break
+    return out
+
+
+def get_trace(trace_id: str) -> Optional[Trace]:
+    for trace in reversed(_recent):
+        if trace.trace_id == trace_id:
+            return trace
+    return None
+
+
+# ── OTLP/JSON export ──────────────────────────────────────────────────────────
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attrs(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+def to_otlp(trace: Trace) -> Dict[str, Any]:
+    spans = []
+    for s in trace.spans:
+        item = {
+            "traceId": trace.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": _KIND.get(s.kind, 1),
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns or s.start_ns),
+            "attributes": _otlp_attrs(s.attributes),
+            "status": {"code": _STATUS[s.status], **({"message": s.status_message} if s.status_message else {})},
+        }
+        if s.parent_id:
+            item["parentSpanId"] = s.parent_id
+        spans.append(item)
+    return {"resourceSpans": [{
+        "resource": {"attributes": _otlp_attrs({"service.name": SERVICE_NAME, "process.pid": os.getpid()})},
+        "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+    }]}
+
+
+class _FileSink:
+    """Appends OTLP JSON lines to TRACE_FILE from a daemon thread (no I/O on the event loop)."""
+
+    def __init__(self):
+        self._queue: "queue.SimpleQueue[Trace]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, trace: Trace) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-file-sink", daemon=True)
+                    self._thread.start()
+        self._queue.put(trace)
+
+    def _run(self) -> None:
+        while True:
+            trace = self._queue.get()
+            try:
+                with open(settings.TRACE_FILE, "a", encoding="utf-8") as fh:
+                    fh.write(json.dumps(to_otlp(trace), separators=(",", ":")) + "\n")
+            except OSError as e:
+                logger.warning(f"Trace file sink failed ({settings.TRACE_FILE}): {e}")
+
+
+_sink = _FileSink()
+
+
+# ── Auto-instrumentation: outbound HTTP + SQL ─────────────────────────────────
+
+def _peer_service(host: str) -> str:
+    if "zohoapis" in host:
+        return "zoho"
+    if host.startswith("accounts.zoho"):
+        return "zoho-accounts"
+    moodle = (settings.MOODLE_BASE_URL or "").split("://")[-1].split("/")[0]
+    if moodle and host == moodle.split(":")[0]:
+        return "moodle"
+    return host
+
+
+def instrument_httpx() -> None:
+    """Client span around every request sent through an httpx.AsyncHTTPTransport."""
+    import httpx
+
+    transport_cls = httpx.AsyncHTTPTransport
+    if getattr(transport_cls, "_traced", False):
+        return
+    original = transport_cls.handle_async_request
+
+    async def handle_async_request(self, request):
+        # URL without the query string: Zoho / Moodle credentials can ride in it
+        with span(f"HTTP {request.method}", "client",
+                  **{"http.method": request.method,
+                     "http.url": f"{request.url.scheme}://{request.url.host}{request.url.path}",
+                     "peer.service": _peer_service(request.url.host)}) as s:
+            response = await original(self, request)
+            if s is not None:
+                s.set_attribute("http.status_code", response.status_code)
+                if response.status_code >= 400:
+                    s.set_status("error", f"HTTP {response.status_code}")
+            return response
+
+    transport_cls.handle_async_request = handle_async_request
+    transport_cls._traced = True
+
+
+def instrument_sqlalchemy() -> None:
+    """Span per SQL statement on every engine (session work inside a request)."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if event.contains(Engine, "before_cursor_execute", _before_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_execute)
+    event.listen(Engine, "after_cursor_execute", _after_execute)
+    event.listen(Engine, "handle_error", _on_error)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    s = _open(f"db {statement.lstrip().split(' ', 1)[0].upper()}", "client",
+              {"db.system": conn.engine.dialect.name, "db.statement": statement[:500]})
+    conn.info.setdefault("trace_spans", []).append(s)
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("trace_spans")
+    s = stack.pop() if stack else None
+    if s is not None:
+        if cursor is not None and cursor.rowcount >= 0:
+            s.set_attribute("db.rows", cursor.rowcount)
+        s.end()
+
+
+def _on_error(exception_context):
+    conn = exception_context.connection
+    stack = conn.info.get("trace_spans") if conn is not None else None
+    s = stack.pop() if stack else None
+    if s is not None:
+        s.set_status("error", str(exception_context.original_exception)[:300])
+        s.end()
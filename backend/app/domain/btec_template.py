@@ -5,6 +5,8 @@ Represents a BTEC grading template from Zoho.
 Used for creating Moodle grading definitions.
 """
 
+import hashlib
+import json
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 
@@ -46,6 +48,12 @@ class BtecTemplate(BaseModel):
         """Check if template has at least one criterion."""
         return self.total_criteria_count > 0
     
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 of the Moodle definition payload; changes with any criterion."""
+        payload = json.dumps(self.to_moodle_dict(), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
     def to_moodle_dict(self) -> Dict[str, Any]:
         """
         Convert to Moodle grading definition format.
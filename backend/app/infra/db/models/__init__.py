@@ -9,6 +9,11 @@ from app.infra.db.models.program import Program
 from app.infra.db.models.unit import Unit
 from app.infra.db.models.registration import Registration
 from app.infra.db.models.event_log import EventLog
+from app.infra.db.models.program_category import ProgramCategory
+from app.infra.db.models.btec_template import BtecUnitTemplate, BtecTemplateSync
+from app.infra.db.models.stat_counter import StatCounter
+from app.infra.db.models.zoho_identity import ZohoIdentity
+from app.infra.db.models.zoho_automation import ZohoAutomation
 from app.infra.db.models.extension import (
     TenantProfile,
     IntegrationSettings,
@@ -28,6 +33,12 @@ __all__ = [
     "Unit",
     "Registration",
     "EventLog",
+    "ProgramCategory",
+    "BtecUnitTemplate",
+    "BtecTemplateSync",
+    "StatCounter",
+    "ZohoIdentity",
+    "ZohoAutomation",
     "TenantProfile",
     "IntegrationSettings",
     "ModuleSettings",
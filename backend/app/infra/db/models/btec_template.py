@@ -0,0 +1,46 @@
+"""
+BTEC Template Models
+- btec_template_cache: the BTEC (Units) records grading templates are parsed
+  from, so grade syncs do not re-read the unit from Zoho for every grade.
+- btec_template_sync: what was last pushed to Moodle per unit, so template
+  sync only re-creates definitions whose criteria changed.
+"""
+
+from sqlalchemy import Column, String, DateTime, Integer, JSON
+from datetime import datetime
+
+from app.infra.db.base import Base
+
+
+class BtecUnitTemplate(Base):
+    """
+    Criteria fields of one Zoho BTEC unit (Name, Unit_Code, P/M/D
+    *_description) plus its Modified_Time, which versions the parsed
+    GradingTemplate held in memory by each worker.
+
+    Refreshed after BTEC_TEMPLATE_CACHE_TTL_SECONDS, replaced by the
+    btec_definition_updated webhook and dropped by btec_definition_deleted.
+    """
+
+    __tablename__ = "btec_template_cache"
+
+    unit_zoho_id = Column(String(255), primary_key=True)
+    record = Column(JSON, nullable=False)
+    modified_time = Column(String(64), nullable=True)
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class BtecTemplateSync(Base):
+    """
+    Last grading definition pushed to Moodle for one Zoho BTEC unit.
+
+    content_hash is BtecTemplate.content_hash of the pushed definition;
+    template sync skips units whose current hash matches it.
+    """
+
+    __tablename__ = "btec_template_sync"
+
+    unit_zoho_id = Column(String(255), primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+    definition_id = Column(Integer, nullable=True)
+    synced_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -5,6 +5,7 @@ Stores webhook events for deduplication and tracking.
 """
 
 from sqlalchemy import Column, String, Integer, DateTime, Text, JSON, Index
+from sqlalchemy.orm import column_property
 from sqlalchemy.sql import func
 from app.infra.db.base import Base
 
@@ -37,7 +38,12 @@ class EventLog(Base):
     payload = Column(JSON, nullable=False)  # Full webhook payload
     
     # Processing status
-    status = Column(String(50), default="pending", nullable=False, index=True)  # pending, processing, completed, failed, duplicate
+    # active_history: the previous status is loaded on assignment so the
+    # stat_counters flush hook can move the count from old status to new
+    status = column_property(
+        Column(String(50), default="pending", nullable=False, index=True),  # pending, processing, completed, failed, duplicate
+        active_history=True,
+    )
     
     # Processing result
     result = Column(JSON, nullable=True)  # Processing result details
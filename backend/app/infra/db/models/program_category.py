@@ -0,0 +1,26 @@
+"""
+Program Category Cache Model
+
+Caches the Zoho BTEC_Program (Products) → Moodle category (MoodleID) mapping
+used when creating Moodle courses for classes.
+"""
+
+from sqlalchemy import Column, String, Integer, DateTime
+from datetime import datetime
+from app.infra.db.base import Base
+
+
+class ProgramCategory(Base):
+    """
+    Program → Moodle category mapping with fetch time for TTL checks.
+
+    moodle_category_id is NULL when the program has no MoodleID in Zoho
+    (callers fall back to MOODLE_DEFAULT_CATEGORY_ID).
+    Rows are refreshed after PROGRAM_CATEGORY_CACHE_TTL_SECONDS and dropped
+    by the program_updated / program_deleted webhooks.
+    """
+    __tablename__ = "program_category_cache"
+
+    program_zoho_id = Column(String(255), primary_key=True)
+    moodle_category_id = Column(Integer, nullable=True)
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
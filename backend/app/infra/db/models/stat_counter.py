@@ -0,0 +1,26 @@
+"""
+Stat Counter Model
+
+Named running totals (event counts per status / source, student count) read
+by the admin dashboard and /events/stats instead of COUNT(*) scans.
+"""
+
+from sqlalchemy import Column, String, BigInteger, DateTime
+from datetime import datetime
+from app.infra.db.base import Base
+
+
+class StatCounter(Base):
+    """
+    One row per counter, e.g. "events.total", "events.status.failed",
+    "events.source.zoho", "students.total".
+
+    Adjusted from deltas buffered at commit of the rows they count and
+    written every few seconds (see app.services.stat_counter_service), and
+    rebuilt from COUNT(*) by the periodic reconcile.
+    """
+    __tablename__ = "stat_counters"
+
+    name = Column(String(100), primary_key=True)
+    value = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
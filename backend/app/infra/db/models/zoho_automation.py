@@ -0,0 +1,32 @@
+"""
+Zoho Automation State Model
+Webhook entities + workflow rules provisioned in Zoho CRM by the backend
+(see zoho_workflow_service); replaces the old zoho_rules_state.json file.
+"""
+
+from sqlalchemy import Column, String, DateTime
+from datetime import datetime
+
+from app.infra.db.base import Base
+
+
+class ZohoAutomation(Base):
+    """
+    One provisioned (module, trigger) pair: a Zoho Webhook entity and the
+    Workflow Rule that fires it, keyed by their shared "MZI - ..." name.
+
+    spec_hash covers the desired webhook + rule payloads (URL, module, trigger);
+    a row whose hash matches the current spec and whose ids still exist in
+    Zoho is left alone on the next setup.
+    """
+
+    __tablename__ = "zoho_automation_state"
+
+    name = Column(String(255), primary_key=True)
+    module = Column(String(100), nullable=False)
+    trigger = Column(String(20), nullable=False)
+    webhook_id = Column(String(64), nullable=True)
+    rule_id = Column(String(64), nullable=True)
+    webhook_base_url = Column(String(500), nullable=True)
+    spec_hash = Column(String(64), nullable=True)
+    synced_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,31 @@
+"""
+Zoho Identity Index Model
+Local Moodle ↔ Zoho id mappings used by the Moodle → Zoho grade webhook
+instead of a Zoho search per lookup (see identity_index_service).
+"""
+
+from sqlalchemy import Column, String, DateTime, Index
+from datetime import datetime
+
+from app.infra.db.base import Base
+
+
+class ZohoIdentity(Base):
+    """
+    One (kind, key) → Zoho record id mapping, e.g. ("student", "<moodle user id>").
+
+    verified_at is when Zoho last confirmed the mapping (a sync flow carried
+    the record, or a search returned it); rows older than
+    IDENTITY_INDEX_TTL_SECONDS are re-resolved on their next use.
+    """
+
+    __tablename__ = "zoho_identity_index"
+
+    kind = Column(String(32), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    zoho_id = Column(String(64), nullable=False)
+    verified_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_zoho_identity_zoho_id", "zoho_id"),
+    )
@@ -0,0 +1,118 @@
+"""
+Substring search + browse indexes for the admin data browser
+
+SQLite:     an external-content FTS5 table per browsed table using the
+            trigram tokenizer (SQLite ≥ 3.34), kept in sync by triggers;
+            search becomes rowid IN (SELECT rowid FROM <t>_fts WHERE MATCH).
+PostgreSQL: pg_trgm GIN indexes on the searched columns, so the existing
+            ILIKE '%term%' filters are served from the index.
+Other DBs / terms shorter than a trigram: plain ILIKE.
+
+ensure_browse_indexes() also adds the (created_at, id) index the keyset
+cursors walk (integration_events_log pages by its autoincrement id alone).
+Everything is IF NOT EXISTS, so it runs at every startup.
+"""
+
+import logging
+import weakref
+from typing import Dict, List, Sequence
+
+from sqlalchemy import inspect, or_, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# table → columns matched by the data browser search box
+SEARCH_COLUMNS: Dict[str, List[str]] = {
+    "students": ["display_name", "academic_email", "zoho_id", "username"],
+    "integration_events_log": ["record_id", "module", "event_type"],
+    "registrations": ["zoho_id"],
+    "enrollments": ["zoho_id", "student_zoho_id", "class_zoho_id"],
+    "payments": ["zoho_id"],
+    "grades": ["zoho_id"],
+}
+
+# Tables whose autoincrement id already follows insertion order: browsed by id alone
+ID_ORDERED = {"integration_events_log"}
+
+_MIN_TRIGRAM = 3
+_fts_tables: "weakref.WeakKeyDictionary[Engine, set]" = weakref.WeakKeyDictionary()
+
+
+def _sqlite_fts(conn, table: str, columns: Sequence[str]) -> None:
+    fts = f"{table}_fts"
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE name = :n"), {"n": fts}
+    ).first()
+    if exists:
+        return
+    cols = ", ".join(columns)
+    new_cols = ", ".join(f"new.{c}" for c in columns)
+    old_cols = ", ".join(f"old.{c}" for c in columns)
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', "
+        f"content_rowid='rowid', tokenize='trigram')"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.rowid, {new_cols}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.rowid, {old_cols}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.rowid, {old_cols}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.rowid, {new_cols}); END"
+    ))
+    conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    logger.info(f"Created FTS5 trigram index {fts}")
+
+
+def ensure_browse_indexes(engine: Engine) -> None:
+    """Create keyset + search indexes for every browsed table that exists."""
+    dialect = engine.dialect.name
+    ready = set()
+    with engine.begin() as conn:
+        existing = set(inspect(conn).get_table_names())
+        if dialect == "postgresql":
+            try:
+                with conn.begin_nested():
+                    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            except Exception as e:
+                logger.warning(f"pg_trgm unavailable, data browser search uses ILIKE scans: {e}")
+                dialect = "postgresql-no-trgm"
+
+        for table, columns in SEARCH_COLUMNS.items():
+            if table not in existing:
+                continue
+            if table not in ID_ORDERED:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_created_id ON {table} (created_at, id)"
+                ))
+            try:
+                with conn.begin_nested():
+                    if dialect == "sqlite":
+                        _sqlite_fts(conn, table, columns)
+                        ready.add(table)
+                    elif dialect == "postgresql":
+                        for c in columns:
+                            conn.execute(text(
+                                f"CREATE INDEX IF NOT EXISTS ix_{table}_{c}_trgm "
+                                f"ON {table} USING gin ({c} gin_trgm_ops)"
+                            ))
+            except Exception as e:
+                logger.warning(f"Search index for {table} not created: {e}")
+    _fts_tables[engine] = ready
+
+
+def search_clause(model, term: str, engine: Engine):
+    """WHERE clause matching `term` as a case-insensitive substring of the search columns."""
+    table = model.__tablename__
+    if len(term) >= _MIN_TRIGRAM and table in _fts_tables.get(engine, ()):
+        match = '"' + term.replace('"', '""') + '"'
+        return text(
+            f"{table}.rowid IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH :_fts_q)"
+        ).bindparams(_fts_q=match)
+    return or_(*(getattr(model, c).ilike(f"%{term}%") for c in SEARCH_COLUMNS[table]))
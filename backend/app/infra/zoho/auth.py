@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 import httpx
 
+from app.core.metrics import ZOHO_TOKEN_REFRESHES
 from .exceptions import ZohoAuthError
 
 logger = logging.getLogger(__name__)
@@ -142,13 +143,16 @@ class ZohoAuthClient:
                 logger.info(
                     f"Access token refreshed successfully. Expires in {expires_in}s"
                 )
+                ZOHO_TOKEN_REFRESHES.inc("success")
         
         except httpx.HTTPError as e:
             logger.error(f"HTTP error during token refresh: {e}")
+            ZOHO_TOKEN_REFRESHES.inc("failure")
             raise ZohoAuthError(f"Token refresh failed: {str(e)}")
         
         except Exception as e:
             logger.error(f"Unexpected error during token refresh: {e}")
+            ZOHO_TOKEN_REFRESHES.inc("failure")
             raise ZohoAuthError(f"Token refresh failed: {str(e)}")
     
     async def revoke_token(self) -> None:
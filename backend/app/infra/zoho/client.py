@@ -10,7 +10,8 @@ Complete client following ZOHO_API_CONTRACT.md strictly.
 """
 
 import logging
-from typing import Dict, List, Optional, Any
+import time
+from typing import Dict, List, Optional, Any, Tuple
 from urllib.parse import urlencode
 import httpx
 from tenacity import (
@@ -21,6 +22,8 @@ from tenacity import (
     before_sleep_log
 )
 
+from app.core import tracing
+from app.core.metrics import ZOHO_LATENCY, ZOHO_REQUESTS
 from .auth import ZohoAuthClient
 from .exceptions import (
     ZohoAPIError,
@@ -33,6 +36,45 @@ from .exceptions import (
 logger = logging.getLogger(__name__)
 
 
+def _metric_labels(method: str, endpoint: str) -> Tuple[str, str]:
+    """
+    Low-cardinality (module, operation) labels for an API endpoint, e.g.
+    GET /BTEC_Students/123 → (BTEC_Students, get_record),
+    GET /BTEC_Students/search → (BTEC_Students, get_search).
+    """
+    parts = [p for p in endpoint.split('?')[0].split('/') if p]
+    if not parts:
+        return "-", method.lower()
+    module = parts[0]
+    sub = [p for p in parts[1:] if not p.isdigit()]
+    if sub:
+        op = sub[-1].lower()
+    elif len(parts) > 1:
+        op = "record"
+    else:
+        op = "list"
+    return module, f"{method.lower()}_{op}"
+
+
+def coql_value(value: Any) -> str:
+    """Render a Python value as a COQL literal (strings quoted and escaped)."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def coql_where(filters: Dict[str, Any]) -> Optional[str]:
+    """{field: value} equality filters → COQL WHERE expression (None if empty)."""
+    if not filters:
+        return None
+    terms = [f"{field} = {coql_value(value)}" for field, value in filters.items()]
+    return terms[0] if len(terms) == 1 else "(" + " and ".join(terms) + ")"
+
+
 class ZohoClient:
     """
     Zoho CRM API v2 client.
@@ -79,7 +121,13 @@ class ZohoClient:
         'Programs': 'Products',
         'Units': 'BTEC',
     }
-    
+
+    # Records per insert / update / upsert request (Zoho CRM API limit)
+    BATCH_WRITE_LIMIT = 100
+
+    # Rows per COQL query (Zoho CRM v2 LIMIT maximum)
+    COQL_PAGE_SIZE = 200
+
     def __init__(
         self,
         auth_client: ZohoAuthClient,
@@ -184,6 +232,14 @@ class ZohoClient:
         if self.organization_id:
             headers['orgId'] = self.organization_id
         
+        metric_module, metric_op = _metric_labels(method, endpoint)
+        status = "error"
+        t0 = time.perf_counter()
+        op_span = tracing.open_span(
+            f"zoho {metric_op} {metric_module}", "client",
+            **{"zoho.module": metric_module, "zoho.operation": metric_op, "http.method": method},
+        )
+        
         try:
             async with httpx.AsyncClient(timeout=self.timeout) as client:
                 response = await client.request(
@@ -193,6 +249,7 @@ class ZohoClient:
                     params=params,
                     json=json_data
                 )
+                status = str(response.status_code)
                 
                 # Handle different status codes
                 if response.status_code == 200:
@@ -266,6 +323,11 @@ class ZohoClient:
         except Exception as e:
             logger.error(f"Unexpected error calling Zoho API: {e}")
             raise ZohoAPIError(f"Unexpected error: {str(e)}")
+        
+        finally:
+            ZOHO_REQUESTS.inc(metric_module, metric_op, status)
+            ZOHO_LATENCY.observe(time.perf_counter() - t0, metric_module, metric_op)
+            tracing.close_span(op_span, None if status.startswith("2") else f"Zoho status {status}")
     
     async def get_record(
         self,
@@ -409,6 +471,117 @@ class ZohoClient:
         
         return response.get('data', [])
     
+    async def coql_query(self, query: str) -> Dict:
+        """
+        Run one COQL SELECT statement.
+        
+        Args:
+            query: COQL query (build literals with coql_value / coql_where)
+        
+        Returns:
+            Dict with 'data' (rows, [] when nothing matches) and 'info'
+        
+        Example:
+            response = await zoho.coql_query(
+                "select Name, Status from BTEC_Students where Status = 'Active' limit 0, 200"
+            )
+        """
+        logger.info(f"COQL query: {query}")
+        
+        response = await self._make_request('POST', '/coql', json_data={'select_query': query})
+        
+        # Zoho answers 204 (no body) when no rows match
+        return {'data': response.get('data') or [], 'info': response.get('info') or {}}
+    
+    async def coql_select(
+        self,
+        module: str,
+        fields: List[str],
+        where: Optional[str] = None,
+        order_by: str = 'id',
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[Dict]:
+        """
+        Select records with server-side filtering, paging through every match.
+        
+        Args:
+            module: Module API name
+            fields: Field API names to return (COQL has no SELECT *)
+            where: COQL WHERE expression (default: every record)
+            order_by: Sort expression; keep it unique (id) for stable paging
+            limit: Maximum rows to return (default: all)
+            offset: Rows to skip
+        
+        Returns:
+            List of matching records
+        
+        Example:
+            active = await zoho.coql_select(
+                'BTEC_Enrollments',
+                ['Enrolled_Students', 'Classes'],
+                where=coql_where({'Enrollment_Status': 'Active'})
+            )
+        """
+        self._validate_module(module)
+        if not fields:
+            raise ValueError("COQL select needs at least one field")
+        
+        rows: List[Dict] = []
+        while limit is None or len(rows) < limit:
+            count = self.COQL_PAGE_SIZE if limit is None else min(self.COQL_PAGE_SIZE, limit - len(rows))
+            response = await self.coql_query(
+                f"select {', '.join(fields)} from {module} "
+                f"where {where or 'id is not null'} "
+                f"order by {order_by} limit {offset}, {count}"
+            )
+            page = response['data']
+            rows.extend(page)
+            offset += len(page)
+            if len(page) < count or not response['info'].get('more_records', False):
+                break
+        
+        return rows
+    
+    async def coql_aggregate(
+        self,
+        module: str,
+        aggregates: List[str],
+        where: Optional[str] = None,
+        group_by: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Compute aggregates (SUM, COUNT, MIN, MAX, AVG) server-side.
+        
+        Args:
+            module: Module API name
+            aggregates: Aggregate expressions, e.g. ['SUM(Payment_Amount)', 'COUNT(id)']
+            where: COQL WHERE expression (default: every record)
+            group_by: Fields to group by (their values are returned too)
+        
+        Returns:
+            One row per group (a single row without group_by), keyed by the
+            expressions as written in `aggregates` plus the group_by fields
+        
+        Example:
+            rows = await zoho.coql_aggregate(
+                'BTEC_Payments',
+                ['SUM(Payment_Amount)', 'COUNT(id)'],
+                where=coql_where({'Student_ID': student_id})
+            )
+            total = rows[0]['SUM(Payment_Amount)']
+        """
+        self._validate_module(module)
+        columns = list(group_by or []) + list(aggregates)
+        query = f"select {', '.join(columns)} from {module} where {where or 'id is not null'}"
+        if group_by:
+            query += f" group by {', '.join(group_by)}"
+        
+        rows = (await self.coql_query(query))['data']
+        if not rows and not group_by:
+            rows = [{}]   # no matching records: every aggregate is empty
+        return rows
+    
     async def create_record(self, module: str, data: Dict) -> Dict:
         """
         Create new record.
@@ -585,6 +758,88 @@ class ZohoClient:
         else:
             raise ZohoAPIError("Invalid upsert response", response_data=response)
 
+    async def _write_records(
+        self,
+        method: str,
+        module: str,
+        endpoint: str,
+        records: List[Dict],
+        **extra
+    ) -> List[Dict]:
+        """Send up to BATCH_WRITE_LIMIT records in one request; per-record results in order."""
+        self._validate_module(module)
+        if not records:
+            return []
+        if len(records) > self.BATCH_WRITE_LIMIT:
+            raise ValueError(
+                f"Zoho writes at most {self.BATCH_WRITE_LIMIT} records per request, "
+                f"got {len(records)}"
+            )
+
+        payload = {'data': records, **extra}
+        response = await self._make_request(method, endpoint, json_data=payload)
+
+        results = response.get('data') if isinstance(response, dict) else None
+        if not results or len(results) != len(records):
+            raise ZohoAPIError("Invalid batch write response", response_data=response)
+        return results
+
+    async def create_records(self, module: str, records: List[Dict]) -> List[Dict]:
+        """
+        Create up to BATCH_WRITE_LIMIT records in one request.
+
+        Zoho reports each record separately, so one bad record does not
+        fail the batch: check every result's 'code'.
+
+        Args:
+            module: Module API name
+            records: Record data (at most BATCH_WRITE_LIMIT)
+
+        Returns:
+            Per-record create results, in the order of `records`
+        """
+        logger.info(f"Creating {len(records)} {module} records")
+        return await self._write_records('POST', module, f"/{module}", records)
+
+    async def update_records(self, module: str, records: List[Dict]) -> List[Dict]:
+        """
+        Update up to BATCH_WRITE_LIMIT records in one request.
+
+        Args:
+            module: Module API name
+            records: Updated fields, each including the record 'id'
+
+        Returns:
+            Per-record update results, in the order of `records`
+        """
+        if any(not record.get('id') for record in records):
+            raise ValueError("Every record in a batch update needs an 'id'")
+        logger.info(f"Updating {len(records)} {module} records")
+        return await self._write_records('PUT', module, f"/{module}", records)
+
+    async def upsert_records(
+        self,
+        module: str,
+        records: List[Dict],
+        duplicate_check_fields: List[str]
+    ) -> List[Dict]:
+        """
+        Create or update up to BATCH_WRITE_LIMIT records in one request.
+
+        Args:
+            module: Module API name
+            records: Record data (at most BATCH_WRITE_LIMIT)
+            duplicate_check_fields: Fields to check for duplicates
+
+        Returns:
+            Per-record upsert results, in the order of `records`
+        """
+        logger.info(f"Upserting {len(records)} {module} records")
+        return await self._write_records(
+            'POST', module, f"/{module}/upsert", records,
+            duplicate_check_fields=duplicate_check_fields
+        )
+
     async def upload_attachment(
         self,
         module: str,
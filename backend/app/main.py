@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -5,9 +6,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.router import router as api_router
 from app.core.config import settings
 from app.core.access_log import AccessLogMiddleware
+from app.core import metrics, profiler, tracing
+from app.api.v1.endpoints.metrics import router as metrics_router
 from admin.router import router as admin_router
 from app.infra.db.base import Base, engine
+from app.infra.db.search import ensure_browse_indexes
 import app.infra.db.models  # noqa: F401 — ensure all models are registered
+from app.services import event_retention_service, stat_counter_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,10 +22,37 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """App lifecycle: create DB tables on startup."""
+    """App lifecycle: create DB tables, reconcile and flush dashboard counters, expire old events, flush worker metrics, run the request CPU sampler."""
     Base.metadata.create_all(bind=engine)
     logger.info("Database tables created/verified.")
+    ensure_browse_indexes(engine)
+    await asyncio.to_thread(event_retention_service.prepare_partitions)
+    reconciler = asyncio.create_task(
+        stat_counter_service.run_reconciler(settings.STATS_RECONCILE_INTERVAL_SECONDS)
+    )
+    counter_flusher = asyncio.create_task(
+        stat_counter_service.run_flusher(settings.STATS_FLUSH_INTERVAL_SECONDS)
+    )
+    retention = None
+    if settings.EVENT_RETENTION_INTERVAL_SECONDS > 0:
+        retention = asyncio.create_task(
+            event_retention_service.run_retention(settings.EVENT_RETENTION_INTERVAL_SECONDS)
+        )
+    flusher = None
+    if settings.METRICS_MULTIPROC_DIR:
+        metrics.prune_dead_snapshots()
+        flusher = asyncio.create_task(metrics.run_flusher(settings.METRICS_FLUSH_INTERVAL_SECONDS))
+    profiler.start_continuous()
     yield
+    profiler.stop_continuous()
+    reconciler.cancel()
+    counter_flusher.cancel()
+    await asyncio.to_thread(stat_counter_service.flush_pending)
+    if retention:
+        retention.cancel()
+    if flusher:
+        flusher.cancel()
+        metrics.flush()
 
 
 app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
@@ -34,14 +66,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# HTTP access log middleware (in-memory ring buffer, newest-first)
+# HTTP access log middleware (in-memory ring buffer, newest-first; opens request traces)
 app.add_middleware(AccessLogMiddleware)
 
+# Trace spans for outbound HTTP (Zoho / Moodle) and SQL statements
+tracing.instrument_httpx()
+tracing.instrument_sqlalchemy()
+
 app.include_router(api_router, prefix="/api/v1")
 
 # Admin panel (server-side HTML)
 app.include_router(admin_router)
 
+# Prometheus scrape endpoint
+app.include_router(metrics_router)
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -28,10 +28,11 @@ Usage:
 """
 
 import logging
-from typing import Dict, List, Optional, Any
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Any, Tuple
 from datetime import datetime
 
-from app.infra.zoho.client import ZohoClient
+from app.infra.zoho.client import ZohoClient, coql_where
 from app.infra.zoho.exceptions import (
     ZohoAPIError,
     ZohoNotFoundError,
@@ -40,6 +41,22 @@ from app.infra.zoho.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# Zoho search page size (max per request)
+SEARCH_PAGE_SIZE = 200
+
+# BTEC_Enrollments fields returned by COQL queries (EnrollmentData.to_zoho_dict)
+ENROLLMENT_FIELDS = [
+    'Enrolled_Students', 'Classes', 'Enrollment_Status', 'Enrollment_Date',
+    'Moodle_Course_ID', 'Completion_Date', 'Grade', 'Attendance_Percentage', 'Notes',
+]
+
+
+def _lookup_id(value: Any) -> Optional[str]:
+    """Zoho lookup field value ({'id', 'name'} or a bare id) → record id."""
+    if isinstance(value, dict):
+        value = value.get('id')
+    return str(value) if value else None
+
 
 class EnrollmentData:
     """Represents enrollment data for syncing."""
@@ -540,20 +557,21 @@ class EnrollmentSyncService:
     
     async def get_active_enrollments(
         self,
-        page: int = 1,
+        page: Optional[int] = None,
         per_page: int = 200
     ) -> List[Dict]:
         """
-        Get all active enrollments.
+        Get active enrollments.
         
-        Note: Filters client-side since Enrollment_Status may not be searchable.
+        Filtered server-side with COQL; without `page`, every active
+        enrollment is returned (paged through internally).
         
         Args:
-            page: Page number (1-indexed)
-            per_page: Records per page (max 200)
+            page: Page number (1-indexed), or None for all
+            per_page: Records per page when `page` is given
         
         Returns:
-            List of active enrollment records
+            List of active enrollment records (ENROLLMENT_FIELDS + id)
         
         Example:
             active = await service.get_active_enrollments()
@@ -562,20 +580,15 @@ class EnrollmentSyncService:
         logger.info("Fetching active enrollments")
         
         try:
-            # Get all enrollments and filter client-side
-            # (Enrollment_Status may not be searchable in Zoho)
-            response = await self.zoho.get_records(
+            active = await self.zoho.coql_select(
                 'BTEC_Enrollments',
-                page=page,
-                per_page=per_page
+                ENROLLMENT_FIELDS,
+                where=coql_where({'Enrollment_Status': 'Active'}),
+                limit=per_page if page else None,
+                offset=(page - 1) * per_page if page else 0
             )
             
-            all_enrollments = response.get('data', [])
-            
-            # Filter for Active status
-            active = [e for e in all_enrollments if e.get('Enrollment_Status') == 'Active']
-            
-            logger.info(f"Found {len(active)} active enrollments (out of {len(all_enrollments)} total)")
+            logger.info(f"Found {len(active)} active enrollments")
             
             return active
         
@@ -583,6 +596,56 @@ class EnrollmentSyncService:
             logger.error(f"Error fetching active enrollments: {e}")
             raise
     
+    async def prefetch_class_enrollments(
+        self,
+        class_ids: Iterable[str]
+    ) -> Tuple[Dict[Tuple[str, str], Dict], List[str]]:
+        """
+        Index the existing enrollments of some classes by (student, class).
+        
+        One paged search per class replaces a search per enrollment.
+        
+        Args:
+            class_ids: Zoho class IDs
+        
+        Returns:
+            ({(student_id, class_id): enrollment record}, class ids whose
+            search failed and must be checked per enrollment)
+        """
+        index: Dict[Tuple[str, str], Dict] = {}
+        failed: List[str] = []
+        
+        for class_id in dict.fromkeys(str(c) for c in class_ids):
+            criteria = f"(Classes:equals:{class_id})"
+            page = 1
+            try:
+                while True:
+                    records = await self.zoho.search_records(
+                        'BTEC_Enrollments',
+                        criteria,
+                        fields=['Enrolled_Students', 'Classes', 'Enrollment_Status'],
+                        page=page,
+                        per_page=SEARCH_PAGE_SIZE
+                    )
+                    for record in records:
+                        student_id = _lookup_id(record.get('Enrolled_Students'))
+                        if student_id:
+                            index.setdefault((student_id, class_id), record)
+                    if len(records) < SEARCH_PAGE_SIZE:
+                        break
+                    page += 1
+            except ZohoNotFoundError:
+                continue   # class has no enrollments yet
+            except Exception as e:
+                logger.warning(f"Error prefetching enrollments for class {class_id}: {e}")
+                failed.append(class_id)
+        
+        logger.info(
+            f"Prefetched {len(index)} existing enrollments "
+            f"({len(failed)} classes unavailable)"
+        )
+        return index, failed
+    
     async def bulk_sync_enrollments(
         self,
         enrollments: List[EnrollmentData]
@@ -590,11 +653,21 @@ class EnrollmentSyncService:
         """
         Sync multiple enrollments in bulk.
         
+        Flow:
+        1. Prefetch the existing enrollments of every class in the batch
+        2. Decide create vs update locally (student + class)
+        3. Send creates and updates in batches of ZohoClient.BATCH_WRITE_LIMIT
+        
+        Enrollments of a class whose prefetch failed fall back to
+        sync_enrollment_to_zoho(). Repeats of a student + class pair are
+        merged into one write (last one wins) and counted as merged once
+        that write succeeds (as failed otherwise).
+        
         Args:
             enrollments: List of EnrollmentData objects
         
         Returns:
-            Dict with summary (total, created, updated, failed)
+            Dict with summary (total, created, updated, merged, failed)
         
         Example:
             enrollments = [
@@ -611,11 +684,90 @@ class EnrollmentSyncService:
             'total': len(enrollments),
             'created': 0,
             'updated': 0,
+            'merged': 0,
             'failed': 0,
             'errors': []
         }
+        repeats: Counter = Counter()   # student + class → enrollments merged into its write
+        
+        def record_success(key: Tuple[str, str], action: str) -> None:
+            results[action] += 1
+            results['merged'] += repeats[key]
+        
+        def record_failure(enrollment: EnrollmentData, error: Any, merged: int = 0) -> None:
+            results['failed'] += 1 + merged
+            results['errors'].append({
+                'student_id': enrollment.zoho_student_id,
+                'class_id': enrollment.zoho_class_id,
+                'error': str(error)
+            })
+            logger.error(
+                f"Failed to sync enrollment (Student: {enrollment.zoho_student_id}, "
+                f"Class: {enrollment.zoho_class_id}): {error}"
+            )
+        
+        # 1. Prefetch
+        existing, unavailable = await self.prefetch_class_enrollments(
+            e.zoho_class_id for e in enrollments
+        )
+        unavailable = set(unavailable)
         
+        # 2. Plan writes, one per student + class
+        creates: Dict[Tuple[str, str], EnrollmentData] = {}
+        updates: Dict[Tuple[str, str], EnrollmentData] = {}
+        fallback: List[EnrollmentData] = []
         for enrollment in enrollments:
+            key = (str(enrollment.zoho_student_id), str(enrollment.zoho_class_id))
+            if key[1] in unavailable:
+                fallback.append(enrollment)
+            elif key in creates or key in updates:
+                (creates if key in creates else updates)[key] = enrollment
+                repeats[key] += 1
+            elif key in existing:
+                updates[key] = enrollment
+            else:
+                creates[key] = enrollment
+        
+        # 3. Batched writes
+        batch_size = ZohoClient.BATCH_WRITE_LIMIT
+        
+        create_list = list(creates.items())
+        for start in range(0, len(create_list), batch_size):
+            batch = create_list[start:start + batch_size]
+            try:
+                written = await self.zoho.create_records(
+                    'BTEC_Enrollments', [e.to_zoho_dict() for _, e in batch]
+                )
+            except Exception as e:
+                for key, enrollment in batch:
+                    record_failure(enrollment, e, repeats[key])
+                continue
+            for (key, enrollment), result in zip(batch, written):
+                if result.get('code') == 'SUCCESS':
+                    record_success(key, 'created')
+                else:
+                    record_failure(enrollment, result.get('message', result), repeats[key])
+        
+        update_list = list(updates.items())
+        for start in range(0, len(update_list), batch_size):
+            batch = update_list[start:start + batch_size]
+            try:
+                written = await self.zoho.update_records(
+                    'BTEC_Enrollments',
+                    [{**e.to_zoho_dict(), 'id': existing[key]['id']} for key, e in batch]
+                )
+            except Exception as e:
+                for key, enrollment in batch:
+                    record_failure(enrollment, e, repeats[key])
+                continue
+            for (key, enrollment), result in zip(batch, written):
+                if result.get('code') == 'SUCCESS':
+                    record_success(key, 'updated')
+                else:
+                    record_failure(enrollment, result.get('message', result), repeats[key])
+        
+        # Classes that could not be prefetched: one lookup per enrollment
+        for enrollment in fallback:
             try:
                 result = await self.sync_enrollment_to_zoho(enrollment)
                 
@@ -625,20 +777,12 @@ class EnrollmentSyncService:
                     results['updated'] += 1
             
             except Exception as e:
-                results['failed'] += 1
-                results['errors'].append({
-                    'student_id': enrollment.zoho_student_id,
-                    'class_id': enrollment.zoho_class_id,
-                    'error': str(e)
-                })
-                logger.error(
-                    f"Failed to sync enrollment (Student: {enrollment.zoho_student_id}, "
-                    f"Class: {enrollment.zoho_class_id}): {e}"
-                )
+                record_failure(enrollment, e)
         
         logger.info(
             f"Bulk sync complete: {results['created']} created, "
-            f"{results['updated']} updated, {results['failed']} failed"
+            f"{results['updated']} updated, {results['merged']} merged, "
+            f"{results['failed']} failed"
         )
         
         return results
@@ -7,8 +7,10 @@ Routes webhook events to appropriate sync services and handles event processing.
 import logging
 from typing import Dict, Any, Optional
 from datetime import datetime
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from app.core.metrics import EVENT_LATENCY, EVENTS_HANDLED
 from app.domain.events import (
     ZohoWebhookEvent, MoodleWebhookEvent,
     EventSource, EventStatus, EventProcessingResult
@@ -89,12 +91,12 @@ class EventHandlerService:
             # Check for duplicate
             if self._is_duplicate_event(event.event_id):
                 logger.info(f"Duplicate event detected: {event.event_id}")
-                return EventProcessingResult(
+                return self._observe(EventSource.ZOHO, event.module, EventProcessingResult(
                     event_id=event.event_id,
                     status=EventStatus.DUPLICATE,
                     action_taken="skipped",
                     processing_time_ms=0
-                )
+                ))
             
             # Log event
             event_log = self._log_event(
@@ -141,7 +143,7 @@ class EventHandlerService:
                 f"status={result.status}, time={processing_time:.2f}ms"
             )
             
-            return result
+            return self._observe(EventSource.ZOHO, event.module, result)
             
         except Exception as e:
             logger.error(f"Error handling Zoho event {event.event_id}: {e}", exc_info=True)
@@ -155,12 +157,12 @@ class EventHandlerService:
             
             processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
             
-            return EventProcessingResult(
+            return self._observe(EventSource.ZOHO, event.module, EventProcessingResult(
                 event_id=event.event_id,
                 status=EventStatus.FAILED,
                 error=str(e),
                 processing_time_ms=processing_time
-            )
+            ))
     
     async def _route_zoho_event(
         self,
@@ -464,12 +466,12 @@ class EventHandlerService:
             # Check for duplicate
             if self._is_duplicate_event(event.event_id):
                 logger.info(f"Duplicate Moodle event: {event.event_id}")
-                return EventProcessingResult(
+                return self._observe(EventSource.MOODLE, "moodle_enrollment", EventProcessingResult(
                     event_id=event.event_id,
                     status=EventStatus.DUPLICATE,
                     action_taken="skipped",
                     processing_time_ms=0
-                )
+                ))
             
             # Log event
             event_log = self._log_event(
@@ -516,7 +518,7 @@ class EventHandlerService:
                 f"status={result.status}, time={processing_time:.2f}ms"
             )
             
-            return result
+            return self._observe(EventSource.MOODLE, "moodle_enrollment", result)
             
         except Exception as e:
             logger.error(f"Error handling Moodle event {event.event_id}: {e}", exc_info=True)
@@ -529,12 +531,12 @@ class EventHandlerService:
             
             processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
             
-            return EventProcessingResult(
+            return self._observe(EventSource.MOODLE, "moodle_enrollment", EventProcessingResult(
                 event_id=event.event_id,
                 status=EventStatus.FAILED,
                 error=str(e),
                 processing_time_ms=processing_time
-            )
+            ))
     
     async def _process_moodle_event(
         self,
@@ -608,16 +610,38 @@ class EventHandlerService:
                 error=str(e)
             )
     
+    def _observe(
+        self,
+        source: EventSource,
+        module: str,
+        result: EventProcessingResult
+    ) -> EventProcessingResult:
+        """Record event count / processing time for /metrics and pass the result through."""
+        status = getattr(result.status, "value", result.status)
+        EVENTS_HANDLED.inc(source.value, module, status)
+        EVENT_LATENCY.observe((result.processing_time_ms or 0) / 1000, source.value, module)
+        return result
+    
     def _is_duplicate_event(self, event_id: str) -> bool:
         """
         Check if event already processed.
         
+        On PostgreSQL the check first takes a transaction-scoped advisory
+        lock on the event_id, held until _log_event commits: the partitioned
+        event log only enforces UNIQUE(event_id, created_at), so this is
+        what keeps two concurrent deliveries from both being processed.
+        
         Args:
             event_id: Unique event ID
             
         Returns:
             True if duplicate, False otherwise
         """
+        if self.db.get_bind().dialect.name == "postgresql":
+            self.db.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:event_id))"),
+                {"event_id": event_id},
+            )
         existing = self.db.query(EventLog).filter(
             EventLog.event_id == event_id
         ).first()
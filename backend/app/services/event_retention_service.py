@@ -0,0 +1,295 @@
+"""
+Event Retention Service - integration_events_log expiry + archival
+
+integration_events_log keeps the full webhook payload of every event; this
+service bounds it.
+
+Per-status windows (EVENT_RETENTION_DAYS, JSON {"status": days}) decide what
+expires; statuses without a window (pending / processing by default) are
+never touched.  Expired rows are:
+1. appended to a gzip NDJSON archive under EVENT_ARCHIVE_DIR (one file per
+   run, one gzip member per batch; empty dir = delete without archiving; a
+   relative dir is refused, since it would depend on the server's CWD)
+2. deleted in batches of EVENT_RETENTION_BATCH_SIZE, one transaction per
+   batch, with stat_counters adjusted in the same transaction
+
+A batch is archived (and fsynced) before its delete commits, so a crash can
+at worst archive a batch twice, never lose it.
+
+PostgreSQL: when integration_events_log has been converted to a monthly
+range-partitioned table (partition_event_log.py), startup and each run
+create the upcoming month partitions (plus the DEFAULT partition, which
+catches rows for a month nobody created yet) and each run expires whole
+months with DROP TABLE once every row in them is past its status window.
+
+Retention is off unless EVENT_RETENTION_INTERVAL_SECONDS is set.  Windows
+should comfortably exceed Zoho's webhook retry horizon: once an event row is
+gone its event_id no longer deduplicates a late redelivery.
+
+On the partitioned table the database only enforces UNIQUE(event_id,
+created_at), not event_id alone; EventHandlerService serializes its
+duplicate check per event_id (advisory lock) to keep dedup exact.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.infra.db.models.event_log import EventLog
+from app.infra.db.session import SessionLocal
+from app.services import stat_counter_service as counters
+
+logger = logging.getLogger(__name__)
+
+TABLE = EventLog.__tablename__
+PARTITION_MONTHS_AHEAD = 2
+
+
+def retention_windows() -> Dict[str, int]:
+    """EVENT_RETENTION_DAYS parsed to {status: days}; invalid JSON disables retention."""
+    try:
+        windows = json.loads(settings.EVENT_RETENTION_DAYS or "{}")
+        return {str(status): int(days) for status, days in windows.items() if int(days) > 0}
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.error(f"EVENT_RETENTION_DAYS is not a JSON object of status → days: {e}")
+        return {}
+
+
+def _partition_name(month: date) -> str:
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def _next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class EventRetentionService:
+    """Expire, archive and delete old integration_events_log rows."""
+
+    def __init__(
+        self,
+        db: Session,
+        windows: Optional[Dict[str, int]] = None,
+        archive_dir: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.db = db
+        self.windows = retention_windows() if windows is None else windows
+        self.archive_dir = settings.EVENT_ARCHIVE_DIR if archive_dir is None else archive_dir
+        self.batch_size = batch_size or settings.EVENT_RETENTION_BATCH_SIZE
+        self._archive_path: Optional[str] = None
+
+    # ── Entry point ───────────────────────────────────────────────────────────
+
+    def run(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """One retention pass. Returns {"archived", "deleted", "partitions_dropped"}."""
+        now = now or datetime.utcnow()
+        stats = {"archived": 0, "deleted": 0, "partitions_dropped": 0}
+        partitioned = self._is_partitioned()
+        if partitioned:
+            self.ensure_partitions(now.date())
+        if not self.windows:
+            return stats
+        if self.archive_dir and not os.path.isabs(self.archive_dir):
+            logger.error(
+                f"EVENT_ARCHIVE_DIR must be an absolute path (got {self.archive_dir!r}); "
+                f"event retention skipped"
+            )
+            return stats
+        self._archive_path = None
+
+        if partitioned:
+            stats["partitions_dropped"], archived = self._drop_expired_partitions(now)
+            stats["archived"] += archived
+
+        for status, days in self.windows.items():
+            archived, deleted = self._expire_status(status, now - timedelta(days=days))
+            stats["archived"] += archived
+            stats["deleted"] += deleted
+
+        if any(stats.values()):
+            logger.info(f"Event retention: {stats} (archive: {self._archive_path or 'off'})")
+        return stats
+
+    # ── Row-level expiry ──────────────────────────────────────────────────────
+
+    def _expire_status(self, status: str, cutoff: datetime):
+        archived = deleted = 0
+        while True:
+            rows = (
+                self.db.query(EventLog)
+                .filter(EventLog.status == status, EventLog.created_at < cutoff)
+                .order_by(EventLog.id)
+                .limit(self.batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            archived += self._archive(rows)
+            deltas: Counter = Counter()
+            for row in rows:
+                deltas.update(counters.event_deltas(row.status, row.source, -1))
+            self.db.query(EventLog).filter(
+                EventLog.id.in_([row.id for row in rows])
+            ).delete(synchronize_session=False)
+            counters.adjust(self.db, deltas)
+            self.db.commit()
+            self.db.expunge_all()
+            deleted += len(rows)
+            if len(rows) < self.batch_size:
+                break
+        return archived, deleted
+
+    # ── Archive ───────────────────────────────────────────────────────────────
+
+    def _archive(self, rows: List[EventLog]) -> int:
+        if not self.archive_dir:
+            return 0
+        if self._archive_path is None:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+            self._archive_path = os.path.join(self.archive_dir, f"{TABLE}-{stamp}.ndjson.gz")
+        lines = []
+        for row in rows:
+            record = {prop.columns[0].name: getattr(row, prop.key) for prop in EventLog.__mapper__.column_attrs}
+            lines.append(json.dumps(record, default=str, ensure_ascii=False))
+        with open(self._archive_path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="ab") as gz:
+                gz.write(("\n".join(lines) + "\n").encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+        return len(rows)
+
+    # ── PostgreSQL partitions ─────────────────────────────────────────────────
+
+    def _is_partitioned(self) -> bool:
+        if self.db.get_bind().dialect.name != "postgresql":
+            return False
+        return bool(self.db.execute(text(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :t"
+        ), {"t": TABLE}).scalar())
+
+    def ensure_partitions(self, today: date) -> None:
+        """
+        Create the DEFAULT partition and this month's and the next
+        PARTITION_MONTHS_AHEAD months' partitions.
+
+        Rows that already landed in the default partition for a month being
+        created are moved into it: PostgreSQL refuses to attach a range that
+        the default partition still holds rows for.
+        """
+        default = f"{TABLE}_default"
+        self.db.execute(text(f"CREATE TABLE IF NOT EXISTS {default} PARTITION OF {TABLE} DEFAULT"))
+        month = today.replace(day=1)
+        for _ in range(PARTITION_MONTHS_AHEAD + 1):
+            end = _next_month(month)
+            name = _partition_name(month)
+            exists = self.db.execute(text("SELECT to_regclass(:n)"), {"n": name}).scalar()
+            if not exists:
+                bounds = {"start": month, "end": end}
+                self.db.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)"))
+                moved = self.db.execute(text(
+                    f"WITH moved AS (DELETE FROM {default} "
+                    f"WHERE created_at >= :start AND created_at < :end RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ), bounds).rowcount
+                self.db.execute(text(
+                    f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+                ))
+                if moved:
+                    logger.info(f"Moved {moved} rows from {default} into {name}")
+            month = end
+        self.db.commit()
+
+    def _drop_expired_partitions(self, now: datetime):
+        """DROP month partitions whose every row is past its status window."""
+        oldest_cutoff = now - timedelta(days=max(self.windows.values()))
+        names = self.db.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :t ORDER BY c.relname"
+        ), {"t": TABLE}).scalars().all()
+
+        dropped = archived = 0
+        prefix = f"{TABLE}_p"
+        for name in names:
+            try:
+                month = datetime.strptime(name[len(prefix):], "%Y%m")
+            except ValueError:
+                continue   # default / foreign partitions are left alone
+            if _next_month(month.date()) > oldest_cutoff.date():
+                continue
+            kept = self.db.execute(text(
+                f"SELECT 1 FROM {name} WHERE NOT (status = ANY(:statuses)) LIMIT 1"
+            ), {"statuses": list(self.windows)}).scalar()
+            if kept:
+                continue   # pending / unwindowed rows: row-level expiry handles the rest
+
+            last_id = 0
+            while True:
+                rows = (
+                    self.db.query(EventLog)
+                    .from_statement(text(
+                        f"SELECT * FROM {name} WHERE id > :last ORDER BY id LIMIT :n"
+                    ).bindparams(last=last_id, n=self.batch_size))
+                    .all()
+                )
+                if not rows:
+                    break
+                archived += self._archive(rows)
+                last_id = rows[-1].id
+                self.db.expunge_all()
+
+            deltas: Counter = Counter()
+            for status, source, n in self.db.execute(text(
+                f"SELECT status, source, COUNT(*) FROM {name} GROUP BY status, source"
+            )):
+                deltas.update(counters.event_deltas(status, source, -n))
+            self.db.execute(text(f"DROP TABLE {name}"))
+            counters.adjust(self.db, deltas)
+            self.db.commit()
+            dropped += 1
+        return dropped, archived
+
+
+def prepare_partitions() -> None:
+    """Startup hook: make sure the event-log partitions exist, retention on or off."""
+    db = SessionLocal()
+    try:
+        service = EventRetentionService(db, windows={})
+        if service._is_partitioned():
+            service.ensure_partitions(datetime.utcnow().date())
+    except Exception as e:
+        logger.warning(f"⚠️ Could not ensure {TABLE} partitions: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _run_once() -> None:
+    db = SessionLocal()
+    try:
+        EventRetentionService(db).run()
+    except Exception as e:
+        logger.error(f"Event retention run failed: {e}", exc_info=True)
+        db.rollback()
+    finally:
+        db.close()
+
+
+async def run_retention(interval: float) -> None:
+    """Background task: one retention pass now, then every `interval` seconds."""
+    while True:
+        await asyncio.to_thread(_run_once)
+        await asyncio.sleep(interval)
@@ -16,11 +16,16 @@ Flow:
 - Composite key: Moodle_Grade_Composite_Key = student_id + course_id
 """
 
+import asyncio
 import logging
+import re
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.infra.db.models.btec_template import BtecUnitTemplate
+from app.infra.db.session import SessionLocal
 from app.infra.zoho.client import ZohoClient
 from app.infra.moodle.users import MoodleClient
 from app.infra.zoho.exceptions import ZohoNotFoundError, ZohoValidationError
@@ -54,6 +59,7 @@ class GradingTemplate:
         self.pass_criteria = self._extract_criteria(unit_data, 'P', range(1, 20))
         self.merit_criteria = self._extract_criteria(unit_data, 'M', range(1, 10))
         self.distinction_criteria = self._extract_criteria(unit_data, 'D', range(1, 7))
+        self._by_code = {c['code']: c for c in self.get_all_criteria()}
     
     def _extract_criteria(
         self,
@@ -101,10 +107,7 @@ class GradingTemplate:
         Returns:
             Criterion dict or None if not found
         """
-        for criterion in self.get_all_criteria():
-            if criterion['code'] == code:
-                return criterion
-        return None
+        return self._by_code.get(code)
     
     def __repr__(self):
         return (
@@ -115,6 +118,126 @@ class GradingTemplate:
         )
 
 
+# BTEC record fields a GradingTemplate is built from (everything else is not cached)
+_TEMPLATE_KEYS = ("id", "Name", "Unit_Code", "Modified_Time")
+_TEMPLATE_FIELD = re.compile(r"^[PMD]\d+_description$")
+
+
+class GradingTemplateCache:
+    """
+    Process-wide BTEC unit → GradingTemplate cache, persisted in the
+    btec_template_cache table.
+
+    The table keeps each unit's criteria fields and Zoho Modified_Time, so all
+    service instances, workers and restarts share one Zoho read per unit per
+    BTEC_TEMPLATE_CACHE_TTL_SECONDS.  Each worker also keeps the parsed
+    GradingTemplate and re-parses only when the row's Modified_Time changes.
+    The btec_definition_updated webhook stores the new record and
+    btec_definition_deleted invalidates it.  Concurrent misses for one unit
+    share a single fetch.  The table reads and writes are synchronous, so the
+    async paths run them in a worker thread.
+
+    Like the program category cache it only ever saves calls: DB errors fall
+    back to a Zoho read, and a failed Zoho read falls back to a stale row.
+    """
+
+    def __init__(self, ttl_seconds: float = 86400.0, session_factory=SessionLocal):
+        self.ttl_seconds = ttl_seconds
+        self._session_factory = session_factory
+        self._parsed: Dict[str, Tuple[str, GradingTemplate]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _version(row: BtecUnitTemplate) -> str:
+        return row.modified_time or row.fetched_at.isoformat()
+
+    def _load(self, unit_id: str) -> Optional[BtecUnitTemplate]:
+        try:
+            with self._session_factory() as db:
+                row = db.get(BtecUnitTemplate, unit_id)
+                if row is not None:
+                    db.expunge(row)
+                return row
+        except Exception as e:
+            logger.warning(f"⚠️ BTEC template cache read failed ({unit_id}): {e}")
+            return None
+
+    def _parse(self, unit_id: str, record: Dict, version: str) -> GradingTemplate:
+        cached = self._parsed.get(unit_id)
+        if cached and cached[0] == version:
+            return cached[1]
+        template = GradingTemplate(unit_id, record)
+        self._parsed[unit_id] = (version, template)
+        return template
+
+    def store(self, unit_id: str, unit_data: Dict) -> GradingTemplate:
+        """Persist a full BTEC record (Zoho read or webhook); returns its template."""
+        record = {k: v for k, v in unit_data.items() if k in _TEMPLATE_KEYS or _TEMPLATE_FIELD.match(k)}
+        modified = str(unit_data["Modified_Time"]) if unit_data.get("Modified_Time") else None
+        row = BtecUnitTemplate(unit_zoho_id=unit_id, record=record,
+                               modified_time=modified, fetched_at=datetime.utcnow())
+        try:
+            with self._session_factory() as db:
+                db.merge(row)
+                db.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ BTEC template cache write failed ({unit_id}): {e}")
+        template = self._parse(unit_id, record, self._version(row))
+        logger.info(
+            f"Loaded template for {template.unit_name}: "
+            f"{len(template.pass_criteria)}P + {len(template.merit_criteria)}M + "
+            f"{len(template.distinction_criteria)}D"
+        )
+        return template
+
+    def invalidate(self, unit_id: str) -> None:
+        self._parsed.pop(unit_id, None)
+        try:
+            with self._session_factory() as db:
+                db.query(BtecUnitTemplate).filter(BtecUnitTemplate.unit_zoho_id == unit_id).delete()
+                db.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ BTEC template cache invalidate failed ({unit_id}): {e}")
+
+    def clear(self) -> None:
+        self._parsed.clear()
+        try:
+            with self._session_factory() as db:
+                db.query(BtecUnitTemplate).delete()
+                db.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ BTEC template cache clear failed: {e}")
+
+    async def get(self, unit_id: str, zoho: ZohoClient, refresh: bool = False) -> GradingTemplate:
+        """Template for a unit; read from Zoho only when missing, stale or `refresh`."""
+        row = None if refresh else await asyncio.to_thread(self._load, unit_id)
+        if row is not None and (datetime.utcnow() - row.fetched_at).total_seconds() < self.ttl_seconds:
+            return self._parse(unit_id, row.record, self._version(row))
+
+        task = self._inflight.get(unit_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(unit_id, zoho, row))
+            self._inflight[unit_id] = task
+            task.add_done_callback(lambda _t, k=unit_id: self._inflight.pop(k, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, unit_id: str, zoho: ZohoClient,
+                     stale: Optional[BtecUnitTemplate]) -> GradingTemplate:
+        logger.info(f"Fetching grading template for unit {unit_id}")
+        try:
+            # ⚠️ IMPORTANT: Use 'BTEC' module, NOT 'BTEC_Units'
+            unit_data = await zoho.get_record('BTEC', unit_id)
+        except ZohoNotFoundError:
+            await asyncio.to_thread(self.invalidate, unit_id)
+            raise
+        except Exception as e:
+            if stale is None:
+                raise
+            logger.warning(f"⚠️ Could not refresh BTEC unit {unit_id}, using cached template: {e}")
+            return self._parse(unit_id, stale.record, self._version(stale))
+        return await asyncio.to_thread(self.store, unit_id, unit_data)
+
+
 class MoodleGradeData:
     """
     Represents Moodle grade data to be synced to Zoho.
@@ -211,7 +334,8 @@ class GradeSyncService:
         self,
         zoho_client: ZohoClient,
         moodle_client: Optional[MoodleClient] = None,
-        db: Optional[Session] = None
+        db: Optional[Session] = None,
+        template_cache: Optional[GradingTemplateCache] = None
     ):
         """
         Initialize grade sync service.
@@ -220,13 +344,14 @@ class GradeSyncService:
             zoho_client: Zoho API client
             moodle_client: Moodle API client (optional)
             db: Database session (optional, for logging)
+            template_cache: Grading template cache (default: process-wide one)
         """
         self.zoho = zoho_client
         self.moodle = moodle_client
         self.db = db
         
-        # Template cache (unit_id -> GradingTemplate)
-        self._template_cache: Dict[str, GradingTemplate] = {}
+        # Template cache (unit_id -> GradingTemplate), shared by every instance
+        self.template_cache = template_cache or grading_template_cache
     
     async def get_grading_template(
         self,
@@ -246,32 +371,8 @@ class GradeSyncService:
         Raises:
             ZohoNotFoundError: If unit not found
         """
-        # Check cache
-        if use_cache and unit_id in self._template_cache:
-            logger.debug(f"Using cached template for unit {unit_id}")
-            return self._template_cache[unit_id]
-        
-        # Fetch from Zoho
-        logger.info(f"Fetching grading template for unit {unit_id}")
-        
         try:
-            # ⚠️ IMPORTANT: Use 'BTEC' module, NOT 'BTEC_Units'
-            unit_data = await self.zoho.get_record('BTEC', unit_id)
-            
-            # Create template
-            template = GradingTemplate(unit_id, unit_data)
-            
-            # Cache it
-            self._template_cache[unit_id] = template
-            
-            logger.info(
-                f"Loaded template for {template.unit_name}: "
-                f"{len(template.pass_criteria)}P + {len(template.merit_criteria)}M + "
-                f"{len(template.distinction_criteria)}D"
-            )
-            
-            return template
-        
+            return await self.template_cache.get(unit_id, self.zoho, refresh=not use_cache)
         except ZohoNotFoundError:
             logger.error(f"Unit {unit_id} not found in Zoho BTEC module")
             raise
@@ -330,6 +431,38 @@ class GradeSyncService:
         
         return subform_rows
     
+    def build_grade_record(
+        self,
+        moodle_grade: MoodleGradeData,
+        subform_rows: List[Dict]
+    ) -> Dict:
+        """
+        Build the BTEC_Grades record (field names from ZOHO_API_CONTRACT.md).
+        
+        Args:
+            moodle_grade: Moodle grade data
+            subform_rows: Learning_Outcomes_Assessm rows for this grade
+        
+        Returns:
+            BTEC_Grades record dict, keyed by Moodle_Grade_Composite_Key
+        """
+        return {
+            # Header fields
+            "Student": moodle_grade.zoho_student_id,
+            "Class": moodle_grade.zoho_class_id,
+            "BTEC_Unit": moodle_grade.zoho_unit_id,
+            "Grade": moodle_grade.overall_grade,  # Pass/Merit/Distinction/Refer
+            "Grade_Status": "Submitted",
+            "Attempt_Date": moodle_grade.graded_date,
+            "Attempt_Number": moodle_grade.attempt_number,
+            "Feedback": moodle_grade.feedback,
+            "Moodle_Grade_ID": str(moodle_grade.moodle_grade_id),
+            "Moodle_Grade_Composite_Key": moodle_grade.composite_key,
+            
+            # Subform: Learning_Outcomes_Assessm
+            "Learning_Outcomes_Assessm": subform_rows
+        }
+    
     async def sync_grade(self, moodle_grade: MoodleGradeData) -> Dict:
         """
         Sync single grade from Moodle to Zoho.
@@ -388,23 +521,7 @@ class GradeSyncService:
         
         # 3. Prepare BTEC_Grades data (field names from contract)
         composite_key = moodle_grade.composite_key
-        
-        grade_data = {
-            # Header fields
-            "Student": moodle_grade.zoho_student_id,
-            "Class": moodle_grade.zoho_class_id,
-            "BTEC_Unit": moodle_grade.zoho_unit_id,
-            "Grade": moodle_grade.overall_grade,  # Pass/Merit/Distinction/Refer
-            "Grade_Status": "Submitted",
-            "Attempt_Date": moodle_grade.graded_date,
-            "Attempt_Number": moodle_grade.attempt_number,
-            "Feedback": moodle_grade.feedback,
-            "Moodle_Grade_ID": str(moodle_grade.moodle_grade_id),
-            "Moodle_Grade_Composite_Key": composite_key,
-            
-            # Subform: Learning_Outcomes_Assessm
-            "Learning_Outcomes_Assessm": subform_rows
-        }
+        grade_data = self.build_grade_record(moodle_grade, subform_rows)
         
         # 4. Upsert grade (create or update based on composite key)
         try:
@@ -512,7 +629,111 @@ class GradeSyncService:
         # Sync
         return await self.sync_grade(grade_data)
     
+    async def sync_grades_batch(self, moodle_grades: List[MoodleGradeData]) -> List[Dict]:
+        """
+        Sync many grades with one template load per unit and batched upserts.
+        
+        Flow:
+        1. Group grades by BTEC unit, fetch each unit's template once
+        2. Build every Learning_Outcomes_Assessm subform
+        3. Upsert BTEC_Grades in batches of ZohoClient.BATCH_WRITE_LIMIT,
+           deduplicated on Moodle_Grade_Composite_Key
+        
+        Unlike sync_grade(), failures do not raise: a grade whose unit cannot
+        be loaded, that has no valid criteria, or that Zoho rejects (alone or
+        with its whole batch) gets an error outcome and the rest still sync.
+        
+        Args:
+            moodle_grades: Moodle grades to sync
+        
+        Returns:
+            One result dict per grade, in input order: sync_grade()'s result
+            shape, or {'status': 'error', 'composite_key', 'message'}
+        
+        Example:
+            results = await service.sync_grades_batch(grades)
+            failed = [r for r in results if r['status'] == 'error']
+        """
+        results: List[Optional[Dict]] = [None] * len(moodle_grades)
+        
+        def fail(index: int, message: str) -> None:
+            results[index] = {
+                'status': 'error',
+                'composite_key': moodle_grades[index].composite_key,
+                'message': message
+            }
+        
+        # 1. One template per unit
+        by_unit: Dict[str, List[int]] = {}
+        for index, moodle_grade in enumerate(moodle_grades):
+            by_unit.setdefault(moodle_grade.zoho_unit_id, []).append(index)
+        
+        # 2. Subforms + records
+        pending: List[Tuple[int, Dict]] = []
+        for unit_id, indexes in by_unit.items():
+            try:
+                template = await self.get_grading_template(unit_id)
+            except Exception as e:
+                logger.error(f"Cannot load template for unit {unit_id} ({len(indexes)} grades): {e}")
+                for index in indexes:
+                    fail(index, f"Grading template unavailable: {e}")
+                continue
+            
+            for index in indexes:
+                moodle_grade = moodle_grades[index]
+                subform_rows = self.build_learning_outcomes_subform(moodle_grade, template)
+                if not subform_rows:
+                    logger.warning(
+                        f"No valid criteria found for grade {moodle_grade.moodle_grade_id}. "
+                        f"Cannot sync."
+                    )
+                    fail(index, 'No valid criteria scores')
+                    continue
+                pending.append((index, self.build_grade_record(moodle_grade, subform_rows)))
+        
+        # 3. Batched upserts
+        batch_size = ZohoClient.BATCH_WRITE_LIMIT
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            try:
+                upserted = await self.zoho.upsert_records(
+                    'BTEC_Grades',
+                    [grade_data for _, grade_data in batch],
+                    duplicate_check_fields=['Moodle_Grade_Composite_Key']
+                )
+            except Exception as e:
+                logger.error(f"Batch upsert of {len(batch)} grades failed: {e}")
+                for index, _ in batch:
+                    fail(index, f"Upsert failed: {e}")
+                continue
+            
+            for (index, grade_data), result in zip(batch, upserted):
+                if result.get('code') != 'SUCCESS':
+                    logger.error(
+                        f"Grade {grade_data['Moodle_Grade_Composite_Key']} rejected by Zoho: {result}"
+                    )
+                    fail(index, f"Upsert failed: {result.get('message', result.get('code'))}")
+                    continue
+                action = result.get('action', 'unknown')  # 'insert' or 'update'
+                results[index] = {
+                    'status': 'created' if action == 'insert' else 'updated',
+                    'zoho_record_id': result['details']['id'],
+                    'composite_key': grade_data['Moodle_Grade_Composite_Key'],
+                    'criteria_count': len(grade_data['Learning_Outcomes_Assessm'])
+                }
+        
+        synced = sum(1 for r in results if r['status'] != 'error')
+        logger.info(
+            f"Batch grade sync: {synced}/{len(moodle_grades)} synced "
+            f"across {len(by_unit)} units"
+        )
+        return results
+    
     def clear_template_cache(self):
         """Clear cached grading templates."""
-        self._template_cache.clear()
+        self.template_cache.clear()
         logger.info("Grading template cache cleared")
+
+
+# ✅ Process-wide instance shared by every GradeSyncService and the BTEC unit webhooks
+grading_template_cache = GradingTemplateCache(ttl_seconds=settings.BTEC_TEMPLATE_CACHE_TTL_SECONDS)
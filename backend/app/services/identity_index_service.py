@@ -0,0 +1,149 @@
+"""
+Identity Index Service - local Moodle ↔ Zoho id resolution
+
+Every Moodle grade event needs the Zoho ids of its BTEC_Grades record (by
+Moodle_Grade_Composite_Key), its student (by Student_Moodle_ID) and its class
+(by Moodle course id / Class_Name).  Resolving them with Zoho searches costs
+up to three API credits per grade before anything is written; this index
+keeps the mappings in the zoho_identity_index table instead.
+
+Kinds (key → Zoho record id):
+- student:    Moodle user id               → BTEC_Students
+- course:     Moodle course id             → BTEC_Classes
+- class_name: Class_Name                   → BTEC_Classes
+- grade:      Moodle_Grade_Composite_Key   → BTEC_Grades
+
+Fed by the flows that already hold the Zoho records (full sync students /
+classes / grades steps, the student / grade / class webhooks) and by the
+grade webhook's own searches and creates.  Verification is lazy: a mapping
+older than IDENTITY_INDEX_TTL_SECONDS counts as a miss (the caller searches
+Zoho and re-stores it), and callers forget() mappings Zoho rejects.
+
+Like the program category cache, the index only ever saves calls: DB errors
+are logged and read as misses.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.infra.db.models.zoho_identity import ZohoIdentity
+from app.infra.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+STUDENT = "student"
+COURSE = "course"
+CLASS_NAME = "class_name"
+GRADE = "grade"
+
+# entity type (ZOHO_MODULE_MAP key) → [(kind, Zoho field holding the key)]
+RECORD_KEYS: Dict[str, List[Tuple[str, str]]] = {
+    "students": [(STUDENT, "Student_Moodle_ID")],
+    "classes":  [(COURSE, "Moodle_Class_ID"), (CLASS_NAME, "Class_Name")],
+    "grades":   [(GRADE, "Moodle_Grade_Composite_Key")],
+}
+
+_CHUNK = 500
+
+
+def _norm(value: Any) -> Optional[str]:
+    """Index key for a Moodle id / name; None for blanks and unset ids ("0")."""
+    if value is None:
+        return None
+    key = str(value).strip()
+    return key if key and key != "0" else None
+
+
+class IdentityIndex:
+    """(kind, key) → Zoho id lookups backed by the zoho_identity_index table."""
+
+    def __init__(self, ttl_seconds: float = 604800.0, session_factory=SessionLocal):
+        self.ttl_seconds = ttl_seconds
+        self._session_factory = session_factory
+
+    def get(self, kind: str, key: Any) -> Optional[str]:
+        """Zoho id for a fresh mapping, else None (absent, stale or DB error)."""
+        key = _norm(key)
+        if key is None:
+            return None
+        try:
+            with self._session_factory() as db:
+                row = db.get(ZohoIdentity, (kind, key))
+                if row and datetime.utcnow() - row.verified_at < timedelta(seconds=self.ttl_seconds):
+                    return row.zoho_id
+        except Exception as e:
+            logger.warning(f"⚠️ Identity index read failed ({kind}:{key}): {e}")
+        return None
+
+    def store(self, kind: str, key: Any, zoho_id: Any) -> None:
+        self.store_many(kind, [(key, zoho_id)])
+
+    def store_many(self, kind: str, pairs: Iterable[Tuple[Any, Any]]) -> int:
+        """Upsert (key, zoho_id) pairs as verified now. Returns rows written."""
+        mapping = {}
+        for key, zoho_id in pairs:
+            key, zoho_id = _norm(key), _norm(zoho_id)
+            if key is not None and zoho_id is not None:
+                mapping[key] = zoho_id
+        if not mapping:
+            return 0
+        now = datetime.utcnow()
+        keys = list(mapping)
+        try:
+            with self._session_factory() as db:
+                for start in range(0, len(keys), _CHUNK):
+                    chunk = keys[start:start + _CHUNK]
+                    existing = {
+                        row.key: row for row in db.query(ZohoIdentity).filter(
+                            ZohoIdentity.kind == kind, ZohoIdentity.key.in_(chunk)
+                        )
+                    }
+                    for key in chunk:
+                        row = existing.get(key)
+                        if row is None:
+                            db.add(ZohoIdentity(kind=kind, key=key, zoho_id=mapping[key], verified_at=now))
+                        else:
+                            row.zoho_id = mapping[key]
+                            row.verified_at = now
+                db.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Identity index write failed ({kind}, {len(keys)} keys): {e}")
+            return 0
+        return len(keys)
+
+    def forget(self, kind: str, key: Any) -> None:
+        key = _norm(key)
+        if key is None:
+            return
+        self._delete(ZohoIdentity.kind == kind, ZohoIdentity.key == key)
+
+    def forget_zoho_id(self, zoho_id: Any) -> None:
+        """Drop every mapping to a Zoho record (record deleted in Zoho)."""
+        zoho_id = _norm(zoho_id)
+        if zoho_id is not None:
+            self._delete(ZohoIdentity.zoho_id == zoho_id)
+
+    def _delete(self, *criteria) -> None:
+        try:
+            with self._session_factory() as db:
+                db.query(ZohoIdentity).filter(*criteria).delete(synchronize_session=False)
+                db.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Identity index delete failed: {e}")
+
+    def observe_records(self, entity_type: str, records: Iterable[Dict]) -> int:
+        """Index the Moodle keys carried by full Zoho records of `entity_type`."""
+        keys = RECORD_KEYS.get(entity_type)
+        if not keys:
+            return 0
+        records = [r for r in records if isinstance(r, dict) and r.get("id")]
+        return sum(
+            self.store_many(kind, ((rec.get(field), rec["id"]) for rec in records))
+            for kind, field in keys
+        )
+
+
+# ✅ Process-wide instance shared by the grade webhook and the sync flows feeding it
+identity_index = IdentityIndex(ttl_seconds=settings.IDENTITY_INDEX_TTL_SECONDS)
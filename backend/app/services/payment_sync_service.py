@@ -9,20 +9,36 @@ Purpose: Display payment history and balance on Moodle student dashboard
 
 Key Operations:
 - Get student payment history
-- Calculate payment balance
+- Calculate payment balance (cached per student, bulk for reporting)
 - Get payment details by ID
 - Search payments by date range or status
 
 Note: NO create/update operations - this is read-only from Moodle's perspective.
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Any, Tuple
 from datetime import datetime, date
 from decimal import Decimal
+import asyncio
 import logging
+import time
+
+from app.core.config import settings
+from app.infra.zoho.client import coql_value, coql_where
 
 logger = logging.getLogger(__name__)
 
+# BTEC_Payments fields returned by COQL queries (PaymentData.from_zoho_dict)
+PAYMENT_FIELDS = [
+    'Name', 'Student_ID', 'Registration_ID', 'Installment_No',
+    'Payment_Amount', 'Payment_Date', 'Payment_Method', 'Synced_to_Moodle',
+]
+
+# Student ids per COQL "Student_ID in (...)" query in summaries_for()
+SUMMARY_BATCH_SIZE = 50
+# Concurrent registration (total fees) lookups in summaries_for()
+FEES_CONCURRENCY = 5
+
 
 class PaymentData:
     """
@@ -180,6 +196,115 @@ class PaymentSummary:
         }
 
 
+class PaymentSummaryCache:
+    """
+    Per-student PaymentSummary cache (per process, TTL).
+
+    Holds complete summaries only (every payment + registration fees), so a
+    payment missing from every cached summary cannot affect any of them.
+    Entries are dropped by the payment_recorded / payment_deleted webhooks;
+    other workers see the change within the TTL.  Concurrent loads of one
+    student share a single Zoho fetch, and a load that overlaps an
+    invalidation is returned but not cached.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, PaymentSummary]] = {}   # student → (expires_at, summary)
+        self._owners: Dict[str, str] = {}                             # payment → student
+        self._generation: Dict[str, int] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def get(self, zoho_student_id: str) -> Optional[PaymentSummary]:
+        entry = self._entries.get(zoho_student_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._drop(zoho_student_id)
+            return None
+        return entry[1]
+
+    def generation(self, zoho_student_id: str) -> int:
+        """Invalidation counter; pass it back to store() to skip stale loads."""
+        return self._generation.get(zoho_student_id, 0)
+
+    def store(self, summary: PaymentSummary, generation: Optional[int] = None) -> None:
+        student_id = summary.zoho_student_id
+        if generation is not None and generation != self.generation(student_id):
+            return   # invalidated while loading
+        self._drop(student_id)
+        self._entries[student_id] = (time.monotonic() + self.ttl_seconds, summary)
+        for payment in summary.payments:
+            if payment.zoho_payment_id:
+                self._owners[payment.zoho_payment_id] = student_id
+
+    def _drop(self, zoho_student_id: str) -> None:
+        entry = self._entries.pop(zoho_student_id, None)
+        if entry:
+            for payment in entry[1].payments:
+                self._owners.pop(payment.zoho_payment_id, None)
+
+    def invalidate(self, zoho_student_id: Optional[str]) -> None:
+        if zoho_student_id:
+            self._generation[zoho_student_id] = self._generation.get(zoho_student_id, 0) + 1
+            self._drop(zoho_student_id)
+
+    def invalidate_payment(self, zoho_payment_id: Optional[str],
+                           zoho_student_id: Optional[str] = None) -> None:
+        """Drop the summary containing a payment (its student, if known)."""
+        owner = zoho_student_id or self._owners.get(str(zoho_payment_id or ""))
+        self.invalidate(owner)
+
+    def clear(self) -> None:
+        for student_id in list(self._entries):
+            self.invalidate(student_id)
+
+    async def get_or_load(
+        self,
+        zoho_student_id: str,
+        loader: Callable[[], Awaitable[PaymentSummary]]
+    ) -> PaymentSummary:
+        cached = self.get(zoho_student_id)
+        if cached is not None:
+            return cached
+        task = self._inflight.get(zoho_student_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(zoho_student_id, loader))
+            self._inflight[zoho_student_id] = task
+            task.add_done_callback(lambda _t, k=zoho_student_id: self._inflight.pop(k, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, zoho_student_id: str,
+                    loader: Callable[[], Awaitable[PaymentSummary]]) -> PaymentSummary:
+        generation = self.generation(zoho_student_id)
+        summary = await loader()
+        self.store(summary, generation)
+        return summary
+
+
+def _summarize(
+    zoho_student_id: str,
+    payments: List[PaymentData],
+    total_fees: Decimal
+) -> PaymentSummary:
+    """Totals, count and last payment date in one pass over the payments."""
+    total_paid = Decimal('0')
+    last_payment_date = None
+    for payment in payments:
+        if payment.payment_amount:
+            total_paid += payment.payment_amount
+        if payment.payment_date and (last_payment_date is None or payment.payment_date > last_payment_date):
+            last_payment_date = payment.payment_date
+    return PaymentSummary(
+        zoho_student_id=zoho_student_id,
+        total_fees=total_fees,
+        total_paid=total_paid,
+        payment_count=len(payments),
+        payments=payments,
+        last_payment_date=last_payment_date
+    )
+
+
 class PaymentSyncService:
     """
     Read-only service for accessing payment data from Zoho CRM.
@@ -189,21 +314,23 @@ class PaymentSyncService:
     for display on the Moodle student dashboard.
     """
     
-    def __init__(self, zoho_client):
+    def __init__(self, zoho_client, summary_cache: Optional[PaymentSummaryCache] = None):
         """
         Initialize PaymentSyncService.
         
         Args:
             zoho_client: Authenticated ZohoCRMClient instance
+            summary_cache: Payment summary cache (default: process-wide one)
         """
         self.zoho = zoho_client
         self.module_name = 'BTEC_Payments'
+        self.summary_cache = summary_cache or payment_summary_cache
         logger.info("PaymentSyncService initialized (read-only mode)")
     
     async def get_student_payments(
         self,
         zoho_student_id: str,
-        page: int = 1,
+        page: Optional[int] = None,
         per_page: int = 200
     ) -> List[PaymentData]:
         """
@@ -211,7 +338,7 @@ class PaymentSyncService:
         
         Args:
             zoho_student_id: Zoho student record ID
-            page: Page number for pagination
+            page: Page number for pagination (default: every page)
             per_page: Number of records per page (max 200)
             
         Returns:
@@ -230,12 +357,19 @@ class PaymentSyncService:
             # Using search instead of get_records for efficiency
             criteria = f"(Student_ID:equals:{zoho_student_id})"
             
-            results = await self.zoho.search_records(
-                self.module_name,
-                criteria,
-                page=page,
-                per_page=per_page
-            )
+            results = []
+            current = page or 1
+            while True:
+                batch = await self.zoho.search_records(
+                    self.module_name,
+                    criteria,
+                    page=current,
+                    per_page=per_page
+                )
+                results.extend(batch)
+                if page is not None or len(batch) < per_page:
+                    break
+                current += 1
             
             payments = [PaymentData.from_zoho_dict(p) for p in results]
             
@@ -277,55 +411,170 @@ class PaymentSyncService:
     async def calculate_payment_summary(
         self,
         zoho_student_id: str,
-        total_fees: Optional[Decimal] = None
+        total_fees: Optional[Decimal] = None,
+        include_payments: bool = True,
+        use_cache: bool = True
     ) -> PaymentSummary:
         """
         Calculate payment summary for a student.
         
-        This aggregates all payments and calculates totals and balance.
-        If total_fees is not provided, it will be fetched from registration.
+        A full summary (every payment, fees from the active registration) is
+        served from the summary cache; the payment_recorded / payment_deleted
+        webhooks invalidate it. Without payments, the totals are aggregated
+        by Zoho in one COQL query instead.
         
         Args:
             zoho_student_id: Zoho student record ID
             total_fees: Optional total fees (if known), otherwise fetched from registration
+            include_payments: Also return the payment records
+            use_cache: Serve / fill the summary cache
             
         Returns:
             PaymentSummary object with totals and balance
         """
-        logger.info(f"Calculating payment summary for student {zoho_student_id}")
+        if not zoho_student_id:
+            raise ValueError("Student ID is required")
         
-        # Get all payments for student
-        payments = await self.get_student_payments(zoho_student_id)
+        if include_payments:
+            cached = self.summary_cache.get(zoho_student_id) if use_cache else None
+            if total_fees is not None:
+                # Caller's fees: no registration lookup, nothing cached
+                payments = cached.payments if cached else await self._fetch_payments(zoho_student_id)
+                summary = _summarize(zoho_student_id, payments, total_fees)
+            elif use_cache:
+                summary = await self.summary_cache.get_or_load(
+                    zoho_student_id, lambda: self._load_summary(zoho_student_id)
+                )
+            else:
+                generation = self.summary_cache.generation(zoho_student_id)
+                summary = await self._load_summary(zoho_student_id)
+                self.summary_cache.store(summary, generation)
+        else:
+            cached = self.summary_cache.get(zoho_student_id) if use_cache else None
+            if cached is not None:
+                summary = PaymentSummary(
+                    zoho_student_id=zoho_student_id,
+                    total_fees=cached.total_fees if total_fees is None else total_fees,
+                    total_paid=cached.total_paid,
+                    payment_count=cached.payment_count,
+                    last_payment_date=cached.last_payment_date
+                )
+            else:
+                summary = await self._aggregate_summary(zoho_student_id, total_fees)
         
-        # Calculate total paid
-        total_paid = sum(
-            (p.payment_amount for p in payments if p.payment_amount),
-            Decimal('0')
+        logger.info(
+            f"Payment summary for {zoho_student_id}: "
+            f"Fees={summary.total_fees}, Paid={summary.total_paid}, Balance={summary.balance}"
         )
         
-        # Find last payment date
-        payment_dates = [p.payment_date for p in payments if p.payment_date]
-        last_payment_date = max(payment_dates) if payment_dates else None
+        return summary
+    
+    async def _fetch_payments(self, zoho_student_id: str) -> List[PaymentData]:
+        records = await self.zoho.coql_select(
+            self.module_name,
+            PAYMENT_FIELDS,
+            where=coql_where({'Student_ID': zoho_student_id})
+        )
+        return [PaymentData.from_zoho_dict(p) for p in records]
+    
+    async def _load_summary(self, zoho_student_id: str) -> PaymentSummary:
+        logger.info(f"Calculating payment summary for student {zoho_student_id}")
+        payments = await self._fetch_payments(zoho_student_id)
+        total_fees = await self._get_total_fees_from_registration(zoho_student_id)
+        return _summarize(zoho_student_id, payments, total_fees)
+    
+    async def _aggregate_summary(
+        self,
+        zoho_student_id: str,
+        total_fees: Optional[Decimal]
+    ) -> PaymentSummary:
+        totals = (await self.zoho.coql_aggregate(
+            self.module_name,
+            ['SUM(Payment_Amount)', 'COUNT(id)', 'MAX(Payment_Date)'],
+            where=coql_where({'Student_ID': zoho_student_id})
+        ))[0]
+        
+        last_payment_date = None
+        if totals.get('MAX(Payment_Date)'):
+            try:
+                last_payment_date = datetime.strptime(
+                    str(totals['MAX(Payment_Date)'])[:10], '%Y-%m-%d'
+                ).date()
+            except ValueError:
+                logger.warning(f"Could not parse payment date: {totals['MAX(Payment_Date)']}")
         
-        # If total_fees not provided, try to get from registration
         if total_fees is None:
             total_fees = await self._get_total_fees_from_registration(zoho_student_id)
         
-        summary = PaymentSummary(
+        return PaymentSummary(
             zoho_student_id=zoho_student_id,
             total_fees=total_fees,
-            total_paid=total_paid,
-            payment_count=len(payments),
-            payments=payments,
+            total_paid=Decimal(str(totals.get('SUM(Payment_Amount)') or 0)),
+            payment_count=int(totals.get('COUNT(id)') or 0),
             last_payment_date=last_payment_date
         )
+    
+    async def summaries_for(
+        self,
+        zoho_student_ids: Iterable[str]
+    ) -> Dict[str, PaymentSummary]:
+        """
+        Full payment summaries for many students (reporting).
+        
+        Cached summaries are reused; the payments of the rest are fetched
+        with one paged COQL query per SUMMARY_BATCH_SIZE students, and their
+        fees with up to FEES_CONCURRENCY registration lookups at a time.
+        
+        Args:
+            zoho_student_ids: Zoho student record IDs
+            
+        Returns:
+            {student_id: PaymentSummary} for every requested student
+        """
+        student_ids = [sid for sid in dict.fromkeys(zoho_student_ids) if sid]
+        summaries: Dict[str, PaymentSummary] = {}
+        missing = []
+        for student_id in student_ids:
+            cached = self.summary_cache.get(student_id)
+            if cached is not None:
+                summaries[student_id] = cached
+            else:
+                missing.append(student_id)
         
         logger.info(
-            f"Payment summary for {zoho_student_id}: "
-            f"Fees={total_fees}, Paid={total_paid}, Balance={summary.balance}"
+            f"Payment summaries for {len(student_ids)} students "
+            f"({len(student_ids) - len(missing)} cached)"
         )
+        if not missing:
+            return summaries
+        
+        generations = {sid: self.summary_cache.generation(sid) for sid in missing}
+        payments: Dict[str, List[PaymentData]] = {sid: [] for sid in missing}
+        for start in range(0, len(missing), SUMMARY_BATCH_SIZE):
+            chunk = missing[start:start + SUMMARY_BATCH_SIZE]
+            records = await self.zoho.coql_select(
+                self.module_name,
+                PAYMENT_FIELDS,
+                where=f"Student_ID in ({', '.join(coql_value(sid) for sid in chunk)})"
+            )
+            for record in records:
+                payment = PaymentData.from_zoho_dict(record)
+                if payment.zoho_student_id in payments:
+                    payments[payment.zoho_student_id].append(payment)
         
-        return summary
+        semaphore = asyncio.Semaphore(FEES_CONCURRENCY)
+        
+        async def fees_for(student_id: str) -> Decimal:
+            async with semaphore:
+                return await self._get_total_fees_from_registration(student_id)
+        
+        fees = await asyncio.gather(*(fees_for(sid) for sid in missing))
+        for student_id, total_fees in zip(missing, fees):
+            summary = _summarize(student_id, payments[student_id], total_fees)
+            self.summary_cache.store(summary, generations[student_id])
+            summaries[student_id] = summary
+        
+        return {sid: summaries[sid] for sid in student_ids}
     
     async def _get_total_fees_from_registration(
         self,
@@ -574,3 +823,7 @@ class PaymentSyncService:
                 raise
         
         return payment.synced_to_moodle
+
+
+# ✅ Process-wide instance shared by every PaymentSyncService and the payment webhooks
+payment_summary_cache = PaymentSummaryCache(ttl_seconds=settings.PAYMENT_SUMMARY_CACHE_TTL_SECONDS)
@@ -0,0 +1,278 @@
+"""
+Stat Counter Service - O(1) dashboard totals
+
+Keeps the stat_counters table in step with integration_events_log and
+students so the admin dashboard, /events/stats and the /metrics queue depth
+read a handful of rows instead of running COUNT(*) over tables that grow
+without bound.
+
+How:
+- An after_flush hook on every ORM Session turns inserted / deleted rows and
+  EventLog status transitions into counter deltas held on the session.  On
+  commit they join an in-process buffer (a rollback drops them, so a rolled
+  back event never moves a counter); webhook transactions never touch the
+  few hot counter rows, so they neither lock nor serialize on them.
+- run_flusher() writes the buffer every STATS_FLUSH_INTERVAL_SECONDS in its
+  own short transaction: one INSERT ... ON CONFLICT DO UPDATE SET
+  value = value + delta per counter, so two writers creating the same new
+  counter never collide on its primary key.  read_counters() adds this
+  process's unflushed deltas; other workers' show up after their next flush.
+- Writes that bypass the ORM (bulk query().delete(), raw SQL, manual DB
+  edits) are absorbed by reconcile(), which upserts every counter from
+  COUNT(*) at startup and every STATS_RECONCILE_INTERVAL_SECONDS.  Rows are
+  updated in place (never deleted), so concurrent flushes keep working.  A
+  reconcile drops this process's buffer (those commits are in the count); a
+  delta buffered elsewhere during the recount is corrected by the next one.
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from collections import Counter
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.infra.db.models.event_log import EventLog
+from app.infra.db.models.stat_counter import StatCounter
+from app.infra.db.models.student import Student
+from app.infra.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+EVENTS_TOTAL = "events.total"
+STUDENTS_TOTAL = "students.total"
+STATUS_PREFIX = "events.status."
+SOURCE_PREFIX = "events.source."
+
+_table = StatCounter.__table__
+_has_table: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()   # engine → table exists
+_pending: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()     # engine → committed, unflushed deltas
+_pending_lock = threading.Lock()
+_SESSION_DELTAS = "stat_counter_deltas"                                    # session.info key: engine → Counter
+
+
+def _committed(obj, attr: str):
+    """Value of `attr` as last loaded from the DB (before pending changes)."""
+    hist = inspect(obj).attrs[attr].history
+    values = hist.deleted or hist.unchanged or hist.added
+    return values[0] if values else getattr(obj, attr)
+
+
+def _insert_factory(conn):
+    """Dialect insert() supporting ON CONFLICT, or None (savepoint fallback)."""
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif conn.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def _upsert(conn, name: str, value: int, now: datetime, increment: bool) -> None:
+    """
+    Race-safe write of one counter: add `value` to it (increment=True, the
+    row starting at max(value, 0)) or set it to `value`.
+    """
+    new_value = _table.c.value + value if increment else value
+    initial = max(value, 0) if increment else value
+    insert = _insert_factory(conn)
+    if insert is not None:
+        stmt = insert(_table).values(name=name, value=initial, updated_at=now)
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=[_table.c.name], set_={"value": new_value, "updated_at": now},
+        ))
+        return
+    update = _table.update().where(_table.c.name == name).values(value=new_value, updated_at=now)
+    if conn.execute(update).rowcount:
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(_table.insert().values(name=name, value=initial, updated_at=now))
+    except IntegrityError:
+        # Another writer created the row first; the savepoint kept our transaction alive
+        conn.execute(update)
+
+
+def _event_keys(status, source):
+    return (EVENTS_TOTAL, STATUS_PREFIX + (status or "pending"), SOURCE_PREFIX + (source or "unknown"))
+
+
+def _flush_deltas(session: Session) -> Counter:
+    deltas: Counter = Counter()
+    for obj in session.new:
+        if isinstance(obj, EventLog):
+            deltas.update(_event_keys(obj.status, obj.source))
+        elif isinstance(obj, Student):
+            deltas[STUDENTS_TOTAL] += 1
+    for obj in session.deleted:
+        if isinstance(obj, EventLog):
+            deltas.subtract(_event_keys(_committed(obj, "status"), _committed(obj, "source")))
+        elif isinstance(obj, Student):
+            deltas[STUDENTS_TOTAL] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, EventLog) and obj not in session.deleted:
+            hist = inspect(obj).attrs.status.history
+            if hist.deleted and hist.added and hist.deleted[0] != hist.added[0]:
+                deltas[STATUS_PREFIX + hist.deleted[0]] -= 1
+                deltas[STATUS_PREFIX + hist.added[0]] += 1
+    return deltas
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_deltas(session: Session, flush_context) -> None:
+    deltas = _flush_deltas(session)
+    if any(deltas.values()):
+        engine = session.connection().engine
+        session.info.setdefault(_SESSION_DELTAS, {}).setdefault(engine, Counter()).update(deltas)
+
+
+@event.listens_for(Session, "after_commit")
+def _buffer_deltas(session: Session) -> None:
+    by_engine = session.info.pop(_SESSION_DELTAS, None)
+    if by_engine:
+        with _pending_lock:
+            for engine, deltas in by_engine.items():
+                _pending.setdefault(engine, Counter()).update(deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_deltas(session: Session) -> None:
+    session.info.pop(_SESSION_DELTAS, None)
+
+
+def _take_pending(engine) -> Counter:
+    with _pending_lock:
+        return _pending.pop(engine, None) or Counter()
+
+
+def pending_deltas(engine) -> Dict[str, int]:
+    """Committed deltas of this process not yet written to stat_counters."""
+    with _pending_lock:
+        return dict(_pending.get(engine, {}))
+
+
+def flush_pending() -> None:
+    """Write the buffered deltas: one short transaction per engine, one upsert per counter."""
+    with _pending_lock:
+        batches = list(_pending.items())
+        _pending.clear()
+    for engine, deltas in batches:
+        try:
+            with Session(bind=engine) as db:
+                adjust(db, deltas)
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Stat counter flush failed: {e}")
+            with _pending_lock:
+                _pending.setdefault(engine, Counter()).update(deltas)
+
+
+def adjust(session: Session, deltas: Dict[str, int]) -> None:
+    """
+    Apply counter deltas inside the session's transaction; used by the
+    flusher and by writers that bypass the ORM unit of work (e.g. bulk
+    deletes by event retention, once per batch).
+    """
+    deltas = {name: n for name, n in deltas.items() if n}
+    if not deltas:
+        return
+    conn = session.connection()
+    if conn.engine not in _has_table:
+        _has_table[conn.engine] = inspect(conn).has_table(StatCounter.__tablename__)
+    if not _has_table[conn.engine]:
+        return
+    now = datetime.utcnow()
+    for name, delta in deltas.items():
+        # First row for a name (new status / source) starts at max(delta, 0);
+        # reconcile corrects any drift
+        _upsert(conn, name, delta, now, increment=True)
+
+
+def event_deltas(status: str, source: str, n: int = 1) -> Dict[str, int]:
+    """Counter changes for adding (n > 0) or removing (n < 0) n events."""
+    return dict.fromkeys(_event_keys(status, source), n)
+
+
+def reconcile(db: Session) -> Dict[str, int]:
+    """Recount every counter from COUNT(*), upserting in place; returns the new values."""
+    _take_pending(db.get_bind())   # already committed, so already in the counts
+    counts: Dict[str, int] = {
+        EVENTS_TOTAL: db.query(func.count(EventLog.id)).scalar() or 0,
+        STUDENTS_TOTAL: db.query(func.count(Student.id)).scalar() or 0,
+    }
+    for status, n in db.query(EventLog.status, func.count(EventLog.id)).group_by(EventLog.status):
+        counts[STATUS_PREFIX + status] = n
+    for source, n in db.query(EventLog.source, func.count(EventLog.id)).group_by(EventLog.source):
+        counts[SOURCE_PREFIX + source] = n
+
+    now = datetime.utcnow()
+    conn = db.connection()
+    for name, n in counts.items():
+        _upsert(conn, name, n, now, increment=False)
+    # Statuses / sources with no rows left drop to zero (never deleted: a
+    # concurrent flush may be incrementing them right now)
+    conn.execute(
+        _table.update().where(_table.c.name.notin_(list(counts)), _table.c.value != 0)
+        .values(value=0, updated_at=now)
+    )
+    db.commit()
+    return counts
+
+
+def read_counters(db: Session) -> Dict[str, int]:
+    """All counters plus this process's unflushed deltas; reconciles first if the table has never been filled."""
+    counters = Counter({name: value for name, value in db.query(StatCounter.name, StatCounter.value)})
+    if not counters:
+        return reconcile(db)
+    counters.update(pending_deltas(db.get_bind()))
+    return dict(counters)
+
+
+def dashboard_stats(db: Session) -> Dict[str, int]:
+    """The five admin dashboard numbers."""
+    c = read_counters(db)
+    return {
+        "students": c.get(STUDENTS_TOTAL, 0),
+        "events_total": c.get(EVENTS_TOTAL, 0),
+        "events_completed": c.get(STATUS_PREFIX + "completed", 0),
+        "events_failed": c.get(STATUS_PREFIX + "failed", 0),
+        "events_pending": c.get(STATUS_PREFIX + "pending", 0) + c.get(STATUS_PREFIX + "processing", 0),
+    }
+
+
+def by_prefix(counters: Dict[str, int], prefix: str) -> Dict[str, int]:
+    """{"failed": 3, ...} from {"events.status.failed": 3, ...}; zero counters dropped."""
+    return {name[len(prefix):]: n for name, n in counters.items() if name.startswith(prefix) and n}
+
+
+def _reconcile_once() -> None:
+    db = SessionLocal()
+    try:
+        reconcile(db)
+    except Exception as e:
+        logger.warning(f"Stat counter reconcile failed: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+async def run_flusher(interval: float) -> None:
+    """Background task: write buffered counter deltas every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(flush_pending)
+
+
+async def run_reconciler(interval: float) -> None:
+    """Background task: rebuild counters now, then every `interval` seconds (0 = once)."""
+    while True:
+        await asyncio.to_thread(_reconcile_once)
+        if interval <= 0:
+            return
+        await asyncio.sleep(interval)
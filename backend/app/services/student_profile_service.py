@@ -34,7 +34,7 @@ import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
-from app.infra.zoho.client import ZohoClient
+from app.infra.zoho.client import ZohoClient, coql_where
 from app.infra.zoho.exceptions import (
     ZohoAPIError,
     ZohoNotFoundError,
@@ -43,6 +43,14 @@ from app.infra.zoho.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# BTEC_Students fields returned by COQL queries (StudentProfile.to_zoho_dict)
+STUDENT_FIELDS = [
+    'Name', 'First_Name', 'Last_Name', 'Academic_Email', 'Student_Moodle_ID',
+    'Status', 'Synced_to_Moodle', 'Student_ID', 'Phone', 'Date_of_Birth', 'Gender',
+    'Address', 'City', 'Country', 'Postal_Code',
+    'Emergency_Contact_Name', 'Emergency_Contact_Phone',
+]
+
 
 class StudentData:
     """Represents student data for syncing."""
@@ -462,10 +470,14 @@ class StudentProfileService:
         """
         Get all students from Zoho with pagination.
         
+        With `filters`, matching happens server-side (COQL), so a page holds
+        `per_page` matches rather than the matches among `per_page` students.
+        
         Args:
             page: Page number (1-indexed)
             per_page: Records per page (max 200)
-            filters: Optional filters (e.g., {'Status': 'Active'})
+            filters: Optional equality filters (e.g., {'Status': 'Active'});
+                filtered records carry STUDENT_FIELDS only
         
         Returns:
             Dict with 'data' (list of students) and 'info' (pagination)
@@ -477,27 +489,31 @@ class StudentProfileService:
         """
         logger.info(f"Fetching students (page {page}, {per_page} per page)")
         
-        response = await self.zoho.get_records(
-            'BTEC_Students',
-            page=page,
-            per_page=per_page
-        )
-        
-        students = response.get('data', [])
-        
-        # Apply filters if provided
-        if filters and students:
-            filtered = []
-            for student in students:
-                match = True
-                for field, value in filters.items():
-                    if student.get(field) != value:
-                        match = False
-                        break
-                if match:
-                    filtered.append(student)
-            
-            response['data'] = filtered
+        if not filters:
+            response = await self.zoho.get_records(
+                'BTEC_Students',
+                page=page,
+                per_page=per_page
+            )
+        else:
+            per_page = min(per_page, 200)
+            # One extra row tells whether another page exists
+            students = await self.zoho.coql_select(
+                'BTEC_Students',
+                STUDENT_FIELDS,
+                where=coql_where(filters),
+                limit=per_page + 1,
+                offset=(page - 1) * per_page
+            )
+            response = {
+                'data': students[:per_page],
+                'info': {
+                    'page': page,
+                    'per_page': per_page,
+                    'count': min(len(students), per_page),
+                    'more_records': len(students) > per_page
+                }
+            }
         
         logger.info(f"Retrieved {len(response.get('data', []))} students")
         
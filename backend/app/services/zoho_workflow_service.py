@@ -18,25 +18,39 @@ Required OAuth scopes:
 Zoho API (v8):
   POST   /crm/v8/settings/automation/webhooks            → create webhook entity
   GET    /crm/v8/settings/automation/webhooks            → list webhook entities
+  PUT    /crm/v8/settings/automation/webhooks/{id}       → update webhook entity
   DELETE /crm/v8/settings/automation/webhooks/{id}       → delete webhook entity
   POST   /crm/v8/settings/automation/workflow_rules      → create rule
   GET    /crm/v8/settings/automation/workflow_rules      → list rules
+  PUT    /crm/v8/settings/automation/workflow_rules/{id} → update rule
   DELETE /crm/v8/settings/automation/workflow_rules/{id} → delete rule
 
+Provisioning is declarative: setup_all_rules() builds the desired webhook +
+rule pair for every (module, trigger), compares it with what Zoho holds and
+the zoho_automation_state table remembers, and only writes the difference —
+unchanged pairs cost no calls, changed ones are updated in place (PUT), and
+missing ones are created.  Stale MZI objects are deleted only after their
+replacements exist, so re-running setup never leaves a module uncovered.
+Calls run concurrently, at most ZOHO_AUTOMATION_CONCURRENCY at a time.
+
 State persistence:
-  Saved IDs (webhook + rule) are stored in backend/zoho_rules_state.json
-  so that re-setup can clean up even after a server restart.
+  Provisioned IDs + spec hashes live in the zoho_automation_state table.
+  Live objects are matched by their "MZI - " name as well, so IDs recorded by
+  the old zoho_rules_state.json file are adopted on the first run.
 """
 
+import asyncio
+import hashlib
 import json
 import logging
-import os
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
 
 from app.core.config import settings
+from app.infra.db.models.zoho_automation import ZohoAutomation
+from app.infra.db.session import SessionLocal
 from app.infra.zoho.auth import ZohoAuthClient
 
 logger = logging.getLogger(__name__)
@@ -64,17 +78,12 @@ KNOWN_MODULE_IDS: Dict[str, str] = {
     "BTEC":                  "5398830000033020716",
 }
 
-# State file — written to backend/ directory (CWD when server runs)
-_STATE_FILE = os.path.normpath(
-    os.path.join(os.path.dirname(__file__), "..", "..", "zoho_rules_state.json")
-)
-
 # ---------------------------------------------------------------------------
 # Module configuration
 # Each module gets TWO webhook entities + TWO workflow rules:
 #   1. create + edit  → "upsert" endpoint
 #   2. delete         → "delete" endpoint
-# Total: 8 modules × 2 = 16 webhooks + 16 rules
+# Total: 9 modules × 2 = 18 webhooks + 18 rules
 # ---------------------------------------------------------------------------
 WORKFLOW_MODULES: List[Dict[str, Any]] = [
     {
@@ -118,19 +127,38 @@ WORKFLOW_MODULES: List[Dict[str, Any]] = [
         "endpoint_upsert": "btec_definition_updated",
         "endpoint_delete": "btec_definition_deleted",
     },
+    {
+        # BTEC Programs — the standard Zoho Products module
+        "module":          "Products",
+        "endpoint_upsert": "program_updated",
+        "endpoint_delete": "program_deleted",
+    },
+]
+
+# (trigger, name suffix, Zoho rule triggers, WORKFLOW_MODULES endpoint key)
+TRIGGERS: List[Tuple[str, str, List[str], str]] = [
+    ("upsert", "create edit", ["create", "edit"], "endpoint_upsert"),
+    ("delete", "delete",      ["delete"],         "endpoint_delete"),
 ]
 
 
+def _spec_hash(*payloads: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payloads, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class _EntityNotFound(RuntimeError):
+    """Zoho has no webhook / rule with the ID we tried to update."""
+
+
 class ZohoWorkflowService:
     """
     Manages Zoho CRM Workflow Rules and their associated Webhook entities.
 
-    Setup is two phases:
-      Phase 1 — create Zoho Webhook entities (one per module/trigger combination)
-      Phase 2 — create Workflow Rules that reference those webhooks by ID
+    Each (module, trigger) is one webhook entity plus the workflow rule that
+    references it by ID; setup_all_rules() reconciles them against Zoho.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, session_factory=SessionLocal) -> None:
         if not (
             settings.ZOHO_CLIENT_ID
             and settings.ZOHO_CLIENT_SECRET
@@ -146,6 +174,7 @@ class ZohoWorkflowService:
             refresh_token=settings.ZOHO_REFRESH_TOKEN,
             region=settings.ZOHO_REGION,
         )
+        self._session_factory = session_factory
 
     # ------------------------------------------------------------------
     # Internal helpers
@@ -304,98 +333,265 @@ class ZohoWorkflowService:
             ],
         }
 
+
+    def desired_automations(
+        self, webhook_base_url: str, module_id_map: Dict[str, str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Desired state: one spec per (module, trigger) with its webhook payload
+        and a hash of webhook + rule (the rule's webhook ID left out, since it
+        is only known once the webhook exists).
+        """
+        specs: List[Dict[str, Any]] = []
+        for m in WORKFLOW_MODULES:
+            module = m["module"]
+            module_id = module_id_map.get(module, "")
+            for trigger, suffix, triggers, endpoint_key in TRIGGERS:
+                name = f"{MZI_PREFIX}{module} - {suffix}"
+                webhook = self._build_zoho_webhook(
+                    name, self._notify_url(webhook_base_url, m[endpoint_key]), module, module_id
+                )
+                rule = self._build_rule(name, module, triggers, webhook_id="")
+                specs.append({
+                    "name": name,
+                    "module": module,
+                    "module_id": module_id,
+                    "trigger": trigger,
+                    "triggers": triggers,
+                    "webhook": webhook,
+                    "spec_hash": _spec_hash(webhook, rule),
+                })
+        return specs
+
     # ------------------------------------------------------------------
-    # State file helpers
+    # State (zoho_automation_state table)
     # ------------------------------------------------------------------
 
-    def _load_state(self) -> Dict[str, Any]:
+    def _load_state(self) -> Dict[str, ZohoAutomation]:
+        """Provisioned rows by name; {} on DB errors (live Zoho names still match)."""
         try:
-            if os.path.exists(_STATE_FILE):
-                with open(_STATE_FILE, "r", encoding="utf-8") as f:
-                    return json.load(f)
+            with self._session_factory() as db:
+                return {row.name: row for row in db.query(ZohoAutomation).all()}
         except Exception as e:
-            logger.warning(f"Could not load rules state: {e}")
-        return {"rules": [], "webhooks": [], "webhook_base_url": ""}
+            logger.warning(f"⚠️ Could not load Zoho automation state: {e}")
+            return {}
 
-    def _save_state(self, state: Dict[str, Any]) -> None:
+    def _save_state(
+        self,
+        webhook_base_url: str,
+        provisioned: List[Dict[str, Any]],
+        keep_names: List[str],
+    ) -> None:
+        """Upsert rows for `provisioned` pairs and drop rows not in `keep_names`."""
+        now = datetime.utcnow()
         try:
-            with open(_STATE_FILE, "w", encoding="utf-8") as f:
-                json.dump(state, f, indent=2, ensure_ascii=False)
-            logger.info(f"Saved state: {len(state.get('rules', []))} rules, "
-                        f"{len(state.get('webhooks', []))} webhooks → {_STATE_FILE}")
+            with self._session_factory() as db:
+                existing = {row.name: row for row in db.query(ZohoAutomation).all()}
+                for name, row in existing.items():
+                    if name not in keep_names:
+                        db.delete(row)
+                for item in provisioned:
+                    row = existing.get(item["name"])
+                    if row is None:
+                        row = ZohoAutomation(name=item["name"])
+                        db.add(row)
+                    row.module = item["module"]
+                    row.trigger = item["trigger"]
+                    row.webhook_id = item["webhook_id"]
+                    row.rule_id = item["rule_id"]
+                    row.webhook_base_url = webhook_base_url
+                    row.spec_hash = item["spec_hash"]
+                    row.synced_at = now
+                db.commit()
         except Exception as e:
-            logger.warning(f"Could not save rules state: {e}")
+            logger.warning(f"⚠️ Could not save Zoho automation state: {e}")
+
+    def _clear_state(self) -> None:
+        try:
+            with self._session_factory() as db:
+                db.query(ZohoAutomation).delete(synchronize_session=False)
+                db.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not clear Zoho automation state: {e}")
 
     # ------------------------------------------------------------------
-    # Zoho Webhook entity CRUD
+    # Zoho Webhook entity / Workflow Rule CRUD
     # ------------------------------------------------------------------
 
-    async def _create_zoho_webhook(
+    async def _list_live(
         self,
         client: httpx.AsyncClient,
         headers: Dict[str, str],
-        name: str,
-        notify_url: str,
-        module: str,
-        module_id: str,
-    ) -> Optional[str]:
-        """
-        Create one Zoho Webhook entity and return its Zoho-assigned ID.
-        Returns None on failure.
-        """
-        payload = self._build_zoho_webhook(name, notify_url, module, module_id)
+        url: str,
+        key: str,
+    ) -> Optional[Dict[str, List[str]]]:
+        """MZI-named webhooks / rules in Zoho as name → [ids]; None if Zoho can't be read."""
         try:
-            resp = await client.post(
-                ZOHO_WEBHOOKS_URL,
-                headers=headers,
-                json={"webhooks": [payload]},
-            )
-            logger.info(f"  [Webhook '{name}'] HTTP {resp.status_code}")
-            if resp.status_code not in (200, 201):
-                logger.warning(f"  Webhook creation failed: {resp.text[:400]}")
-                return None
-            data = resp.json()
-            items = data.get("webhooks", [])
-            if not items:
-                logger.warning(f"  Empty webhooks response: {resp.text[:200]}")
-                return None
-            item = items[0]
-            details = item.get("details", item)
-            webhook_id = str(details.get("id", ""))
-            if webhook_id:
-                logger.info(f"  Webhook '{name}' created  id={webhook_id}")
-            else:
-                logger.warning(f"  Webhook created but no id returned: {item}")
-            return webhook_id or None
+            resp = await client.get(url, headers=headers)
         except Exception as e:
-            logger.warning(f"  Exception creating webhook '{name}': {e}")
+            logger.warning(f"Could not list Zoho {key}: {e}")
+            return None
+        if resp.status_code == 204:
+            return {}
+        if resp.status_code != 200:
+            logger.warning(f"Could not list Zoho {key}: HTTP {resp.status_code} {resp.text[:150]}")
             return None
+        live: Dict[str, List[str]] = {}
+        for item in resp.json().get(key, []):
+            name = item.get("name", "")
+            if name.startswith(MZI_PREFIX) and item.get("id"):
+                live.setdefault(name, []).append(str(item["id"]))
+        return live
+
+    async def _write_entity(
+        self,
+        client: httpx.AsyncClient,
+        headers: Dict[str, str],
+        url: str,
+        key: str,
+        payload: Dict[str, Any],
+        entity_id: Optional[str] = None,
+    ) -> str:
+        """
+        Update (PUT) `entity_id` in place, or create (POST) when None.
+        Returns the entity's Zoho ID; raises RuntimeError on any rejection
+        (_EntityNotFound when the entity to update does not exist).
+        """
+        method = "PUT" if entity_id else "POST"
+        target = f"{url}/{entity_id}" if entity_id else url
+        resp = await client.request(method, target, headers=headers, json={key: [payload]})
+        logger.info(f"  [{payload['name']}] {method} {key} HTTP {resp.status_code}")
+        if entity_id and resp.status_code == 404:
+            raise _EntityNotFound(f"HTTP 404: {resp.text[:300]}")
+        if resp.status_code not in (200, 201):
+            hint = (f" (check OAuth scope for {key})" if resp.status_code == 401 else "")
+            raise RuntimeError(f"HTTP {resp.status_code}: {resp.text[:300]}{hint}")
+        items = resp.json().get(key, [])
+        item = items[0] if items else {}
+        if item.get("status") == "error":
+            if entity_id and item.get("code") in ("NOT_FOUND", "RECORD_NOT_FOUND"):
+                raise _EntityNotFound(item.get("message", str(item)))
+            raise RuntimeError(item.get("message", str(item)))
+        new_id = str(item.get("details", item).get("id", "") or entity_id or "")
+        if not new_id:
+            raise RuntimeError(f"No id returned: {resp.text[:200]}")
+        return new_id
+
+    async def _upsert_entity(
+        self,
+        client: httpx.AsyncClient,
+        headers: Dict[str, str],
+        url: str,
+        key: str,
+        payload: Dict[str, Any],
+        entity_id: Optional[str],
+    ) -> str:
+        """
+        Update in place; create a replacement only when Zoho no longer has
+        `entity_id`.  Any other rejection is raised, so a transient failure
+        never leaves a duplicate behind.
+        """
+        if entity_id:
+            try:
+                return await self._write_entity(client, headers, url, key, payload, entity_id)
+            except _EntityNotFound as e:
+                logger.warning(f"  [{payload['name']}] {entity_id} not found ({e}) — recreating")
+        return await self._write_entity(client, headers, url, key, payload)
 
-    async def _delete_zoho_webhooks(
+    async def _delete_entities(
+        self,
+        client: httpx.AsyncClient,
+        headers: Dict[str, str],
+        url: str,
+        ids: List[str],
+        semaphore: asyncio.Semaphore,
+    ) -> Tuple[int, int]:
+        """Delete webhooks / rules by ID concurrently. Returns (deleted, failed)."""
+
+        async def delete(entity_id: str) -> bool:
+            async with semaphore:
+                try:
+                    resp = await client.delete(f"{url}/{entity_id}", headers=headers)
+                except Exception as e:
+                    logger.warning(f"  Error deleting {entity_id}: {e}")
+                    return False
+            if resp.status_code in (200, 204):
+                logger.info(f"  Deleted {entity_id}")
+                return True
+            logger.warning(
+                f"  Failed to delete {entity_id}: HTTP {resp.status_code} {resp.text[:150]}"
+            )
+            return False
+
+        done = await asyncio.gather(*(delete(i) for i in ids))
+        deleted = sum(done)
+        return deleted, len(done) - deleted
+
+    @staticmethod
+    def _current_id(
+        name: str, saved_id: Optional[str], live: Optional[Dict[str, List[str]]]
+    ) -> Optional[str]:
+        """The Zoho ID to reuse for `name`: the saved one if still live, else a live namesake."""
+        if live is None:
+            return saved_id
+        ids = live.get(name, [])
+        if saved_id in ids:
+            return saved_id
+        return ids[0] if ids else None
+
+    async def _reconcile(
         self,
         client: httpx.AsyncClient,
         headers: Dict[str, str],
-        webhook_ids: List[str],
-    ) -> int:
-        """Delete Zoho Webhook entities by ID list. Returns count deleted."""
-        deleted = 0
-        for wh_id in webhook_ids:
+        spec: Dict[str, Any],
+        row: Optional[ZohoAutomation],
+        live_webhooks: Optional[Dict[str, List[str]]],
+        live_rules: Optional[Dict[str, List[str]]],
+        semaphore: asyncio.Semaphore,
+    ) -> Dict[str, Any]:
+        """Bring one (module, trigger) pair in line with `spec`."""
+        name = spec["name"]
+        webhook_id = self._current_id(name, row.webhook_id if row else None, live_webhooks)
+        rule_id = self._current_id(name, row.rule_id if row else None, live_rules)
+        result = {
+            "name": name,
+            "module": spec["module"],
+            "trigger": spec["trigger"],
+            "spec_hash": spec["spec_hash"],
+            "webhook_id": webhook_id,
+            "rule_id": rule_id,
+        }
+
+        if (
+            row is not None
+            and row.spec_hash == spec["spec_hash"]
+            and webhook_id and webhook_id == row.webhook_id
+            and rule_id and rule_id == row.rule_id
+        ):
+            return {**result, "status": "unchanged"}
+        if not spec["module_id"]:
+            return {**result, "status": "error", "error": (
+                f"Unknown module ID for {spec['module']} — "
+                "re-generate OAuth token with ZohoCRM.settings.modules.ALL scope."
+            )}
+
+        async with semaphore:
             try:
-                resp = await client.delete(
-                    f"{ZOHO_WEBHOOKS_URL}/{wh_id}",
-                    headers=headers,
+                new_webhook_id = await self._upsert_entity(
+                    client, headers, ZOHO_WEBHOOKS_URL, "webhooks", spec["webhook"], webhook_id
+                )
+                rule = self._build_rule(name, spec["module"], spec["triggers"], new_webhook_id)
+                new_rule_id = await self._upsert_entity(
+                    client, headers, ZOHO_WORKFLOW_URL, "workflow_rules", rule, rule_id
                 )
-                if resp.status_code in (200, 204):
-                    deleted += 1
-                    logger.info(f"  Deleted webhook {wh_id}")
-                else:
-                    logger.warning(
-                        f"  Failed to delete webhook {wh_id}: "
-                        f"HTTP {resp.status_code} {resp.text[:150]}"
-                    )
             except Exception as e:
-                logger.warning(f"  Error deleting webhook {wh_id}: {e}")
-        return deleted
+                logger.warning(f"  [{name}] Failed: {e}")
+                # Whatever already exists in Zoho keeps firing until the next run
+                return {**result, "status": "error", "error": str(e)}
+
+        status = "updated" if (webhook_id or rule_id) else "created"
+        logger.info(f"  [{name}] {status} (webhook_id={new_webhook_id}, rule_id={new_rule_id})")
+        return {**result, "status": status, "webhook_id": new_webhook_id, "rule_id": new_rule_id}
 
     # ------------------------------------------------------------------
     # Public API
@@ -403,173 +599,111 @@ class ZohoWorkflowService:
 
     async def setup_all_rules(self, webhook_base_url: str) -> Dict[str, Any]:
         """
-        Create all 14 Webhook entities + 14 Workflow Rules in Zoho CRM.
-        Deletes any existing MZI objects first (idempotent — safe to call multiple times).
+        Provision all Webhook entities + Workflow Rules in Zoho CRM (18 of each).
+
+        Diff-based and idempotent: unchanged pairs are skipped, changed ones
+        updated in place, missing ones created; MZI objects no longer referenced
+        are deleted last, after everything desired is in place.
 
         Args:
             webhook_base_url: Public base URL of this backend.
                 e.g. "https://polyphyletically-unnagged-amare.ngrok-free.app"
         """
-        # ---------------------------------------------------------------
-        # Phase 0: Clean up existing MZI rules and webhooks
-        # ---------------------------------------------------------------
-        delete_result = await self.delete_all_rules()
-        logger.info(f"Pre-cleanup: deleted {delete_result.get('deleted_rules', 0)} rules, "
-                    f"{delete_result.get('deleted_webhooks', 0)} webhooks.")
-
-        # ---------------------------------------------------------------
-        # Phase 1: Create Zoho Webhook entities (one per trigger type per module)
-        # ---------------------------------------------------------------
         headers = await self._headers()
-        created_webhooks: List[Dict] = []
-        errors: List[Any] = []
-
-        # Map from (module, trigger_type) → webhook_id
-        webhook_id_map: Dict[str, str] = {}
-
-        # ---------------------------------------------------------------
-        # Phase 0b: Resolve module IDs (needed by Zoho webhook creation API)
-        # ---------------------------------------------------------------
-        module_names = [m["module"] for m in WORKFLOW_MODULES]
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            module_id_map = await self._fetch_module_ids(client, headers, module_names)
+        saved = self._load_state()
+        semaphore = asyncio.Semaphore(max(1, settings.ZOHO_AUTOMATION_CONCURRENCY))
 
         async with httpx.AsyncClient(timeout=30.0) as client:
-            logger.info(f"Phase 1: Creating {len(WORKFLOW_MODULES) * 2} Webhook entities...")
-            for m in WORKFLOW_MODULES:
-                module = m["module"]
-                module_id = module_id_map.get(module, "")
-                if not module_id:
-                    err_msg = (
-                        f"Unknown module ID for {module} — "
-                        "re-generate OAuth token with ZohoCRM.settings.modules.ALL scope."
-                    )
-                    errors.append({"name": f"{MZI_PREFIX}{module}", "error": err_msg})
-                    logger.error(f"  {err_msg}")
-                    continue
-
-                # Upsert webhook
-                upsert_name = f"{MZI_PREFIX}{module} - create edit"
-                upsert_url = self._notify_url(webhook_base_url, m["endpoint_upsert"])
-                upsert_id = await self._create_zoho_webhook(
-                    client, headers, upsert_name, upsert_url, module, module_id
-                )
-                if upsert_id:
-                    webhook_id_map[f"{module}:upsert"] = upsert_id
-                    created_webhooks.append({"webhook_id": upsert_id, "name": upsert_name})
-                else:
-                    errors.append({"name": upsert_name, "error": "Webhook entity creation failed"})
-
-                # Delete webhook
-                delete_name = f"{MZI_PREFIX}{module} - delete"
-                delete_url = self._notify_url(webhook_base_url, m["endpoint_delete"])
-                delete_id = await self._create_zoho_webhook(
-                    client, headers, delete_name, delete_url, module, module_id
-                )
-                if delete_id:
-                    webhook_id_map[f"{module}:delete"] = delete_id
-                    created_webhooks.append({"webhook_id": delete_id, "name": delete_name})
-                else:
-                    errors.append({"name": delete_name, "error": "Webhook entity creation failed"})
+            # -----------------------------------------------------------
+            # Actual state: live MZI objects (by name) + module IDs
+            # -----------------------------------------------------------
+            live_webhooks, live_rules, module_id_map = await asyncio.gather(
+                self._list_live(client, headers, ZOHO_WEBHOOKS_URL, "webhooks"),
+                self._list_live(client, headers, ZOHO_WORKFLOW_URL, "workflow_rules"),
+                self._fetch_module_ids(client, headers, [m["module"] for m in WORKFLOW_MODULES]),
+            )
 
-        # ---------------------------------------------------------------
-        # Phase 2: Create Workflow Rules referencing webhook IDs
-        # ---------------------------------------------------------------
-        created_rules: List[Dict] = []
+            # -----------------------------------------------------------
+            # Create / update what differs from the desired state
+            # -----------------------------------------------------------
+            specs = self.desired_automations(webhook_base_url, module_id_map)
+            results = await asyncio.gather(*(
+                self._reconcile(client, headers, spec, saved.get(spec["name"]),
+                                live_webhooks, live_rules, semaphore)
+                for spec in specs
+            ))
+
+            # -----------------------------------------------------------
+            # Delete stale MZI objects — replacements already exist
+            # -----------------------------------------------------------
+            keep = {r["webhook_id"] for r in results} | {r["rule_id"] for r in results}
+            known_webhooks = {row.webhook_id for row in saved.values()}
+            known_rules = {row.rule_id for row in saved.values()}
+            for live, known in ((live_webhooks, known_webhooks), (live_rules, known_rules)):
+                for ids in (live or {}).values():
+                    known.update(ids)
+            # Rules first: a rule must not outlive the webhook it points to
+            deleted_rules, failed_rules = await self._delete_entities(
+                client, headers, ZOHO_WORKFLOW_URL,
+                sorted(i for i in known_rules - keep if i), semaphore,
+            )
+            deleted_webhooks, failed_webhooks = await self._delete_entities(
+                client, headers, ZOHO_WEBHOOKS_URL,
+                sorted(i for i in known_webhooks - keep if i), semaphore,
+            )
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            logger.info(f"Phase 2: Creating {len(WORKFLOW_MODULES) * 2} Workflow Rules...")
-            for m in WORKFLOW_MODULES:
-                module = m["module"]
-
-                for trigger_type, key_suffix, rule_suffix, triggers in [
-                    ("upsert", "upsert", "create edit", ["create", "edit"]),
-                    ("delete", "delete", "delete",       ["delete"]),
-                ]:
-                    rule_name = f"{MZI_PREFIX}{module} - {rule_suffix}"
-                    wh_id = webhook_id_map.get(f"{module}:{key_suffix}")
-
-                    if not wh_id:
-                        errors.append({"name": rule_name, "error": "No webhook ID available — skipped"})
-                        continue
-
-                    rule_payload = self._build_rule(
-                        rule_name=rule_name,
-                        module=module,
-                        triggers=triggers,
-                        webhook_id=wh_id,
-                    )
-                    try:
-                        resp = await client.post(
-                            ZOHO_WORKFLOW_URL,
-                            headers=headers,
-                            json={"workflow_rules": [rule_payload]},
-                        )
-                        logger.info(f"  [{rule_name}] HTTP {resp.status_code}")
-
-                        if resp.status_code not in (200, 201):
-                            body = resp.text[:300]
-                            hint = (" (check OAuth scope: ZohoCRM.settings.workflow_rules.ALL)"
-                                    if resp.status_code == 401 else "")
-                            errors.append({"name": rule_name, "error": f"HTTP {resp.status_code}: {body}{hint}"})
-                            logger.warning(f"  [{rule_name}] Failed: {body}")
-                            continue
-
-                        data = resp.json()
-                        items = data.get("workflow_rules", [])
-                        item = items[0] if items else {}
-                        details = item.get("details", item)
-                        rule_id = str(details.get("id", ""))
-
-                        if item.get("status") == "error" or not rule_id:
-                            errors.append({"name": rule_name, "error": item.get("message", str(item))})
-                            logger.warning(f"  [{rule_name}] Zoho error: {item}")
-                        else:
-                            created_rules.append({
-                                "rule_id": rule_id,
-                                "name": rule_name,
-                                "webhook_id": wh_id,
-                                "status": "created",
-                            })
-                            logger.info(f"  [{rule_name}] Created (rule_id={rule_id})")
-
-                    except Exception as e:
-                        errors.append({"name": rule_name, "error": str(e)})
-                        logger.warning(f"  [{rule_name}] Exception: {e}")
-
-        # ---------------------------------------------------------------
-        # Phase 3: Persist state
-        # ---------------------------------------------------------------
-        self._save_state({
-            "webhook_base_url": webhook_base_url,
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "rules": created_rules,
-            "webhooks": created_webhooks,
-        })
+        ok = [r for r in results if r["status"] != "error"]
+        errors = [{"name": r["name"], "error": r["error"]} for r in results if r["status"] == "error"]
+        self._save_state(
+            webhook_base_url,
+            [r for r in ok if r["status"] != "unchanged"],
+            # failed pairs keep their previous row (and objects) until a later run fixes them
+            [r["name"] for r in results],
+        )
 
-        total = len(WORKFLOW_MODULES) * 2
-        success_count = len(created_rules)
+        counts = {s: sum(1 for r in results if r["status"] == s) for s in ("created", "updated", "unchanged")}
+        total = len(specs)
         logger.info(
-            f"Setup done: {success_count}/{total} rules created, "
-            f"{len(created_webhooks)} webhooks created, {len(errors)} errors."
+            f"Setup done: {len(ok)}/{total} rules in place ({counts['created']} created, "
+            f"{counts['updated']} updated, {counts['unchanged']} unchanged), "
+            f"{deleted_rules} stale rules + {deleted_webhooks} stale webhooks deleted, "
+            f"{len(errors)} errors."
         )
 
         return {
-            "success": success_count == total and len(errors) == 0,
-            "created": success_count,
+            "success": len(ok) == total and not errors,
+            "provisioned": len(ok),
             "total": total,
+            **counts,
+            "deleted_old": deleted_rules,
+            "deleted": {
+                "deleted_rules": deleted_rules,
+                "deleted_webhooks": deleted_webhooks,
+                "failed_rules": failed_rules,
+                "failed_webhooks": failed_webhooks,
+            },
             "errors": errors,
             "webhook_base_url": webhook_base_url,
-            "rules": created_rules,
-            "webhooks_created": len(created_webhooks),
-            "deleted_old": delete_result,
+            "rules": [
+                {k: r[k] for k in ("rule_id", "name", "webhook_id", "status")} for r in ok
+            ],
         }
 
     async def list_rules(self) -> Dict[str, Any]:
         """
         Return saved rule state + live count from Zoho API.
         """
-        state = self._load_state()
+        saved = self._load_state()
+        saved_rules = [
+            {
+                "rule_id": row.rule_id,
+                "name": row.name,
+                "webhook_id": row.webhook_id,
+                "synced_at": row.synced_at.isoformat() if row.synced_at else None,
+            }
+            for row in sorted(saved.values(), key=lambda r: r.name)
+        ]
+        saved_base_url = next((row.webhook_base_url for row in saved.values() if row.webhook_base_url), "")
 
         try:
             headers = await self._headers()
@@ -580,8 +714,8 @@ class ZohoWorkflowService:
                 all_rules = resp.json().get("workflow_rules", [])
                 mzi_rules = [r for r in all_rules if r.get("name", "").startswith(MZI_PREFIX)]
                 return {
-                    "saved_rules":       state.get("rules", []),
-                    "saved_base_url":    state.get("webhook_base_url", ""),
+                    "saved_rules":       saved_rules,
+                    "saved_base_url":    saved_base_url,
                     "zoho_live_count":   len(mzi_rules),
                     "zoho_live_rules":   [
                         {"id": r.get("id"), "name": r.get("name"), "active": r.get("active")}
@@ -590,7 +724,7 @@ class ZohoWorkflowService:
                 }
             elif resp.status_code == 204:
                 return {
-                    "saved_rules":     state.get("rules", []),
+                    "saved_rules":     saved_rules,
                     "zoho_live_count": 0,
                     "zoho_live_rules": [],
                 }
@@ -600,8 +734,8 @@ class ZohoWorkflowService:
             logger.warning(f"Could not fetch live rules from Zoho: {e}")
 
         return {
-            "saved_rules":     state.get("rules", []),
-            "saved_base_url":  state.get("webhook_base_url", ""),
+            "saved_rules":     saved_rules,
+            "saved_base_url":  saved_base_url,
             "zoho_live_rules": None,
             "note": "Could not reach Zoho API — showing saved state only.",
         }
@@ -609,84 +743,32 @@ class ZohoWorkflowService:
     async def delete_all_rules(self) -> Dict[str, Any]:
         """
         Delete all MZI-managed Workflow Rules AND Webhook entities from Zoho CRM.
-        Uses saved state file first; falls back to searching Zoho by name prefix.
+        Targets the saved IDs plus anything in Zoho carrying the MZI name prefix.
         """
-        state = self._load_state()
-        saved_rules = state.get("rules", [])
-        saved_webhooks = state.get("webhooks", [])
-
+        saved = self._load_state()
         headers = await self._headers()
-
-        # Fallback: if no saved rule IDs, search Zoho by name prefix
-        if not saved_rules:
-            logger.info("No saved rule IDs — searching Zoho by name prefix...")
-            try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    resp = await client.get(ZOHO_WORKFLOW_URL, headers=headers)
-                if resp.status_code == 200:
-                    all_rules = resp.json().get("workflow_rules", [])
-                    saved_rules = [
-                        {"rule_id": str(r["id"]), "name": r.get("name", "")}
-                        for r in all_rules
-                        if r.get("name", "").startswith(MZI_PREFIX) and r.get("id")
-                    ]
-                    logger.info(f"Found {len(saved_rules)} MZI rules in Zoho by name.")
-            except Exception as e:
-                logger.warning(f"Could not fetch rules for deletion: {e}")
-
-        # Fallback: if no saved webhook IDs, search Zoho by name prefix
-        if not saved_webhooks:
-            logger.info("No saved webhook IDs — searching Zoho webhooks by name prefix...")
-            try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    resp = await client.get(ZOHO_WEBHOOKS_URL, headers=headers)
-                if resp.status_code == 200:
-                    all_wh = resp.json().get("webhooks", [])
-                    saved_webhooks = [
-                        {"webhook_id": str(w["id"]), "name": w.get("name", "")}
-                        for w in all_wh
-                        if w.get("name", "").startswith(MZI_PREFIX) and w.get("id")
-                    ]
-                    logger.info(f"Found {len(saved_webhooks)} MZI webhooks in Zoho by name.")
-            except Exception as e:
-                logger.warning(f"Could not fetch webhooks for deletion: {e}")
-
-        deleted_rules = 0
-        failed_rules = 0
-        deleted_webhooks = 0
+        semaphore = asyncio.Semaphore(max(1, settings.ZOHO_AUTOMATION_CONCURRENCY))
 
         async with httpx.AsyncClient(timeout=30.0) as client:
-            # Delete workflow rules
-            for rule in saved_rules:
-                rule_id = rule.get("rule_id") or rule.get("id")
-                if not rule_id:
-                    continue
-                try:
-                    resp = await client.delete(
-                        f"{ZOHO_WORKFLOW_URL}/{rule_id}",
-                        headers=headers,
-                    )
-                    if resp.status_code in (200, 204):
-                        deleted_rules += 1
-                        logger.info(f"Deleted rule {rule_id}: {rule.get('name', '')}")
-                    else:
-                        failed_rules += 1
-                        logger.warning(
-                            f"Failed to delete rule {rule_id}: "
-                            f"HTTP {resp.status_code} — {resp.text[:150]}"
-                        )
-                except Exception as e:
-                    failed_rules += 1
-                    logger.warning(f"Error deleting rule {rule_id}: {e}")
-
-            # Delete webhook entities
-            wh_ids = [w.get("webhook_id") or w.get("id") for w in saved_webhooks if w]
-            deleted_webhooks = await self._delete_zoho_webhooks(
-                client, headers, [wid for wid in wh_ids if wid]
+            live_webhooks, live_rules = await asyncio.gather(
+                self._list_live(client, headers, ZOHO_WEBHOOKS_URL, "webhooks"),
+                self._list_live(client, headers, ZOHO_WORKFLOW_URL, "workflow_rules"),
+            )
+            rule_ids = {row.rule_id for row in saved.values() if row.rule_id}
+            webhook_ids = {row.webhook_id for row in saved.values() if row.webhook_id}
+            for ids in (live_rules or {}).values():
+                rule_ids.update(ids)
+            for ids in (live_webhooks or {}).values():
+                webhook_ids.update(ids)
+
+            deleted_rules, failed_rules = await self._delete_entities(
+                client, headers, ZOHO_WORKFLOW_URL, sorted(rule_ids), semaphore
+            )
+            deleted_webhooks, _ = await self._delete_entities(
+                client, headers, ZOHO_WEBHOOKS_URL, sorted(webhook_ids), semaphore
             )
 
-        # Clear state file
-        self._save_state({"rules": [], "webhooks": [], "webhook_base_url": ""})
+        self._clear_state()
 
         logger.info(
             f"Deletion complete: {deleted_rules} rules deleted, "
@@ -696,6 +778,6 @@ class ZohoWorkflowService:
             "deleted_rules": deleted_rules,
             "deleted_webhooks": deleted_webhooks,
             "failed_rules": failed_rules,
-            "total_rules": len(saved_rules),
-            "total_webhooks": len(saved_webhooks),
+            "total_rules": len(rule_ids),
+            "total_webhooks": len(webhook_ids),
         }
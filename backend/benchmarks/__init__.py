@@ -0,0 +1,16 @@
+"""
+Offline benchmark harness — no production Zoho / Moodle needed.
+
+  dataset.py  – synthetic tenants (Zoho-shaped records, 1k–100k+)
+  stubs.py    – in-process fake Zoho CRM v2 + Moodle REST (latency, errors,
+                pagination, 'Duplicate entry' / parent 'not found' semantics)
+  run.py      – scenarios (full_sync, webhooks, ingest) + report / compare
+  loadgen.py  – open-loop webhook load at fixed rates → latency / throughput
+                curve, event-loop lag and the sustainable rate for an SLO
+
+Usage:
+  python -m benchmarks.run full_sync --records 10000 --zoho-latency-ms 40
+  python -m benchmarks.run webhooks --records 5000 --concurrency 50 --json out.json
+  python -m benchmarks.run ingest --records 20000 --compare baseline.json
+  python -m benchmarks.loadgen --rates 10,25,50,100,200 --duration 10 --json curve.json
+"""
@@ -0,0 +1,137 @@
+"""
+Synthetic tenant generator — Zoho-shaped records for every synced module.
+
+Per student (on average): 1 registration, 3 payments, 4 enrollments,
+4 grades, 0.2 requests; one class per 25 students, one teacher per 3 classes,
+10 programs.  `records` is the approximate total across all modules.
+"""
+import random
+from typing import Dict, List
+
+# Zoho module name → entity key used by the generator
+MODULES = {
+    "Products":              "programs",
+    "BTEC_Teachers":         "teachers",
+    "BTEC_Students":         "students",
+    "BTEC_Classes":          "classes",
+    "BTEC_Registrations":    "registrations",
+    "BTEC_Payments":         "payments",
+    "BTEC_Enrollments":      "enrollments",
+    "BTEC_Grades":           "grades",
+    "BTEC_Student_Requests": "requests",
+}
+
+RECORDS_PER_STUDENT = 13.3   # incl. the student row and its share of classes/teachers
+PROGRAM_COUNT = 10
+
+_TS = "2026-01-15T09:30:00+03:00"
+
+
+def _ids(prefix: int, n: int) -> List[str]:
+    return [f"58430170{prefix:02d}{i:09d}" for i in range(1, n + 1)]
+
+
+def _lookup(record_id: str, name: str) -> Dict[str, str]:
+    return {"id": record_id, "name": name}
+
+
+def build_tenant(records: int, seed: int = 0) -> Dict[str, List[Dict]]:
+    """Return {zoho_module: [record, ...]} with ~`records` records in total."""
+    rng = random.Random(seed)
+    n_students = max(1, int(records / RECORDS_PER_STUDENT))
+    n_classes = max(2, n_students // 25)
+    n_teachers = max(1, n_classes // 3)
+
+    program_ids = _ids(1, PROGRAM_COUNT)
+    teacher_ids = _ids(2, n_teachers)
+    student_ids = _ids(3, n_students)
+    class_ids = _ids(4, n_classes)
+
+    tenant: Dict[str, List[Dict]] = {module: [] for module in MODULES}
+
+    tenant["Products"] = [
+        {"id": pid, "Product_Name": f"BTEC Program {i}", "MoodleID": str(100 + i),
+         "Program_Price": 4000 + 250 * i, "Status": "Active"}
+        for i, pid in enumerate(program_ids, start=1)
+    ]
+    tenant["BTEC_Teachers"] = [
+        {"id": tid, "Name": f"Teacher {i}", "Email": f"teacher{i}@example.edu",
+         "Academic_Email": f"teacher{i}@example.edu", "Teacher_Moodle_ID": str(5000 + i),
+         "Created_Time": _TS, "Modified_Time": _TS}
+        for i, tid in enumerate(teacher_ids, start=1)
+    ]
+    tenant["BTEC_Students"] = [
+        {"id": sid, "Name": f"A{i:07d}", "First_Name": "Student", "Last_Name": str(i),
+         "Display_Name": f"Student {i}", "Academic_Email": f"s{i}@example.edu",
+         "Phone_Number": f"+9627{i:08d}", "Status": "Active",
+         "Created_Time": _TS, "Modified_Time": _TS}
+        for i, sid in enumerate(student_ids, start=1)
+    ]
+    tenant["BTEC_Classes"] = [
+        {"id": cid, "Class_Name": f"Class {i}", "Class_Short_Name": f"C{i}",
+         "BTEC_Program": _lookup(program_ids[i % PROGRAM_COUNT], f"BTEC Program {i % PROGRAM_COUNT + 1}"),
+         "Teacher": _lookup(teacher_ids[i % n_teachers], f"Teacher {i % n_teachers + 1}"),
+         "Class_Status": "Active", "Class_Major": "IT" if i % 4 == 0 else "Business",
+         # Half the classes already have a Moodle course, half get one created
+         "Moodle_Class_ID": str(9000 + i) if i % 2 else None,
+         "Start_Date": "2026-02-01", "End_Date": "2026-06-30",
+         "Created_Time": _TS, "Modified_Time": _TS}
+        for i, cid in enumerate(class_ids, start=1)
+    ]
+
+    reg_seq = pay_seq = enr_seq = grade_seq = req_seq = 0
+    for s_idx, sid in enumerate(student_ids, start=1):
+        student = _lookup(sid, f"Student {s_idx}")
+
+        reg_seq += 1
+        reg_id = f"5843017005{reg_seq:09d}"
+        program = program_ids[s_idx % PROGRAM_COUNT]
+        tenant["BTEC_Registrations"].append({
+            "id": reg_id, "Student_ID": student, "Program": _lookup(program, "BTEC Program"),
+            "Registration_Number": f"REG-{reg_seq:06d}", "Registration_Date": "2026-01-10",
+            "Registration_Status": "Active", "Program_Price": 6000, "Paid_Amount": 3000,
+            "Remaining_Amount": 3000, "Currency": "JOD", "Study_Mode": "Full Time",
+            "Payment_Schedule": [
+                {"Installment_No": n, "Due_Date": f"2026-0{n + 1}-01",
+                 "Installment_Amount": 2000, "Installment_Status": "Paid" if n == 1 else "Pending"}
+                for n in (1, 2, 3)
+            ],
+            "Created_Time": _TS, "Modified_Time": _TS,
+        })
+        for _ in range(3):
+            pay_seq += 1
+            tenant["BTEC_Payments"].append({
+                "id": f"5843017006{pay_seq:09d}", "Name": f"PAY-{pay_seq:06d}",
+                "Registration_ID": _lookup(reg_id, f"REG-{reg_seq:06d}"), "Student_ID": student,
+                "Payment_Amount": 1000, "Payment_Date": "2026-01-20",
+                "Payment_Method": "Cash", "Payment_Status": "Confirmed",
+                "Created_Time": _TS, "Modified_Time": _TS,
+            })
+        for cid in rng.sample(class_ids, k=min(4, n_classes)):
+            enr_seq += 1
+            tenant["BTEC_Enrollments"].append({
+                "id": f"5843017007{enr_seq:09d}", "Enrolled_Students": student,
+                "Classes": _lookup(cid, "Class"), "Start_Date": "2026-02-01",
+                "Enrollment_Status": "Active", "Created_Time": _TS, "Modified_Time": _TS,
+            })
+            grade_seq += 1
+            tenant["BTEC_Grades"].append({
+                "id": f"5843017008{grade_seq:09d}", "Student": student, "Class": _lookup(cid, "Class"),
+                "Assignment_Name": "Assignment 1", "BTEC_Grade_Name": rng.choice(["P", "M", "D", "R"]),
+                "Grade": rng.randint(40, 100), "Attempt_Number": 1, "Grade_Status": "Final",
+                "Attempt_Date": "2026-03-01", "Created_Time": _TS, "Modified_Time": _TS,
+            })
+        if rng.random() < 0.2:
+            req_seq += 1
+            tenant["BTEC_Student_Requests"].append({
+                "id": f"5843017009{req_seq:09d}", "Student": student,
+                "Request_Type": "Enroll Next Semester", "Status": "Submitted",
+                "Reason": "Benchmark", "Request_Date": "2026-03-05",
+                "Created_Time": _TS, "Modified_Time": _TS,
+            })
+
+    return tenant
+
+
+def count_records(tenant: Dict[str, List[Dict]]) -> int:
+    return sum(len(v) for v in tenant.values())
@@ -0,0 +1,387 @@
+"""
+Webhook load generator — latency vs. throughput for the Zoho notification routes.
+
+Boots the app under uvicorn in a background thread (own event loop, fake
+Zoho / Moodle installed, temp SQLite DB) — or targets an already running app
+with --target — and replays webhook bodies at a ladder of fixed rates:
+
+  dashboard – /webhooks/student-dashboard/* (webhooks_dashboard_sync)
+  courses   – /webhooks/student-dashboard/class_updated (webhooks_moodle_courses)
+  events    – /events/zoho/* (events.py, HMAC verified)
+
+Bodies are synthetic ({"zoho_id", "module"} / Zoho notification shapes) or
+replayed from a capture file (--replay, JSON lines of {"path", "body",
+"content_type"}); --shape picks JSON, form-urlencoded or a mix.  Every request
+carries X-Zoho-Signature: sha256=<HMAC of the body>.
+
+Load is open-loop: request i is due at start + i / rate whatever happened to
+earlier ones, and latency is measured from that due time, so a stalled server
+shows up as latency instead of silently lowering the offered rate.
+
+Each step reports achieved rate, p50/p95/p99, errors, requests over the SLO
+(default: Zoho's 10 s webhook timeout) and the server event-loop lag.  A step
+is saturated when throughput falls below 90 % of the offered rate, p99
+passes the SLO, or loop lag p99 passes --max-loop-lag-ms; the last
+unsaturated rate is the sustainable rate.
+
+Usage:
+  python -m benchmarks.loadgen --routes dashboard,events --rates 10,25,50,100 --duration 10
+  python -m benchmarks.loadgen --target http://127.0.0.1:8001 --replay captured.jsonl --json curve.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+
+from benchmarks.run import add_environment_args, bench_environment, configure_logging, percentile
+
+BENCH_SECRET = "bench-webhook-secret"
+
+DASHBOARD_ROUTES = [
+    ("student_updated",        "BTEC_Students"),
+    ("registration_created",   "BTEC_Registrations"),
+    ("payment_recorded",       "BTEC_Payments"),
+    ("enrollment_updated",     "BTEC_Enrollments"),
+    ("grade_submitted",        "BTEC_Grades"),
+    ("request_status_changed", "BTEC_Student_Requests"),
+]
+COURSE_ROUTES = [("class_updated", "BTEC_Classes")]
+EVENT_ROUTES = [
+    ("student",    "BTEC_Students"),
+    ("enrollment", "BTEC_Enrollments"),
+    ("grade",      "BTEC_Grades"),
+    ("payment",    "BTEC_Payments"),
+]
+# Only /events/zoho/student parses Zoho's form-data ("Default") format
+FORM_EVENT_ROUTES = {"student"}
+
+
+@dataclass
+class WebhookRequest:
+    path: str
+    body: bytes
+    content_type: str
+
+
+@dataclass
+class StepResult:
+    offered_rps: float
+    sent: int
+    completed: int
+    achieved_rps: float
+    errors: int
+    over_slo: int
+    errors_by_path: Dict[str, int]
+    latency_p50_ms: Optional[float]
+    latency_p95_ms: Optional[float]
+    latency_p99_ms: Optional[float]
+    loop_lag_p99_ms: Optional[float]
+    loop_lag_max_ms: Optional[float]
+    saturated: bool = False
+    reasons: List[str] = field(default_factory=list)
+
+
+# ===========================================================================
+# BODIES
+# ===========================================================================
+
+def sign(body: bytes, secret: str = BENCH_SECRET) -> str:
+    from app.core.security import HMACVerifier
+    return "sha256=" + HMACVerifier.generate_signature(body.decode("utf-8"), secret)
+
+
+def _encode(fields: Dict, use_json: bool) -> Tuple[bytes, str]:
+    if use_json:
+        return json.dumps(fields).encode(), "application/json"
+    return urlencode(fields).encode(), "application/x-www-form-urlencoded"
+
+
+def synthetic_requests(tenant: Dict[str, List[Dict]], routes: List[str], shape: str,
+                       seed: int = 0) -> Iterator[WebhookRequest]:
+    """Endless round-robin over the selected routes and the tenant's records."""
+    rng = random.Random(seed)
+    targets = []
+    if "dashboard" in routes:
+        targets += [(f"/api/v1/webhooks/student-dashboard/{r}", m, "dashboard") for r, m in DASHBOARD_ROUTES]
+    if "courses" in routes:
+        targets += [(f"/api/v1/webhooks/student-dashboard/{r}", m, "dashboard") for r, m in COURSE_ROUTES]
+    if "events" in routes:
+        targets += [(f"/api/v1/events/zoho/{r}", m, "event" if r in FORM_EVENT_ROUTES else "event_json")
+                    for r, m in EVENT_ROUTES]
+    targets = [t for t in targets if tenant.get(t[1])]
+
+    for i in itertools.count():
+        path, module, kind = targets[i % len(targets)]
+        record = tenant[module][(i // len(targets)) % len(tenant[module])]
+        use_json = shape == "json" or kind == "event_json" or (shape == "mixed" and rng.random() < 0.5)
+        if kind == "dashboard":
+            fields = {"zoho_id": record["id"], "module": module}
+        elif use_json:
+            fields = {"notification_id": f"bench-{i}", "module": module, "operation": "update",
+                      "record_id": record["id"], "data": record}
+        else:
+            # Zoho "Default" webhook format: the record's fields, flat
+            fields = {k: v for k, v in record.items() if not isinstance(v, (dict, list)) and v is not None}
+        body, content_type = _encode(fields, use_json)
+        yield WebhookRequest(path, body, content_type)
+
+
+def replayed_requests(path: str) -> Iterator[WebhookRequest]:
+    """Cycle through a capture file: one {"path", "body", "content_type"} per line."""
+    captured = []
+    with open(path) as fh:
+        for line in fh:
+            if line.strip():
+                item = json.loads(line)
+                body = item["body"]
+                if not isinstance(body, str):
+                    body = json.dumps(body)
+                captured.append(WebhookRequest(item["path"], body.encode(),
+                                               item.get("content_type", "application/json")))
+    if not captured:
+        raise SystemExit(f"{path}: no captured requests")
+    return itertools.cycle(captured)
+
+
+# ===========================================================================
+# IN-PROCESS SERVER + LOOP-LAG PROBE
+# ===========================================================================
+
+class LoopLagProbe:
+    """Samples how late a periodic sleep wakes up on the server's event loop."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[Tuple[float, float]] = []   # (wall time, lag seconds)
+
+    async def run(self) -> None:
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.samples.append((now, max(0.0, now - t0 - self.interval)))
+
+    def window(self, start: float, end: float) -> List[float]:
+        return [lag for ts, lag in self.samples if start <= ts <= end]
+
+
+class InProcessServer:
+    """uvicorn on 127.0.0.1:<free port> in a daemon thread with its own loop."""
+
+    def __init__(self, probe: LoopLagProbe):
+        import uvicorn
+        from app.main import app
+
+        self.probe = probe
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.url = f"http://127.0.0.1:{self.sock.getsockname()[1]}"
+        # lifespan off: the benchmark DB is already created and get_db overridden
+        self.server = uvicorn.Server(uvicorn.Config(app, lifespan="off", log_config=None,
+                                                    access_log=False, timeout_keep_alive=30))
+        self.thread = threading.Thread(target=self._serve, name="loadgen-uvicorn", daemon=True)
+
+    def _serve(self) -> None:
+        async def main():
+            probe = asyncio.create_task(self.probe.run())
+            try:
+                await self.server.serve(sockets=[self.sock])
+            finally:
+                probe.cancel()
+        asyncio.run(main())
+
+    def __enter__(self) -> "InProcessServer":
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+# ===========================================================================
+# LOAD STEPS
+# ===========================================================================
+
+def _saturation(step: StepResult, slo_ms: float, max_loop_lag_ms: float) -> List[str]:
+    reasons = []
+    if step.achieved_rps < 0.9 * step.offered_rps:
+        reasons.append("throughput")
+    if step.latency_p99_ms is not None and step.latency_p99_ms > slo_ms:
+        reasons.append("latency_slo")
+    if step.loop_lag_p99_ms is not None and step.loop_lag_p99_ms > max_loop_lag_ms:
+        reasons.append("event_loop")
+    return reasons
+
+
+async def run_step(client: httpx.AsyncClient, requests: Iterator[WebhookRequest], rate: float,
+                   duration: float, args, probe: Optional[LoopLagProbe]) -> StepResult:
+    total = max(1, int(rate * duration))
+    latencies: List[float] = []
+    finished: List[float] = []
+    errors_by_path: Dict[str, int] = {}
+    over_slo = 0
+    slo = args.slo_ms / 1000
+    inflight = asyncio.Semaphore(args.max_inflight)
+
+    async def _fire(req: WebhookRequest, due: float) -> None:
+        nonlocal over_slo
+        headers = {"Content-Type": req.content_type, "X-Zoho-Signature": sign(req.body)}
+        try:
+            resp = await client.post(req.path, content=req.body, headers=headers)
+            failed = resp.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        finally:
+            inflight.release()
+        now = time.perf_counter()
+        finished.append(now)
+        latencies.append(now - due)
+        over_slo += now - due > slo
+        if failed:
+            errors_by_path[req.path] = errors_by_path.get(req.path, 0) + 1
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        due = start + i / rate
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await inflight.acquire()
+        tasks.append(asyncio.create_task(_fire(next(requests), due)))
+    send_end = time.perf_counter()
+    await asyncio.gather(*tasks)
+
+    # Steady-state throughput: completions inside the send window after a
+    # warm-up quarter, so slow-but-keeping-up routes don't read as saturation
+    window_start = start + (send_end - start) * 0.25
+    in_window = sum(1 for t in finished if window_start <= t <= send_end)
+    achieved = in_window / (send_end - window_start) if send_end > window_start else len(finished) / duration
+
+    lags = probe.window(start, time.perf_counter()) if probe else []
+    step = StepResult(
+        offered_rps=rate,
+        sent=total,
+        completed=len(latencies),
+        achieved_rps=round(achieved, 1),
+        errors=sum(errors_by_path.values()),
+        over_slo=over_slo,
+        errors_by_path=errors_by_path,
+        latency_p50_ms=percentile(latencies, 50),
+        latency_p95_ms=percentile(latencies, 95),
+        latency_p99_ms=percentile(latencies, 99),
+        loop_lag_p99_ms=percentile(lags, 99),
+        loop_lag_max_ms=round(max(lags) * 1000, 2) if lags else None,
+    )
+    step.reasons = _saturation(step, args.slo_ms, args.max_loop_lag_ms)
+    step.saturated = bool(step.reasons)
+    return step
+
+
+async def run_curve(args, base_url: str, requests: Iterator[WebhookRequest],
+                    probe: Optional[LoopLagProbe]) -> List[StepResult]:
+    steps: List[StepResult] = []
+    # Explicit transport: the stub patch routes transport-less clients to the fakes
+    limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.slo_ms / 1000 * 3,
+                                 transport=httpx.AsyncHTTPTransport(limits=limits)) as client:
+        for rate in args.rates:
+            step = await run_step(client, requests, rate, args.duration, args, probe)
+            steps.append(step)
+            print(format_step(step), flush=True)
+            if step.saturated and not args.keep_going:
+                break
+    return steps
+
+
+def format_step(step: StepResult) -> str:
+    flag = f"SATURATED ({', '.join(step.reasons)})" if step.saturated else "ok"
+    return (f"{step.offered_rps:>8.1f} {step.achieved_rps:>9.1f} {step.latency_p50_ms!s:>9} "
+            f"{step.latency_p95_ms!s:>9} {step.latency_p99_ms!s:>9} {step.errors:>6} {step.over_slo:>6} "
+            f"{step.loop_lag_p99_ms!s:>9} {step.loop_lag_max_ms!s:>9}  {flag}")
+
+
+HEADER = (f"{'offered':>8} {'achieved':>9} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} "
+          f"{'errors':>6} {'>slo':>6} {'lag_p99':>9} {'lag_max':>9}")
+
+
+def sustainable_rate(steps: List[StepResult]) -> Optional[float]:
+    ok = [s.offered_rps for s in steps if not s.saturated]
+    return max(ok) if ok else None
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Webhook load generator / latency SLO curve")
+    add_environment_args(p)
+    p.add_argument("--routes", default="dashboard,courses,events",
+                   help="comma list of dashboard, courses, events")
+    p.add_argument("--shape", choices=("json", "form", "mixed"), default="mixed")
+    p.add_argument("--replay", help="JSON-lines capture of {path, body, content_type} to replay")
+    p.add_argument("--rates", default="5,10,25,50,100,200",
+                   type=lambda v: [float(r) for r in v.split(",") if r])
+    p.add_argument("--duration", type=float, default=10.0,
+                   help="seconds per rate step (the first quarter is warm-up)")
+    p.add_argument("--max-inflight", type=int, default=256, help="client-side cap on open requests")
+    p.add_argument("--slo-ms", type=float, default=10000.0, help="latency SLO (Zoho webhook timeout)")
+    p.add_argument("--max-loop-lag-ms", type=float, default=100.0)
+    p.add_argument("--keep-going", action="store_true", help="run every rate even after saturation")
+    p.add_argument("--target", help="base URL of an already running app (no stubs / loop probe)")
+    p.add_argument("--json", help="write the curve to this file")
+    return p.parse_args(argv)
+
+
+async def _run_target(args) -> List[StepResult]:
+    from benchmarks.dataset import build_tenant
+    requests = (replayed_requests(args.replay) if args.replay
+                else synthetic_requests(build_tenant(args.records, args.seed), args.routes.split(","),
+                                        args.shape, args.seed))
+    return await run_curve(args, args.target, requests, probe=None)
+
+
+def main(argv=None) -> List[StepResult]:
+    from unittest.mock import patch
+    from app.core.config import settings
+
+    args = parse_args(argv)
+    configure_logging(args.verbose)
+    print(HEADER)
+
+    if args.target:
+        steps = asyncio.run(_run_target(args))
+    else:
+        with bench_environment(args) as (tenant, _zoho, _transport), \
+             patch.object(settings, "ZOHO_WEBHOOK_SECRET", BENCH_SECRET):
+            requests = (replayed_requests(args.replay) if args.replay
+                        else synthetic_requests(tenant, args.routes.split(","), args.shape, args.seed))
+            probe = LoopLagProbe()
+            with InProcessServer(probe) as server:
+                steps = asyncio.run(run_curve(args, server.url, requests, probe))
+
+    rate = sustainable_rate(steps)
+    print(f"sustainable rate: {rate if rate is not None else '< ' + str(args.rates[0])} req/s "
+          f"(SLO p99 ≤ {args.slo_ms:.0f} ms, loop lag p99 ≤ {args.max_loop_lag_ms:.0f} ms)")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"sustainable_rps": rate, "steps": [asdict(s) for s in steps],
+                       "config": {k: v for k, v in vars(args).items() if k != "json"}}, fh, indent=2)
+    return steps
+
+
+if __name__ == "__main__":
+    main()
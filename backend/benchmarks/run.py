@@ -0,0 +1,331 @@
+"""
+Benchmark runner — drives the real sync code against the in-process stubs.
+
+Scenarios:
+  full_sync – full_sync.start_full_sync() over the whole tenant (all 8 steps)
+  webhooks  – dashboard / class / enrollment webhook routes, {"zoho_id"} bodies
+              (full record fetched from fake Zoho, parents auto-synced)
+  ingest    – /api/v1/sync/<module> batches (programs … enrollments) into a temp SQLite DB
+
+Report: records/s, p50/p99 latency (per webhook request / ingest batch, and
+per outbound Zoho/Moodle call), HTTP calls per service/operation, errors and
+peak RSS.  --json writes the result, --compare prints the delta against a
+previous result file so runs can be compared over time.
+
+Run one scenario per process: peak RSS is a process-lifetime high-water mark.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.dataset import build_tenant, count_records
+from benchmarks.stubs import FakeMoodle, FakeZoho, StubConfig, install_stubs
+
+WEBHOOK_ROUTES = [
+    # (route under /api/v1/webhooks/student-dashboard, Zoho module)
+    ("student_updated",        "BTEC_Students"),
+    ("registration_created",   "BTEC_Registrations"),
+    ("payment_recorded",       "BTEC_Payments"),
+    ("class_updated",          "BTEC_Classes"),
+    ("enrollment_updated",     "BTEC_Enrollments"),
+    ("grade_submitted",        "BTEC_Grades"),
+    ("request_status_changed", "BTEC_Student_Requests"),
+]
+
+INGEST_ROUTES = [
+    # (sync endpoint, Zoho module) — parents before children
+    ("/api/v1/sync/programs",      "Products"),
+    ("/api/v1/sync/students",      "BTEC_Students"),
+    ("/api/v1/sync/classes",       "BTEC_Classes"),
+    ("/api/v1/sync/registrations", "BTEC_Registrations"),
+    ("/api/v1/sync/payments",      "BTEC_Payments"),
+    ("/api/v1/sync/enrollments",   "BTEC_Enrollments"),
+]
+
+# The ingress parsers predate the webhook field names — copy lookups across.
+# Grades are left out: /sync/grades needs BTEC Unit lookups the tenant doesn't model.
+INGEST_ALIASES = {
+    "BTEC_Registrations": {"Student": "Student_ID", "Enrollment_Status": "Registration_Status"},
+    "BTEC_Payments":      {"Registration": "Registration_ID", "Amount": "Payment_Amount"},
+    "BTEC_Enrollments":   {"Student": "Enrolled_Students", "Class": "Classes", "Status": "Enrollment_Status"},
+}
+
+
+@dataclass
+class BenchResult:
+    scenario: str
+    records: int
+    processed: int
+    errors: int
+    elapsed_s: float
+    records_per_s: float
+    latency_p50_ms: Optional[float]
+    latency_p99_ms: Optional[float]
+    outbound_p50_ms: Optional[float]
+    outbound_p99_ms: Optional[float]
+    http_calls_total: int
+    http_calls: Dict[str, int] = field(default_factory=dict)
+    zoho_token_refreshes: int = 0
+    peak_rss_mb: float = 0.0
+    config: Dict = field(default_factory=dict)
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile in milliseconds (values in seconds)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return round(ordered[idx] * 1000, 2)
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def _bench_db(directory: str):
+    """Temp SQLite DB for endpoints / caches that touch the local database."""
+    import app.infra.db.models  # noqa: F401 — register every model
+    from app.infra.db.base import Base
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                           connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+def _override_db(session_factory) -> None:
+    from app.infra.db.session import get_db
+    from app.main import app
+
+    def _get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = _get_db
+
+
+def _asgi_client() -> httpx.AsyncClient:
+    from app.main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None)
+
+
+@contextmanager
+def bench_environment(args):
+    """
+    Synthetic tenant + fake Zoho / Moodle installed, temp DB wired into get_db
+    and the program-category cache.  Yields (tenant, zoho, transport).
+    Everything is restored on exit.
+    """
+    from app.api.v1.endpoints import webhooks_shared
+    from app.main import app
+
+    tenant = build_tenant(args.records, seed=args.seed)
+    zoho = FakeZoho(tenant, StubConfig(args.zoho_latency_ms, args.jitter_ms, args.error_rate, args.seed))
+    moodle = FakeMoodle(StubConfig(args.moodle_latency_ms, args.jitter_ms, args.error_rate, args.seed),
+                        strict_parents=not args.lenient_parents)
+
+    cache = webhooks_shared.program_category_cache
+    original_factory = cache._session_factory
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = _bench_db(tmp)
+        webhooks_shared.parent_resolver.clear()
+        cache._session_factory = session_factory
+        _override_db(session_factory)
+        try:
+            with install_stubs(zoho, moodle) as transport:
+                yield tenant, zoho, transport
+        finally:
+            cache._session_factory = original_factory
+            app.dependency_overrides.clear()
+            webhooks_shared.parent_resolver.clear()
+
+
+# ===========================================================================
+# SCENARIOS  →  (processed, errors, per-unit latencies in seconds)
+# ===========================================================================
+
+async def scenario_full_sync(tenant, args):
+    from app.api.v1.endpoints import full_sync
+    started = await full_sync.start_full_sync()
+    job = full_sync.JOBS[started["job_id"]]
+    while job["status"] != "completed":
+        await asyncio.sleep(0.05)
+    processed = sum(r.get("total", 0) for r in job["results"].values())
+    return processed, job["total_errors"], []
+
+
+async def scenario_webhooks(tenant, args):
+    events = []
+    for i in range(args.events or count_records(tenant)):
+        route, module = WEBHOOK_ROUTES[i % len(WEBHOOK_ROUTES)]
+        rows = tenant[module]
+        if rows:
+            events.append((route, module, rows[(i // len(WEBHOOK_ROUTES)) % len(rows)]["id"]))
+
+    latencies: List[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async with _asgi_client() as client:
+        async def _send(route: str, module: str, zoho_id: str) -> None:
+            nonlocal errors
+            async with sem:
+                t0 = time.perf_counter()
+                resp = await client.post(f"/api/v1/webhooks/student-dashboard/{route}",
+                                         json={"zoho_id": zoho_id, "module": module})
+                latencies.append(time.perf_counter() - t0)
+                if resp.status_code >= 400:
+                    errors += 1
+
+        await asyncio.gather(*(_send(*e) for e in events))
+    return len(events), errors, latencies
+
+
+async def scenario_ingest(tenant, args):
+    batches = []
+    for path, module in INGEST_ROUTES:
+        aliases = INGEST_ALIASES.get(module, {})
+        rows = [{**r, **{alias: r.get(src) for alias, src in aliases.items()}} for r in tenant[module]]
+        for start in range(0, len(rows), args.batch_size):
+            batches.append((path, rows[start:start + args.batch_size]))
+
+    latencies: List[float] = []
+    errors = processed = 0
+    async with _asgi_client() as client:
+        for path, rows in batches:   # sequential: the endpoints share one DB writer
+            t0 = time.perf_counter()
+            resp = await client.post(path, json={"data": rows})
+            latencies.append(time.perf_counter() - t0)
+            processed += len(rows)
+            if resp.status_code >= 400:
+                errors += len(rows)
+                continue
+            for item in resp.json().get("results", []):
+                if str(item.get("status", "")).upper() in ("INVALID", "ERROR"):
+                    errors += 1
+    return processed, errors, latencies
+
+
+SCENARIOS = {
+    "full_sync": scenario_full_sync,
+    "webhooks":  scenario_webhooks,
+    "ingest":    scenario_ingest,
+}
+
+
+# ===========================================================================
+# RUN / REPORT
+# ===========================================================================
+
+async def run(args) -> BenchResult:
+    with bench_environment(args) as (tenant, zoho, transport):
+        t0 = time.perf_counter()
+        processed, errors, latencies = await SCENARIOS[args.scenario](tenant, args)
+        elapsed = time.perf_counter() - t0
+
+    stats = transport.stats
+    return BenchResult(
+        scenario=args.scenario,
+        records=count_records(tenant),
+        processed=processed,
+        errors=errors,
+        elapsed_s=round(elapsed, 3),
+        records_per_s=round(processed / elapsed, 1) if elapsed > 0 else 0.0,
+        latency_p50_ms=percentile(latencies, 50),
+        latency_p99_ms=percentile(latencies, 99),
+        outbound_p50_ms=percentile(stats.latencies, 50),
+        outbound_p99_ms=percentile(stats.latencies, 99),
+        http_calls_total=stats.total_calls,
+        http_calls={f"{svc}:{op}": n for (svc, op), n in sorted(stats.calls.items())},
+        zoho_token_refreshes=zoho.token_refreshes,
+        peak_rss_mb=peak_rss_mb(),
+        config={k: v for k, v in vars(args).items() if k not in ("json", "compare", "verbose")},
+    )
+
+
+_COMPARED = ("records_per_s", "latency_p50_ms", "latency_p99_ms", "outbound_p50_ms",
+             "outbound_p99_ms", "http_calls_total", "zoho_token_refreshes", "errors", "peak_rss_mb")
+
+
+def report(result: BenchResult, baseline: Optional[Dict] = None) -> str:
+    lines = [
+        f"scenario        {result.scenario}  ({result.records} records in tenant)",
+        f"processed       {result.processed}  errors {result.errors}  in {result.elapsed_s}s",
+    ]
+    for key in _COMPARED:
+        value = getattr(result, key)
+        line = f"{key:<22}{value}"
+        if baseline and baseline.get(key) not in (None, 0) and value is not None:
+            delta = (value - baseline[key]) / baseline[key] * 100
+            line += f"   (baseline {baseline[key]}, {delta:+.1f}%)"
+        lines.append(line)
+    lines.append("http calls:")
+    lines.extend(f"  {name:<45}{n}" for name, n in result.http_calls.items())
+    return "\n".join(lines)
+
+
+def add_environment_args(p: argparse.ArgumentParser) -> None:
+    """Tenant / stub options shared by every benchmark entry point."""
+    p.add_argument("--records", type=int, default=1000, help="approx. total records in the synthetic tenant")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--zoho-latency-ms", type=float, default=0.0)
+    p.add_argument("--moodle-latency-ms", type=float, default=0.0)
+    p.add_argument("--jitter-ms", type=float, default=0.0)
+    p.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub calls that fail")
+    p.add_argument("--lenient-parents", action="store_true",
+                   help="fake Moodle accepts children whose parents were never pushed")
+    p.add_argument("--verbose", action="store_true", help="keep app INFO logging")
+
+
+def configure_logging(verbose: bool) -> None:
+    # Handler errors are counted in the report; only show the log stream on request
+    logging.basicConfig(level=logging.INFO if verbose else logging.CRITICAL)
+    logging.getLogger().setLevel(logging.INFO if verbose else logging.CRITICAL)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Offline Zoho → Moodle sync benchmark")
+    p.add_argument("scenario", choices=sorted(SCENARIOS))
+    add_environment_args(p)
+    p.add_argument("--events", type=int, default=0, help="webhooks: number of events (default: one per record)")
+    p.add_argument("--concurrency", type=int, default=20, help="webhooks: concurrent requests")
+    p.add_argument("--batch-size", type=int, default=100, help="ingest: records per request")
+    p.add_argument("--json", help="write the result to this file")
+    p.add_argument("--compare", help="previous --json result to compare against")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> BenchResult:
+    args = parse_args(argv)
+    configure_logging(args.verbose)
+    result = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+    print(report(result, baseline))
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(asdict(result), fh, indent=2)
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+In-process fake Zoho CRM v2 and Moodle REST servers.
+
+Both are plain async handlers behind one httpx transport (StubTransport),
+routed by host.  install_stubs() makes every httpx.AsyncClient created by the
+app use that transport and points settings at the stubs, so full_sync, the
+webhook handlers and ZohoClient run unmodified with no network access.
+
+Fake Zoho (www.zohoapis.com, accounts.zoho.com):
+  POST /oauth/v2/token                      → access token (counted)
+  GET  /crm/v2/{module}?page=&per_page=     → paginated, info.more_records
+  GET  /crm/v2/{module}?ids=a,b             → batch fetch (≤100 ids)
+  GET  /crm/v2/{module}/search?criteria=((Field:equals:value))  → paginated
+  GET  /crm/v2/{module}/{id}                → single record (404 if missing)
+  PUT/POST /crm/v2/{module}[/upsert]        → merge fields, SUCCESS per row
+
+Fake Moodle (MOODLE_BASE_URL host):
+  POST /webservice/rest/server.php  wsfunction=local_mzi_* / core_* / enrol_*
+  Create-style functions answer 'Duplicate entry' for existing rows; children
+  answer '<Parent> … not found' when their student / registration / class has
+  not been pushed (strict_parents=True), like the real plugin.
+
+Latency (+ jitter) is an asyncio.sleep per call; error_rate injects Zoho 500s
+and Moodle dml_write_exception responses.
+"""
+import asyncio
+import json
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+import httpx
+
+from app.core.config import settings
+
+ZOHO_API_HOST = "www.zohoapis.com"
+ZOHO_ACCOUNTS_HOST = "accounts.zoho.com"
+MOODLE_HOST = "moodle.stub"
+MOODLE_BASE_URL = f"http://{MOODLE_HOST}"
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 0
+
+    async def delay(self, rng: random.Random) -> None:
+        if self.latency_ms or self.jitter_ms:
+            await asyncio.sleep(max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+
+@dataclass
+class CallStats:
+    """Outbound calls seen by the stubs, keyed by (service, operation)."""
+    calls: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    errors: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    latencies: List[float] = field(default_factory=list)
+
+    def record(self, service: str, op: str, elapsed: float, failed: bool) -> None:
+        key = (service, op)
+        self.calls[key] = self.calls.get(key, 0) + 1
+        if failed:
+            self.errors[key] = self.errors.get(key, 0) + 1
+        self.latencies.append(elapsed)
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+def _json(status: int, body) -> httpx.Response:
+    return httpx.Response(status, content=json.dumps(body).encode(),
+                          headers={"content-type": "application/json"})
+
+
+# ===========================================================================
+# FAKE ZOHO
+# ===========================================================================
+
+class FakeZoho:
+    def __init__(self, tenant: Dict[str, List[Dict]], config: Optional[StubConfig] = None):
+        self.config = config or StubConfig()
+        self._rng = random.Random(self.config.seed)
+        self.records: Dict[str, Dict[str, Dict]] = {
+            module: {r["id"]: r for r in rows} for module, rows in tenant.items()
+        }
+        self.order: Dict[str, List[str]] = {module: [r["id"] for r in rows] for module, rows in tenant.items()}
+        self._index: Dict[Tuple[str, str], Dict[str, List[str]]] = {}
+        self.token_refreshes = 0
+
+    def _search_index(self, module: str, field_name: str) -> Dict[str, List[str]]:
+        key = (module, field_name)
+        if key not in self._index:
+            index: Dict[str, List[str]] = {}
+            for rid in self.order.get(module, []):
+                value = self.records[module][rid].get(field_name)
+                if isinstance(value, dict):
+                    value = value.get("id")
+                if value is not None:
+                    index.setdefault(str(value), []).append(rid)
+            self._index[key] = index
+        return self._index[key]
+
+    @staticmethod
+    def _page(module_rows: List[Dict], params: Dict[str, str]) -> httpx.Response:
+        page = int(params.get("page", 1))
+        per_page = min(int(params.get("per_page", 200)), 200)
+        start = (page - 1) * per_page
+        data = module_rows[start:start + per_page]
+        if not data:
+            return httpx.Response(204)
+        more = start + per_page < len(module_rows)
+        return _json(200, {"data": data, "info": {"page": page, "per_page": per_page,
+                                                  "count": len(data), "more_records": more}})
+
+    async def handle(self, request: httpx.Request) -> Tuple[str, httpx.Response]:
+        """Return (operation label, response)."""
+        await self.config.delay(self._rng)
+        if request.url.host == ZOHO_ACCOUNTS_HOST:
+            self.token_refreshes += 1
+            return "token", _json(200, {"access_token": f"stub-token-{self.token_refreshes}",
+                                        "expires_in": 3600, "token_type": "Bearer"})
+
+        if self._rng.random() < self.config.error_rate:
+            return "error", _json(500, {"code": "INTERNAL_ERROR", "message": "injected"})
+
+        parts = [p for p in request.url.path.split("/") if p][2:]   # strip crm/v2
+        params = {k: v for k, v in request.url.params.items()}
+        module = parts[0] if parts else ""
+        rows = self.records.get(module)
+        if rows is None:
+            return "invalid_module", _json(400, {"code": "INVALID_MODULE", "message": module})
+
+        if request.method in ("PUT", "POST"):
+            body = json.loads(request.content or b"{}")
+            results = []
+            for item in body.get("data", []):
+                rid = item.get("id")
+                if rid and rid in rows:
+                    rows[rid].update(item)
+                results.append({"code": "SUCCESS", "details": {"id": rid}, "status": "success"})
+            return "write", _json(200, {"data": results})
+
+        if len(parts) == 1:
+            if "ids" in params:
+                wanted = [i for i in params["ids"].split(",") if i][:100]
+                data = [rows[i] for i in wanted if i in rows]
+                return "get_ids", _json(200, {"data": data}) if data else httpx.Response(204)
+            return "list", self._page([rows[i] for i in self.order[module]], params)
+
+        if parts[1] == "search":
+            criteria = params.get("criteria", "").strip("()")
+            try:
+                field_name, op, value = criteria.split(":", 2)
+            except ValueError:
+                return "search", _json(400, {"code": "INVALID_QUERY", "message": criteria})
+            value = value.rstrip(")")
+            if op != "equals":
+                return "search", _json(400, {"code": "INVALID_QUERY", "message": op})
+            ids = self._search_index(module, field_name).get(value, [])
+            return "search", self._page([rows[i] for i in ids], params)
+
+        record = rows.get(parts[1])
+        if record is None:
+            return "get", _json(404, {"code": "INVALID_DATA", "message": "record not found"})
+        return "get", _json(200, {"data": [record]})
+
+
+# ===========================================================================
+# FAKE MOODLE
+# ===========================================================================
+
+# wsfunction → (table, JSON param, id field, create-only, required parents)
+_MOODLE_WRITES: Dict[str, Tuple[str, str, str, bool, Tuple[Tuple[str, str, str], ...]]] = {
+    "local_mzi_sync_teacher":          ("teachers",      "teacherdata",      "zoho_teacher_id",      False, ()),
+    "local_mzi_update_student":        ("students",      "studentdata",      "zoho_student_id",      False, ()),
+    "local_mzi_create_class":          ("classes",       "classdata",        "zoho_class_id",        True,  ()),
+    "local_mzi_create_registration":   ("registrations", "registrationdata", "zoho_registration_id", False,
+                                        (("students", "zoho_student_id", "Student"),)),
+    "local_mzi_record_payment":        ("payments",      "paymentdata",      "zoho_payment_id",      True,
+                                        (("registrations", "zoho_registration_id", "Registration"),)),
+    "local_mzi_update_enrollment":     ("enrollments",   "enrollmentdata",   "zoho_enrollment_id",   False,
+                                        (("students", "zoho_student_id", "Student"),
+                                         ("classes", "zoho_class_id", "Class"))),
+    "local_mzi_submit_grade":          ("grades",        "gradedata",        "zoho_grade_id",        False,
+                                        (("students", "zoho_student_id", "Student"),
+                                         ("classes", "zoho_class_id", "Class"))),
+    "local_mzi_update_request_status": ("requests",      "requestdata",      "zoho_request_id",      False,
+                                        (("students", "zoho_student_id", "Student"),)),
+}
+
+
+class FakeMoodle:
+    def __init__(self, config: Optional[StubConfig] = None, strict_parents: bool = True):
+        self.config = config or StubConfig()
+        self.strict_parents = strict_parents
+        self._rng = random.Random(self.config.seed + 1)
+        self.tables: Dict[str, Dict[str, Dict]] = {}
+        self._next_course_id = 20000
+
+    def _error(self, message: str, exception: str = "moodle_exception") -> httpx.Response:
+        return _json(200, {"exception": exception, "errorcode": "error", "message": message})
+
+    def _write(self, spec, data: Dict) -> Optional[Tuple[str, ...]]:
+        """Apply one local_mzi_* write; returns (message, exception) on failure."""
+        table, _param, id_field, create_only, parents = spec
+        rid = str(data.get(id_field) or "")
+        if self.strict_parents:
+            for parent_table, fk, label in parents:
+                fk_value = str(data.get(fk) or "")
+                if fk_value and fk_value not in self.tables.get(parent_table, {}):
+                    return (f"{label} with {fk} {fk_value} not found",)
+        rows = self.tables.setdefault(table, {})
+        if create_only and rid in rows:
+            return (f"Duplicate entry '{rid}' for key '{id_field}'", "dml_write_exception")
+        rows[rid] = data
+        return None
+
+    async def handle(self, request: httpx.Request) -> Tuple[str, httpx.Response]:
+        await self.config.delay(self._rng)
+        form = {k: v[0] for k, v in parse_qs((request.content or b"").decode(), keep_blank_values=True).items()}
+        fn = form.get("wsfunction", "")
+        if self._rng.random() < self.config.error_rate:
+            return fn, self._error("Error writing to database", "dml_write_exception")
+
+        spec = _MOODLE_WRITES.get(fn)
+        if spec:
+            data = json.loads(form.get(spec[1]) or "{}")
+            error = self._write(spec, data)
+            if error:
+                return fn, self._error(*error)
+            return fn, _json(200, {"success": True, "id": len(self.tables[spec[0]]), "message": "ok"})
+
+        if fn == "local_mzi_update_enrollments":
+            spec = _MOODLE_WRITES["local_mzi_update_enrollment"]
+            results = []
+            for data in json.loads(form.get("enrollmentsdata") or "[]"):
+                error = self._write(spec, data)
+                results.append({"success": not error, "enrollment_id": str(data.get(spec[2]) or ""),
+                                "message": error[0] if error else "ok"})
+            return fn, _json(200, {"results": results})
+        if fn == "local_mzi_enrol_users":
+            enrolments = json.loads(form.get("enrolmentsdata") or "[]")
+            return fn, _json(200, {"enrolled": len(enrolments), "skipped": 0,
+                                   "message": f"{len(enrolments)} user(s) enrolled"})
+        if fn == "local_mzi_sync_installments":
+            return fn, _json(200, {"success": True, "count": len(json.loads(form.get("installmentsdata") or "[]"))})
+        if fn == "core_course_create_courses":
+            self._next_course_id += 1
+            return fn, _json(200, [{"id": self._next_course_id, "shortname": form.get("courses[0][shortname]", "")}])
+        if fn == "core_course_update_courses":
+            return fn, _json(200, {"warnings": []})
+        if fn == "core_user_get_users_by_field":
+            return fn, _json(200, [{"id": 7000 + len(form.get("values[0]", "")), "email": form.get("values[0]", "")}])
+        if fn.startswith("enrol_manual_"):
+            return fn, _json(200, None)
+        if fn.startswith("local_mzi_delete_"):
+            return fn, _json(200, {"success": True, "message": "deleted"})
+        return fn, self._error("Can't find data record in database table external_functions.",
+                               "dml_missing_record_exception")
+
+
+# ===========================================================================
+# TRANSPORT + INSTALL
+# ===========================================================================
+
+class StubTransport(httpx.AsyncBaseTransport):
+    """Routes requests by host to the fake Zoho / Moodle handlers and counts them."""
+
+    def __init__(self, zoho: FakeZoho, moodle: FakeMoodle):
+        self.zoho = zoho
+        self.moodle = moodle
+        self.stats = CallStats()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        host = request.url.host
+        t0 = time.perf_counter()
+        if host in (ZOHO_API_HOST, ZOHO_ACCOUNTS_HOST):
+            service = "zoho"
+            op, response = await self.zoho.handle(request)
+        elif host == MOODLE_HOST:
+            service = "moodle"
+            op, response = await self.moodle.handle(request)
+        else:
+            raise httpx.ConnectError(f"benchmark stubs: no route to {host}", request=request)
+        failed = response.status_code >= 400 or b'"exception"' in response.content[:200]
+        self.stats.record(service, op, time.perf_counter() - t0, failed)
+        response.request = request
+        return response
+
+
+@contextmanager
+def install_stubs(zoho: FakeZoho, moodle: FakeMoodle):
+    """
+    Route every httpx.AsyncClient without an explicit transport to the stubs
+    and point Zoho / Moodle settings at them.  Yields the StubTransport.
+    """
+    transport = StubTransport(zoho, moodle)
+    original_init = httpx.AsyncClient.__init__
+
+    def _init(self, *args, **kwargs):
+        kwargs.setdefault("transport", transport)
+        original_init(self, *args, **kwargs)
+
+    with patch.object(httpx.AsyncClient, "__init__", _init), \
+         patch.object(settings, "ZOHO_CLIENT_ID", "stub-client"), \
+         patch.object(settings, "ZOHO_CLIENT_SECRET", "stub-secret"), \
+         patch.object(settings, "ZOHO_REFRESH_TOKEN", "stub-refresh"), \
+         patch.object(settings, "ZOHO_REGION", "com"), \
+         patch.object(settings, "ZOHO_API_BASE_URL", f"https://{ZOHO_API_HOST}/crm/v2"), \
+         patch.object(settings, "MOODLE_ENABLED", True), \
+         patch.object(settings, "MOODLE_BASE_URL", MOODLE_BASE_URL), \
+         patch.object(settings, "MOODLE_TOKEN", "stub-moodle-token"):
+        yield transport
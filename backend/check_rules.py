@@ -1,6 +1,8 @@
-import httpx, json, asyncio, sys
+import httpx, asyncio, sys
 sys.path.insert(0, '.')
 from app.core.config import settings
+from app.infra.db.models.zoho_automation import ZohoAutomation
+from app.infra.db.session import SessionLocal
 from app.infra.zoho.auth import ZohoAuthClient
 
 async def main():
@@ -13,8 +15,11 @@ async def main():
     token = await auth.get_access_token()
     headers = {'Authorization': f'Zoho-oauthtoken {token}'}
 
-    state = json.load(open('zoho_rules_state.json'))
-    rules = state.get('rules', [])
+    with SessionLocal() as db:
+        rules = [
+            {'rule_id': row.rule_id, 'name': row.name}
+            for row in db.query(ZohoAutomation).all() if row.rule_id
+        ]
 
     print(f"Checking {len(rules)} rules...\n")
     for rule in rules:
@@ -12,7 +12,7 @@ from datetime import datetime
 from pathlib import Path
 from app.core.config import settings
 from app.infra.zoho import create_zoho_client
-from zoho_attachments import ZohoAttachmentHandler
+from zoho_attachments import CHUNK_SIZE, ZohoAttachmentHandler
 
 # Zoho Module Names from zoho_api_names.json
 MODULES = {
@@ -25,6 +25,12 @@ MODULES = {
     "requests": "BTEC_Student_Requests"
 }
 
+# Max concurrent Zoho searches / Moodle pushes per related module
+RELATED_CONCURRENCY = 5
+
+# Max concurrent student photo lookups / downloads
+PHOTO_CONCURRENCY = 5
+
 # Moodle Webhook Endpoints
 MOODLE_ENDPOINTS = {
     "students": "local_mzi_update_student",
@@ -276,44 +282,26 @@ class InitialSyncService:
             access_token = await self.zoho.auth.get_access_token()
             self.attachment_handler = ZohoAttachmentHandler(access_token)
         
+        # Fetch student photos up front, concurrently (cached ones are not re-downloaded)
+        photos = {}
+        if entity_type == "students" and self.attachment_handler:
+            photos = await self.fetch_student_photos(module, records)
+        
         # Sync each record to Moodle
         for idx, record in enumerate(records, 1):
             try:
                 # Transform record
                 transformed = self.transform_record(record, entity_type)
                 
-                # Download photo for students
-                if entity_type == "students" and self.attachment_handler:
-                    student_id = transformed.get("student_id", "")
-                    zoho_id = transformed.get("zoho_student_id", "")
-                    
-                    if student_id and zoho_id:
-                        print(f"   📷 Downloading photo for {student_id}...")
-                        photo_path = await self.attachment_handler.find_and_download_photo(
-                            module=module,
-                            record_id=zoho_id,
-                            student_id=student_id,
-                            save_dir=self.photos_dir
-                        )
-                        
-                        if photo_path and os.path.exists(photo_path):
-                            # Read and encode photo as base64
-                            try:
-                                with open(photo_path, 'rb') as f:
-                                    photo_base64 = base64.b64encode(f.read()).decode('utf-8')
-                                
-                                # Add to transformed data
-                                transformed["photo_data"] = photo_base64
-                                transformed["photo_filename"] = os.path.basename(photo_path)
-                                transformed["photo_url"] = f"/student_photos/{os.path.basename(photo_path)}"
-                                
-                                self.stats["students"]["photos_downloaded"] += 1
-                                print(f"   ✅ Photo encoded and ready to send")
-                            except Exception as e:
-                                print(f"   ⚠️ Failed to encode photo: {str(e)}")
+                # Attach photo for students — only when Moodle hasn't got this exact file yet
+                photo = photos.get(transformed.get("zoho_student_id", ""))
+                if photo:
+                    self.attach_photo(transformed, photo)
                 
                 # Send to Moodle
                 result = await self.call_moodle_ws(endpoint, transformed)
+                if photo:
+                    result = await self.confirm_photo(endpoint, transformed, photo, result)
                 
                 self.stats[entity_type]["synced"] += 1
                 print(f"✅ [{idx}/{len(records)}] Synced {entity_type}: {transformed.get(f'zoho_{entity_type[:-1]}_id', 'N/A')}")
@@ -322,6 +310,68 @@ class InitialSyncService:
                 self.stats[entity_type]["failed"] += 1
                 print(f"❌ [{idx}/{len(records)}] Failed {entity_type}: {str(e)}")
 
+    async def fetch_student_photos(self, module: str, records: List[Dict]) -> Dict[str, Dict]:
+        """Personal photos for student records, fetched concurrently: zoho id → photo info"""
+        sem = asyncio.Semaphore(PHOTO_CONCURRENCY)
+        
+        async def _fetch(record: Dict):
+            student_id = record.get("Name", "")
+            zoho_id = record.get("id", "")
+            if not (student_id and zoho_id):
+                return zoho_id, None
+            async with sem:
+                photo = await self.attachment_handler.get_photo(
+                    module=module,
+                    record_id=zoho_id,
+                    student_id=student_id,
+                    save_dir=self.photos_dir
+                )
+            if photo and not photo["cached"]:
+                self.stats["students"]["photos_downloaded"] += 1
+            return zoho_id, photo
+        
+        results = await asyncio.gather(*(_fetch(r) for r in records))
+        return {zoho_id: photo for zoho_id, photo in results if photo}
+
+    async def confirm_photo(self, endpoint: str, transformed: Dict, photo: Dict, result: Any) -> Any:
+        """Record the photo hash Moodle reports holding; re-send the photo if it differs"""
+        cache = self.attachment_handler.cache(self.photos_dir)
+        held = result.get("photo_sha256") if isinstance(result, dict) else None
+        if "photo_data" not in transformed:
+            if not held or held == photo["sha256"]:
+                return result
+            print(f"   📷 Moodle holds a different photo — re-sending")
+            self.attach_photo(transformed, photo, force=True)
+            if "photo_data" not in transformed:
+                return result
+            result = await self.call_moodle_ws(endpoint, transformed)
+            held = result.get("photo_sha256") if isinstance(result, dict) else None
+        cache.mark_pushed(transformed.get("student_id", ""), photo["sha256"], held)
+        return result
+
+    def attach_photo(self, transformed: Dict, photo: Dict, force: bool = False):
+        """Add photo fields to a student payload unless Moodle already holds this content"""
+        photo_path = photo["path"]
+        filename = os.path.basename(photo_path)
+        transformed["photo_filename"] = filename
+        transformed["photo_url"] = f"/student_photos/{filename}"
+        
+        cache = self.attachment_handler.cache(self.photos_dir)
+        if not force and cache.pushed_hash(transformed.get("student_id", "")) == photo["sha256"]:
+            print(f"   📷 Photo unchanged in Moodle — not re-sent")
+            return
+        try:
+            # Moodle takes the photo inline in the JSON payload: encode in chunks
+            # (multiples of 3 bytes keep base64 segments concatenable)
+            parts = []
+            with open(photo_path, 'rb') as f:
+                while chunk := f.read(CHUNK_SIZE * 3):
+                    parts.append(base64.b64encode(chunk).decode('ascii'))
+            transformed["photo_data"] = "".join(parts)
+            print(f"   ✅ Photo encoded and ready to send")
+        except Exception as e:
+            print(f"   ⚠️ Failed to encode photo: {str(e)}")
+
     async def sync_single_student(self, email: str):
         """Sync a single student by email"""
         print(f"\n{'='*60}")
@@ -407,106 +457,112 @@ class InitialSyncService:
             print(f"   ⚠️  Could not find Moodle user: {str(e)}")
             return None
 
+    async def search_all_records(self, module: str, criteria: str) -> List[Dict]:
+        """Search records by criteria, following pagination past 200 results"""
+        all_records = []
+        page = 1
+
+        while True:
+            try:
+                records = await self.zoho.search_records(module, criteria, page=page, per_page=200)
+            except Exception as e:
+                print(f"   ⚠️  Search {module} {criteria} page {page} failed: {str(e)}")
+                break
+            if not records:
+                break
+
+            all_records.extend(records)
+
+            if len(records) < 200:  # Last page
+                break
+
+            page += 1
+
+        return all_records
+
+    async def push_records(self, entity_type: str, records: List[Dict], label_field: str, indent: str = "   "):
+        """Push records to Moodle concurrently (bounded by RELATED_CONCURRENCY)"""
+        sem = asyncio.Semaphore(RELATED_CONCURRENCY)
+
+        async def _push(record: Dict):
+            label = record.get(label_field)
+            if isinstance(label, dict):
+                label = label.get("name")
+            async with sem:
+                try:
+                    transformed = self.transform_record(record, entity_type)
+                    await self.call_moodle_ws(MOODLE_ENDPOINTS[entity_type], transformed)
+                    self.stats[entity_type]["synced"] += 1
+                    print(f"{indent}✅ Synced {entity_type}: {label or 'N/A'}")
+                except Exception as e:
+                    self.stats[entity_type]["failed"] += 1
+                    print(f"{indent}❌ Failed {entity_type}: {str(e)}")
+
+        self.stats[entity_type]["fetched"] += len(records)
+        await asyncio.gather(*(_push(r) for r in records))
+
     async def sync_student_related_records(self, zoho_student_id: str):
         """Sync all records related to a specific student"""
         print(f"\n🔗 Syncing related records for student: {zoho_student_id}")
-        
-        # ⚠️ Zoho API doesn't support searching by lookup fields directly
-        # So we fetch ALL records and filter manually by zoho_student_id
-        
-        # 1. Sync ALL Classes first (independent, needed for enrollments)
-        print("\n   📦 Syncing ALL classes from Zoho...")
-        classes_response = await self.zoho.get_records(MODULES["classes"], per_page=5)  # LIMIT TO 5 FOR TESTING
-        all_classes = classes_response.get("data", [])
-        print(f"   📊 Found {len(all_classes)} total classes (limited to 5 for testing)")
-        
-        for cls in all_classes:
-            try:
-                transformed = self.transform_record(cls, "classes")
-                result = await self.call_moodle_ws(MOODLE_ENDPOINTS["classes"], transformed)
-                print(f"   ✅ Synced class: {cls.get('Class_Name', 'N/A')}")
-            except Exception as e:
-                print(f"   ❌ Failed class: {str(e)}")
-        
-        # 2. Sync Registrations for this student
-        print("\n   📦 Fetching registrations for student...")
-        regs_response = await self.zoho.get_records(MODULES["registrations"], per_page=200)
-        all_registrations = regs_response.get("data", [])
-        
-        print(f"   ℹ️  Sample registration structure: {all_registrations[0] if all_registrations else 'No registrations'}")
-        print(f"   ℹ️  Looking for student ID: {zoho_student_id}")
-        
-        student_registrations = [r for r in all_registrations if r.get("Student", {}).get("id") == zoho_student_id]
-        print(f"   📊 Found {len(student_registrations)} registrations for this student")
-        
-        for reg in student_registrations:
-            try:
-                transformed = self.transform_record(reg, "registrations")
-                result = await self.call_moodle_ws(MOODLE_ENDPOINTS["registrations"], transformed)
-                print(f"   ✅ Synced registration: {reg.get('Program', {}).get('name', 'N/A')}")
-                
-                # Sync payments for this registration
-                reg_id = reg.get("id")
-                pmts_response = await self.zoho.get_records(MODULES["payments"], per_page=200)
-                all_payments = pmts_response.get("data", [])
-                reg_payments = [p for p in all_payments if p.get("Registration", {}).get("id") == reg_id]
-                print(f"      💰 Found {len(reg_payments)} payments for this registration")
-                
-                for pmt in reg_payments:
-                    try:
-                        pmt_transformed = self.transform_record(pmt, "payments")
-                        pmt_result = await self.call_moodle_ws(MOODLE_ENDPOINTS["payments"], pmt_transformed)
-                        print(f"      ✅ Synced payment: {pmt.get('Payment_Number', 'N/A')}")
-                    except Exception as e:
-                        print(f"      ❌ Failed payment: {str(e)}")
-                        
-            except Exception as e:
-                print(f"   ❌ Failed registration: {str(e)}")
-        
-        # 3. Sync Enrollments for this student
-        print("\n   📦 Fetching enrollments for student...")
-        enrs_response = await self.zoho.get_records(MODULES["enrollments"], per_page=200)
-        all_enrollments = enrs_response.get("data", [])
-        student_enrollments = [e for e in all_enrollments if e.get("Student", {}).get("id") == zoho_student_id]
-        print(f"   📊 Found {len(student_enrollments)} enrollments for this student")
-        
-        for enr in student_enrollments:
-            try:
-                transformed = self.transform_record(enr, "enrollments")
-                result = await self.call_moodle_ws(MOODLE_ENDPOINTS["enrollments"], transformed)
-                print(f"   ✅ Synced enrollment: {enr.get('Class', {}).get('name', 'N/A')}")
-            except Exception as e:
-                print(f"   ❌ Failed enrollment: {str(e)}")
-        
-        # 4. Sync Grades for this student
-        print("\n   📦 Fetching grades for student...")
-        grades_response = await self.zoho.get_records(MODULES["grades"], per_page=200)
-        all_grades = grades_response.get("data", [])
-        student_grades = [g for g in all_grades if g.get("Student", {}).get("id") == zoho_student_id]
-        print(f"   📊 Found {len(student_grades)} grades for this student")
-        
-        for grade in student_grades:
-            try:
-                transformed = self.transform_record(grade, "grades")
-                result = await self.call_moodle_ws(MOODLE_ENDPOINTS["grades"], transformed)
-                print(f"   ✅ Synced grade: {grade.get('Unit_Code', 'N/A')}")
-            except Exception as e:
-                print(f"   ❌ Failed grade: {str(e)}")
-        
-        # 5. Sync Requests for this student
-        print("\n   📦 Fetching requests for student...")
-        reqs_response = await self.zoho.get_records(MODULES["requests"], per_page=200)
-        all_requests = reqs_response.get("data", [])
-        student_requests = [r for r in all_requests if r.get("Student", {}).get("id") == zoho_student_id]
-        print(f"   📊 Found {len(student_requests)} requests for this student")
-        
-        for req in student_requests:
-            try:
-                transformed = self.transform_record(req, "requests")
-                result = await self.call_moodle_ws(MOODLE_ENDPOINTS["requests"], transformed)
-                print(f"   ✅ Synced request: {req.get('Request_Type', 'N/A')}")
-            except Exception as e:
-                print(f"   ❌ Failed request: {str(e)}")
+
+        # 1. Search every student-scoped module by its Student lookup (concurrently)
+        student_criteria = f"(Student:equals:{zoho_student_id})"
+        registrations, enrollments, grades, requests = await asyncio.gather(
+            *(self.search_all_records(MODULES[entity], student_criteria)
+              for entity in ("registrations", "enrollments", "grades", "requests"))
+        )
+        print(f"   📊 Found {len(registrations)} registrations, {len(enrollments)} enrollments, "
+              f"{len(grades)} grades, {len(requests)} requests")
+
+        # Per-registration payment searches + per-class fetches share one bound
+        fetch_sem = asyncio.Semaphore(RELATED_CONCURRENCY)
+
+        async def _search_payments(registration_id: str) -> List[Dict]:
+            async with fetch_sem:
+                return await self.search_all_records(
+                    MODULES["payments"], f"(Registration:equals:{registration_id})")
+
+        async def sync_registrations_and_payments():
+            await self.push_records("registrations", registrations, "Program")
+
+            # Payments: one Registration-lookup search per registration (bounded)
+            payment_lists = await asyncio.gather(
+                *(_search_payments(reg["id"]) for reg in registrations if reg.get("id"))
+            )
+            payments = [p for pmts in payment_lists for p in pmts]
+            print(f"   💰 Found {len(payments)} payments for this student")
+            await self.push_records("payments", payments, "Payment_Number", indent="      ")
+
+        async def sync_classes_enrollments_grades():
+            # Only the classes this student actually references
+            class_ids = sorted({
+                r["Class"]["id"] for r in enrollments + grades
+                if isinstance(r.get("Class"), dict) and r["Class"].get("id")
+            })
+
+            async def _fetch_class(class_id: str):
+                try:
+                    async with fetch_sem:
+                        return await self.zoho.get_record(MODULES["classes"], class_id)
+                except Exception as e:
+                    print(f"   ❌ Failed to fetch class {class_id}: {str(e)}")
+                    return None
+
+            classes = [c for c in await asyncio.gather(*(_fetch_class(cid) for cid in class_ids)) if c]
+            print(f"   📦 {len(classes)} classes referenced by this student")
+            await self.push_records("classes", classes, "Class_Name")
+
+            await asyncio.gather(
+                self.push_records("enrollments", enrollments, "Class"),
+                self.push_records("grades", grades, "Unit_Code"),
+            )
+
+        # 2. Push: registrations→payments and classes→enrollments/grades run side by side
+        await asyncio.gather(
+            sync_registrations_and_payments(),
+            sync_classes_enrollments_grades(),
+            self.push_records("requests", requests, "Request_Type"),
+        )
 
     async def sync_related(self, entity_type: str, lookup_field: str, lookup_id: str):
         """Sync related records by lookup field"""
@@ -549,6 +605,9 @@ class InitialSyncService:
         for entity in sync_order:
             await self.sync_entity(entity)
         
+        if self.attachment_handler:
+            await self.attachment_handler.aclose()
+        
         # Print summary
         print("\n" + "="*60)
         print("📊 SYNC SUMMARY")
@@ -0,0 +1,103 @@
+"""
+Partition Event Log Migration (PostgreSQL)
+
+Converts integration_events_log into a table range-partitioned by month on
+created_at, so event retention (app.services.event_retention_service) can
+expire a whole month with DROP TABLE instead of row deletes.
+
+- The old table is renamed to integration_events_log_unpartitioned and
+  left in place; drop it by hand once the copy is verified.
+- PostgreSQL requires the partition key in every unique constraint, so the
+  primary key becomes (id, created_at) and UNIQUE(event_id, created_at)
+  replaces UNIQUE(event_id): the database no longer rejects a second row
+  with the same event_id on its own.  EventHandlerService enforces it
+  instead: on PostgreSQL its duplicate check takes a per-event_id advisory
+  transaction lock, held until the new row is committed, so concurrent
+  deliveries of one event cannot both pass the check.
+- Monthly partitions are created from the oldest row up to two months
+  ahead; later months are created at startup and by each retention run.
+- A DEFAULT partition catches any row whose month has no partition yet, so
+  an insert never fails; ensure_partitions moves such rows into the month
+  partition when it creates it.
+
+Run during a quiet window: the copy holds an exclusive lock on the table.
+"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from app.infra.db.base import engine
+
+TABLE = "integration_events_log"
+OLD = f"{TABLE}_unpartitioned"
+
+PARTITION_EVENT_LOG_SQL = f"""
+LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE;
+ALTER TABLE {TABLE} RENAME TO {OLD};
+
+CREATE TABLE {TABLE} (
+    LIKE {OLD} INCLUDING DEFAULTS,
+    PRIMARY KEY (id, created_at),
+    UNIQUE (event_id, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE IF EXISTS {TABLE}_id_seq OWNED BY {TABLE}.id;
+
+CREATE TABLE IF NOT EXISTS {TABLE}_default PARTITION OF {TABLE} DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_events_p_event_id ON {TABLE} (event_id);
+CREATE INDEX IF NOT EXISTS idx_events_p_status_created ON {TABLE} (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_events_p_source_module ON {TABLE} (source, module);
+CREATE INDEX IF NOT EXISTS idx_events_p_record ON {TABLE} (source, record_id);
+"""
+
+
+def _next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_event_log():
+    """Rename, recreate as partitioned, create default + month partitions, copy rows."""
+    if engine.dialect.name != "postgresql":
+        print("❌ Partitioning is only supported on PostgreSQL")
+        return
+
+    with engine.begin() as conn:
+        already = conn.execute(text(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :t"
+        ), {"t": TABLE}).scalar()
+        if already:
+            print(f"✅ {TABLE} is already partitioned")
+            return
+
+        print(f"Converting {TABLE} to monthly partitions...")
+        conn.execute(text(PARTITION_EVENT_LOG_SQL))
+
+        oldest = conn.execute(text(f"SELECT MIN(created_at) FROM {OLD}")).scalar()
+        month = (oldest.date() if oldest else date.today()).replace(day=1)
+        last = _next_month(_next_month(date.today().replace(day=1)))
+        while month <= last:
+            end = _next_month(month)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {TABLE}_p{month:%Y%m} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            month = end
+
+        copied = conn.execute(text(f"INSERT INTO {TABLE} SELECT * FROM {OLD}")).rowcount
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {TABLE}), 1))"
+        ))
+        print(f"✅ Copied {copied} rows into partitioned {TABLE}")
+
+    print(f"\n✅ Migration completed — verify, then: DROP TABLE {OLD};")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    partition_event_log()
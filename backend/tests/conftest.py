@@ -4,6 +4,7 @@ Pytest configuration and fixtures for integration tests
 import pytest
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
 from app.core.config import settings
 from app.infra.db.base import Base
 
@@ -47,3 +48,24 @@ def db():
 def db_session(db: Session):
     """Alias fixture for db."""
     return db
+
+
+@pytest.fixture(scope="function")
+def sqlite_factory():
+    """
+    Build sessionmakers over private in-memory SQLite databases:
+    sqlite_factory(EventLog, Student) creates just those tables,
+    sqlite_factory() every registered table.
+    """
+    engines = []
+
+    def make(*models):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(engine, tables=[m.__table__ for m in models] or None)
+        engines.append(engine)
+        return sessionmaker(bind=engine)
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
@@ -0,0 +1,104 @@
+"""
+Smoke tests for the offline benchmark harness (fake Zoho / Moodle + runner)
+"""
+
+import httpx
+import pytest
+
+from benchmarks import loadgen
+from benchmarks.dataset import build_tenant, count_records
+from benchmarks.run import parse_args, percentile, run
+from benchmarks.stubs import FakeMoodle, FakeZoho, StubConfig, StubTransport
+
+
+class TestStubs:
+    """Test the fake servers' Zoho / Moodle semantics."""
+
+    async def test_zoho_pagination_and_search(self):
+        tenant = build_tenant(300)
+        transport = StubTransport(FakeZoho(tenant, StubConfig()), FakeMoodle(StubConfig()))
+        students = tenant["BTEC_Students"]
+        async with httpx.AsyncClient(transport=transport) as client:
+            page = await client.get("https://www.zohoapis.com/crm/v2/BTEC_Students",
+                                    params={"page": 1, "per_page": 10})
+            body = page.json()
+            assert len(body["data"]) == 10
+            assert body["info"]["more_records"] is True
+
+            found = await client.get(
+                "https://www.zohoapis.com/crm/v2/BTEC_Enrollments/search",
+                params={"criteria": f"(Enrolled_Students:equals:{students[0]['id']})"},
+            )
+            assert {r["Enrolled_Students"]["id"] for r in found.json()["data"]} == {students[0]["id"]}
+
+    async def test_moodle_parent_and_duplicate_errors(self):
+        moodle = FakeMoodle(StubConfig())
+        transport = StubTransport(FakeZoho({}, StubConfig()), moodle)
+        url = "http://moodle.stub/webservice/rest/server.php"
+        async with httpx.AsyncClient(transport=transport) as client:
+            async def call(fn, param, data):
+                resp = await client.post(url, data={"wsfunction": fn, param: data})
+                return resp.json()
+
+            orphan = await call("local_mzi_record_payment", "paymentdata",
+                                '{"zoho_payment_id": "p1", "zoho_registration_id": "r1"}')
+            assert orphan["message"] == "Registration with zoho_registration_id r1 not found"
+
+            await call("local_mzi_update_student", "studentdata", '{"zoho_student_id": "s1"}')
+            await call("local_mzi_create_registration", "registrationdata",
+                       '{"zoho_registration_id": "r1", "zoho_student_id": "s1"}')
+            created = await call("local_mzi_record_payment", "paymentdata",
+                                 '{"zoho_payment_id": "p1", "zoho_registration_id": "r1"}')
+            again = await call("local_mzi_record_payment", "paymentdata",
+                               '{"zoho_payment_id": "p1", "zoho_registration_id": "r1"}')
+        assert created["success"] is True
+        assert "Duplicate entry" in again["message"]
+
+
+class TestRunner:
+    """Test the full_sync scenario end to end."""
+
+    async def test_full_sync_small_tenant(self):
+        result = await run(parse_args(["full_sync", "--records", "300"]))
+
+        assert result.errors == 0
+        assert result.records == count_records(build_tenant(300))
+        assert result.processed > 0
+        assert result.http_calls["moodle:local_mzi_update_student"] == len(build_tenant(300)["BTEC_Students"])
+        assert result.zoho_token_refreshes >= 1
+
+    def test_percentile(self):
+        assert percentile([], 50) is None
+        assert percentile([0.001, 0.002, 0.003, 0.004], 50) == 2.0
+        assert percentile([0.001, 0.002, 0.003, 0.004], 99) == 4.0
+
+
+class TestLoadgen:
+    """Test webhook body generation and saturation detection."""
+
+    def test_bodies_are_signed_and_shaped(self):
+        from app.core.security import verify_webhook_signature
+
+        tenant = build_tenant(300)
+        requests = loadgen.synthetic_requests(tenant, ["events"], "form")
+        batch = [next(requests) for _ in range(len(loadgen.EVENT_ROUTES))]
+
+        for req in batch:
+            assert verify_webhook_signature("zoho", req.body.decode(), loadgen.sign(req.body),
+                                            loadgen.BENCH_SECRET)
+        shapes = {req.path.rsplit("/", 1)[1]: req.content_type for req in batch}
+        # Only the student route understands form-data; the rest stay JSON
+        assert shapes["student"] == "application/x-www-form-urlencoded"
+        assert shapes["grade"] == "application/json"
+
+    def test_saturation_reasons(self):
+        step = loadgen.StepResult(
+            offered_rps=100, sent=1000, completed=1000, achieved_rps=70.0, errors=0, over_slo=3,
+            errors_by_path={}, latency_p50_ms=50.0, latency_p95_ms=900.0, latency_p99_ms=12000.0,
+            loop_lag_p99_ms=5.0, loop_lag_max_ms=20.0,
+        )
+        assert loadgen._saturation(step, slo_ms=10000, max_loop_lag_ms=100) == ["throughput", "latency_slo"]
+
+        step.achieved_rps, step.latency_p99_ms = 99.0, 300.0
+        assert loadgen._saturation(step, slo_ms=10000, max_loop_lag_ms=100) == []
+        assert loadgen.sustainable_rate([step]) == 100
@@ -0,0 +1,86 @@
+"""
+Unit tests for BtecTemplateService bulk sync (incremental + concurrent)
+"""
+
+import threading
+import time
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.orm import sessionmaker
+
+from app.infra.db.models import BtecTemplateSync
+from app.infra.zoho.client import ZohoClient
+from app.services.btec_template_service import BtecTemplateService, forget_template_sync
+
+
+def _unit(i, p1="Explain"):
+    return {'id': f'U{i}', 'Name': f'Unit {i}', 'P1_description': p1, 'M1_description': 'Analyse'}
+
+
+class FakeMoodle:
+    """Blocking _call_api like MoodleClient; records peak concurrency."""
+
+    def __init__(self):
+        self.calls = []
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def _call_api(self, function, params):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+            self.calls.append(params['zoho_unit_id'])
+        if params['zoho_unit_id'] == 'U3':
+            return {'success': False, 'message': 'Moodle rejected'}
+        return {'success': True, 'definition_id': len(self.calls)}
+
+
+@pytest.fixture
+def sqlite_db(sqlite_factory):
+    return sqlite_factory(BtecTemplateSync)()
+
+
+@pytest.fixture
+def zoho():
+    zoho = MagicMock(spec=ZohoClient)
+    zoho.units = [_unit(i) for i in range(8)]
+    zoho.get_records = AsyncMock(side_effect=lambda **kw: {'data': zoho.units if kw['page'] == 1 else []})
+    return zoho
+
+
+async def test_sync_all_templates_incremental_and_concurrent(sqlite_db, zoho):
+    moodle = FakeMoodle()
+    service = BtecTemplateService(zoho, moodle, sqlite_db)
+
+    results = await service.sync_all_templates(concurrency=3)
+
+    assert (results['success'], results['failed'], results['skipped']) == (7, 1, 0)
+    assert 1 < moodle.peak <= 3
+    assert [d['unit_id'] for d in results['details']] == [f'U{i}' for i in range(8)]
+    # Zoho sync status writes stay disabled
+    zoho.update_records.assert_not_awaited()
+    zoho.update_record.assert_not_awaited()
+    assert sqlite_db.query(BtecTemplateSync).count() == 7
+
+    # re-run: only the failed unit and the edited one are pushed again
+    zoho.units[5] = _unit(5, p1="Explain in detail")
+    moodle.calls.clear()
+    results = await BtecTemplateService(zoho, moodle, sqlite_db).sync_all_templates()
+
+    assert sorted(moodle.calls) == ['U3', 'U5']
+    assert (results['success'], results['failed'], results['skipped']) == (1, 1, 6)
+
+    # a deleted unit loses its hash, so re-creating it pushes it again
+    forget_template_sync('U0', session_factory=sessionmaker(bind=sqlite_db.get_bind()))
+    moodle.calls.clear()
+    await BtecTemplateService(zoho, moodle, sqlite_db).sync_all_templates()
+    assert sorted(moodle.calls) == ['U0', 'U3']
+
+    # force re-creates everything
+    moodle.calls.clear()
+    await BtecTemplateService(zoho, moodle, sqlite_db).sync_all_templates(force=True)
+    assert len(moodle.calls) == 8
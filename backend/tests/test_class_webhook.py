@@ -0,0 +1,112 @@
+"""
+Unit tests for teacher lookups and batched enrollment pushes in the class webhook
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, patch
+
+from app.api.v1.endpoints import webhooks_moodle_courses as courses
+from app.api.v1.endpoints import webhooks_shared
+from app.api.v1.endpoints.webhooks_shared import TeacherCache
+
+
+class FakeMoodleWS:
+    """call_moodle_ws stand-in; optionally without the batch enrollment function."""
+
+    def __init__(self, batch=True, batch_error=None):
+        self.batch = batch
+        self.batch_error = batch_error
+        self.calls = []
+
+    async def __call__(self, wsfunction, params):
+        self.calls.append(wsfunction)
+        await asyncio.sleep(0)
+        if wsfunction == "local_mzi_update_enrollments":
+            if self.batch_error:
+                raise self.batch_error
+            if not self.batch:
+                raise HTTPException(status_code=500,
+                                    detail="Can't find data record in database table external_functions.")
+            items = json.loads(params["enrollmentsdata"])
+            return {"results": [{"success": i["zoho_student_id"] != "bad", "enrol_status": "enrolled",
+                                 "moodle_user_id": 1, "message": "ok"} for i in items]}
+        if wsfunction == "local_mzi_update_enrollment":
+            return {"success": True, "enrol_status": "enrolled", "moodle_user_id": 1}
+        if wsfunction == "core_user_get_users_by_field":
+            return [{"id": 77}]
+        return {}
+
+
+def _enrollments(n):
+    return [{"zoho_enrollment_id": f"e{i}", "zoho_student_id": "bad" if i == 3 else f"s{i}"} for i in range(n)]
+
+
+@pytest.fixture(autouse=True)
+def batch_flag():
+    with patch.object(courses, "_batch_unsupported_until", 0.0):
+        yield
+
+
+async def test_push_class_enrollments_batches():
+    moodle = FakeMoodleWS()
+    with patch.object(courses, "call_moodle_ws", moodle):
+        counts = await courses.push_class_enrollments(_enrollments(120))
+    assert counts == {"synced": 119, "failed": 1}
+    assert moodle.calls == ["local_mzi_update_enrollments"] * 3
+
+
+async def test_push_class_enrollments_falls_back_to_single_calls():
+    moodle = FakeMoodleWS(batch=False)
+    with patch.object(courses, "call_moodle_ws", moodle):
+        counts = await courses.push_class_enrollments(_enrollments(4))
+        assert counts == {"synced": 4, "failed": 0}
+        assert moodle.calls == ["local_mzi_update_enrollments"] + ["local_mzi_update_enrollment"] * 4
+
+        # plugin without the batch function is remembered...
+        moodle.calls.clear()
+        await courses.push_class_enrollments(_enrollments(2))
+        assert moodle.calls == ["local_mzi_update_enrollment"] * 2
+
+        # ...until the recheck interval has passed
+        moodle.calls.clear()
+        with patch.object(courses.time, "monotonic",
+                          return_value=courses._batch_unsupported_until + 1):
+            await courses.push_class_enrollments(_enrollments(2))
+    assert moodle.calls[0] == "local_mzi_update_enrollments"
+
+
+async def test_transient_batch_failure_keeps_batching():
+    moodle = FakeMoodleWS(batch_error=HTTPException(status_code=502, detail="Moodle API communication error: timeout"))
+    with patch.object(courses, "call_moodle_ws", moodle):
+        counts = await courses.push_class_enrollments(_enrollments(60))
+        assert counts == {"synced": 0, "failed": 60}
+        assert moodle.calls == ["local_mzi_update_enrollments"] * 2
+
+        moodle.batch_error = None
+        moodle.calls.clear()
+        await courses.push_class_enrollments(_enrollments(2))
+    assert moodle.calls == ["local_mzi_update_enrollments"]
+
+
+async def test_teacher_cache_hits_and_single_flight():
+    cache = TeacherCache()
+    cache.store("t1", "Teacher@School.edu", 55)
+    moodle = FakeMoodleWS()
+    fetch = AsyncMock(return_value={"id": "t2", "Academic_Email": "other@school.edu"})
+    with patch.object(webhooks_shared, "call_moodle_ws", moodle), \
+         patch.object(webhooks_shared, "fetch_zoho_full_record", fetch):
+        assert await cache.get_moodle_user_id("t1") == 55
+        assert moodle.calls == [] and fetch.await_count == 0
+
+        # miss: one Zoho fetch + one Moodle lookup, shared by concurrent callers
+        ids = await asyncio.gather(*(cache.get_moodle_user_id("t2") for _ in range(3)))
+        assert ids == [77, 77, 77]
+        assert fetch.await_count == 1 and moodle.calls == ["core_user_get_users_by_field"]
+        assert cache.get_by_email("OTHER@school.edu") == 77
+
+        cache.forget("t2")
+        assert cache.get_by_email("other@school.edu") is None
@@ -0,0 +1,113 @@
+"""
+Unit tests for the admin data browser (keyset cursors, FTS search, counts)
+"""
+
+from datetime import datetime
+
+import pytest
+from unittest.mock import patch
+
+from admin import router as admin_router
+from app.infra.db.models import EventLog, Student
+from app.infra.db.search import ensure_browse_indexes
+
+
+@pytest.fixture
+def db_factory(sqlite_factory):
+    """Private in-memory database with browse / FTS indexes, wired into SessionLocal."""
+    factory = sqlite_factory()
+    ensure_browse_indexes(factory.kw["bind"])
+    admin_router._count_cache.clear()
+    with patch("app.infra.db.session.SessionLocal", factory):
+        yield factory
+
+
+def _students(factory, n, same_time=True):
+    db = factory()
+    ts = datetime(2026, 1, 1, 12, 0, 0)
+    for i in range(n):
+        db.add(Student(zoho_id=f"z{i:03d}", username=f"user{i}", academic_email=f"s{i}@school.edu",
+                       display_name=f"Student {i}", created_at=ts if same_time else datetime(2026, 1, 1, 0, i)))
+    db.commit()
+    db.close()
+
+
+def _page(entity="students", **kw):
+    kw.setdefault("search", "")
+    kw.setdefault("status", "")
+    kw.setdefault("before", "")
+    kw.setdefault("after", "")
+    return admin_router._fetch_entity(entity, per_page=30, **kw)
+
+
+class TestKeyset:
+    """Test cursor pages over rows that share created_at."""
+
+    def test_walk_older_then_newer(self, db_factory):
+        _students(db_factory, 70)
+
+        seen, pages, cursor = [], [], ""
+        while True:
+            rows, total, _, newer, older = _page(before=cursor)
+            pages.append((rows, newer))
+            seen += [r["zoho_id"] for r in rows]
+            if not older:
+                break
+            cursor = older
+        assert total == "70"
+        assert len(seen) == 70 == len(set(seen))
+        assert [len(p[0]) for p in pages] == [30, 30, 10]
+
+        back, *_ = _page(after=pages[2][1])
+        assert back == pages[1][0]
+
+    def test_events_page_by_id(self, db_factory):
+        db = db_factory()
+        for i in range(35):
+            db.add(EventLog(event_id=f"e{i}", source="zoho", module="BTEC_Students", event_type="updated",
+                            record_id=f"r{i}", payload={}, status="completed"))
+        db.commit()
+        db.close()
+
+        first, total, _, _, older = _page("events")
+        second, *_ = _page("events", before=older)
+        assert total == "35"
+        assert first[0]["record_id"] == "r34" and second[-1]["record_id"] == "r0"
+
+    def test_bad_cursor_falls_back_to_first_page(self, db_factory):
+        _students(db_factory, 3)
+        rows, *_ = _page(before="not-a-cursor!")
+        assert len(rows) == 3
+
+
+class TestSearch:
+    """Test FTS5 trigram search and capped counts."""
+
+    def test_substring_search_follows_writes(self, db_factory):
+        _students(db_factory, 5, same_time=False)
+        db = db_factory()
+        s = db.query(Student).filter_by(zoho_id="z003").one()
+        s.display_name = "Alice Wonderland"
+        db.commit()
+        db.close()
+
+        from app.infra.db.search import _fts_tables
+        assert "students" in _fts_tables[db_factory.kw["bind"]]
+        rows, total, *_ = _page(search="WONDER")
+        assert [r["zoho_id"] for r in rows] == ["z003"] and total == "1"
+        rows, *_ = _page(search="school.edu")
+        assert len(rows) == 5
+        rows, *_ = _page(search="z0")   # shorter than a trigram: ILIKE fallback
+        assert len(rows) == 5
+
+    def test_filtered_count_is_capped_and_cached(self, db_factory):
+        _students(db_factory, 12)
+        with patch.object(admin_router, "_COUNT_CAP", 10):
+            _, total, *_ = _page(search="school")
+            assert total == "10+"
+            db = db_factory()
+            db.add(Student(zoho_id="x", academic_email="x@school.edu"))
+            db.commit()
+            db.close()
+            assert _page(search="school")[1] == "10+"
+            assert _page(search="x@school")[1] == "1"
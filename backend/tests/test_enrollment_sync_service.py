@@ -300,41 +300,40 @@ class TestEnrollmentSyncService:
     
     async def test_get_active_enrollments(self, service, mock_zoho):
         """Test getting active enrollments."""
-        mock_zoho.search_records.return_value = [
+        mock_zoho.coql_select = AsyncMock(return_value=[
             {'id': '1', 'Enrollment_Status': 'Active'},
             {'id': '2', 'Enrollment_Status': 'Active'}
-        ]
+        ])
         
         enrollments = await service.get_active_enrollments()
         
         assert len(enrollments) == 2
         
-        mock_zoho.search_records.assert_called_once_with(
-            'BTEC_Enrollments',
-            '(Enrollment_Status:equals:Active)',
-            page=1,
-            per_page=200
-        )
+        args, kwargs = mock_zoho.coql_select.call_args
+        assert args[0] == 'BTEC_Enrollments'
+        assert kwargs['where'] == "Enrollment_Status = 'Active'"
+        assert kwargs['limit'] is None
+        
+        await service.get_active_enrollments(page=3, per_page=50)
+        kwargs = mock_zoho.coql_select.call_args.kwargs
+        assert (kwargs['limit'], kwargs['offset']) == (50, 100)
     
     async def test_bulk_sync_enrollments(self, service, mock_zoho):
         """Test bulk syncing enrollments."""
-        # Mock: first enrollment is new, second exists
-        mock_zoho.search_records.side_effect = [
-            [],  # No existing for first
-            [{'id': '2', 'Enrollment_Status': 'Active'}],  # Existing for second
-            []   # No existing for third
+        # Mock: class1 already has student2 enrolled
+        mock_zoho.search_records.return_value = [
+            {'id': '2', 'Enrolled_Students': {'id': 'student2', 'name': 'S2'},
+             'Classes': {'id': 'class1'}, 'Enrollment_Status': 'Active'}
         ]
         
-        # Mock create/update
-        mock_zoho.create_record.side_effect = [
+        # Mock batched create/update
+        mock_zoho.create_records = AsyncMock(return_value=[
             {'code': 'SUCCESS', 'details': {'id': '1'}},
             {'code': 'SUCCESS', 'details': {'id': '3'}}
-        ]
-        
-        mock_zoho.update_record.return_value = {
-            'code': 'SUCCESS',
-            'details': {'id': '2'}
-        }
+        ])
+        mock_zoho.update_records = AsyncMock(return_value=[
+            {'code': 'SUCCESS', 'details': {'id': '2'}}
+        ])
         
         enrollments = [
             EnrollmentData("student1", "class1", "101"),
@@ -348,7 +347,65 @@ class TestEnrollmentSyncService:
         assert summary['created'] == 2
         assert summary['updated'] == 1
         assert summary['failed'] == 0
+        
+        # One class search, one create batch, one update batch
+        assert mock_zoho.search_records.call_count == 1
+        created = mock_zoho.create_records.call_args[0][1]
+        assert [r['Enrolled_Students'] for r in created] == ['student1', 'student3']
+        updated = mock_zoho.update_records.call_args[0][1]
+        assert updated[0]['id'] == '2' and updated[0]['Enrolled_Students'] == 'student2'
+    
+    async def test_bulk_sync_pages_batches_and_falls_back(self, service, mock_zoho):
+        """Paged prefetch, 100-record writes, per-item path for unavailable classes."""
+        existing = [{'id': f'E{i}', 'Enrolled_Students': {'id': f's{i}'}} for i in range(250)]
+        
+        async def search(module, criteria, fields=None, page=1, per_page=200):
+            if 'class-down' in criteria:
+                raise RuntimeError("Zoho down")
+            if 'Enrolled_Students' in criteria:
+                return []   # per-item lookup
+            return existing[(page - 1) * per_page:page * per_page]
+        mock_zoho.search_records.side_effect = search
+        mock_zoho.create_records = AsyncMock(
+            side_effect=lambda module, records: [{'code': 'SUCCESS'} for _ in records]
+        )
+        mock_zoho.update_records = AsyncMock(
+            side_effect=lambda module, records: [
+                {'code': 'INVALID_DATA', 'message': 'bad'} if r['id'] == 'E0' else {'code': 'SUCCESS'}
+                for r in records
+            ]
+        )
+        mock_zoho.create_record.return_value = {'code': 'SUCCESS', 'details': {'id': 'N1'}}
+        
+        enrollments = [EnrollmentData(f's{i}', 'class1', '101') for i in range(300)]
+        enrollments.append(EnrollmentData('s0', 'class-down', '102'))
+        
+        summary = await service.bulk_sync_enrollments(enrollments)
+        
+        assert summary['created'] == 51   # 50 new + 1 via fallback
+        assert summary['updated'] == 249
+        assert summary['failed'] == 1 and summary['errors'][0]['student_id'] == 's0'
+        assert [len(c.args[1]) for c in mock_zoho.update_records.call_args_list] == [100, 100, 50]
+        assert [len(c.args[1]) for c in mock_zoho.create_records.call_args_list] == [50]
+        mock_zoho.create_record.assert_called_once()
 
+    
+    async def test_bulk_sync_repeats_counted_after_write(self, service, mock_zoho):
+        """Repeated student + class pairs count as merged only once their write succeeds."""
+        mock_zoho.search_records.return_value = []
+        mock_zoho.create_records = AsyncMock(side_effect=lambda module, records: [
+            {'code': 'INVALID_DATA', 'message': 'bad'} if r['Enrolled_Students'] == 'bad' else {'code': 'SUCCESS'}
+            for r in records
+        ])
+        
+        enrollments = [EnrollmentData(s, 'class1', '101') for s in ('s1', 's1', 's1', 'bad', 'bad')]
+        
+        summary = await service.bulk_sync_enrollments(enrollments)
+        
+        assert mock_zoho.create_records.call_count == 1
+        assert (summary['created'], summary['merged'], summary['updated']) == (1, 2, 0)
+        assert summary['failed'] == 2 and len(summary['errors']) == 1
+        assert summary['created'] + summary['updated'] + summary['merged'] + summary['failed'] == summary['total']
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -0,0 +1,120 @@
+"""
+Unit tests for event-log retention (windows, batched deletes, archive)
+"""
+
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.core.config import settings
+from app.domain.events import EventStatus, ZohoWebhookEvent
+from app.infra.db.models import EventLog, StatCounter, Student
+from app.services import event_retention_service
+from app.services import stat_counter_service as counters
+from app.services.event_handler_service import EventHandlerService
+from app.services.event_retention_service import EventRetentionService
+
+NOW = datetime(2026, 6, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def sqlite_db(sqlite_factory):
+    return sqlite_factory(EventLog, StatCounter, Student)()
+
+
+def _seed(sqlite_db):
+    """Per status: ages in days; ids are 'status-age-i'."""
+    ages = {"completed": [1, 40, 45, 50, 60, 70, 80], "failed": [40, 100], "pending": [365]}
+    for status, days in ages.items():
+        for i, age in enumerate(days):
+            sqlite_db.add(EventLog(event_id=f"{status}-{age}-{i}", source="zoho", module="BTEC_Students",
+                                   event_type="updated", record_id=str(i), payload={"n": i},
+                                   status=status, created_at=NOW - timedelta(days=age)))
+    sqlite_db.commit()
+    counters.reconcile(sqlite_db)
+
+
+class TestRetention:
+    """Test expiry by status window with archive + counter updates."""
+
+    def test_expires_archives_and_adjusts_counters(self, sqlite_db, tmp_path):
+        _seed(sqlite_db)
+        service = EventRetentionService(sqlite_db, windows={"completed": 30, "failed": 90},
+                                        archive_dir=str(tmp_path), batch_size=4)
+        stats = service.run(now=NOW)
+
+        assert stats == {"archived": 7, "deleted": 7, "partitions_dropped": 0}
+        left = sorted(e.event_id for e in sqlite_db.query(EventLog))
+        assert left == ["completed-1-0", "failed-40-0", "pending-365-0"]
+
+        files = list(tmp_path.glob("integration_events_log-*.ndjson.gz"))
+        assert len(files) == 1
+        with gzip.open(files[0], "rt") as fh:   # several gzip members, read as one stream
+            archived = [json.loads(line) for line in fh]
+        assert len(archived) == 7
+        assert {"event_id", "payload", "status", "created_at"} <= set(archived[0])
+        assert archived[0]["payload"] == {"n": 1}
+
+        incremental = counters.by_prefix(counters.read_counters(sqlite_db), "events.")
+        assert incremental == counters.by_prefix(counters.reconcile(sqlite_db), "events.")
+        assert counters.dashboard_stats(sqlite_db)["events_total"] == 3
+
+    def test_no_archive_dir_deletes_only(self, sqlite_db, tmp_path):
+        _seed(sqlite_db)
+        stats = EventRetentionService(sqlite_db, windows={"failed": 30}, archive_dir="").run(now=NOW)
+        assert stats["archived"] == 0 and stats["deleted"] == 2
+
+    def test_relative_archive_dir_refused(self, sqlite_db):
+        _seed(sqlite_db)
+        stats = EventRetentionService(sqlite_db, windows={"failed": 30}, archive_dir="event_archive").run(now=NOW)
+        assert stats["deleted"] == 0 and sqlite_db.query(EventLog).count() == 10
+
+    def test_retention_off_by_default(self):
+        fields = type(settings).model_fields
+        assert fields["EVENT_RETENTION_INTERVAL_SECONDS"].default == 0
+        assert fields["EVENT_ARCHIVE_DIR"].default == ""
+
+    def test_windows_from_settings(self):
+        with patch.object(settings, "EVENT_RETENTION_DAYS", '{"completed": 14, "failed": 0}'):
+            assert event_retention_service.retention_windows() == {"completed": 14}
+        with patch.object(settings, "EVENT_RETENTION_DAYS", "not json"):
+            assert event_retention_service.retention_windows() == {}
+
+    def test_partitions_ensured_without_windows(self, sqlite_db):
+        service = EventRetentionService(sqlite_db, windows={})
+        with patch.object(service, "_is_partitioned", return_value=True), \
+             patch.object(service, "ensure_partitions") as ensure:
+            assert service.run(now=NOW) == {"archived": 0, "deleted": 0, "partitions_dropped": 0}
+        ensure.assert_called_once_with(NOW.date())
+
+
+class TestDedupAfterPartitioning:
+    """Partitioning relaxes event_id uniqueness to (event_id, created_at); the app lookup still dedups."""
+
+    async def test_replayed_event_is_duplicate(self, sqlite_db):
+        sqlite_db.add(EventLog(event_id="evt-1", source="zoho", module="BTEC_Students", event_type="update",
+                               record_id="1", payload={}, status="completed", created_at=NOW - timedelta(days=40)))
+        sqlite_db.commit()
+
+        handler = EventHandlerService(sqlite_db, MagicMock(), MagicMock(), MagicMock(), MagicMock(), MagicMock())
+        with patch.object(handler, "_route_zoho_event") as route:
+            result = await handler.handle_zoho_event(ZohoWebhookEvent(
+                event_id="evt-1", module="BTEC_Students", operation="update", record_id="1",
+            ))
+
+        assert result.status == EventStatus.DUPLICATE
+        route.assert_not_called()
+        assert sqlite_db.query(EventLog).filter(EventLog.event_id == "evt-1").count() == 1
+
+    def test_postgres_check_is_serialized_per_event_id(self):
+        session = MagicMock()
+        session.get_bind.return_value.dialect.name = "postgresql"
+        session.query.return_value.filter.return_value.first.return_value = None
+        handler = EventHandlerService(session, MagicMock(), MagicMock(), MagicMock(), MagicMock(), MagicMock())
+
+        assert handler._is_duplicate_event("evt-2") is False
+        statement, params = session.execute.call_args.args
+        assert "pg_advisory_xact_lock" in str(statement) and params == {"event_id": "evt-2"}
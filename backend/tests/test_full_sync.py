@@ -0,0 +1,121 @@
+"""
+Unit tests for the full-sync step scheduler
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.api.v1.endpoints import full_sync
+from app.api.v1.endpoints.full_sync import (
+    SINGLE_STUDENT_RELATED,
+    SYNC_STEPS,
+    StepResult,
+    _run_step_dag,
+    _sync_student_related,
+    _validate_step_dag,
+)
+
+
+def _new_job() -> dict:
+    return {"job_id": "test-job-0000", "results": {}, "total_synced": 0, "total_errors": 0}
+
+
+class TestStepDag:
+    """Test dependency-aware scheduling of full-sync steps."""
+
+    def test_default_dag_is_valid(self):
+        """The shipped step DAG has no cycles or unknown dependencies."""
+        _validate_step_dag(SYNC_STEPS)
+
+    def test_cycle_rejected(self):
+        """A cyclic DAG is rejected before anything runs."""
+        with pytest.raises(ValueError):
+            _validate_step_dag({"a": ("A", ("b",)), "b": ("B", ("a",))})
+
+    def test_unknown_dependency_rejected(self):
+        with pytest.raises(ValueError):
+            _validate_step_dag({"a": ("A", ("missing",))})
+
+    @pytest.mark.asyncio
+    async def test_dependencies_finish_first(self):
+        """Every step starts only after all of its dependencies finished."""
+        started, finished = [], []
+
+        async def runner(key):
+            started.append(key)
+            await asyncio.sleep(0.01)
+            finished.append(key)
+            return StepResult(module=key, total=1, synced=1, skipped=0, errors=0)
+
+        job = _new_job()
+        await _run_step_dag(job, SYNC_STEPS, runner, max_parallel=8)
+
+        for key, (_, deps) in SYNC_STEPS.items():
+            for dep in deps:
+                assert finished.index(dep) < started.index(key)
+        assert sorted(job["completed_steps"]) == sorted(SYNC_STEPS)
+        assert job["step_index"] == len(SYNC_STEPS)
+        assert job["total_synced"] == len(SYNC_STEPS)
+        assert job["running_steps"] == []
+
+    @pytest.mark.asyncio
+    async def test_independent_steps_overlap_within_budget(self):
+        """Independent steps run concurrently but never above max_parallel."""
+        active = {"now": 0, "peak": 0}
+
+        async def runner(key):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            return StepResult(module=key, total=0, synced=0, skipped=0, errors=0)
+
+        await _run_step_dag(_new_job(), SYNC_STEPS, runner, max_parallel=2)
+        assert active["peak"] == 2
+
+    @pytest.mark.asyncio
+    async def test_crashed_step_releases_dependants(self):
+        """A crashing step is recorded as an error and its dependants still run."""
+        async def runner(key):
+            if key == "registrations":
+                raise RuntimeError("boom")
+            return StepResult(module=key, total=0, synced=0, skipped=0, errors=0)
+
+        job = _new_job()
+        await _run_step_dag(job, SYNC_STEPS, runner, max_parallel=3)
+
+        assert job["results"]["registrations"]["errors"] == 1
+        assert "payments" in job["completed_steps"]
+        assert job["total_errors"] == 1
+
+
+class TestSyncStudentRelated:
+    """Test the concurrent related-module search + push for sync-student."""
+
+    @pytest.mark.asyncio
+    async def test_searches_share_token_and_payments_follow_registrations(self):
+        pushed = []
+
+        async def search(module, field, value, client=None, token=None):
+            # Registrations return last, so payments must wait for them
+            await asyncio.sleep(0.02 if module == "BTEC_Registrations" else 0)
+            return [{"id": f"{module}-1"}]
+
+        async def moodle(ws_function, params):
+            pushed.append(ws_function)
+            return {}
+
+        token = AsyncMock(return_value="tok")
+        with patch.object(full_sync, "_get_zoho_token", token), \
+             patch.object(full_sync, "fetch_zoho_records_by_criteria", AsyncMock(side_effect=search)) as fetch, \
+             patch.object(full_sync, "call_moodle_ws", AsyncMock(side_effect=moodle)), \
+             patch.object(full_sync, "transform_zoho_to_moodle", lambda r, t: {"id": r["id"]}):
+            results = await _sync_student_related("s1")
+
+        assert list(results) == list(SINGLE_STUDENT_RELATED)
+        assert all(r["synced"] == 1 for r in results.values())
+        assert token.await_count == 1
+        assert all(c.kwargs["token"] == "tok" for c in fetch.await_args_list)
+        assert pushed.index("local_mzi_create_registration") < pushed.index("local_mzi_record_payment")
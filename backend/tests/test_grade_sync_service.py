@@ -2,13 +2,17 @@
 Unit tests for GradeSyncService
 """
 
+import threading
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from app.infra.db.models import BtecUnitTemplate
 from app.services.grade_sync_service import (
     GradeSyncService,
     GradingTemplate,
+    GradingTemplateCache,
     MoodleGradeData
 )
 from app.infra.zoho.client import ZohoClient
@@ -167,9 +171,14 @@ class TestGradeSyncService:
         return zoho
     
     @pytest.fixture
-    def service(self, mock_zoho):
+    def template_cache(self, sqlite_factory):
+        """Template cache backed by a private in-memory database."""
+        return GradingTemplateCache(session_factory=sqlite_factory(BtecUnitTemplate))
+    
+    @pytest.fixture
+    def service(self, mock_zoho, template_cache):
         """Create service instance."""
-        return GradeSyncService(zoho_client=mock_zoho)
+        return GradeSyncService(zoho_client=mock_zoho, template_cache=template_cache)
     
     @pytest.mark.asyncio
     async def test_get_grading_template(self, service, mock_zoho):
@@ -217,6 +226,54 @@ class TestGradeSyncService:
         
         assert template1 is template2  # Same instance
     
+    @pytest.mark.asyncio
+    async def test_template_cache_shared_and_versioned(self, service, mock_zoho, template_cache):
+        """A new service instance reuses the cache; a newer Modified_Time re-parses."""
+        mock_zoho.get_record.return_value = {
+            'id': '123', 'Name': 'Unit 1', 'P1_description': 'Old', 'Modified_Time': '2026-01-01T10:00:00+03:00'
+        }
+        await service.get_grading_template('123')
+        
+        other = GradeSyncService(zoho_client=mock_zoho, template_cache=template_cache)
+        template_cache._parsed.clear()   # as seen from another worker
+        assert (await other.get_grading_template('123')).pass_criteria[0]['description'] == 'Old'
+        assert mock_zoho.get_record.call_count == 1
+        
+        # btec_definition_updated webhook stores the edited unit
+        template_cache.store('123', {
+            'id': '123', 'Name': 'Unit 1', 'P1_description': 'New', 'Modified_Time': '2026-02-01T10:00:00+03:00'
+        })
+        assert (await other.get_grading_template('123')).pass_criteria[0]['description'] == 'New'
+        assert mock_zoho.get_record.call_count == 1
+        
+        # past the TTL a failed Zoho read still serves the stale row
+        template_cache.ttl_seconds = 0
+        mock_zoho.get_record.side_effect = RuntimeError("Zoho down")
+        assert (await service.get_grading_template('123')).pass_criteria[0]['description'] == 'New'
+        
+        template_cache.invalidate('123')
+        with pytest.raises(RuntimeError):
+            await service.get_grading_template('123')
+    
+    @pytest.mark.asyncio
+    async def test_template_cache_db_work_off_loop(self, service, mock_zoho, template_cache):
+        """Table reads and writes run in a worker thread, not on the event loop."""
+        loop_thread = threading.get_ident()
+        threads = []
+        session_factory = template_cache._session_factory
+
+        def tracking_factory():
+            threads.append(threading.get_ident())
+            return session_factory()
+
+        template_cache._session_factory = tracking_factory
+        mock_zoho.get_record.return_value = {'id': '123', 'Name': 'Unit 1', 'P1_description': 'Test'}
+
+        await service.get_grading_template('123')
+
+        assert len(threads) == 2            # _load miss + store
+        assert loop_thread not in threads
+
     def test_build_learning_outcomes_subform(self, service):
         """Test building Learning_Outcomes_Assessm subform."""
         # Create template
@@ -397,6 +454,58 @@ class TestGradeSyncService:
         assert result['status'] == 'created'
         assert result['zoho_record_id'] == '5843017000000444444'
 
+    @pytest.mark.asyncio
+    async def test_sync_grades_batch(self, service, mock_zoho):
+        """One template fetch per unit, 100-record upserts, per-grade outcomes in order."""
+        units = {
+            'U1': {'id': 'U1', 'Name': 'Unit 1', 'P1_description': 'Explain'},
+            'U2': {'id': 'U2', 'Name': 'Unit 2', 'P1_description': 'Describe'},
+        }
+        mock_zoho.get_record.side_effect = lambda module, unit_id: units[unit_id]
+
+        grades = []
+        for i in range(150):
+            grade = MoodleGradeData(
+                moodle_grade_id=str(i), student_id=str(i), course_id='202',
+                zoho_student_id=f'S{i}', zoho_class_id='C1',
+                zoho_unit_id='U1' if i % 2 else 'U2',
+                overall_grade='Pass', graded_date='2026-01-25'
+            )
+            grade.add_criterion_score('P1' if i != 7 else 'P9', 'Achieved')
+            grades.append(grade)
+
+        def upsert(module, records, duplicate_check_fields):
+            assert module == 'BTEC_Grades'
+            assert duplicate_check_fields == ['Moodle_Grade_Composite_Key']
+            results = []
+            for record in records:
+                if record['Moodle_Grade_Composite_Key'] == '3_202':
+                    results.append({'code': 'INVALID_DATA', 'message': 'bad Student'})
+                else:
+                    results.append({'code': 'SUCCESS', 'action': 'insert',
+                                    'details': {'id': 'Z' + record['Moodle_Grade_ID']}})
+            return results
+        mock_zoho.upsert_records = AsyncMock(side_effect=upsert)
+
+        results = await service.sync_grades_batch(grades)
+
+        assert mock_zoho.get_record.call_count == 2
+        assert [len(c.args[1]) for c in mock_zoho.upsert_records.call_args_list] == [100, 49]
+        assert len(results) == 150
+        assert results[0] == {'status': 'created', 'zoho_record_id': 'Z0',
+                              'composite_key': '0_202', 'criteria_count': 1}
+        assert results[3]['status'] == 'error' and 'bad Student' in results[3]['message']
+        assert results[7] == {'status': 'error', 'composite_key': '7_202',
+                              'message': 'No valid criteria scores'}
+        assert sum(r['status'] == 'created' for r in results) == 148
+
+        # a failing unit or batch only fails its own grades
+        mock_zoho.get_record.side_effect = ZohoNotFoundError("gone")
+        service.template_cache.clear()
+        results = await service.sync_grades_batch(grades[:2])
+        assert [r['status'] for r in results] == ['error', 'error']
+        assert mock_zoho.upsert_records.call_count == 2
+
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -0,0 +1,116 @@
+"""
+Unit tests for the Moodle ↔ Zoho identity index and the grade webhook using it
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from unittest.mock import patch
+
+from app.api.v1.endpoints import webhooks
+from app.infra.db.models import ZohoIdentity
+from app.infra.zoho.exceptions import ZohoValidationError
+from app.services import identity_index_service as ids
+from app.services.identity_index_service import IdentityIndex, identity_index
+
+
+@pytest.fixture
+def factory(sqlite_factory):
+    factory = sqlite_factory(ZohoIdentity)
+    with patch.object(identity_index, "_session_factory", factory):
+        yield factory
+
+
+class FakeZoho:
+    """BTEC_Students / BTEC_Classes / BTEC_Grades held in dicts; records every call."""
+
+    def __init__(self):
+        self.calls = []
+        self.records = {
+            "BTEC_Students": {"s1": {"id": "s1", "Student_Moodle_ID": "42"}},
+            "BTEC_Classes": {"c1": {"id": "c1", "Class_Name": "Unit 1 - Programming"}},
+            "BTEC_Grades": {},
+        }
+
+    async def search_records(self, module, criteria):
+        self.calls.append(("search", module))
+        field, _, value = criteria.strip("()").split(":", 2)
+        return [r for r in self.records[module].values() if str(r.get(field)) == value]
+
+    async def create_record(self, module, data):
+        self.calls.append(("create", module))
+        new_id = f"g{len(self.records[module]) + 1}"
+        self.records[module][new_id] = {"id": new_id, **data}
+        return {"details": {"id": new_id}}
+
+    async def update_record(self, module, record_id, data):
+        self.calls.append(("update", module))
+        if record_id not in self.records[module]:
+            raise ZohoValidationError("Update failed: the id given seems to be invalid")
+        self.records[module][record_id].update(data)
+        return {"code": "SUCCESS"}
+
+
+def _grade_event(grade="P"):
+    return {"student_id": 42, "course_id": 7, "assignment_id": 3, "course_name": "Unit 1 - Programming",
+            "student_name": "Sam", "grade": grade, "graded_at": "2026-06-01 10:00:00"}
+
+
+class TestIdentityIndex:
+    """Test storage, staleness and record observation."""
+
+    def test_store_get_and_staleness(self, factory):
+        index = IdentityIndex(ttl_seconds=60, session_factory=factory)
+        assert index.store_many(ids.STUDENT, [(42, "s1"), ("", "x"), ("43", None), ("44", "s4")]) == 2
+        assert index.get(ids.STUDENT, "42") == "s1" and index.get(ids.STUDENT, 43) is None
+
+        db = factory()
+        db.get(ZohoIdentity, (ids.STUDENT, "44")).verified_at = datetime.utcnow() - timedelta(seconds=61)
+        db.commit()
+        db.close()
+        assert index.get(ids.STUDENT, "44") is None
+
+        index.forget_zoho_id("s1")
+        assert index.get(ids.STUDENT, "42") is None
+
+    def test_observe_records(self, factory):
+        index = IdentityIndex(session_factory=factory)
+        index.observe_records("classes", [
+            {"id": "c1", "Class_Name": "Unit 1", "Moodle_Class_ID": "7"},
+            {"id": "c2", "Class_Name": "Unit 2", "Moodle_Class_ID": None},
+        ])
+        index.observe_records("payments", [{"id": "p1"}])
+        assert index.get(ids.COURSE, 7) == "c1"
+        assert index.get(ids.CLASS_NAME, "Unit 2") == "c2"
+        assert index.get(ids.COURSE, None) is None
+
+
+class TestGradeWebhook:
+    """Test that a known grade costs one Zoho call and stale ids fall back to search."""
+
+    @pytest.mark.asyncio
+    async def test_known_grade_is_single_update(self, factory):
+        zoho = FakeZoho()
+        with patch("app.infra.zoho.create_zoho_client", return_value=zoho):
+            first = await webhooks.handle_grade_updated(_grade_event(), "e1")
+            assert first["action"] == "created"
+            assert len(zoho.calls) == 4   # 3 searches + create
+
+            zoho.calls.clear()
+            webhooks._request_cache.clear()
+            second = await webhooks.handle_grade_updated(_grade_event("M"), "e2")
+        assert second["action"] == "updated"
+        assert zoho.calls == [("update", "BTEC_Grades")]
+        assert zoho.records["BTEC_Grades"]["g1"]["Grade"] == "M"
+        assert zoho.records["BTEC_Grades"]["g1"]["Student"] == {"id": "s1"}
+
+    @pytest.mark.asyncio
+    async def test_stale_grade_id_is_forgotten_and_searched(self, factory):
+        zoho = FakeZoho()
+        identity_index.store(ids.GRADE, "42_7_3", "deleted-grade")
+        webhooks._request_cache.clear()
+        with patch("app.infra.zoho.create_zoho_client", return_value=zoho):
+            result = await webhooks.handle_grade_updated(_grade_event(), "e3")
+        assert result["action"] == "created"
+        assert zoho.calls.index(("update", "BTEC_Grades")) < zoho.calls.index(("search", "BTEC_Grades"))
+        assert identity_index.get(ids.GRADE, "42_7_3") == "g1"
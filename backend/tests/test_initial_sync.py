@@ -0,0 +1,126 @@
+"""
+Unit tests for initial_sync related-record fan-out and photo re-sends
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import patch
+
+import initial_sync
+from initial_sync import InitialSyncService, MODULES, RELATED_CONCURRENCY
+from zoho_attachments import ZohoAttachmentHandler
+
+
+class FakeZoho:
+    """search_records / get_record stand-in; pages of 200, records peak concurrency."""
+
+    def __init__(self, rows):
+        self.rows = rows            # {(module, criteria): [records]}
+        self.searches = []
+        self.active = self.peak = 0
+
+    async def _call(self):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.005)
+        self.active -= 1
+
+    async def search_records(self, module, criteria, page=1, per_page=200):
+        self.searches.append((module, criteria, page))
+        await self._call()
+        rows = self.rows.get((module, criteria), [])
+        return rows[(page - 1) * per_page:page * per_page]
+
+    async def get_record(self, module, record_id):
+        await self._call()
+        return {"id": record_id, "Class_Name": f"Class {record_id}"}
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with patch.object(initial_sync, "create_zoho_client", return_value=None):
+        svc = InitialSyncService()
+    svc.pushed = []
+
+    async def call_moodle_ws(function, params):
+        svc.pushed.append((function, params))
+        return {"success": True}
+
+    svc.call_moodle_ws = call_moodle_ws
+    return svc
+
+
+def _student_rows(n_regs, n_classes, payments_per_reg):
+    criteria = "(Student:equals:S1)"
+    rows = {
+        (MODULES["registrations"], criteria): [
+            {"id": f"R{i}", "Student": {"id": "S1"}, "Program": {"name": "BTEC"}} for i in range(n_regs)
+        ],
+        (MODULES["enrollments"], criteria): [
+            {"id": f"E{i}", "Student": {"id": "S1"}, "Class": {"id": f"C{i}"}} for i in range(n_classes)
+        ],
+    }
+    for i in range(n_regs):
+        rows[(MODULES["payments"], f"(Registration:equals:R{i})")] = [
+            {"id": f"P{i}-{j}", "Registration": {"id": f"R{i}"}} for j in range(payments_per_reg)
+        ]
+    return rows
+
+
+async def test_related_records_follow_pagination(service):
+    rows = _student_rows(n_regs=1, n_classes=0, payments_per_reg=450)
+    rows[(MODULES["grades"], "(Student:equals:S1)")] = [{"id": f"G{i}"} for i in range(200)]
+    service.zoho = FakeZoho(rows)
+
+    await service.sync_student_related_records("S1")
+
+    assert service.stats["payments"]["synced"] == 450
+    assert service.stats["grades"]["synced"] == 200
+    pages = {(m, c): p for m, c, p in service.zoho.searches}
+    assert pages[(MODULES["payments"], "(Registration:equals:R0)")] == 3
+    # a full last page needs one more (empty) page to know it was the last
+    assert pages[(MODULES["grades"], "(Student:equals:S1)")] == 2
+
+
+async def test_payments_searched_per_registration_and_bounded(service):
+    service.zoho = FakeZoho(_student_rows(n_regs=12, n_classes=12, payments_per_reg=2))
+
+    await service.sync_student_related_records("S1")
+
+    payment_searches = sorted(
+        c for m, c, _ in service.zoho.searches if m == MODULES["payments"]
+    )
+    assert payment_searches == sorted(f"(Registration:equals:R{i})" for i in range(12))
+    paid = {p["zoho_payment_id"] for f, p in service.pushed if f == "local_mzi_record_payment"}
+    assert paid == {f"P{i}-{j}" for i in range(12) for j in range(2)}
+    assert service.stats["classes"]["synced"] == 12
+    # payment searches + class fetches share RELATED_CONCURRENCY
+    assert service.zoho.peak <= RELATED_CONCURRENCY
+
+
+async def test_photo_resent_when_moodle_copy_differs(service, tmp_path):
+    photo_path = tmp_path / "S-1.jpg"
+    photo_path.write_bytes(b"\xff\xd8photo")
+    photo = {"path": str(photo_path), "sha256": "local", "cached": True}
+    service.attachment_handler = ZohoAttachmentHandler("token")
+    cache = service.attachment_handler.cache(service.photos_dir)
+    cache.mark_pushed("S-1", "local", moodle_sha256="local")
+    held = iter(["stale", "local"])
+
+    async def call_moodle_ws(function, params):
+        service.pushed.append((function, dict(params)))
+        return {"success": True, "photo_sha256": next(held)}
+
+    service.call_moodle_ws = call_moodle_ws
+    transformed = {"student_id": "S-1"}
+    service.attach_photo(transformed, photo)
+    assert "photo_data" not in transformed          # cache says Moodle has it
+
+    result = await service.call_moodle_ws("local_mzi_update_student", transformed)
+    await service.confirm_photo("local_mzi_update_student", transformed, photo, result)
+
+    # Moodle reported another file: the photo went out again and is recorded as confirmed
+    assert len(service.pushed) == 2 and "photo_data" in service.pushed[1][1]
+    assert cache.pushed_hash("S-1") == "local"
@@ -0,0 +1,133 @@
+"""
+Unit tests for the /metrics registry and exposition
+"""
+
+import json
+import os
+
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.access_log import AccessLogMiddleware
+from app.core.metrics import Counter, Gauge, Histogram
+
+
+@pytest.fixture
+def registry():
+    """Isolated registry (restores the application metrics afterwards)."""
+    saved = dict(metrics._registry)
+    metrics._registry.clear()
+    yield
+    metrics._registry.clear()
+    metrics._registry.update(saved)
+
+
+class TestExposition:
+    """Test counter / histogram rendering."""
+
+    def test_counter_and_histogram(self, registry):
+        c = Counter("calls_total", "Calls.", ("fn",))
+        h = Histogram("call_seconds", "Latency.", ("fn",), buckets=(0.1, 1.0))
+        c.inc("a")
+        c.inc("a", amount=2)
+        h.observe(0.05, "a")
+        h.observe(0.5, "a")
+        h.observe(5.0, "a")
+
+        with patch.object(metrics, "_collectors", []):
+            text = metrics.render()
+
+        assert '# TYPE calls_total counter' in text
+        assert 'calls_total{fn="a"} 3' in text
+        assert 'call_seconds_bucket{fn="a",le="0.1"} 1' in text
+        assert 'call_seconds_bucket{fn="a",le="1"} 2' in text
+        assert 'call_seconds_bucket{fn="a",le="+Inf"} 3' in text
+        assert 'call_seconds_count{fn="a"} 3' in text
+
+    def test_label_count_checked(self, registry):
+        c = Counter("x_total", "X.", ("a", "b"))
+        with pytest.raises(ValueError):
+            c.inc("only-one")
+
+
+class TestMultiWorker:
+    """Test merging of per-worker snapshots."""
+
+    def test_counters_summed_dead_gauges_dropped(self, registry, tmp_path):
+        c = Counter("calls_total", "Calls.", ("fn",))
+        g = Gauge("in_flight", "In flight.")
+        c.inc("a", amount=2)
+        g.set(1)
+
+        other_live = {"pid": os.getppid(), "metrics": {
+            "calls_total": {"kind": "counter", "values": [[["a"], 5.0]]},
+            "in_flight": {"kind": "gauge", "values": [[[], 3.0]]},
+        }}
+        dead = {"pid": 2 ** 22 + 7, "metrics": {
+            "calls_total": {"kind": "counter", "values": [[["a"], 1.0]]},
+            "in_flight": {"kind": "gauge", "values": [[[], 100.0]]},
+        }}
+        (tmp_path / "metrics_1.json").write_text(json.dumps(other_live))
+        (tmp_path / "metrics_2.json").write_text(json.dumps(dead))
+
+        with patch.object(metrics.settings, "METRICS_MULTIPROC_DIR", str(tmp_path)), \
+             patch.object(metrics, "_collectors", []):
+            text = metrics.render()
+            metrics.flush()
+
+        assert 'calls_total{fn="a"} 8' in text
+        assert "in_flight 4" in text
+        assert (tmp_path / f"metrics_{os.getpid()}.json").exists()
+
+
+class TestHttpMiddleware:
+    """Test per-route labels recorded by AccessLogMiddleware."""
+
+    def test_route_template_label(self):
+        app = FastAPI()
+        app.add_middleware(AccessLogMiddleware)
+
+        @app.get("/things/{thing_id}")
+        def get_thing(thing_id: str):
+            return {"id": thing_id}
+
+        client = TestClient(app)
+        before = metrics.HTTP_REQUESTS.value("other", "/things/{thing_id}", "GET", 200)
+        client.get("/things/1")
+        client.get("/things/2")
+        client.get("/nowhere")
+
+        assert metrics.HTTP_REQUESTS.value("other", "/things/{thing_id}", "GET", 200) == before + 2
+        assert metrics.HTTP_REQUESTS.value("other", "<unmatched>", "GET", 404) >= 1
+        assert metrics.HTTP_IN_FLIGHT.value("other") == 0
+
+
+class TestEndpointAccess:
+    """Test the /metrics bearer token gate."""
+
+    @pytest.fixture
+    def client(self, registry):
+        from app.api.v1.endpoints.metrics import router
+
+        app = FastAPI()
+        app.include_router(router)
+        with patch.object(metrics, "_collectors", []):
+            yield TestClient(app)
+
+    def test_closed_without_token(self, client):
+        with patch.multiple(settings, METRICS_TOKEN=None, METRICS_PUBLIC=False):
+            assert client.get("/metrics").status_code == 403
+
+    def test_bearer_token_required(self, client):
+        with patch.multiple(settings, METRICS_TOKEN="s3cret", METRICS_PUBLIC=False):
+            assert client.get("/metrics").status_code == 401
+            assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+            assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+    def test_public_opt_out(self, client):
+        with patch.multiple(settings, METRICS_TOKEN=None, METRICS_PUBLIC=True):
+            assert client.get("/metrics").status_code == 200
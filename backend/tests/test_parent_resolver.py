@@ -0,0 +1,162 @@
+"""
+Unit tests for the shared parent auto-sync resolver
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.api.v1.endpoints import webhooks_shared
+from app.api.v1.endpoints.webhooks_shared import ParentResolver, find_missing_parent
+
+
+@pytest.fixture
+def resolver():
+    """Fresh resolver, installed as the module-level instance for the test."""
+    r = ParentResolver(ttl_seconds=60, record_ttl_seconds=60)
+    with patch.object(webhooks_shared, "parent_resolver", r):
+        yield r
+
+
+class TestParentResolver:
+    """Test presence cache, single-flight and batch prefetch."""
+
+    def test_presence_cache(self, resolver):
+        assert resolver.is_present("registrations", "r1") is False
+        resolver.mark_present("registrations", "r1")
+        assert resolver.is_present("registrations", "r1") is True
+        resolver.forget("registrations", "r1")
+        assert resolver.is_present("registrations", "r1") is False
+
+    def test_child_types_not_cached(self, resolver):
+        """Only parent entity types are tracked."""
+        resolver.mark_present("payments", "p1")
+        assert resolver.is_present("payments", "p1") is False
+
+    def test_presence_expires(self, resolver):
+        resolver.ttl_seconds = -1
+        resolver.mark_present("students", "s1")
+        assert resolver.is_present("students", "s1") is False
+
+    @pytest.mark.asyncio
+    async def test_single_flight_fetch(self, resolver):
+        """Concurrent requests for the same parent share one Zoho fetch."""
+        async def slow_fetch(module, record_id, **session):
+            await asyncio.sleep(0.01)
+            return {"id": record_id}
+
+        fetch = AsyncMock(side_effect=slow_fetch)
+        with patch.object(webhooks_shared, "fetch_zoho_full_record", fetch):
+            results = await asyncio.gather(
+                *(resolver.get_record("registrations", "r1") for _ in range(5))
+            )
+            # Cached afterwards
+            await resolver.get_record("registrations", "r1")
+
+        assert all(r == {"id": "r1"} for r in results)
+        assert fetch.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_prefetch_skips_known_and_cached(self, resolver):
+        """Prefetch only asks Zoho for parents that are neither present nor cached."""
+        resolver.mark_present("registrations", "r1")
+        batch = AsyncMock(return_value=[{"id": "r2"}, {"id": "r3"}])
+        fetch = AsyncMock(return_value={})
+        with patch.object(webhooks_shared, "fetch_zoho_records_by_ids", batch), \
+             patch.object(webhooks_shared, "fetch_zoho_full_record", fetch), \
+             patch.object(webhooks_shared, "get_zoho_access_token", AsyncMock(return_value="tok")):
+            fetched = await resolver.prefetch("registrations", ["r1", "r2", "r3", "r2", None])
+            again = await resolver.prefetch("registrations", ["r2", "r3"])
+            record = await resolver.get_record("registrations", "r3")
+
+        assert fetched == 2
+        assert again == 0
+        batch.assert_awaited_once()
+        assert batch.call_args.args == ("BTEC_Registrations", ["r2", "r3"])
+        assert batch.call_args.kwargs["token"] == "tok"
+        assert record == {"id": "r3"}
+        fetch.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_prefetch_shares_one_client_and_token(self, resolver):
+        """Every ?ids= chunk of a prefetch reuses the same client and access token."""
+        batch = AsyncMock(side_effect=lambda module, ids, **session: [{"id": i} for i in ids])
+        token = AsyncMock(return_value="tok")
+        with patch.object(webhooks_shared, "fetch_zoho_records_by_ids", batch), \
+             patch.object(webhooks_shared, "get_zoho_access_token", token):
+            fetched = await resolver.prefetch("registrations", [f"r{i}" for i in range(250)])
+
+        assert fetched == 250 and batch.await_count == 3
+        assert token.await_count == 1
+        clients = {id(call.kwargs["client"]) for call in batch.call_args_list}
+        assert len(clients) == 1
+
+    @pytest.mark.asyncio
+    async def test_refresh_does_not_join_plain_fetch(self, resolver):
+        """A refresh issued while a plain fetch is in flight gets its own, newer fetch."""
+        versions = iter(["old", "new"])
+
+        async def fetch_version(module, record_id, **session):
+            version = next(versions)
+            await asyncio.sleep(0.02 if version == "old" else 0.01)
+            return {"id": record_id, "v": version}
+
+        with patch.object(webhooks_shared, "fetch_zoho_full_record", AsyncMock(side_effect=fetch_version)):
+            plain = asyncio.create_task(resolver.get_record("registrations", "r1"))
+            await asyncio.sleep(0)
+            fresh = await resolver.get_record("registrations", "r1", refresh=True)
+            await plain
+
+        assert fresh["v"] == "new"
+        # the slower, older fetch finishing last does not overwrite the cache
+        assert (await resolver.get_record("registrations", "r1"))["v"] == "new"
+
+    @pytest.mark.asyncio
+    async def test_ensure_present_pushes_once(self, resolver):
+        """A missing parent is fetched and pushed once, then known present."""
+        fetch = AsyncMock(return_value={"id": "s1", "Name": "S-1"})
+        moodle = AsyncMock(return_value={})
+        with patch.object(webhooks_shared, "fetch_zoho_full_record", fetch), \
+             patch.object(webhooks_shared, "call_moodle_ws", moodle), \
+             patch.object(webhooks_shared, "transform_zoho_to_moodle", lambda r, t: {"zoho_student_id": r["id"]}):
+            pushed = await asyncio.gather(
+                resolver.ensure_present("students", "s1"),
+                resolver.ensure_present("students", "s1"),
+            )
+            later = await resolver.ensure_present("students", "s1")
+
+        assert pushed == [True, True]
+        assert later is False
+        assert fetch.await_count == 1
+        assert moodle.await_count == 1
+        assert resolver.is_present("students", "s1")
+
+    @pytest.mark.asyncio
+    async def test_duplicate_entry_counts_as_present(self, resolver):
+        fetch = AsyncMock(return_value={"id": "c1"})
+        moodle = AsyncMock(side_effect=Exception("Duplicate entry 'c1'"))
+        with patch.object(webhooks_shared, "fetch_zoho_full_record", fetch), \
+             patch.object(webhooks_shared, "call_moodle_ws", moodle), \
+             patch.object(webhooks_shared, "transform_zoho_to_moodle", lambda r, t: {}):
+            await resolver.ensure_present("classes", "c1")
+
+        assert resolver.is_present("classes", "c1")
+
+
+class TestFindMissingParent:
+    """Test mapping of Moodle 'not found' errors to parent references."""
+
+    def test_payment_registration(self):
+        err = Exception("Registration with zoho_registration_id 99 not found")
+        t = {"zoho_registration_id": "99"}
+        assert find_missing_parent("payments", err, t) == ("registrations", "99")
+
+    def test_enrollment_class(self):
+        err = Exception("Class not found")
+        t = {"zoho_student_id": "s1", "zoho_class_id": "c1"}
+        assert find_missing_parent("enrollments", err, t) == ("classes", "c1")
+
+    def test_other_error(self):
+        err = Exception("Database write failed")
+        assert find_missing_parent("payments", err, {"zoho_registration_id": "1"}) is None
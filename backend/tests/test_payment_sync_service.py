@@ -12,6 +12,7 @@ from unittest.mock import Mock, AsyncMock, patch
 from app.services.payment_sync_service import (
     PaymentData,
     PaymentSummary,
+    PaymentSummaryCache,
     PaymentSyncService
 )
 
@@ -208,8 +209,8 @@ class TestPaymentSyncService:
     
     @pytest.fixture
     def service(self, mock_zoho):
-        """Create PaymentSyncService with mock client."""
-        return PaymentSyncService(mock_zoho)
+        """Create PaymentSyncService with mock client and a private summary cache."""
+        return PaymentSyncService(mock_zoho, summary_cache=PaymentSummaryCache())
     
     @pytest.mark.asyncio
     async def test_get_student_payments(self, service, mock_zoho):
@@ -290,8 +291,8 @@ class TestPaymentSyncService:
     @pytest.mark.asyncio
     async def test_calculate_payment_summary(self, service, mock_zoho):
         """Test calculating payment summary for a student."""
-        # Mock search_records for get_student_payments
-        mock_zoho.search_records.return_value = [
+        # Every payment via COQL, totals computed in one pass
+        mock_zoho.coql_select = AsyncMock(return_value=[
             {
                 'id': '5843017000000111111',
                 'Name': 'PMT-001',
@@ -306,7 +307,12 @@ class TestPaymentSyncService:
                 'Payment_Amount': 3000.00,
                 'Payment_Date': '2025-12-01'
             }
-        ]
+        ])
+        mock_zoho.coql_aggregate = AsyncMock(return_value=[{
+            'SUM(Payment_Amount)': 8000.00,
+            'COUNT(id)': 2,
+            'MAX(Payment_Date)': '2025-12-01'
+        }])
         
         summary = await service.calculate_payment_summary(
             "5843017000000222222",
@@ -319,6 +325,73 @@ class TestPaymentSyncService:
         assert summary.payment_count == 2
         assert summary.last_payment_date == date(2025, 12, 1)
         assert not summary.is_fully_paid
+        assert len(summary.payments) == 2
+        
+        assert mock_zoho.coql_select.call_args.kwargs['where'] == "Student_ID = '5843017000000222222'"
+        mock_zoho.search_records.assert_not_called()   # fees given: no registration lookup
+        mock_zoho.coql_aggregate.assert_not_called()
+        
+        # Totals only: aggregated by Zoho, no record fetch
+        summary = await service.calculate_payment_summary(
+            "5843017000000222222", total_fees=Decimal("8000.00"), include_payments=False
+        )
+        assert summary.is_fully_paid and summary.payments == []
+        assert summary.last_payment_date == date(2025, 12, 1)
+        assert mock_zoho.coql_select.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_payment_summary_cache_and_bulk(self, service, mock_zoho):
+        """Summaries are cached per student, invalidated per payment, built in bulk."""
+        payments = {
+            'S1': [{'id': 'P1', 'Student_ID': {'id': 'S1'}, 'Payment_Amount': 100, 'Payment_Date': '2025-01-01'}],
+            'S2': [{'id': 'P2', 'Student_ID': {'id': 'S2'}, 'Payment_Amount': 50.5, 'Payment_Date': '2025-02-01'},
+                   {'id': 'P3', 'Student_ID': {'id': 'S2'}, 'Payment_Amount': 49.5, 'Payment_Date': '2025-03-01'}],
+        }
+        
+        async def coql_select(module, fields, where=None):
+            return [p for sid, rows in payments.items() if f"'{sid}'" in where for p in rows]
+        mock_zoho.coql_select = AsyncMock(side_effect=coql_select)
+        mock_zoho.search_records.return_value = [
+            {'Payment_Schedule': [{'Installment_Amount': 100}, {'Installment_Amount': 100}]}
+        ]
+        
+        first = await service.calculate_payment_summary('S1')
+        again = await service.calculate_payment_summary('S1')
+        assert again is first and first.balance == Decimal('100')
+        assert mock_zoho.coql_select.call_count == 1
+        assert mock_zoho.search_records.call_count == 1
+        
+        # payment_deleted knows only the payment id
+        service.summary_cache.invalidate_payment('P1')
+        await service.calculate_payment_summary('S1')
+        assert mock_zoho.coql_select.call_count == 2
+        
+        summaries = await service.summaries_for(['S1', 'S2', 'S3'])
+        assert list(summaries) == ['S1', 'S2', 'S3']
+        assert summaries['S1'] is service.summary_cache.get('S1')
+        assert summaries['S2'].total_paid == Decimal('100.0') and summaries['S2'].payment_count == 2
+        assert summaries['S2'].last_payment_date == date(2025, 3, 1)
+        assert summaries['S3'].payment_count == 0 and summaries['S3'].total_fees == Decimal('200')
+        # S2 + S3 in one query
+        assert mock_zoho.coql_select.call_count == 3
+        assert mock_zoho.coql_select.call_args.kwargs['where'] == "Student_ID in ('S2', 'S3')"
+    
+    @pytest.mark.asyncio
+    async def test_uncached_summary_not_stored_when_invalidated_mid_load(self, service, mock_zoho):
+        """use_cache=False refills the cache, unless a webhook invalidated it during the load."""
+        async def coql_select(module, fields, where=None):
+            # payment_recorded lands while the payments are being read
+            service.summary_cache.invalidate('S1')
+            return [{'id': 'P1', 'Student_ID': {'id': 'S1'}, 'Payment_Amount': 100}]
+        mock_zoho.coql_select = AsyncMock(side_effect=coql_select)
+        mock_zoho.search_records.return_value = []
+        
+        await service.calculate_payment_summary('S1', use_cache=False)
+        assert service.summary_cache.get('S1') is None
+        
+        mock_zoho.coql_select = AsyncMock(return_value=[])
+        fresh = await service.calculate_payment_summary('S1', use_cache=False)
+        assert service.summary_cache.get('S1') is fresh
     
     @pytest.mark.asyncio
     async def test_search_payments_by_date_range(self, service, mock_zoho):
@@ -0,0 +1,116 @@
+"""
+Unit tests for the sampling profiler (collapsed stacks, request attribution)
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from admin.auth import COOKIE_NAME, create_session
+from admin.router import router as admin_router
+from app.core import profiler
+from app.core.access_log import AccessLogMiddleware
+from app.core.config import settings
+
+
+def _busy_worker(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(500))
+
+
+class TestSampler:
+    """Test the on-demand profile run."""
+
+    async def test_cpu_profile_collapsed_stacks(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_worker, args=(stop,), name="busy")
+        worker.start()
+        try:
+            collapsed, summary = await profiler.profile(0.3, "cpu", interval=0.005)
+        finally:
+            stop.set()
+            worker.join()
+
+        assert summary["samples"] > 0
+        lines = collapsed.splitlines()
+        busy = [l for l in lines if l.startswith("busy;")]
+        assert busy and all("test_profiler:_busy_worker" in l for l in busy)
+        stack, count = busy[0].rsplit(" ", 1)
+        assert int(count) > 0 and ";" in stack
+
+    async def test_tasks_mode_and_single_run(self):
+        async def waiting_on_io():
+            await asyncio.sleep(5)
+
+        task = asyncio.create_task(waiting_on_io(), name="io")
+        run = asyncio.create_task(profiler.profile(0.2, "tasks", interval=0.01))
+        await asyncio.sleep(0.05)
+        with pytest.raises(profiler.ProfilerBusy):
+            await profiler.profile(0.1)
+        collapsed, _ = await run
+        task.cancel()
+
+        assert any(l.startswith("task:io;") and "waiting_on_io" in l for l in collapsed.splitlines())
+
+
+class TestSlowRequestCpu:
+    """Test per-endpoint CPU accounting for slow requests."""
+
+    def test_samples_attributed_to_route(self):
+        @asynccontextmanager
+        async def lifespan(app):
+            profiler.start_continuous()
+            yield
+            profiler.stop_continuous()
+
+        app = FastAPI(lifespan=lifespan)
+        app.add_middleware(AccessLogMiddleware)
+
+        @app.get("/work/{n}")
+        async def work(n: int):
+            t0 = time.perf_counter()
+            while time.perf_counter() - t0 < 0.3:
+                sum(i * i for i in range(1000))
+            return {"n": n}
+
+        @app.get("/fast")
+        async def fast():
+            return {}
+
+        profiler._slow_cpu.clear()
+        with patch.object(settings, "PROFILER_CONTINUOUS_HZ", 200.0), \
+             patch.object(settings, "PROFILER_SLOW_REQUEST_MS", 100.0):
+            with TestClient(app) as client:
+                client.get("/work/1")
+                client.get("/fast")
+
+        rows = profiler.slow_request_cpu()
+        assert [r["route"] for r in rows] == ["GET /work/{n}"]
+        assert rows[0]["requests"] == 1
+        assert rows[0]["cpu_s"] > 0.1
+        assert not profiler._inflight
+
+
+class TestEndpoint:
+    """Test the admin gate on the profiler routes."""
+
+    def test_admin_only(self):
+        app = FastAPI()
+        app.include_router(admin_router)
+        client = TestClient(app)
+
+        assert client.get("/admin/profiler/collapsed.txt?seconds=0.1").status_code == 401
+        client.cookies.set(COOKIE_NAME, create_session("viewer", "viewer", "Viewer"))
+        assert client.get("/admin/profiler/slow-requests").status_code == 401
+
+        client.cookies.set(COOKIE_NAME, create_session("root", "admin", "Root"))
+        resp = client.get("/admin/profiler/collapsed.txt?seconds=0.1&interval_ms=2")
+        assert resp.status_code == 200
+        assert resp.text.startswith("# mode=cpu")
+        assert "attachment" in resp.headers["content-disposition"]
@@ -0,0 +1,76 @@
+"""
+Unit tests for the DB-backed program → Moodle category cache
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.api.v1.endpoints import webhooks_shared
+from app.api.v1.endpoints.webhooks_shared import ProgramCategoryCache
+from app.infra.db.models import ProgramCategory
+
+
+@pytest.fixture
+def cache(sqlite_factory):
+    """Cache backed by a private in-memory SQLite database."""
+    return ProgramCategoryCache(ttl_seconds=3600, session_factory=sqlite_factory(ProgramCategory))
+
+
+class TestProgramCategoryCache:
+    """Test persistence, TTL, single-flight and invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_fetches_once_then_reads_db(self, cache):
+        fetch = AsyncMock(return_value={"id": "p1", "MoodleID": "42"})
+        with patch.object(webhooks_shared, "fetch_zoho_full_record", fetch):
+            first = await cache.get_category("p1", default=1)
+            second = await cache.get_category("p1", default=1)
+
+        assert first == second == 42
+        assert fetch.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_share_one_fetch(self, cache):
+        async def slow_fetch(module, record_id):
+            await asyncio.sleep(0.01)
+            return {"id": record_id, "MoodleID": 7}
+
+        fetch = AsyncMock(side_effect=slow_fetch)
+        with patch.object(webhooks_shared, "fetch_zoho_full_record", fetch):
+            cats = await asyncio.gather(*(cache.get_category("p1", default=1) for _ in range(5)))
+
+        assert cats == [7] * 5
+        assert fetch.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_moodle_id_uses_default_and_is_cached(self, cache):
+        fetch = AsyncMock(return_value={"id": "p1", "MoodleID": None})
+        with patch.object(webhooks_shared, "fetch_zoho_full_record", fetch):
+            assert await cache.get_category("p1", default=5) == 5
+            assert await cache.get_category("p1", default=5) == 5
+
+        assert fetch.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_and_expiry_refetch(self, cache):
+        fetch = AsyncMock(side_effect=[{"MoodleID": 3}, {"MoodleID": 4}, {"MoodleID": 5}])
+        with patch.object(webhooks_shared, "fetch_zoho_full_record", fetch):
+            assert await cache.get_category("p1", default=1) == 3
+            cache.invalidate("p1")
+            assert await cache.get_category("p1", default=1) == 4
+            cache.ttl_seconds = -1
+            assert await cache.get_category("p1", default=1) == 5
+
+    @pytest.mark.asyncio
+    async def test_stale_row_survives_zoho_failure(self, cache):
+        cache.store("p1", 9)
+        cache.ttl_seconds = -1
+        fetch = AsyncMock(side_effect=Exception("Zoho down"))
+        with patch.object(webhooks_shared, "fetch_zoho_full_record", fetch):
+            assert await cache.get_category("p1", default=1) == 9
+
+    @pytest.mark.asyncio
+    async def test_no_program_returns_default(self, cache):
+        assert await cache.get_category(None, default=11) == 11
@@ -0,0 +1,114 @@
+"""
+Unit tests for the progress bus and the full-sync SSE progress stream
+"""
+
+import asyncio
+import json
+
+import pytest
+from unittest.mock import patch
+
+from app.api.v1.endpoints import full_sync
+from app.api.v1.endpoints.full_sync import StepResult, _LiveProgress
+from app.core import progress
+from app.core.config import settings
+
+
+class TestProgressBus:
+    """Test per-key conflation and subscription lifetime."""
+
+    @pytest.mark.asyncio
+    async def test_newest_message_per_key(self):
+        bus = progress.ProgressBus()
+        with bus.subscribe("t") as sub:
+            bus.publish("t", "a", 1)
+            bus.publish("t", "b", 1)
+            bus.publish("t", "a", 2)
+            bus.publish("other", "a", 99)
+            assert await sub.get() == [("b", 1), ("a", 2)]
+            assert await sub.get(timeout=0.01) == []
+        assert not bus.has_subscribers("t")
+
+    def test_sse_frame(self):
+        assert progress.sse_event("status", "<p>\n</p>") == "event: status\ndata: <p>\ndata: </p>\n\n"
+        assert progress.sse_event("job", {"n": 1}) == 'event: job\ndata: {"n": 1}\n\n'
+
+
+class TestLiveProgress:
+    """Test throttled step progress and the SSE stream built on it."""
+
+    def test_updates_are_throttled(self):
+        job = {"job_id": "j1", "results": {}}
+        r = StepResult(module="M", total=100, synced=0, skipped=0, errors=0)
+        with patch.object(settings, "FULL_SYNC_PROGRESS_INTERVAL_MS", 60_000), \
+                progress.bus.subscribe(full_sync.PROGRESS_TOPIC) as sub:
+            live = _LiveProgress(job, "students", "M", 100)
+            published = []
+            for i in range(100):
+                r.synced += 1
+                live.update(r, i + 1)
+                published += sub._pending.values()
+                sub._pending.clear()
+            assert [m["processed"] for m in published] == [1]
+            assert job["results"]["students"]["processed"] == 1
+
+            live.finish(r)
+            assert sub._pending["j1:students"]["synced"] == 100
+            assert "error_details" not in sub._pending["j1:students"]
+        assert job["results"]["students"]["processed"] == 100
+
+    def test_no_live_job_is_noop(self):
+        live = _LiveProgress(None, None, "M", 3)
+        live.update(StepResult(module="M", total=3, synced=1, skipped=0, errors=0), 1)
+        live.finish(StepResult(module="M", total=3, synced=3, skipped=0, errors=0))
+
+    @pytest.mark.asyncio
+    async def test_stream_follows_job_until_done(self):
+        job = {"job_id": "j2", "status": "running", "results": {}, "step_total": 1}
+        with patch.dict(full_sync.JOBS, {"j2": job}):
+            frames = []
+
+            async def consume():
+                async for frame in full_sync._progress_events("j2"):
+                    frames.append(frame)
+
+            task = asyncio.create_task(consume())
+            await asyncio.sleep(0)
+            full_sync._publish_step({"job_id": "other"}, "students", {"processed": 1})
+            full_sync._publish_step(job, "students", {"processed": 5, "error_details": ["x"]})
+            job["status"] = "completed"
+            full_sync._publish_job(job)
+            await asyncio.wait_for(task, 1)
+
+        events = [(f.split("\n")[0], json.loads(f.split("data: ", 1)[1])) for f in frames]
+        assert events[0] == ("event: job", {**dict.fromkeys(full_sync._JOB_FIELDS),
+                                            "job_id": "j2", "status": "running", "step_total": 1})
+        assert events[1] == ("event: step", {"job_id": "j2", "step": "students", "processed": 5})
+        assert events[2][0] == "event: job" and events[2][1]["status"] == "completed"
+        assert not progress.bus.has_subscribers(full_sync.PROGRESS_TOPIC)
+
+    @pytest.mark.asyncio
+    async def test_stream_without_job_id_follows_next_job(self):
+        done = {"job_id": "j3", "status": "completed", "results": {}, "step_total": 1}
+        nxt = {"job_id": "j4", "status": "running", "results": {}, "step_total": 1}
+        with patch.dict(full_sync.JOBS, {"j3": done}), patch.object(full_sync, "LATEST_JOB_ID", "j3"):
+            frames = []
+
+            async def consume():
+                async for frame in full_sync._progress_events(None):
+                    frames.append(frame)
+                    if len(frames) == 3:
+                        return
+
+            task = asyncio.create_task(consume())
+            await asyncio.sleep(0)
+            assert not task.done()
+            full_sync._publish_job(nxt)
+            full_sync._publish_step(nxt, "students", {"processed": 2})
+            await asyncio.wait_for(task, 1)
+
+        events = [(f.split("\n")[0], json.loads(f.split("data: ", 1)[1])) for f in frames]
+        assert events[0][0] == "event: job" and events[0][1]["job_id"] == "j3"
+        assert events[1][0] == "event: job" and events[1][1]["job_id"] == "j4"
+        assert events[2] == ("event: step", {"job_id": "j4", "step": "students", "processed": 2})
+        assert not progress.bus.has_subscribers(full_sync.PROGRESS_TOPIC)
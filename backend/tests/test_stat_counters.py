@@ -0,0 +1,109 @@
+"""
+Unit tests for the incrementally maintained dashboard counters
+"""
+
+import pytest
+
+from app.infra.db.models import EventLog, StatCounter, Student
+from app.services import stat_counter_service as counters
+
+
+def _event(i, status="pending", source="zoho"):
+    return EventLog(event_id=f"e{i}", source=source, module="BTEC_Students", event_type="updated",
+                    record_id=str(i), payload={}, status=status)
+
+
+@pytest.fixture
+def sqlite_db(sqlite_factory):
+    return sqlite_factory(EventLog, Student, StatCounter)()
+
+
+class TestStatCounters:
+    """Test that counters follow inserts, status transitions and deletes."""
+
+    def test_incremental_matches_recount(self, sqlite_db):
+        counters.reconcile(sqlite_db)
+        sqlite_db.add_all([_event(i) for i in range(5)] + [_event(9, source="moodle")])
+        sqlite_db.add(Student(username="s1", academic_email="s1@example.com"))
+        sqlite_db.commit()
+
+        events = sqlite_db.query(EventLog).order_by(EventLog.id).all()
+        events[0].status = "processing"
+        sqlite_db.commit()
+        events[0].status = "completed"
+        events[1].status = "failed"
+        sqlite_db.commit()
+        sqlite_db.delete(events[2])
+        sqlite_db.commit()
+
+        assert counters.dashboard_stats(sqlite_db) == {
+            "students": 1, "events_total": 5, "events_completed": 1,
+            "events_failed": 1, "events_pending": 3,
+        }
+        incremental = counters.by_prefix(counters.read_counters(sqlite_db), "events.")
+        assert counters.by_prefix(counters.reconcile(sqlite_db), "events.") == incremental
+
+    def test_rollback_leaves_counters(self, sqlite_db):
+        counters.reconcile(sqlite_db)
+        sqlite_db.add(_event(1))
+        sqlite_db.flush()
+        sqlite_db.rollback()
+        assert counters.dashboard_stats(sqlite_db)["events_total"] == 0
+
+    def test_deltas_buffered_until_flush(self, sqlite_db):
+        counters.reconcile(sqlite_db)
+        sqlite_db.add_all([_event(1), _event(2, status="failed")])
+        sqlite_db.commit()
+
+        # the event transaction left the counter rows alone ...
+        rows = dict(sqlite_db.query(StatCounter.name, StatCounter.value))
+        assert rows[counters.EVENTS_TOTAL] == 0
+        # ... yet reads in this process already include the buffered deltas
+        assert counters.dashboard_stats(sqlite_db)["events_total"] == 2
+
+        counters.flush_pending()
+        rows = dict(sqlite_db.query(StatCounter.name, StatCounter.value))
+        assert rows[counters.EVENTS_TOTAL] == 2 and rows[counters.STATUS_PREFIX + "failed"] == 1
+        assert counters.pending_deltas(sqlite_db.get_bind()) == {}
+        assert counters.dashboard_stats(sqlite_db)["events_total"] == 2
+
+    def test_first_read_reconciles(self, sqlite_db):
+        sqlite_db.add(_event(1, status="failed"))
+        sqlite_db.commit()
+        sqlite_db.query(StatCounter).delete()
+        sqlite_db.commit()
+
+        assert counters.dashboard_stats(sqlite_db)["events_failed"] == 1
+
+    def test_reconcile_upserts_in_place(self, sqlite_db):
+        sqlite_db.add_all([_event(1, status="failed"), _event(2)])
+        sqlite_db.commit()
+        counters.reconcile(sqlite_db)
+        sqlite_db.delete(sqlite_db.query(EventLog).filter_by(status="failed").one())
+        sqlite_db.commit()
+        sqlite_db.query(EventLog).update({"status": "completed"})   # bypasses the flush hook
+        sqlite_db.commit()
+
+        result = counters.reconcile(sqlite_db)
+        rows = dict(sqlite_db.query(StatCounter.name, StatCounter.value))
+        assert result[counters.STATUS_PREFIX + "completed"] == 1
+        # vanished status kept as a zero row rather than deleted
+        assert rows[counters.STATUS_PREFIX + "failed"] == 0
+        assert rows[counters.STATUS_PREFIX + "pending"] == 0
+
+    @pytest.mark.parametrize("on_conflict", [True, False])
+    def test_delta_upsert(self, sqlite_db, on_conflict, monkeypatch):
+        if not on_conflict:
+            monkeypatch.setattr(counters, "_insert_factory", lambda conn: None)
+        counters.adjust(sqlite_db, {"events.source.new": 2})
+        counters.adjust(sqlite_db, {"events.source.new": 3, "events.source.gone": -1})
+        sqlite_db.commit()
+        rows = dict(sqlite_db.query(StatCounter.name, StatCounter.value))
+        assert rows["events.source.new"] == 5 and rows["events.source.gone"] == 0
+
+    def test_no_table_is_noop(self, sqlite_factory):
+        session = sqlite_factory(EventLog)()
+        session.add(_event(1))
+        session.commit()
+        assert session.query(EventLog).count() == 1
+        session.close()
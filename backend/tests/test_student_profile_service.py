@@ -333,22 +333,26 @@ class TestStudentProfileService:
     
     async def test_get_all_students_with_filter(self, service, mock_zoho):
         """Test getting students with status filter."""
-        mock_zoho.get_records.return_value = {
-            'data': [
-                {'id': '1', 'Name': 'Student 1', 'Status': 'Active'},
-                {'id': '2', 'Name': 'Student 2', 'Status': 'Inactive'},
-                {'id': '3', 'Name': 'Student 3', 'Status': 'Active'}
-            ],
-            'info': {'more_records': False}
-        }
+        mock_zoho.coql_select = AsyncMock(return_value=[
+            {'id': '1', 'Name': 'Student 1', 'Status': 'Active'},
+            {'id': '3', 'Name': 'Student 3', 'Status': 'Active'},
+            {'id': '4', 'Name': 'Student 4', 'Status': 'Active'}
+        ])
         
         response = await service.get_all_students(
+            page=2,
+            per_page=2,
             filters={'Status': 'Active'}
         )
         
-        # Should filter to only Active students
+        # Filtered by Zoho; the extra row only signals another page
         assert len(response['data']) == 2
-        assert all(s['Status'] == 'Active' for s in response['data'])
+        assert response['info']['more_records'] is True
+        mock_zoho.get_records.assert_not_called()
+        
+        kwargs = mock_zoho.coql_select.call_args.kwargs
+        assert kwargs['where'] == "Status = 'Active'"
+        assert (kwargs['limit'], kwargs['offset']) == (3, 2)
     
     async def test_get_synced_students(self, service, mock_zoho):
         """Test getting synced students."""
@@ -0,0 +1,101 @@
+"""
+Unit tests for request tracing (spans, retention, OTLP export, middleware)
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import tracing
+from app.core.access_log import AccessLogMiddleware
+from app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def recent():
+    """Empty trace buffer; keep every trace regardless of duration."""
+    tracing._recent.clear()
+    with patch.object(settings, "TRACE_SLOW_MS", 0.0), patch.object(settings, "TRACE_FILE", ""):
+        yield tracing._recent
+    tracing._recent.clear()
+
+
+class TestSpans:
+    """Test span nesting and trace retention."""
+
+    async def test_children_attach_across_tasks(self, recent):
+        @tracing.traced()
+        async def fetch(i):
+            with tracing.span("moodle call", "client", n=i):
+                await asyncio.sleep(0)
+
+        root = tracing.start_trace("POST /hook")
+        await asyncio.gather(fetch(1), fetch(2))
+        tracing.end_trace(root)
+
+        trace = recent[-1]
+        by_name = {}
+        for s in trace.spans:
+            by_name.setdefault(s.name, []).append(s)
+        assert len(by_name["moodle call"]) == 2
+        fetch_ids = {s.span_id for s in by_name[next(n for n in by_name if n.endswith("fetch"))]}
+        assert {s.parent_id for s in by_name["moodle call"]} == fetch_ids
+        assert tracing.current_span() is None
+
+    def test_error_status_and_no_trace_noop(self, recent):
+        with tracing.span("outside") as s:
+            assert s is None
+
+        root = tracing.start_trace("GET /x")
+        with pytest.raises(ValueError):
+            with tracing.span("boom"):
+                raise ValueError("bad")
+        tracing.end_trace(root)
+
+        boom = recent[-1].spans[1]
+        assert boom.status == "error" and "bad" in boom.status_message
+
+    def test_fast_traces_not_kept(self, recent):
+        with patch.object(settings, "TRACE_SLOW_MS", 10_000.0):
+            tracing.end_trace(tracing.start_trace("GET /fast"))
+        assert len(recent) == 0
+
+    def test_traceparent_and_otlp(self, recent):
+        root = tracing.start_trace(
+            "POST /hook", traceparent="00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01",
+        )
+        with tracing.span("db SELECT", "client", **{"db.system": "sqlite"}):
+            pass
+        tracing.end_trace(root)
+
+        doc = tracing.to_otlp(recent[-1])
+        spans = doc["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert spans[0]["traceId"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+        assert spans[0]["parentSpanId"] == "00f067aa0ba902b7"
+        assert spans[0]["kind"] == 2 and spans[1]["kind"] == 3
+        assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+        assert {"key": "db.system", "value": {"stringValue": "sqlite"}} in spans[1]["attributes"]
+
+
+class TestMiddleware:
+    """Test that requests open a trace with a route-template root span."""
+
+    def test_request_trace(self, recent):
+        app = FastAPI()
+        app.add_middleware(AccessLogMiddleware)
+
+        @app.get("/items/{item_id}")
+        async def item(item_id: str):
+            with tracing.span("lookup"):
+                return {"id": item_id}
+
+        TestClient(app).get("/items/42")
+
+        trace = recent[-1]
+        assert trace.root.name == "GET /items/{item_id}"
+        assert trace.root.attributes["http.status_code"] == 200
+        assert [row["span"].name for row in trace.waterfall()] == ["GET /items/{item_id}", "lookup"]
+        assert tracing.get_trace(trace.trace_id) is trace
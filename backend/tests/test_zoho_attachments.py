@@ -0,0 +1,70 @@
+"""
+Unit tests for the content-addressed attachment cache and streamed photo downloads
+"""
+
+import os
+
+import httpx
+
+from zoho_attachments import AttachmentCache, ZohoAttachmentHandler
+
+PHOTO = b"\xff\xd8" + os.urandom(200_000)
+
+
+def _handler(downloads, attachments):
+    def handler(request: httpx.Request) -> httpx.Response:
+        parts = request.url.path.split("/")
+        record_id = parts[parts.index("Attachments") - 1]
+        if request.url.path.endswith("/Attachments"):
+            return httpx.Response(200, json={"data": attachments[record_id]})
+        downloads.append(record_id)
+        return httpx.Response(200, content=PHOTO, headers={"content-type": "image/jpeg"})
+    return handler
+
+
+def _photo(att_id, modified="2026-01-01T10:00:00+00:00"):
+    return [{"id": att_id, "File_Name": "Personal_photo.JPG", "Size": str(len(PHOTO)), "Modified_Time": modified}]
+
+
+async def test_photo_cache_dedups_and_skips_unchanged(tmp_path):
+    downloads = []
+    attachments = {"r1": _photo("a1"), "r2": _photo("a2")}
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_handler(downloads, attachments)))
+    handler = ZohoAttachmentHandler("token", client=client)
+    save_dir = str(tmp_path)
+
+    first = await handler.get_photo("BTEC_Students", "r1", "S1", save_dir)
+    second = await handler.get_photo("BTEC_Students", "r2", "S2", save_dir)
+
+    assert first["sha256"] == second["sha256"] and not first["cached"]
+    assert open(first["path"], "rb").read() == PHOTO
+    # same content stored once, no partial files left behind
+    assert os.listdir(tmp_path / ".blobs") == [f"{first['sha256']}.jpg"]
+
+    # unchanged attachment: listing only, no download — also across cache instances
+    downloads.clear()
+    again = await ZohoAttachmentHandler("token", client=client).get_photo("BTEC_Students", "r1", "S1", save_dir)
+    assert again == {**first, "cached": True} and downloads == []
+
+    # replaced attachment (new Modified_Time) is fetched again
+    attachments["r1"] = _photo("a1", modified="2026-02-01T10:00:00+00:00")
+    await handler.get_photo("BTEC_Students", "r1", "S1", save_dir)
+    assert downloads == ["r1"]
+
+    cache = AttachmentCache(save_dir)
+    cache.mark_pushed("S1", first["sha256"])
+    assert AttachmentCache(save_dir).pushed_hash("S1") == first["sha256"]
+    await client.aclose()
+
+
+def test_pushed_hash_checks_what_moodle_reports(tmp_path):
+    cache = AttachmentCache(str(tmp_path))
+    cache.mark_pushed("S1", "aaa", moodle_sha256="aaa")
+    cache.mark_pushed("S2", "aaa", moodle_sha256="bbb")   # Moodle kept / got a different file
+    cache.mark_pushed("S3", "aaa")                        # plugin does not report hashes
+
+    reloaded = AttachmentCache(str(tmp_path))
+    assert reloaded.pushed_hash("S1") == "aaa"
+    assert reloaded.pushed_hash("S2") is None
+    assert reloaded.pushed_hash("S3") == "aaa"
+    assert reloaded.pushed_hash("S4") is None
@@ -7,7 +7,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime, timedelta
 
 from app.infra.zoho.auth import ZohoAuthClient
-from app.infra.zoho.client import ZohoClient
+from app.infra.zoho.client import ZohoClient, coql_value, coql_where
 from app.infra.zoho.exceptions import (
     ZohoAuthError,
     ZohoNotFoundError,
@@ -240,6 +240,57 @@ class TestZohoClient:
             
             assert exc_info.value.retry_after == 60
 
+    
+    def test_coql_literals(self):
+        """Test COQL value quoting and equality filters."""
+        assert coql_value("O'Brien") == "'O\\'Brien'"
+        assert coql_value(True) == "true" and coql_value(5) == "5"
+        assert coql_where({}) is None
+        assert coql_where({'Status': 'Active'}) == "Status = 'Active'"
+        assert coql_where({'Status': 'Active', 'Synced_to_Moodle': False}) == (
+            "(Status = 'Active' and Synced_to_Moodle = false)"
+        )
+    
+    @pytest.mark.asyncio
+    async def test_coql_select_pages(self, zoho_client):
+        """Test COQL select pages with LIMIT offset, count past 200 rows."""
+        rows = [{'id': str(i)} for i in range(450)]
+        
+        async def respond(method, endpoint, json_data=None, params=None):
+            offset, count = map(int, json_data['select_query'].rsplit('limit ', 1)[1].split(', '))
+            page = rows[offset:offset + count]
+            return {'data': page, 'info': {'more_records': offset + count < len(rows)}}
+        
+        with patch.object(zoho_client, '_make_request', new=AsyncMock(side_effect=respond)) as request:
+            result = await zoho_client.coql_select(
+                'BTEC_Enrollments', ['Classes'], where=coql_where({'Enrollment_Status': 'Active'})
+            )
+            assert len(result) == 450
+            assert request.call_count == 3
+            query = request.call_args_list[0].kwargs['json_data']['select_query']
+            assert query == (
+                "select Classes from BTEC_Enrollments where Enrollment_Status = 'Active' "
+                "order by id limit 0, 200"
+            )
+            
+            assert len(await zoho_client.coql_select('BTEC_Enrollments', ['Classes'], limit=5, offset=10)) == 5
+    
+    @pytest.mark.asyncio
+    async def test_coql_aggregate(self, zoho_client):
+        """Test aggregates, including the 204 no-match response."""
+        mock_response = {'data': [{'SUM(Payment_Amount)': 8000, 'COUNT(id)': 2}]}
+        with patch.object(zoho_client, '_make_request', new=AsyncMock(return_value=mock_response)) as request:
+            rows = await zoho_client.coql_aggregate(
+                'BTEC_Payments', ['SUM(Payment_Amount)', 'COUNT(id)'], where="Student_ID = '1'"
+            )
+            assert rows[0]['COUNT(id)'] == 2
+            assert request.call_args.kwargs['json_data']['select_query'] == (
+                "select SUM(Payment_Amount), COUNT(id) from BTEC_Payments where Student_ID = '1'"
+            )
+        
+        with patch.object(zoho_client, '_make_request', new=AsyncMock(return_value={'status': 'success'})):
+            assert await zoho_client.coql_aggregate('BTEC_Payments', ['COUNT(id)']) == [{}]
+
 
 class TestZohoGradingIntegration:
     """Test grading-specific integration."""
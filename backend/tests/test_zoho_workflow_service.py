@@ -0,0 +1,171 @@
+"""
+Unit tests for the diff-based Zoho workflow/webhook provisioner
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.infra.db.models import ZohoAutomation
+from app.services import zoho_workflow_service as zws
+from app.services.zoho_workflow_service import ZohoWorkflowService, WORKFLOW_MODULES
+
+BASE = "https://api.example.com"
+TOTAL = len(WORKFLOW_MODULES) * 2
+
+
+class FakeZohoSettings:
+    """Webhooks + workflow rules held in dicts; records calls and peak concurrency."""
+
+    def __init__(self):
+        self.objects = {"webhooks": {}, "workflow_rules": {}}
+        self.calls = []
+        self.active = self.peak = 0
+        self.fail_create = set()
+        self.fail_update = set()
+        self._next = 1000
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        parts = request.url.path.rstrip("/").split("/")
+        key, entity_id = (parts[-1], None) if parts[-1] in self.objects else (parts[-2], parts[-1])
+        self.calls.append((request.method, key))
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.005)
+        self.active -= 1
+        store = self.objects[key]
+
+        if request.method == "GET":
+            items = [{"id": i, **o} for i, o in store.items()]
+            return httpx.Response(200, json={key: items}) if items else httpx.Response(204)
+        if request.method == "DELETE":
+            return httpx.Response(200 if store.pop(entity_id, None) else 404, json={})
+        payload = json.loads(request.content)[key][0]
+        if request.method == "POST":
+            if payload["name"] in self.fail_create:
+                return httpx.Response(200, json={key: [{"status": "error", "message": "rejected"}]})
+            self._next += 1
+            entity_id = str(self._next)
+        elif entity_id in self.fail_update:
+            return httpx.Response(500, json={"code": "INTERNAL_ERROR", "message": "try again"})
+        elif entity_id not in store:
+            return httpx.Response(404, json={"code": "NOT_FOUND", "message": "invalid id"})
+        store[entity_id] = payload
+        return httpx.Response(200, json={key: [{"status": "success", "details": {"id": entity_id}}]})
+
+
+@pytest.fixture
+def zoho():
+    fake = FakeZohoSettings()
+    real_client = httpx.AsyncClient
+    transport = httpx.MockTransport(fake.handler)
+    with patch.object(zws.httpx, "AsyncClient", lambda **kw: real_client(transport=transport, **kw)), \
+         patch.dict(zws.KNOWN_MODULE_IDS, {"Products": "5398830000000000001"}):
+        yield fake
+
+
+@pytest.fixture
+def sqlite_db(sqlite_factory):
+    return sqlite_factory(ZohoAutomation)()
+
+
+@pytest.fixture
+def service(sqlite_db):
+    with patch.multiple(settings, ZOHO_CLIENT_ID="id", ZOHO_CLIENT_SECRET="secret",
+                        ZOHO_REFRESH_TOKEN="token", ZOHO_AUTOMATION_CONCURRENCY=3):
+        svc = ZohoWorkflowService(session_factory=sessionmaker(bind=sqlite_db.get_bind()))
+        svc._headers = AsyncMock(return_value={})
+        yield svc
+
+
+def _writes(zoho):
+    return [c for c in zoho.calls if c[0] != "GET"]
+
+
+async def test_setup_creates_then_skips_unchanged(service, zoho, sqlite_db):
+    result = await service.setup_all_rules(BASE)
+
+    assert result["success"] and (result["created"], result["total"]) == (TOTAL, TOTAL)
+    assert len(zoho.objects["webhooks"]) == len(zoho.objects["workflow_rules"]) == TOTAL
+    assert 1 < zoho.peak <= 3
+    rule = next(iter(zoho.objects["workflow_rules"].values()))
+    webhook_id = rule["conditions"][0]["instant_actions"]["actions"][0]["id"]
+    assert zoho.objects["webhooks"][webhook_id]["name"] == rule["name"]
+    assert sqlite_db.query(ZohoAutomation).count() == TOTAL
+
+    # nothing changed: the re-run only reads
+    zoho.calls.clear()
+    result = await service.setup_all_rules(BASE)
+    assert result["unchanged"] == TOTAL and _writes(zoho) == []
+
+
+async def test_setup_updates_in_place_and_removes_strays(service, zoho):
+    await service.setup_all_rules(BASE)
+    ids = set(zoho.objects["webhooks"])
+    zoho.objects["webhooks"]["stray"] = {"name": "MZI - Old_Module - delete"}
+    zoho.objects["workflow_rules"]["other"] = {"name": "Someone else's rule"}
+
+    zoho.calls.clear()
+    result = await service.setup_all_rules("https://new.example.com")
+
+    assert result["success"] and result["updated"] == TOTAL and result["created"] == 0
+    # same webhook ids, new URL — no delete-and-recreate gap
+    assert set(zoho.objects["webhooks"]) == ids
+    assert all(w["url"].startswith("https://new.example.com/") for w in zoho.objects["webhooks"].values())
+    assert ("POST", "webhooks") not in zoho.calls
+    assert result["deleted"]["deleted_webhooks"] == 1 and result["deleted_old"] == 0
+    assert "other" in zoho.objects["workflow_rules"]
+
+
+async def test_setup_adopts_untracked_and_keeps_failed(service, zoho, sqlite_db):
+    await service.setup_all_rules(BASE)
+    sqlite_db.query(ZohoAutomation).delete()   # e.g. state lost / migrating from the JSON file
+    sqlite_db.commit()
+    before = dict(zoho.objects["webhooks"])
+
+    # a lost rule is recreated; existing namesakes are adopted and updated
+    lost = next(i for i, r in zoho.objects["workflow_rules"].items() if r["name"].endswith("BTEC - delete"))
+    del zoho.objects["workflow_rules"][lost]
+    zoho.fail_create.add("MZI - BTEC - delete")
+    result = await service.setup_all_rules(BASE)
+
+    assert not result["success"] and result["errors"][0]["name"] == "MZI - BTEC - delete"
+    assert result["updated"] == TOTAL - 1
+    assert set(zoho.objects["webhooks"]) == set(before)  # failed pair's webhook kept
+    assert len(zoho.objects["workflow_rules"]) == TOTAL - 1
+
+    zoho.fail_create.clear()
+    result = await service.setup_all_rules(BASE)
+    assert result["success"] and result["unchanged"] == TOTAL - 1
+
+
+async def test_update_recreates_only_when_not_found(service, zoho, sqlite_db):
+    await service.setup_all_rules(BASE)
+    rules = zoho.objects["workflow_rules"]
+    failing = next(i for i, r in rules.items() if r["name"].endswith("BTEC - delete"))
+    gone = next(i for i, r in rules.items() if r["name"].endswith("BTEC - create edit"))
+    zoho.fail_update.add(failing)
+
+    # a rule deleted between the live listing and the PUT: the saved id is still used
+    with patch.object(service, "_current_id", lambda name, stored, live: stored):
+        del rules[gone]
+        zoho.calls.clear()
+        result = await service.setup_all_rules("https://new.example.com")
+
+    assert [e["name"] for e in result["errors"]] == ["MZI - BTEC - delete"]
+    assert zoho.calls.count(("POST", "workflow_rules")) == 1    # only the 404 is recreated
+    assert len(rules) == TOTAL
+
+
+async def test_delete_all_rules(service, zoho, sqlite_db):
+    await service.setup_all_rules(BASE)
+    result = await service.delete_all_rules()
+
+    assert (result["deleted_rules"], result["deleted_webhooks"]) == (TOTAL, TOTAL)
+    assert zoho.objects == {"webhooks": {}, "workflow_rules": {}}
+    assert sqlite_db.query(ZohoAutomation).count() == 0
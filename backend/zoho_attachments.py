@@ -1,86 +1,231 @@
 """
 Zoho Attachment Handler
 Downloads student photos from Zoho CRM attachments
+
+Downloads are streamed to disk in chunks (hashed on the way) and kept in a
+content-addressed AttachmentCache under the save directory, so an unchanged
+attachment (same id, Modified_Time and Size) is never downloaded twice and
+identical files are stored once.
 """
 import asyncio
+import hashlib
 import httpx
 import json
 import os
+import shutil
 from pathlib import Path
 from typing import Optional, Dict
 
+# Bytes per read/write while streaming attachments
+CHUNK_SIZE = 64 * 1024
+
+
+class AttachmentCache:
+    """
+    Content-addressed attachment store rooted at a save directory.
+
+    <root>/.blobs/<sha256><ext>  one copy per distinct content
+    <root>/<name><ext>           named copy (hard link to the blob where possible)
+    <root>/.index.json           attachment id → {version, sha256, ext},
+                                 plus key → {sha256 last pushed to Moodle,
+                                 moodle_sha256 Moodle reported holding}
+
+    version is "<Modified_Time>|<Size>" from the Zoho attachment listing; a
+    changed version means the attachment was replaced and is downloaded again.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.blobs = self.root / ".blobs"
+        self.index_path = self.root / ".index.json"
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self._index = {"attachments": {}, "pushed": {}}
+        try:
+            if self.index_path.exists():
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index.update(json.load(f))
+        except Exception as e:
+            print(f"⚠️ Could not load attachment index: {str(e)}")
+
+    @staticmethod
+    def version(attachment: Dict) -> str:
+        return f"{attachment.get('Modified_Time', '')}|{attachment.get('Size', '')}"
+
+    def blob_path(self, sha256: str, ext: str) -> Path:
+        return self.blobs / f"{sha256}{ext}"
+
+    def lookup(self, attachment_id: str, version: str) -> Optional[Dict]:
+        """Cached entry for this attachment version whose blob is still on disk"""
+        entry = self._index["attachments"].get(attachment_id)
+        if entry and entry["version"] == version and self.blob_path(entry["sha256"], entry["ext"]).exists():
+            return entry
+        return None
+
+    def store(self, attachment_id: str, version: str, sha256: str, ext: str, tmp_path: str) -> Path:
+        """Adopt a downloaded file as the blob for `sha256` (dropped if already stored)"""
+        blob = self.blob_path(sha256, ext)
+        if blob.exists():
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, blob)
+        self._index["attachments"][attachment_id] = {"version": version, "sha256": sha256, "ext": ext}
+        self.save()
+        return blob
+
+    def materialize(self, blob: Path, dest: str) -> str:
+        """Expose a blob under a stable name (photo URLs use the student id)"""
+        dest_path = Path(dest)
+        try:
+            if dest_path.exists() and os.path.samefile(blob, dest_path):
+                return dest
+        except OSError:
+            pass
+        tmp = dest_path.with_name(dest_path.name + ".link")
+        try:
+            os.link(blob, tmp)
+        except OSError:
+            shutil.copyfile(blob, tmp)
+        os.replace(tmp, dest_path)
+        return dest
+
+    def pushed_hash(self, key: str) -> Optional[str]:
+        """
+        sha256 Moodle is known to hold for `key`: the last pushed hash, unless
+        Moodle reported a different file back (None then, so it is re-sent).
+        A plugin that reports nothing is trusted with what was pushed.
+        """
+        entry = self._index["pushed"].get(key)
+        if isinstance(entry, str):   # index written before Moodle reported hashes
+            return entry
+        if not entry:
+            return None
+        moodle_sha256 = entry.get("moodle_sha256")
+        if moodle_sha256 and moodle_sha256 != entry["sha256"]:
+            return None
+        return entry["sha256"]
+
+    def mark_pushed(self, key: str, sha256: str, moodle_sha256: Optional[str] = None) -> None:
+        """Record the content pushed for `key` and the hash Moodle reported for it"""
+        self._index["pushed"][key] = {"sha256": sha256, "moodle_sha256": moodle_sha256 or None}
+        self.save()
+
+    def save(self) -> None:
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+            os.replace(tmp, self.index_path)
+        except Exception as e:
+            print(f"⚠️ Could not save attachment index: {str(e)}")
+
+
 class ZohoAttachmentHandler:
     """Handle downloading attachments from Zoho CRM"""
     
-    def __init__(self, access_token: str):
+    def __init__(self, access_token: str, client: Optional[httpx.AsyncClient] = None):
         self.access_token = access_token
         self.base_url = "https://www.zohoapis.com/crm/v2"
         self.headers = {
             "Authorization": f"Zoho-oauthtoken {access_token}"
         }
+        # One connection pool shared by concurrent photo work
+        self._client = client
+        self._owns_client = client is None
+        self._caches: Dict[str, AttachmentCache] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=60.0)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+
+    def cache(self, save_dir: str) -> AttachmentCache:
+        if save_dir not in self._caches:
+            self._caches[save_dir] = AttachmentCache(save_dir)
+        return self._caches[save_dir]
     
     async def get_attachments(self, module: str, record_id: str) -> list:
         """Get list of attachments for a record"""
         url = f"{self.base_url}/{module}/{record_id}/Attachments"
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.get(url, headers=self.headers)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return result.get("data", [])
-                elif response.status_code == 204:
-                    return []  # No attachments
-                else:
-                    print(f"❌ Error getting attachments: {response.status_code}")
-                    return []
-                    
-            except Exception as e:
-                print(f"❌ Exception getting attachments: {str(e)}")
+        try:
+            response = await self.client.get(url, headers=self.headers, timeout=30.0)
+            
+            if response.status_code == 200:
+                result = response.json()
+                return result.get("data", [])
+            elif response.status_code == 204:
+                return []  # No attachments
+            else:
+                print(f"❌ Error getting attachments: {response.status_code}")
                 return []
+                
+        except Exception as e:
+            print(f"❌ Exception getting attachments: {str(e)}")
+            return []
     
     async def download_attachment(self, module: str, record_id: str, attachment_id: str, 
                                  save_path: Optional[str] = None) -> Optional[Dict]:
-        """Download a specific attachment and return its info"""
+        """Download a specific attachment and return its info (streamed to disk when save_path is given)"""
         url = f"{self.base_url}/{module}/{record_id}/Attachments/{attachment_id}"
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            try:
-                response = await client.get(url, headers=self.headers)
-                
-                if response.status_code == 200:
-                    # If save_path is provided, save the file
-                    if save_path:
-                        Path(save_path).parent.mkdir(parents=True, exist_ok=True)
-                        with open(save_path, 'wb') as f:
-                            f.write(response.content)
-                        
-                        return {
-                            "success": True,
-                            "path": save_path,
-                            "size": len(response.content),
-                            "content_type": response.headers.get("content-type")
-                        }
-                    else:
-                        # Return the content directly
-                        return {
-                            "success": True,
-                            "content": response.content,
-                            "size": len(response.content),
-                            "content_type": response.headers.get("content-type")
-                        }
-                else:
+        try:
+            async with self.client.stream("GET", url, headers=self.headers) as response:
+                if response.status_code != 200:
                     print(f"❌ Error downloading attachment: {response.status_code}")
                     return None
-                    
-            except Exception as e:
-                print(f"❌ Exception downloading attachment: {str(e)}")
-                return None
-    
-    async def find_and_download_photo(self, module: str, record_id: str, 
-                                     student_id: str, save_dir: str = "student_photos") -> Optional[str]:
-        """Find Personal_photo attachment and download it"""
+
+                content_type = response.headers.get("content-type")
+                if not save_path:
+                    # Return the content directly
+                    content = await response.aread()
+                    return {
+                        "success": True,
+                        "content": content,
+                        "size": len(content),
+                        "sha256": hashlib.sha256(content).hexdigest(),
+                        "content_type": content_type
+                    }
+
+                # Stream to a partial file, hashing each chunk
+                Path(save_path).parent.mkdir(parents=True, exist_ok=True)
+                part_path = f"{save_path}.part"
+                digest = hashlib.sha256()
+                size = 0
+                try:
+                    with open(part_path, 'wb') as f:
+                        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                            f.write(chunk)
+                            digest.update(chunk)
+                            size += len(chunk)
+                    os.replace(part_path, save_path)
+                finally:
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+
+                return {
+                    "success": True,
+                    "path": save_path,
+                    "size": size,
+                    "sha256": digest.hexdigest(),
+                    "content_type": content_type
+                }
+                
+        except Exception as e:
+            print(f"❌ Exception downloading attachment: {str(e)}")
+            return None
+
+    async def get_photo(self, module: str, record_id: str,
+                        student_id: str, save_dir: str = "student_photos") -> Optional[Dict]:
+        """
+        Find the Personal_photo attachment and make it available as <save_dir>/<student_id><ext>.
+        Returns {"path", "sha256", "cached"} or None; cached photos cost one listing call.
+        """
         
         # Get all attachments for this record
         attachments = await self.get_attachments(module, record_id)
@@ -106,8 +251,6 @@ class ZohoAttachmentHandler:
         file_name = personal_photo.get("File_Name")
         file_type = personal_photo.get("$file_type", "")
         
-        print(f"   📷 Found photo: {file_name} ({file_type})")
-        
         # Determine file extension
         if ".jpg" in file_name.lower() or ".jpeg" in file_name.lower():
             ext = ".jpg"
@@ -120,16 +263,35 @@ class ZohoAttachmentHandler:
         
         # Create save path
         save_path = os.path.join(save_dir, f"{student_id}{ext}")
+        cache = self.cache(save_dir)
+        version = cache.version(personal_photo)
+
+        entry = cache.lookup(attachment_id, version)
+        if entry:
+            cache.materialize(cache.blob_path(entry["sha256"], entry["ext"]), save_path)
+            print(f"   📷 Photo unchanged: {file_name} (cached)")
+            return {"path": save_path, "sha256": entry["sha256"], "cached": True}
+
+        print(f"   📷 Found photo: {file_name} ({file_type})")
         
         # Download the file
-        result = await self.download_attachment(module, record_id, attachment_id, save_path)
+        tmp_path = str(cache.blobs / f"{attachment_id}{ext}.download")
+        result = await self.download_attachment(module, record_id, attachment_id, tmp_path)
         
         if result and result.get("success"):
+            blob = cache.store(attachment_id, version, result["sha256"], ext, tmp_path)
+            cache.materialize(blob, save_path)
             print(f"   ✅ Downloaded to: {save_path}")
-            return save_path
+            return {"path": save_path, "sha256": result["sha256"], "cached": False}
         else:
             print(f"   ❌ Failed to download")
             return None
+    
+    async def find_and_download_photo(self, module: str, record_id: str, 
+                                     student_id: str, save_dir: str = "student_photos") -> Optional[str]:
+        """Find Personal_photo attachment and download it (skipped when the cached copy is current)"""
+        photo = await self.get_photo(module, record_id, student_id, save_dir)
+        return photo["path"] if photo else None
 
 
 async def test_photo_download():
@@ -158,6 +320,7 @@ async def test_photo_download():
         student_id=omar_student_id,
         save_dir="student_photos"
     )
+    await handler.aclose()
     
     if photo_path:
         print(f"\n✅ Success! Photo saved to: {photo_path}")
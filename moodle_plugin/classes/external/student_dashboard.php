@@ -108,6 +108,7 @@ class student_dashboard extends external_api {
             
             // Handle photo upload if provided
             $photo_saved = false;
+            $photo_sha256 = '';
             if (!empty($data['photo_data']) && !empty($data['photo_filename'])) {
                 try {
                     global $CFG;
@@ -125,6 +126,7 @@ class student_dashboard extends external_api {
                     if (file_put_contents($filepath, $photo_binary)) {
                         $record->photo_url = '/student_photos/' . $data['photo_filename'];
                         $photo_saved = true;
+                        $photo_sha256 = hash('sha256', $photo_binary);
                     }
                 } catch (\Exception $e) {
                     // Log but don't fail the whole operation
@@ -135,6 +137,15 @@ class student_dashboard extends external_api {
                 $record->photo_url = $data['photo_url'];
             }
             
+            // Report the photo file we hold so the sync can re-send it if it differs
+            if (!$photo_saved && !empty($data['photo_filename'])) {
+                global $CFG;
+                $heldpath = $CFG->dataroot . '/student_photos/' . basename($data['photo_filename']);
+                if (is_file($heldpath)) {
+                    $photo_sha256 = hash_file('sha256', $heldpath);
+                }
+            }
+            
             if ($existing) {
                 $record->id = $existing->id;
                 $DB->update_record('local_mzi_students', $record);
@@ -157,7 +168,8 @@ class student_dashboard extends external_api {
                 'success' => true,
                 'action' => $action,
                 'student_id' => $data['zoho_student_id'],
-                'message' => $message
+                'message' => $message,
+                'photo_sha256' => $photo_sha256
             ];
             
         } catch (\Exception $e) {
@@ -175,7 +187,9 @@ class student_dashboard extends external_api {
             'success' => new external_value(PARAM_BOOL, 'Operation success status'),
             'action' => new external_value(PARAM_TEXT, 'Action performed (created/updated)'),
             'student_id' => new external_value(PARAM_TEXT, 'Zoho student ID'),
-            'message' => new external_value(PARAM_TEXT, 'Result message')
+            'message' => new external_value(PARAM_TEXT, 'Result message'),
+            'photo_sha256' => new external_value(PARAM_ALPHANUM,
+                'SHA-256 of the photo file held for photo_filename (empty if none)', VALUE_OPTIONAL)
         ]);
     }
     
@@ -842,6 +856,64 @@ class student_dashboard extends external_api {
             'message'        => new external_value(PARAM_TEXT, 'Result message'),
         ]);
     }
+
+    /**
+     * Returns description of method parameters for update_enrollments
+     */
+    public static function update_enrollments_parameters() {
+        return new external_function_parameters([
+            'enrollmentsdata' => new external_value(PARAM_RAW,
+                'JSON array of enrollment objects (same shape as update_enrollment)')
+        ]);
+    }
+
+    /**
+     * Batch form of update_enrollment: one WS round trip for a whole class.
+     * Each item is processed independently — a failing item is reported in
+     * its result row and does not stop the rest.
+     *
+     * @param string $enrollmentsdata JSON array of enrollment objects
+     */
+    public static function update_enrollments($enrollmentsdata) {
+        $params = self::validate_parameters(self::update_enrollments_parameters(), [
+            'enrollmentsdata' => $enrollmentsdata,
+        ]);
+
+        $context = context_system::instance();
+        require_capability('moodle/site:config', $context);
+
+        $items = json_decode($params['enrollmentsdata'], true);
+        if (!is_array($items)) {
+            throw new \invalid_parameter_exception('Invalid JSON data');
+        }
+
+        $results = [];
+        foreach ($items as $item) {
+            try {
+                $results[] = self::update_enrollment(json_encode($item));
+            } catch (\Exception $e) {
+                $results[] = [
+                    'success'        => false,
+                    'action'         => 'none',
+                    'enrollment_id'  => (string)($item['zoho_enrollment_id'] ?? ''),
+                    'enrol_status'   => 'error',
+                    'moodle_user_id' => 0,
+                    'message'        => $e->getMessage(),
+                ];
+            }
+        }
+
+        return ['results' => $results];
+    }
+
+    /**
+     * Returns description of method result value for update_enrollments
+     */
+    public static function update_enrollments_returns() {
+        return new external_single_structure([
+            'results' => new external_multiple_structure(self::update_enrollment_returns()),
+        ]);
+    }
     
     
     /**
@@ -96,6 +96,15 @@ $functions = [
         'ajax'        => true,
     ],
     
+    'local_mzi_update_enrollments' => [
+        'classname'   => 'local_moodle_zoho_sync\external\student_dashboard',
+        'methodname'  => 'update_enrollments',
+        'classpath'   => '',
+        'description' => 'Update a batch of student enrollments from Zoho CRM in one call',
+        'type'        => 'write',
+        'ajax'        => true,
+    ],
+    
     'local_mzi_submit_grade' => [
         'classname'   => 'local_moodle_zoho_sync\external\student_dashboard',
         'methodname'  => 'submit_grade',
@@ -234,6 +243,7 @@ $services = [
             'local_mzi_sync_installments',
             'local_mzi_create_class',
             'local_mzi_update_enrollment',
+            'local_mzi_update_enrollments',
             'local_mzi_submit_grade',
             'local_mzi_update_request_status',
             'local_mzi_approve_photo',